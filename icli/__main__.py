@@ -5,6 +5,8 @@ from loguru import logger
 from mutil import safeLoop  # type: ignore
 import asyncio
 import icli.cli as cli
+from icli.replay import replayApp
+from icli.simbroker import SimIB
 import sys
 
 from dotenv import dotenv_values
@@ -16,7 +18,10 @@ if sys.version_info >= (3, 12):
     asyncio.get_event_loop().set_task_factory(asyncio.eager_task_factory)
 
 CONFIG_DEFAULT = dict(
-    ICLI_IBKR_HOST="127.0.0.1", ICLI_IBKR_PORT=4001, ICLI_REFRESH=3.33
+    ICLI_IBKR_HOST="127.0.0.1",
+    ICLI_IBKR_PORT=4001,
+    ICLI_REFRESH=3.33,
+    ICLI_SIMULATE=0,
 )
 
 CONFIG = {**CONFIG_DEFAULT, **dotenv_values(".env.icli"), **os.environ}
@@ -33,11 +38,23 @@ HOST: str = CONFIG["ICLI_IBKR_HOST"]
 PORT = int(CONFIG["ICLI_IBKR_PORT"])  # type: ignore
 REFRESH = float(CONFIG["ICLI_REFRESH"])  # type: ignore
 
+# run against a local simulated broker instead of the IBKR gateway
+SIMULATE = bool(int(CONFIG["ICLI_SIMULATE"]))  # type: ignore
+
 
 async def initcli():
-    app = cli.IBKRCmdlineApp(
-        accountId=ACCOUNT_ID, toolbarUpdateInterval=REFRESH, host=HOST, port=PORT
-    )
+    if SIMULATE:
+        # simulated executions and latencies never mix into the live journal and latency
+        # history, and simulated sessions don't record ticks
+        app = replayApp(accountId=ACCOUNT_ID, toolbarUpdateInterval=REFRESH, ib=SimIB())
+    else:
+        app = cli.IBKRCmdlineApp(
+            accountId=ACCOUNT_ID,
+            toolbarUpdateInterval=REFRESH,
+            host=HOST,
+            port=PORT,
+        )
+
     await app.setup()
     if sys.stdin.isatty():
         # patch entire application with prompt-toolkit-compatible stdout
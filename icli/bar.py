@@ -1,55 +1,437 @@
+import asyncio
+
+from collections import defaultdict
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
+from typing import Any, Callable, Final
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+
 from loguru import logger
 
+from icli.helpers import contractForName
+
+
+@dataclass(slots=True)
+class OHLCBar:
+    date: datetime
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float = 0
+
+
 @dataclass
-class OHLC5MinTracker:
-    def __init__(self):
-        self.previous_bar = None
-        self.current_bar = None
-        self.current_interval_start = None
-        self.skip_until = None
-
-    def _align_to_5min(self, dt: datetime) -> datetime:
-        return dt.replace(minute=dt.minute - dt.minute % 5, second=0, microsecond=0)
-        # #return dt - timedelta(
-        #     minutes=dt.minute % 5,
-        #     seconds=0,
-        #     microseconds=0
-        # )
-
-    def update(self, tick_time: datetime, tick_price: float):
-        aligned_time = self._align_to_5min(tick_time)
-
-        if self.skip_until is None:
-            self.skip_until = aligned_time + timedelta(minutes=5)
+class ORBTracker:
+    """Opening range breakout state carried forward one completed bar at a time.
+
+    Same rules as scanning every bar since the open on each check, but each new bar
+    only updates the running state instead of rescanning the session."""
+
+    orbHigh: float
+    orbLow: float
+
+    stale: bool = False
+    inside: bool = True
+    outside: bool = False
+    outsideCount: int = 0
+    breakoutCount: int = 0
+    retestCount: int = 0
+
+    # (bar date, "C" or "P") of the most recent breakout
+    lastBreakout: tuple[datetime, str] | None = None
+
+    def update(self, bar, latest: bool = True) -> str | None:
+        """Process a completed bar; returns breakout direction if 'bar' is a valid breakout.
+
+        Only the latest completed bar can be a valid breakout; older bars closing
+        outside the range make the range stale until price comes back inside."""
+        direction = None
+        if bar.open >= self.orbHigh and bar.close >= self.orbHigh:
+            direction = "C"
+        elif bar.open <= self.orbLow and bar.close <= self.orbLow:
+            direction = "P"
+
+        if direction:
+            self.outside = True
+            self.inside = False
+            if not self.stale:
+                self.outsideCount += 1
+                if latest:
+                    self.breakoutCount += 1
+                    self.lastBreakout = (bar.date, direction)
+
+                # once this bar is no longer the latest bar, it's a stale breakout
+                self.stale = True
+
+                return direction if latest else None
+        elif not self.inside:
+            self.inside = True
+            self.stale = False
+            self.retestCount += 1
+            self.outside = False
+
+        return None
+
+    def breakoutAt(self, date: datetime) -> str | None:
+        """Return breakout direction if the bar starting at 'date' was a valid breakout."""
+        if self.lastBreakout and self.lastBreakout[0] == date:
+            return self.lastBreakout[1]
+
+        return None
+
+
+@dataclass
+class BarSeries:
+    """Completed bars for one symbol plus the currently building bar."""
+
+    symbol: str
+    contract: Any = None
+    bars: list[OHLCBar] = field(default_factory=list)
+    byDate: dict[datetime, OHLCBar] = field(default_factory=dict)
+    current: OHLCBar | None = None
+    live: Any = None
+
+    # called with each newly completed bar
+    listeners: list[Callable[[OHLCBar], Any]] = field(default_factory=list)
+
+    def complete(self, bar: OHLCBar) -> None:
+        self.bars.append(bar)
+        self.byDate[bar.date] = bar
+
+        for listener in self.listeners:
+            try:
+                listener(bar)
+            except:
+                logger.exception("[{}] Bar listener failed", self.symbol)
+
+
+@dataclass
+class IntradayBars:
+    """Shared 5 minute intraday bars per symbol.
+
+    Each symbol is seeded once from historical data, then extended from 5 second
+    realtime bars, so strategies read completed bars without repeating historical requests."""
+
+    state: Any
+    minutes: int = 5
+    tz: ZoneInfo = field(default_factory=lambda: ZoneInfo("America/New_York"))
+    series: dict[str, BarSeries] = field(default_factory=dict)
+    seeding: dict[str, asyncio.Task] = field(default_factory=dict)
+
+    def align(self, dt: datetime) -> datetime:
+        dt = dt.astimezone(self.tz)
+        return dt.replace(
+            minute=dt.minute - dt.minute % self.minutes, second=0, microsecond=0
+        )
+
+    async def get(self, symbol: str) -> BarSeries:
+        """Return bar series for symbol, seeding it on first use (concurrent callers share one seed)."""
+        if found := self.series.get(symbol):
+            return found
+
+        if symbol not in self.seeding:
+            self.seeding[symbol] = asyncio.create_task(self.seed(symbol))
+
+        try:
+            return await asyncio.shield(self.seeding[symbol])
+        finally:
+            self.seeding.pop(symbol, None)
+
+    async def seed(self, symbol: str) -> BarSeries:
+        (contract,) = await self.state.qualify(contractForName(symbol))
+        series = BarSeries(symbol, contract)
+
+        await self.backfill(series)
+        self.subscribe(series)
+        self.series[symbol] = series
+
+        logger.info(
+            "[{}] Seeded {} intraday bars, extending from realtime bars",
+            symbol,
+            len(series.bars),
+        )
+
+        return series
+
+    async def backfill(self, series: BarSeries) -> None:
+        """Complete bars newer than the last completed bar from historical data."""
+        contract = series.contract
+        await self.state.pacer.wait(
+            "historical", key=(contract.conId, "TRADES", self.minutes)
+        )
+        history = await self.state.ib.reqHistoricalDataAsync(
+            contract,
+            endDateTime="",
+            durationStr="23400 S",
+            barSizeSetting=f"{self.minutes} mins",
+            whatToShow="TRADES",
+            useRTH=True,
+            formatDate=1,
+        )
+
+        now = datetime.now(self.tz)
+        last = series.bars[-1].date if series.bars else None
+        for hbar in history or []:
+            bar = OHLCBar(
+                hbar.date, hbar.open, hbar.high, hbar.low, hbar.close, hbar.volume
+            )
+
+            # the final historical bar is partial if its interval hasn't finished yet
+            if bar.date + timedelta(minutes=self.minutes) > now:
+                series.current = bar
+            elif last is None or bar.date > last:
+                series.complete(bar)
+
+    def subscribe(self, series: BarSeries) -> None:
+        """Extend 'series' from realtime bars (if a line is available)."""
+        series.live = self.state.lines.subscribe(
+            series.contract,
+            "intraday",
+            "bars",
+            barSize=5,
+            whatToShow="TRADES",
+            useRTH=True,
+        )
+
+        if series.live is not None:
+            series.live.updateEvent += lambda bars, hasNewBar: self.extend(
+                series, bars, hasNewBar
+            )
+        else:
+            logger.warning("[{}] No line available for realtime bars", series.symbol)
+
+    async def reseed(self) -> None:
+        """Resume every series after a reconnect (which drops every line).
+
+        Series are kept (with their listeners): bars completed while disconnected are
+        added from historical data, then realtime bars are subscribed again."""
+        for symbol, series in list(self.series.items()):
+            series.live = None
+            try:
+                await self.backfill(series)
+            except:
+                logger.exception("[{}] Failed to backfill intraday bars", symbol)
+
+            # released while we waited on history
+            if self.series.get(symbol) is series:
+                self.subscribe(series)
+
+    def extend(self, series: BarSeries, bars, hasNewBar: bool) -> None:
+        if not hasNewBar:
             return
 
-        # Don't build bars until we hit a clean interval after the first tick
-        if aligned_time < self.skip_until:
+        rt = bars[-1]
+        start = self.align(rt.time)
+        current = series.current
+
+        if current and current.date == start:
+            current.high = max(current.high, rt.high)
+            current.low = min(current.low, rt.low)
+            current.close = rt.close
+            current.volume += rt.volume
             return
 
-        if aligned_time != self.current_interval_start:
-            if self.current_bar:
-                self.previous_bar = self.current_bar
-            self.current_interval_start = aligned_time
-            self.current_bar = {
-                'timestamp': aligned_time,
-                'open': tick_price,
-                'high': tick_price,
-                'low': tick_price,
-                'close': tick_price
-            }
+        # a realtime bar in a new interval means the building bar is complete
+        if current and current.date < start:
+            series.complete(current)
+
+        series.current = OHLCBar(start, rt.open_, rt.high, rt.low, rt.close, rt.volume)
+
+    def release(self, symbol: str) -> None:
+        if series := self.series.pop(symbol, None):
+            if series.live is not None:
+                self.state.lines.unsubscribeContract(
+                    series.contract, "intraday", "bars"
+                )
+
+
+# bar durations (in seconds) built for every symbol fed into a BarAggregator
+TIMEFRAMES: Final = {"1s": 1, "5s": 5, "1m": 60, "5m": 300, "15m": 900}
+
+# completed bars retained per timeframe
+TIMEFRAME_HISTORY: Final = {"1s": 300, "5s": 360, "1m": 390, "5m": 200, "15m": 100}
+
+# columns of each bar row ('partial' is 1 for a first bar which started mid-interval)
+BAR_COLUMNS: Final = ("time", "open", "high", "low", "close", "volume", "partial")
+T, O, H, L, C, V, P = range(len(BAR_COLUMNS))
+
+
+@dataclass(slots=True)
+class BarRing:
+    """OHLCV bars for one timeframe in a fixed-size ring.
+
+    Every completed bar is written twice (at 'idx' and 'idx + capacity') so the most
+    recent 'capacity' bars are always one contiguous slice of 'data', which lets us
+    return ordered views (and DataFrames) without copying."""
+
+    seconds: int
+    capacity: int
+    data: np.ndarray = field(init=False)
+    current: np.ndarray = field(init=False)
+
+    # total bars completed (the ring holds the last 'capacity' of them)
+    count: int = 0
+
+    # start of the bar currently building (0 if not started yet)
+    start: float = 0
+
+    def __post_init__(self) -> None:
+        self.data = np.full((2 * self.capacity, len(BAR_COLUMNS)), np.nan)
+        self.current = np.full(len(BAR_COLUMNS), np.nan)
+
+    def update(self, when: float, price: float, volume: float) -> np.ndarray | None:
+        """Add a tick; returns the completed bar row if this tick started a new bar."""
+        start = when - (when % self.seconds)
+        cur = self.current
+        completed = None
+
+        if start != self.start:
+            # the first bar is kept but marked partial unless its first tick opened the interval
+            partial = not self.start and when != start
+            if self.start:
+                completed = self.append(cur)
+
+            self.start = start
+            cur[T] = start
+            cur[O] = cur[H] = cur[L] = cur[C] = price
+            cur[V] = volume
+            cur[P] = partial
         else:
-            self.current_bar['high'] = max(self.current_bar['high'], tick_price)
-            self.current_bar['low'] = min(self.current_bar['low'], tick_price)
-            self.current_bar['close'] = tick_price
+            if price > cur[H]:
+                cur[H] = price
+            elif price < cur[L]:
+                cur[L] = price
+
+            cur[C] = price
+            cur[V] += volume
+
+        return completed
+
+    def append(self, row: np.ndarray) -> np.ndarray:
+        idx = self.count % self.capacity
+        self.data[idx] = row
+        self.data[idx + self.capacity] = row
+        self.count += 1
+        return self.data[idx]
+
+    def completed(self) -> np.ndarray:
+        """Completed bars oldest-to-newest as a view (no copy)."""
+        if self.count < self.capacity:
+            return self.data[: self.count]
+
+        head = self.count % self.capacity
+        return self.data[head : head + self.capacity]
+
+    def last(self) -> np.ndarray | None:
+        if not self.count:
+            return None
+
+        return self.data[(self.count - 1) % self.capacity]
+
+
+@dataclass
+class BarAggregator:
+    """Build bars at every timeframe in TIMEFRAMES for any symbol from tick timestamps."""
+
+    timeframes: dict[str, int] = field(default_factory=lambda: dict(TIMEFRAMES))
+    history: dict[str, int] = field(default_factory=lambda: dict(TIMEFRAME_HISTORY))
+
+    # exchange timezone for bar timestamps returned by previous()
+    tz: ZoneInfo = field(default_factory=lambda: ZoneInfo("America/New_York"))
+
+    rings: dict[Any, dict[str, BarRing]] = field(default_factory=dict)
+    lastVolume: dict[Any, float] = field(default_factory=dict)
+
+    # (key, timeframe) -> callbacks run with (key, timeframe, bar row) when a bar completes
+    listeners: dict[tuple[Any, str], list[Callable]] = field(
+        default_factory=lambda: defaultdict(list)
+    )
+
+    def update(
+        self, key: Any, when: float, price: float, volume: float = np.nan
+    ) -> None:
+        """Add one tick for 'key' at epoch seconds 'when'.
+
+        'volume' is the ticker's cumulative volume; bars get the change between ticks."""
+        if price != price or when != when:
+            return
+
+        if (rings := self.rings.get(key)) is None:
+            rings = self.rings[key] = {
+                name: BarRing(seconds, self.history.get(name, 100))
+                for name, seconds in self.timeframes.items()
+            }
+
+        prev = self.lastVolume.get(key)
+        delta = 0.0
+        if volume == volume:
+            if prev is not None and volume >= prev:
+                delta = volume - prev
+
+            self.lastVolume[key] = volume
+
+        for name, ring in rings.items():
+            completed = ring.update(when, price, delta)
+            if completed is not None and (key, name) in self.listeners:
+                for listener in self.listeners[(key, name)]:
+                    try:
+                        listener(key, name, completed)
+                    except:
+                        logger.exception("[{} :: {}] Bar listener failed", key, name)
+
+    def subscribe(self, key: Any, timeframe: str, listener: Callable) -> None:
+        assert timeframe in self.timeframes, f"Unknown timeframe: {timeframe}"
+        self.listeners[(key, timeframe)].append(listener)
+
+    def unsubscribe(self, key: Any, timeframe: str, listener: Callable) -> None:
+        if found := self.listeners.get((key, timeframe)):
+            if listener in found:
+                found.remove(listener)
+
+            if not found:
+                del self.listeners[(key, timeframe)]
+
+    def remove(self, key: Any) -> None:
+        self.rings.pop(key, None)
+        self.lastVolume.pop(key, None)
+
+    def bars(self, key: Any, timeframe: str) -> np.ndarray:
+        """Completed bars as an (N, len(BAR_COLUMNS)) array view, oldest first."""
+        if rings := self.rings.get(key):
+            return rings[timeframe].completed()
+
+        return np.empty((0, len(BAR_COLUMNS)))
+
+    def frame(self, key: Any, timeframe: str) -> pd.DataFrame:
+        """Completed bars as a DataFrame backed by the ring memory (no copy; don't modify it)."""
+        df = pd.DataFrame(self.bars(key, timeframe), columns=BAR_COLUMNS, copy=False)
+        df.index = pd.to_datetime(df["time"], unit="s", utc=True)
+        return df
+
+    def previous(
+        self, key: Any, timeframe: str, partial: bool = True
+    ) -> dict[str, Any] | None:
+        """Most recent completed bar as a dict (timestamp, open, high, low, close).
 
-    def get_current_bar(self):
-        return self.current_bar
+        The timestamp is in the exchange timezone. If 'partial' is False, a first bar which
+        started mid-interval isn't returned."""
+        if not (rings := self.rings.get(key)):
+            return None
 
-    def get_previous_bar(self):
-        return self.previous_bar
+        row = rings[timeframe].last()
+        if row is None or (row[P] and not partial):
+            return None
 
-    def __repr__(self):
-        return f"Current: {self.current_bar}, Previous: {self.previous_bar}"
+        return {
+            "timestamp": datetime.fromtimestamp(row[T], self.tz),
+            "open": row[O],
+            "high": row[H],
+            "low": row[L],
+            "close": row[C],
+            "volume": row[V],
+            "partial": bool(row[P]),
+        }
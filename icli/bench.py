@@ -0,0 +1,465 @@
+"""Micro-benchmarks for icli hot paths with a regression baseline.
+
+Every benchmark runs offline against an unconnected app (see icli.replay.replayApp) with
+synthetic quotes: recorded-style rows are applied to registered tickers exactly like a
+replay, so tickersUpdate(), the toolbar, and the quote sort see the same objects they see
+live. Quote-dependent paths run at 10, 100, and 500 quotes.
+
+Each benchmark reports nanoseconds per call (median of several timeit rounds, each round
+auto-ranged to run long enough for stable timing). Results are written as JSON, and a
+run is compared against a baseline JSON: a benchmark regresses when it is slower than
+its baseline by more than its threshold (ICLI_BENCH_THRESHOLD, or a per-benchmark value
+from the baseline's "thresholds"). Quote-dependent benchmarks are also checked for
+scaling: the cost per quote may grow by at most ICLI_BENCH_SCALING (or the baseline's
+per-family "scaling" value) from one quote count to the next, so a path going quadratic
+fails even on a machine without a baseline. Regressions, scaling failures, and
+benchmarks without a baseline exit non-zero so this can gate changes.
+
+    python -m icli.bench                      # run everything, compare against the baseline
+    python -m icli.bench --save               # run everything, record it as the new baseline
+    python -m icli.bench -k toolbar -o now.json
+
+Baselines are only comparable on the machine (and Python) they were recorded on, so
+record one with --save before comparing anywhere new.
+"""
+
+import argparse
+import datetime
+import functools
+import itertools
+import math
+import os
+import pathlib
+import platform
+import re
+import statistics
+import sys
+import tempfile
+import timeit
+
+from collections.abc import Callable
+from typing import Any, Final
+
+import diskcache
+import orjson
+
+from ib_async import Contract, Option, Stock
+from loguru import logger
+
+import icli.cli as cli
+import icli.lang as lang
+from icli.contracts import ContractIndex
+from icli.helpers import (
+    PriceOrQuantity,
+    comply,
+    contractForName,
+    contractToSymbolDescriptor,
+    lookupKey,
+)
+from icli.replay import TickReplay, replayApp
+from icli.tinyalgo import ATRLive
+
+ICLI_BENCH_BASELINE: Final = str(
+    os.getenv(
+        "ICLI_BENCH_BASELINE", pathlib.Path(__file__).with_name("bench-baseline.json")
+    )
+)
+
+# fraction a benchmark may be slower than its baseline before it counts as a regression
+ICLI_BENCH_THRESHOLD: Final = float(os.getenv("ICLI_BENCH_THRESHOLD", 0.25))
+
+# largest allowed growth of per-quote cost between consecutive QUOTE_COUNTS
+ICLI_BENCH_SCALING: Final = float(os.getenv("ICLI_BENCH_SCALING", 1.5))
+
+# timeit rounds per benchmark (the median round is reported)
+ICLI_BENCH_ROUNDS: Final = int(os.getenv("ICLI_BENCH_ROUNDS", 5))
+
+QUOTE_COUNTS: Final = (10, 100, 500)
+
+STOCKS: Final = """SPY QQQ IWM DIA AAPL MSFT NVDA AMZN GOOG META TSLA AMD NFLX AVGO COIN
+                   JPM XOM UNH LLY COST""".split()
+
+# name -> setup function returning the zero-argument callable to time
+BENCHMARKS: dict[str, Callable[[], Callable[[], Any]]] = {}
+
+
+def bench(name: str) -> Callable:
+    def register(setup: Callable[[], Callable[[], Any]]) -> Callable:
+        BENCHMARKS[name] = setup
+        return setup
+
+    return register
+
+
+def expiration(days: int = 30) -> str:
+    """Return the first Friday at least 'days' from today as YYMMDD.
+
+    Benchmarked options must never be expired, or the greeks refresh skips them."""
+    date = datetime.date.today() + datetime.timedelta(days=days)
+    date += datetime.timedelta(days=(4 - date.weekday()) % 7)
+    return date.strftime("%y%m%d")
+
+
+def quoteNames(count: int) -> list[str]:
+    """Return 'count' quote names: stocks first, then SPY options around the money.
+
+    Every count has about the same share of options (at least 80%) so costs per quote
+    are comparable across counts; options also run through the greeks refresh."""
+    names = STOCKS[: max(1, count // 5)]
+    expires = expiration()
+    for i in itertools.count():
+        if len(names) >= count:
+            break
+
+        right = "C" if i % 2 == 0 else "P"
+        names.append(f"SPY{expires}{right}{(500 + i // 2) * 1000:08d}")
+
+    return names
+
+
+@functools.cache
+def quotedApp(count: int) -> tuple[cli.IBKRCmdlineApp, list[Any]]:
+    """Return an unconnected app quoting 'count' synthetic quotes (and their tickers)."""
+    app = replayApp(
+        conIdCache=ContractIndex(disk=diskcache.Cache(tempfile.mkdtemp("-icli-bench")))
+    )
+
+    harness = TickReplay(app, toolbarInterval=0)
+    now = datetime.datetime.now().timestamp()
+
+    tickers = []
+    for i, name in enumerate(quoteNames(count)):
+        price = 500 + i if name in STOCKS else 5 + i % 7
+        tickers.append(
+            harness.apply(
+                (name, now, price - 0.01, 100, price + 0.01, 100, price, 1_000_000)
+            )
+        )
+
+    return app, tickers
+
+
+def tick(tickers: list[Any], step: int) -> None:
+    """Move every quote by a penny (alternating direction) so every consumer sees a change."""
+    delta = 0.01 if step % 2 else -0.01
+    for t in tickers:
+        t.bid += delta
+        t.ask += delta
+        t.last += delta
+
+
+def quotesBenchmarks(count: int) -> None:
+    @bench(f"tickersUpdate[{count}]")
+    def tickersUpdate():
+        app, tickers = quotedApp(count)
+        batch = set(tickers)
+        steps = itertools.count()
+
+        def run():
+            tick(tickers, next(steps))
+            app.tickersUpdate(batch)
+
+        return run
+
+    @bench(f"bottomToolbar[{count}]")
+    def bottomToolbar():
+        # unchanged quotes: only rows whose values changed are formatted again
+        app, _ = quotedApp(count)
+        return app.bottomToolbar
+
+    @bench(f"formatTicker[{count}]")
+    def formatTicker():
+        # every quote changed: every row is formatted again
+        app, tickers = quotedApp(count)
+        steps = itertools.count()
+
+        def run():
+            tick(tickers, next(steps))
+            app.bottomToolbar()
+
+        return run
+
+    @bench(f"sortQuotes[{count}]")
+    def sortQuotes():
+        app, _ = quotedApp(count)
+        return lambda: sorted(app.quoteState.items(), key=cli.sortQuotes)
+
+
+for count in QUOTE_COUNTS:
+    quotesBenchmarks(count)
+
+
+@bench("qualify[cached]")
+def qualifyCached():
+    app, tickers = quotedApp(QUOTE_COUNTS[0])
+
+    # lookups by contract id and by unqualified symbol descriptor
+    requests: list[Contract] = []
+    for t in tickers:
+        contract = t.contract
+        if isinstance(contract, Option):
+            app.conIdCache.store(contract)
+            requests.append(Contract(conId=contract.conId))
+        else:
+            request = Stock(contract.symbol, "SMART", "USD")
+            app.conIdCache.store(contract, contractToSymbolDescriptor(request))
+            requests.append(request)
+
+    def run():
+        # fully cached qualification never suspends, so drive the coroutine directly
+        try:
+            app.qualify(*requests).send(None)
+        except StopIteration:
+            pass
+
+    return run
+
+
+@bench("contractForName")
+def contractsForNames():
+    expires = expiration()
+    names = ["aapl", f"SPY{expires}C00500000", "/ES", "/ESZ4", f"/ES{expires}C05000000"]
+    return lambda: [contractForName(n) for n in names]
+
+
+@bench("lookupKey")
+def lookupKeys():
+    _, tickers = quotedApp(QUOTE_COUNTS[0])
+    contracts = [t.contract for t in tickers]
+    return lambda: [lookupKey(c) for c in contracts]
+
+
+@bench("comply")
+def complyPrices():
+    expires = expiration()
+    option = Option(
+        "SPXW",
+        f"20{expires}",
+        5000,
+        "C",
+        "SMART",
+        localSymbol=f"SPXW  {expires}C05000000",
+    )
+    return lambda: (comply(option, 3.27), comply(option, -12.33), comply("AAPL", 101.234))
+
+
+@bench("PriceOrQuantity")
+def priceOrQuantity():
+    return lambda: (
+        PriceOrQuantity("$12,500"),
+        PriceOrQuantity("-100"),
+        PriceOrQuantity(250, is_quantity=True),
+    )
+
+
+@bench("Calculator.calc")
+def calculator():
+    app, _ = quotedApp(QUOTE_COUNTS[0])
+    expressions = [
+        "(/ (- 512.25 498.10) 498.10)",
+        "(grow (+ 100 (* 2_000 3.5)) 5 3)",
+    ]
+    return lambda: [app.calc.calc(e) for e in expressions]
+
+
+@bench("expand_symbols")
+def expandSymbols():
+    symbols = ["SPXW241220{P,C}0{4900,5000,5100}000", "AAPL", "/ES"]
+    return lambda: lang.expand_symbols(symbols)
+
+
+@bench("ATRLive.update")
+def atrLive():
+    atr = ATRLive()
+    prices = itertools.cycle(
+        [500 + math.sin(i / 10) * 3 + (i % 7) * 0.05 for i in range(1000)]
+    )
+    return lambda: atr.update(next(prices))
+
+
+def measure(fn: Callable[[], Any], rounds: int = ICLI_BENCH_ROUNDS) -> dict[str, Any]:
+    """Return nanoseconds per call (median and best round) and loops per round."""
+    timer = timeit.Timer(fn)
+    loops, _ = timer.autorange()
+    times = [t / loops * 1e9 for t in timer.repeat(rounds, loops)]
+    return dict(ns=statistics.median(times), min=min(times), loops=loops)
+
+
+def run(pattern: str | None = None) -> dict[str, Any]:
+    """Run benchmarks (optionally only names matching 'pattern'); returns the results document."""
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if pattern and not re.search(pattern, name):
+            continue
+
+        results[name] = measure(setup())
+        logger.info("{:>24}: {:>14,.0f} ns", name, results[name]["ns"])
+
+    return dict(
+        created=datetime.datetime.now().isoformat(timespec="seconds"),
+        python=platform.python_version(),
+        implementation=platform.python_implementation(),
+        machine=platform.machine(),
+        platform=platform.platform(),
+        processor=platform.processor(),
+        benchmarks=results,
+    )
+
+
+def load(path: str | pathlib.Path) -> dict[str, Any] | None:
+    try:
+        return orjson.loads(pathlib.Path(path).read_bytes())
+    except FileNotFoundError:
+        return None
+
+
+def save(path: str | pathlib.Path, document: dict[str, Any]) -> None:
+    pathlib.Path(path).write_bytes(
+        orjson.dumps(document, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS)
+    )
+
+
+def compare(
+    current: dict[str, Any],
+    baseline: dict[str, Any],
+    threshold: float = ICLI_BENCH_THRESHOLD,
+) -> list[str]:
+    """Log each benchmark against its baseline; returns names of regressed benchmarks."""
+    if (current["python"], current["machine"]) != (
+        baseline.get("python"),
+        baseline.get("machine"),
+    ):
+        logger.warning(
+            "Baseline is from Python {} on {} (this is Python {} on {})",
+            baseline.get("python"),
+            baseline.get("machine"),
+            current["python"],
+            current["machine"],
+        )
+
+    thresholds = baseline.get("thresholds", {})
+    previous = baseline.get("benchmarks", {})
+
+    regressed = []
+    for name, found in current["benchmarks"].items():
+        if not (base := previous.get(name)):
+            # an unrecorded benchmark can't pass a comparison
+            regressed.append(name)
+            logger.error("{:>24}: {:>14,.0f} ns (no baseline)", name, found["ns"])
+            continue
+
+        ratio = found["ns"] / base["ns"]
+        limit = 1 + thresholds.get(name, threshold)
+        if ratio > limit:
+            regressed.append(name)
+            log = logger.error
+        else:
+            log = logger.info
+
+        log(
+            "{:>24}: {:>14,.0f} ns vs {:>14,.0f} ns ({:>+7.1%}, limit {:+.0%})",
+            name,
+            found["ns"],
+            base["ns"],
+            ratio - 1,
+            limit - 1,
+        )
+
+    return regressed
+
+
+def scaling(
+    current: dict[str, Any],
+    limits: dict[str, float] | None = None,
+    limit: float = ICLI_BENCH_SCALING,
+) -> list[str]:
+    """Check per-quote cost growth between consecutive quote counts of each benchmark family.
+
+    Returns names of benchmarks whose cost per quote grew by more than the family's limit
+    (from 'limits', else 'limit') compared to the previous quote count."""
+    limits = limits or {}
+    families: dict[str, dict[int, float]] = {}
+    for name, found in current["benchmarks"].items():
+        if m := re.fullmatch(r"(.+)\[(\d+)\]", name):
+            families.setdefault(m.group(1), {})[int(m.group(2))] = found["ns"]
+
+    superlinear = []
+    for family, byCount in families.items():
+        allowed = limits.get(family, limit)
+        counts = sorted(byCount)
+        for smaller, larger in itertools.pairwise(counts):
+            growth = (byCount[larger] / larger) / (byCount[smaller] / smaller)
+            if growth > allowed:
+                superlinear.append(f"{family}[{larger}]")
+                log = logger.error
+            else:
+                log = logger.info
+
+            log(
+                "{:>24}: {:>10,.0f} ns/quote at {} vs {:,.0f} at {} ({:.2f}x, max {:.2f}x)",
+                family,
+                byCount[larger] / larger,
+                larger,
+                byCount[smaller] / smaller,
+                smaller,
+                growth,
+                allowed,
+            )
+
+    return superlinear
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark icli hot paths")
+    parser.add_argument("-k", dest="pattern", help="only run benchmarks matching regex")
+    parser.add_argument("-o", "--output", help="write results JSON here")
+    parser.add_argument("--baseline", default=ICLI_BENCH_BASELINE)
+    parser.add_argument(
+        "--save", action="store_true", help="record results as the new baseline"
+    )
+    parser.add_argument("--threshold", type=float, default=ICLI_BENCH_THRESHOLD)
+    parser.add_argument("--scaling", type=float, default=ICLI_BENCH_SCALING)
+    args = parser.parse_args()
+
+    # the toolbar and handlers log through loguru; only report benchmark results
+    logger.remove()
+    logger.add(sys.stderr, level="INFO", filter=__name__)
+
+    current = run(args.pattern)
+
+    if args.output:
+        save(args.output, current)
+
+    baseline = load(args.baseline)
+    failed = scaling(current, (baseline or {}).get("scaling"), args.scaling)
+
+    if args.save:
+        # keep per-benchmark thresholds (and benchmarks not run this time) from the previous baseline
+        if baseline:
+            current["thresholds"] = baseline.get("thresholds", {})
+            current["benchmarks"] = {
+                **baseline.get("benchmarks", {}),
+                **current["benchmarks"],
+            }
+
+        # keep per-family scaling limits too
+        if baseline and "scaling" in baseline:
+            current["scaling"] = baseline["scaling"]
+
+        save(args.baseline, current)
+        logger.info("Saved baseline: {}", args.baseline)
+    elif not (baseline and baseline.get("benchmarks")):
+        logger.error(
+            "No baseline timings in {} (record them with --save)", args.baseline
+        )
+        sys.exit(2)
+    else:
+        failed += compare(current, baseline, args.threshold)
+
+    if failed:
+        logger.error("Failed: {}", ", ".join(failed))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -77,18 +77,10 @@ class CalculatorTransformer(Transformer):
         # ticker[0] is just the symbol name while ticker[1] is the Ticker() object...
         q = ticker[1]
 
-        # during "regular times" there's a bid/ask spread
-        if (
-            q.bidSize == q.bidSize
-            and q.askSize == q.askSize
-            and q.bidSize > 0
-            and q.askSize > 0
-            and q.bid > 0
-            and q.ask > 0
-        ):
-            mark = (q.bid + q.ask) / 2
-        else:
-            # else, over weekends and shutdown times, there's either the last price or the close price
+        # quote store has the midpoint during "regular times" when there's a bid/ask spread,
+        # else, over weekends and shutdown times, there's either the last price or the close price
+        mark = self.state.quoteStore.mark(ticker[0])
+        if mark is None:
             mark = q.last if q.last == q.last and q.last > 0 else q.close
 
         logger.info(
@@ -153,11 +145,8 @@ class CalculatorTransformer(Transformer):
         """Attempt to lookup by symbol name directly."""
         part = value[0].upper()
         try:
-            q = self.state.quoteState[part]
-            if q.bidSize and q.askSize:
-                value = (q.bid + q.ask) / 2
-            else:
-                value = q.last if q.last == q.last else q.close
+            value = self.state.quoteStore.mark(part)
+            assert value is not None
         except:
             logger.error("[{}] No value found! Calculation can't continue.", value)
             return None
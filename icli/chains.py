@@ -0,0 +1,286 @@
+"""Local option chain store.
+
+Expirations and strikes for an underlying are loaded with one reqSecDefOptParams()
+request (which, unlike reqContractDetails() for every option, isn't held back by IBKR's
+one-minute pacing) or from an optional external provider, then kept on disk by
+underlying and expiration so restarts and repeated lookups don't hit the API again.
+
+Strikes are kept sorted so strike window queries are just two bisects.
+
+reqSecDefOptParams() reports strikes per trading class, so every expiration starts with
+all strikes of its trading class (some of which aren't listed for that expiration).
+Anything picking strikes by their position in the list instead of qualifying them uses
+strikesFor(), which replaces one expiration's strikes with its listed strikes.
+"""
+
+import asyncio
+import bisect
+import datetime
+
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Final, Iterable
+
+import diskcache
+import pendulum
+
+from ib_async import FuturesOption, Option
+from loguru import logger
+
+from icli.helpers import contractForName
+
+# external chain provider: underlying symbol -> {expiration YYYYMMDD: strikes} (or None to fall back to IBKR)
+ChainProvider = Callable[[str], Awaitable[dict[str, list[float]] | None]]
+
+# option underlyings which are indexes (everything else without a namespace is a stock)
+INDEX_UNDERLYINGS: Final = {"SPX", "NDX", "RUT", "VIX", "XSP"}
+
+
+def strikesBetween(strikes: list[float], low: float, high: float) -> list[float]:
+    """Return strikes in the open interval (low, high) from sorted 'strikes'."""
+    return strikes[
+        bisect.bisect_right(strikes, low) : bisect.bisect_left(strikes, high)
+    ]
+
+
+def sessionDate() -> datetime.date:
+    return pendulum.now("US/Eastern").date()
+
+
+@dataclass(slots=True)
+class Chain:
+    """All expirations (YYYYMMDD) with their sorted strikes for one underlying."""
+
+    symbol: str
+    loaded: datetime.date
+    strikes: dict[str, list[float]] = field(default_factory=dict)
+
+    # expirations whose strikes are the strikes actually listed for them
+    exact: set[str] = field(default_factory=set)
+
+    @property
+    def expirations(self) -> list[str]:
+        return sorted(self.strikes)
+
+    def between(self, expiration: str, low: float, high: float) -> list[float]:
+        return strikesBetween(self.strikes.get(expiration, []), low, high)
+
+
+@dataclass
+class ChainStore:
+    state: Any
+
+    disk: diskcache.Cache = field(
+        default_factory=lambda: diskcache.Cache("./cache-chains")
+    )
+
+    # tried before IBKR if provided
+    provider: ChainProvider | None = None
+
+    chains: dict[str, Chain] = field(default_factory=dict)
+
+    # coalesce concurrent loads of the same underlying
+    loading: dict[str, asyncio.Task] = field(default_factory=dict)
+
+    def cached(self, symbol: str) -> Chain | None:
+        """Return chain from memory or disk without any network requests (may be from a previous day)."""
+        if found := self.chains.get(symbol):
+            return found
+
+        meta = self.disk.get((symbol, "expirations"))
+        if not meta:
+            return None
+
+        loaded, expirations = meta
+        strikes = {}
+        for expiration in expirations:
+            if (found := self.disk.get((symbol, expiration))) is not None:
+                strikes[expiration] = found
+
+        chain = self.chains[symbol] = Chain(symbol, loaded, strikes)
+        return chain
+
+    def save(self, chain: Chain) -> None:
+        self.chains[chain.symbol] = chain
+
+        # strikes are stored per expiration so a single expiration can be read back alone
+        for expiration, strikes in chain.strikes.items():
+            self.disk.set((chain.symbol, expiration), strikes, expire=86400 * 7)
+
+        self.disk.set(
+            (chain.symbol, "expirations"),
+            (chain.loaded, chain.expirations),
+            expire=86400 * 7,
+        )
+
+    async def get(self, symbol: str, refresh: bool = False) -> Chain | None:
+        """Return chain for underlying 'symbol', fetching it if not already loaded today."""
+        found = self.cached(symbol)
+        if found and found.loaded == sessionDate() and not refresh:
+            return found
+
+        if (task := self.loading.get(symbol)) is None:
+            task = self.loading[symbol] = asyncio.create_task(self.load(symbol))
+            task.add_done_callback(lambda _: self.loading.pop(symbol, None))
+
+        if loaded := await asyncio.shield(task):
+            return loaded
+
+        if found:
+            logger.warning(
+                "[{}] Using option chain from {} because refresh failed",
+                symbol,
+                found.loaded,
+            )
+
+        return found
+
+    async def load(self, symbol: str) -> Chain | None:
+        strikes = None
+        if self.provider:
+            try:
+                strikes = await self.provider(symbol)
+            except:
+                logger.exception("[{}] External chain provider failed", symbol)
+
+        if not strikes:
+            strikes = await self.fetch(symbol)
+
+        if not strikes:
+            return None
+
+        chain = Chain(
+            symbol, sessionDate(), {k: sorted(set(v)) for k, v in strikes.items() if v}
+        )
+        self.save(chain)
+
+        logger.info(
+            "[{}] Loaded {} expirations ({} through {})",
+            symbol,
+            len(chain.strikes),
+            chain.expirations[0] if chain.strikes else None,
+            chain.expirations[-1] if chain.strikes else None,
+        )
+
+        return chain
+
+    async def fetch(self, symbol: str) -> dict[str, list[float]] | None:
+        """Fetch all expirations and strikes for an underlying from IBKR."""
+        name = f"I:{symbol}" if symbol in INDEX_UNDERLYINGS else symbol
+        (underlying,) = await self.state.qualify(contractForName(name))
+        if not underlying.conId:
+            logger.error("[{}] Can't fetch chains for unknown underlying", symbol)
+            return None
+
+        logger.info("[chains] Fetching for {}", symbol)
+
+        await self.state.pacer.wait("details")
+
+        try:
+            chains = await asyncio.wait_for(
+                self.state.ib.reqSecDefOptParamsAsync(
+                    underlying.symbol,
+                    underlying.exchange if underlying.secType == "FUT" else "",
+                    underlying.secType,
+                    underlying.conId,
+                ),
+                timeout=30,
+            )
+        except:
+            logger.error("[{}] Timeout while fetching option chains...", symbol)
+            return None
+
+        # every exchange reports the same chains, so prefer SMART rows when we have them
+        # (but keep every trading class, e.g. both SPX monthlies and SPXW dailies)
+        smart = [c for c in chains if c.exchange == "SMART"]
+
+        # reqSecDefOptParams() reports strikes per trading class instead of per expiration,
+        # so each expiration gets every strike of its trading class (see strikesFor()).
+        strikes: dict[str, set[float]] = {}
+        for chain in smart or chains:
+            for expiration in chain.expirations:
+                strikes.setdefault(expiration, set()).update(chain.strikes)
+
+        return {k: sorted(v) for k, v in strikes.items()}
+
+    async def strikesFor(self, symbol: str, expiration: str) -> list[float]:
+        """Return strikes listed for one expiration (YYYYMMDD) of underlying 'symbol'.
+
+        Loaded with one contract details request the first time an expiration is asked
+        for, then kept in the chain until the chain itself is reloaded."""
+        # SPXW dailies are in the SPX chain
+        if symbol == "SPXW":
+            symbol = "SPX"
+
+        chain = await self.get(symbol)
+        if not chain:
+            return []
+
+        if expiration in chain.exact:
+            return chain.strikes.get(expiration, [])
+
+        # the underlying as an option with only an expiration matches every listed strike
+        name = f"I:{symbol}" if symbol in INDEX_UNDERLYINGS else symbol
+        request = contractForName(name)
+        if request is None:
+            return []
+
+        if request.secType == "FUT":
+            request.secType = "FOP"
+        else:
+            request.secType = "OPT"
+            request.exchange = "SMART"
+
+        request.lastTradeDateOrContractMonth = expiration
+
+        logger.info("[{}{}] Fetching strikes...", symbol, expiration)
+
+        await self.state.pacer.wait("details")
+
+        try:
+            details = await asyncio.wait_for(
+                self.state.ib.reqContractDetailsAsync(request), timeout=60
+            )
+        except:
+            logger.error("[{}{}] Timeout while fetching strikes...", symbol, expiration)
+            return []
+
+        strikes = sorted(
+            {
+                d.contract.strike
+                for d in details
+                if d.contract.lastTradeDateOrContractMonth == expiration
+            }
+        )
+
+        if not strikes:
+            logger.error("[{}{}] No strikes listed", symbol, expiration)
+            return []
+
+        chain.strikes[expiration] = strikes
+        chain.exact.add(expiration)
+        self.disk.set((symbol, expiration), strikes, expire=86400 * 7)
+
+        return strikes
+
+    async def prefetch(self, symbols: Iterable[str]) -> None:
+        """Load chains for 'symbols' in the background (one at a time, paced as bulk lookups)."""
+        for symbol in sorted(set(symbols)):
+            try:
+                await self.get(symbol)
+            except:
+                logger.exception("[{}] Failed to prefetch option chain", symbol)
+
+
+def underlyingsFor(contracts: Iterable) -> set[str]:
+    """Return underlying symbol names for option chain prefetching from quoted or held contracts."""
+    found = set()
+    for c in contracts:
+        if isinstance(c, FuturesOption):
+            continue
+
+        if isinstance(c, Option):
+            found.add("SPX" if c.symbol == "SPXW" else c.symbol)
+        elif c.secType in {"STK", "IND"}:
+            found.add(c.symbol)
+
+    return found
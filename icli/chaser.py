@@ -0,0 +1,305 @@
+"""Central order chasing.
+
+Limit orders which should walk toward the far side of the spread until filled are
+registered with OrderChaser instead of each running their own polling loop.
+
+One scheduler task manages every working chase. It wakes when a quote for a chased
+contract updates or an order status changes (and when a time-based step is due), then
+steps each order price according to its StepSchedule. Modifications across all chases
+spend from the pacer's order budget so closing many positions at once stays under IBKR's
+message cap.
+"""
+
+import asyncio
+import os
+import time
+
+from dataclasses import dataclass, field
+from typing import Any, Final, Hashable
+
+from ib_async import Contract, Crypto, Forex, Future, FuturesOption, Option, Trade
+from loguru import logger
+
+from icli.helpers import comply
+
+# order statuses ending a chase
+CHASE_DONE_STATUSES: Final = {"Filled", "Cancelled", "ApiCancelled", "Inactive"}
+
+
+@dataclass(slots=True, frozen=True)
+class StepSchedule:
+    """How each chase update moves the limit price toward the far side of the spread."""
+
+    # fraction of the distance between our price and the far side to move each step
+    fraction: float = 0.5
+
+    # minimum step size in price ticks
+    ticks: int = 1
+
+    # step again after this many seconds even if the quote didn't change
+    interval: float = 3.0
+
+    # never modify the same order more often than this (seconds)
+    minGap: float = 0.25
+
+    # seconds the initial price is left alone before the first step
+    initial: float = 0.5
+
+
+CHASE_SCHEDULES: Final = {
+    # step half way to the far side on every quote change, or every 3 seconds
+    "default": StepSchedule(),
+    # step one tick at a time
+    "ticks": StepSchedule(fraction=0, ticks=1, interval=1.0),
+    # close most of the gap quickly
+    "fast": StepSchedule(fraction=0.75, ticks=1, interval=1.0, initial=0.1),
+    # only step on time and only by a quarter of the spread
+    "slow": StepSchedule(fraction=0.25, ticks=1, interval=5.0, minGap=5.0),
+}
+
+ICLI_CHASE_SCHEDULE: Final = os.getenv("ICLI_CHASE_SCHEDULE", "default")
+
+
+@dataclass(slots=True)
+class Chase:
+    trade: Trade
+    contract: Contract
+    quoteKey: Hashable
+    isLong: bool
+    schedule: StepSchedule
+
+    # resolves to True when filled, False when canceled or rejected
+    done: asyncio.Future
+
+    lastModified: float = 0
+    steps: int = 0
+
+    # monotonic time of the next time-based step
+    nextStep: float = 0
+
+    # far side of the spread when we last stepped (quote updates only step if it moved)
+    far: float = 0
+
+    def __post_init__(self) -> None:
+        self.nextStep = time.monotonic() + self.schedule.initial
+
+
+@dataclass
+class OrderChaser:
+    state: Any
+
+    # order id -> chase
+    chases: dict[int, Chase] = field(default_factory=dict)
+
+    # quote key -> order ids chasing that quote
+    byKey: dict[Hashable, set[int]] = field(default_factory=dict)
+
+    # order ids needing a look on the next wakeup
+    dirty: set[int] = field(default_factory=set)
+
+    wake: asyncio.Event = field(default_factory=asyncio.Event)
+    task: asyncio.Task | None = None
+
+    modifications: int = 0
+
+    def chase(
+        self,
+        trade: Trade,
+        contract: Contract,
+        quoteKey: Hashable,
+        isLong: bool,
+        schedule: StepSchedule | str = ICLI_CHASE_SCHEDULE,
+    ) -> asyncio.Future:
+        """Start chasing a placed limit order; returns a future resolving to True when filled."""
+        if isinstance(schedule, str):
+            schedule = CHASE_SCHEDULES.get(schedule, CHASE_SCHEDULES["default"])
+
+        orderId = trade.order.orderId
+        done = asyncio.get_running_loop().create_future()
+        self.chases[orderId] = Chase(trade, contract, quoteKey, isLong, schedule, done)
+        self.byKey.setdefault(quoteKey, set()).add(orderId)
+
+        if not self.task or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+        # the order may have already completed while we were setting up
+        self.orderStatus(trade)
+
+        return done
+
+    def release(self, orderId: int, filled: bool | None = None) -> None:
+        """Stop chasing an order (the order itself is left alone)."""
+        if not (chase := self.chases.pop(orderId, None)):
+            return
+
+        self.dirty.discard(orderId)
+        if waiting := self.byKey.get(chase.quoteKey):
+            waiting.discard(orderId)
+            if not waiting:
+                del self.byKey[chase.quoteKey]
+
+        if not chase.done.done():
+            chase.done.set_result(bool(filled))
+
+    def quoteUpdated(self, key: Hashable) -> None:
+        """tickersUpdate hook: a chased contract's quote changed."""
+        if orderIds := self.byKey.get(key):
+            self.dirty.update(orderIds)
+            self.wake.set()
+
+    def orderStatus(self, trade: Trade) -> None:
+        """orderStatusEvent handler."""
+        orderId = trade.order.orderId
+        if orderId not in self.chases:
+            return
+
+        status = trade.orderStatus.status
+        if status in CHASE_DONE_STATUSES:
+            if status != "Filled":
+                logger.error(
+                    "[{} :: {}] Order was canceled or rejected! Status: {}",
+                    status,
+                    trade.contract.localSymbol,
+                    trade.orderStatus,
+                )
+
+            self.release(orderId, status == "Filled")
+            return
+
+        self.dirty.add(orderId)
+        self.wake.set()
+
+    def take(self) -> bool:
+        """Consume one order message from the pacer if available."""
+        return self.state.pacer.take("orders")
+
+    def price(self, chase: Chase, bid: float, ask: float) -> float | None:
+        """Return next limit price for 'chase' or None if it shouldn't move."""
+        order = chase.trade.order
+        if order.lmtPrice is None:
+            return None
+
+        current = float(order.lmtPrice)
+        far = ask if chase.isLong else bid
+        direction = 1 if chase.isLong else -1
+
+        # already at (or through) the far side, so just wait for the fill
+        if (far - current) * direction <= 0:
+            return None
+
+        tick = 0.01
+        step = max(
+            (far - current) * direction * chase.schedule.fraction,
+            chase.schedule.ticks * tick,
+        )
+        newPrice = current + step * direction
+
+        # never chase past the far side
+        if (newPrice - far) * direction > 0:
+            newPrice = far
+
+        if isinstance(chase.contract, (Option, FuturesOption, Future)):
+            newPrice = comply(chase.contract, newPrice)
+
+        # crypto and forex can round to 8 places, everything else is 2 places.
+        if isinstance(chase.contract, (Forex, Crypto)):
+            newPrice = round(newPrice, 8)
+        else:
+            newPrice = round(newPrice, 2)
+
+        # price increments (like option nickel ticks) can round a small step back to where we are,
+        # so go straight to the far side (which is always a valid price) instead of stalling.
+        if newPrice == current:
+            newPrice = far
+
+        if newPrice == current:
+            return None
+
+        return newPrice
+
+    def step(self, chase: Chase, now: float) -> bool:
+        """Move one chase if it's allowed to; returns False if it was rate limited."""
+        trade = chase.trade
+        timed = now >= chase.nextStep
+        if timed:
+            chase.nextStep = now + chase.schedule.interval
+
+        # modifications aren't accepted while the previous submit/modify is still pending,
+        # but the status change out of Pending wakes us again.
+        if "Pending" in trade.orderStatus.status or not trade.orderStatus.remaining:
+            return True
+
+        # the initial price gets a chance to fill before any step
+        if not chase.steps and not timed:
+            return True
+
+        if now - chase.lastModified < chase.schedule.minGap:
+            return True
+
+        if not (quote := self.state.quoteStore.quote(chase.quoteKey)):
+            return True
+
+        bid, ask = quote
+        if not (bid > 0 and ask > 0):
+            return True
+
+        # quote updates only step the order if the far side moved, otherwise we wait for the timed step
+        far = ask if chase.isLong else bid
+        if not timed and far == chase.far:
+            return True
+
+        if (newPrice := self.price(chase, bid, ask)) is None:
+            return True
+
+        if not self.take():
+            if timed:
+                chase.nextStep = now
+            return False
+
+        logger.info(
+            "[{} :: {}] Chasing price from {} to {} (bid {} ask {})",
+            trade.order.orderId,
+            chase.quoteKey,
+            trade.order.lmtPrice,
+            newPrice,
+            bid,
+            ask,
+        )
+
+        trade.order.lmtPrice = newPrice
+        self.state.ib.placeOrder(chase.contract, trade.order)
+
+        chase.lastModified = now
+        chase.nextStep = now + chase.schedule.interval
+        chase.far = far
+        chase.steps += 1
+        self.modifications += 1
+        return True
+
+    async def run(self) -> None:
+        while self.chases:
+            now = time.monotonic()
+            nextStep = min(c.nextStep for c in self.chases.values())
+
+            try:
+                await asyncio.wait_for(
+                    self.wake.wait(), timeout=max(0.0, nextStep - now)
+                )
+            except asyncio.TimeoutError:
+                pass
+
+            self.wake.clear()
+
+            now = time.monotonic()
+            timed = {oid for oid, c in self.chases.items() if c.nextStep <= now}
+            todo = (self.dirty | timed) & self.chases.keys()
+            self.dirty.clear()
+
+            for orderId in sorted(todo):
+                if not self.step(self.chases[orderId], now):
+                    # out of modification tokens: retry once the bucket refills
+                    self.dirty.add(orderId)
+
+            if self.dirty:
+                await asyncio.sleep(max(0.01, *self.state.pacer.delay("orders")))
+                self.wake.set()
@@ -3,9 +3,8 @@
 original_print = print
 import asyncio
 import bisect
-from datetime import datetime, timedelta
+from datetime import timedelta
 import decimal
-import fnmatch  # for glob string matching!
 import locale  # automatic money formatting
 import logging
 import math
@@ -15,7 +14,7 @@ import re
 import statistics
 import sys
 
-from collections import Counter, defaultdict, deque
+from collections import Counter
 from dataclasses import dataclass, field
 from typing import Any, Mapping, Sequence
 
@@ -26,7 +25,6 @@ import warnings
 import diskcache
 
 import numpy as np
-import orjson
 import pandas as pd
 import pendulum
 
@@ -41,14 +39,31 @@ from prompt_toolkit.shortcuts import set_title
 import icli.awwdio as awwdio
 
 import icli.calc
+from icli.contracts import ContractIndex, QualifyQueue
 import icli.orders as orders
-from icli.bar import OHLC5MinTracker
+import icli.quotestore as quotestore
+from icli.recorder import TickRecorder
+import icli.toolbar as toolbar
+from icli.bar import BarAggregator, IntradayBars
+from icli.chains import ChainStore, underlyingsFor
+from icli.chaser import OrderChaser
+from icli.greeks import GreeksEngine
+from icli.execstats import ExecutionStats
+from icli.journal import ExecutionJournal, fillDict, filterTime, sessionStart
+from icli.latency import OrderLatency
+from icli.spreads import SpreadBook
+from icli.openorders import OpenOrderIndex, opposite
+from icli.pacer import RequestPacer
+from icli.positions import PositionBook
+from icli.profiler import LoopMonitor, SamplingProfiler
+from icli.strategies import StrategyRuntime
+from icli.subscriptions import MarketDataLines, QUOTE
 
 from icli.futsexchanges import FUTS_EXCHANGE
 
 # from . import agent
 # from . import accum
-from .tinyalgo import ATRLive
+from icli.indicators import IndicatorEngine
 
 locale.setlocale(locale.LC_ALL, "")
 
@@ -59,6 +74,8 @@ from ib_async import (
     Bag,
     ComboLeg,
     Contract,
+    ExecutionFilter,
+    Fill,
     Future,
     IB,
     Index,
@@ -100,6 +117,10 @@ ICLI_CLIENT_ID = int(os.getenv("ICLI_CLIENT_ID", 0))
 # outputs non-JSON compliant NaN values, so you may need to filter those out if read back using a different
 # json parser)
 ICLI_DUMP_QUOTES = bool(int(os.getenv("ICLI_DUMP_QUOTES", 0)))
+
+# output format for ICLI_DUMP_QUOTES recordings: "json" (one row per line) or "bin" (fixed-width
+# records readable with icli.recorder.readTicks())
+ICLI_DUMP_QUOTES_FORMAT = os.getenv("ICLI_DUMP_QUOTES_FORMAT", "json")
 ICLI_AWWDIO_URL = awwdio.ICLI_AWWDIO_URL
 
 
@@ -536,29 +557,49 @@ class IBKRCmdlineApp:
     pnlSingle: dict[int, PnLSingle] = field(default_factory=dict)
     exiting: bool = False
     strategy: dict[str, dict] = field(default_factory=dict)
-    barState: dict[str, OHLC5MinTracker] = field(default_factory=dict)
-    running = defaultdict(lambda: False)
-    internalPositions: dict[str, int] = field(default_factory=dict)
+    # multi-timeframe OHLCV bars for every live quote (built from tick timestamps)
+    bars: BarAggregator = field(default_factory=BarAggregator)
+
+    # shared intraday bars for strategies (seeded once per symbol, then extended live)
+    intraday: IntradayBars = field(init=False)
+
+    # long-lived strategy objects evaluated from coalesced tick notifications
+    strategies: StrategyRuntime = field(init=False)
+
+    # positions by contract id, quote name, underlying, and trading class, kept current by
+    # portfolio and position events (and our own fills)
+    positions: PositionBook = field(default_factory=PositionBook)
+
+    # working orders by contract (or spread legs) and action, kept current by order events
+    openOrders: OpenOrderIndex = field(default_factory=OpenOrderIndex)
+
+    # every execution and commission we've seen, across restarts
+    journal: ExecutionJournal = field(default_factory=ExecutionJournal)
+
+    # running aggregates for the current session's executions (see sessionStats())
+    execStats: ExecutionStats = field(default_factory=ExecutionStats)
 
     ol: buylang.OLang = field(default_factory=buylang.OLang)
-    quotehistory: dict[int, deque[float]] = field(
-        default_factory=lambda: defaultdict(lambda: deque(maxlen=120))
-    )
 
-    # calculate live ATR based on quote updates
-    # (the .25 is because quotes update at 250 ms intervals, so we normalize "events per second" by update frequency)
-    atrs: dict[str, ATRLive] = field(
-        default_factory=lambda: defaultdict(
-            lambda: ATRLive(int(90 / 0.25), int(45 / 0.25))
-        )
-    )
+    # steps working limit orders toward the far side of the spread until filled
+    chaser: OrderChaser = field(init=False)
 
-    speak: awwdio.AwwdioClient = field(default_factory=awwdio.AwwdioClient)
+    # every open market data, depth, and realtime bar line (with the line budget)
+    lines: MarketDataLines = field(init=False)
 
-    # hold EMA per current symbol with various lookback periods
-    ema: dict[str, dict[int, float]] = field(
-        default_factory=lambda: defaultdict(lambda: defaultdict(float))
-    )
+    # live bid/ask/last/mid values and recent midpoint history for every quote in quoteState
+    quoteStore: quotestore.QuoteStore = field(default_factory=quotestore.QuoteStore)
+
+    # synthetic quotes for spreads IBKR isn't quoting, built from their quoted legs
+    spreads: SpreadBook = field(init=False)
+
+    # local IV and greeks for every quoted option, priced from quoteStore
+    greeks: GreeksEngine = field(init=False)
+
+    # live EMAs and ATR per quote key, updated by quote timestamps in tickersUpdate
+    indicators: IndicatorEngine = field(default_factory=IndicatorEngine)
+
+    speak: awwdio.AwwdioClient = field(default_factory=awwdio.AwwdioClient)
 
     # Specific dict of ONLY fields we show in the live account status toolbar.
     # Saves us from sorting/filtering self.summary() with every full bar update.
@@ -569,14 +610,37 @@ class IBKRCmdlineApp:
     )
 
     # Cache all contractIds and names to their fully qualified contract object values
-    conIdCache: diskcache.Cache = field(
-        default_factory=lambda: diskcache.Cache("./cache-contracts")
-    )
+    conIdCache: ContractIndex = field(default_factory=ContractIndex)
+
+    # paces every request we send to the gateway
+    pacer: RequestPacer = field(default_factory=RequestPacer)
+
+    # always-on event loop lag and handler timing, plus the on-demand stack sampler ('prof')
+    loopMonitor: LoopMonitor = field(default_factory=LoopMonitor)
+    profiler: SamplingProfiler = field(default_factory=SamplingProfiler)
+
+    # order lifecycle latency histograms for this session ('latency')
+    latency: OrderLatency = field(default_factory=OrderLatency)
+
+    # batches uncached contract lookups from all concurrent qualify() calls
+    qualifier: QualifyQueue = field(init=False)
+
+    # option expirations and strikes by underlying (plus the background task keeping them fresh)
+    chains: ChainStore = field(init=False)
+    chainsPrefetcher: asyncio.Task | None = None
 
     connected: bool = False
     disableClientQuoteSnapshotting: bool = False
     loadingCommissions: bool = False
 
+    # sorted quote rows and their cached formatted output for the toolbar
+    toolbarRows: toolbar.ToolbarRows = field(
+        default_factory=lambda: toolbar.ToolbarRows(sortQuotes)
+    )
+
+    # background tick writer (only created if ICLI_DUMP_QUOTES is enabled)
+    recorder: TickRecorder | None = None
+
     @property
     def diy(self) -> int:
         """Return remaining trading days in year"""
@@ -594,6 +658,24 @@ class IBKRCmdlineApp:
         # provide ourself to the calculator so the calculator can lookup live quote prices and live account values
         self.calc = icli.calc.Calculator(self)
 
+        self.qualifier = QualifyQueue(self.ib, self.pacer)
+        self.chains = ChainStore(self)
+        self.lines = MarketDataLines(self)
+        self.greeks = GreeksEngine(self.quoteStore)
+        self.spreads = SpreadBook(self.quoteStore)
+        self.chaser = OrderChaser(self)
+        self.intraday = IntradayBars(self)
+        self.strategies = StrategyRuntime(
+            self,
+            {algo: getattr(lang, name) for algo, name in lang.STRATMAP.items()},
+        )
+
+        if ICLI_DUMP_QUOTES:
+            self.recorder = TickRecorder(
+                clientId=self.clientId, fmt=ICLI_DUMP_QUOTES_FORMAT
+            )
+            self.recorder.start()
+
     async def qualify(self, *contracts) -> list[Contract]:
         """Qualify contracts against the IBKR allowed symbols.
 
@@ -602,19 +684,6 @@ class IBKRCmdlineApp:
         We also cache the results for ease of re-use and for mapping
         contractIds back to names later."""
 
-        # logger.warning("Current full cache: {}", [x for x in self.conIdCache])
-
-        # Group contracts into cached and uncached so we can look up uncached contracts
-        # all at once but still iterate them in expected order of results.
-        cached_contracts = {}
-        uncached_contracts = []
-
-        # in order to retain the result in the same order as the input, we map the python id() value of
-        # each contract object to the final contract result itself. Then, at the end, we just iterate
-        # the input 'contracts' collection looking up them by id() for the final result order matching
-        # the input order again.
-        totalResult = {}
-
         # Our cache operates on two tiers:
         #  - ideally, we look up contracts by id directly
         #  - alternatively, we look up contracts by name, but we also need to know the _type_ of the name we are looking up.
@@ -622,127 +691,116 @@ class IBKRCmdlineApp:
         #  - if input contract already has a contract id, we look up the conId directly.
         #  - if input contract doesn't have an id, we generate a lookup key of Class-Symbol like "Future-ES" or "Index-SPX"
         #    so we can retrieve the correct instrument class combined with the proper symbol from a cached contract.
+        # Results are in the same order as the input; anything not cached becomes a future from the qualify
+        # queue (which batches and coalesces requests across all concurrent callers).
+        results: list[Contract | asyncio.Future] = []
         for contract in contracts:
-            cached_contract = None
-
-            key = None
-            try:
-                # only attempt to look up using ID if ID exists, else attempt to lookup by name
-                if contract.conId:
-                    # Attempt first lookup using direct ID, but if ID isn't found try to use the Class-Symbol key format...
-                    cached_contract = self.conIdCache.get(contract.conId)  # type: ignore
-                else:
-                    key = contractToSymbolDescriptor(contract)
-                    # logger.info("Looking up: {} :: {}", contract, key)
-                    cached_contract = self.conIdCache.get(key)  # type: ignore
-
-                # logger.info("Using cached contract for {}: [cached {}] :: [requested {}]", contract.conId, cached_contract, contract)
-            except ModuleNotFoundError:
-                # the pickled contract is from another library we don't have loaded in this environment anymore,
-                # so we need to drop the existing bad pickle and re-save it
-                try:
-                    del self.conIdCache[contract.conId]
-                    del self.conIdCache[contractToSymbolDescriptor(contract)]
-                except:
-                    pass
-
             # if we _found_ a contract (and the contract has an id (just defensively preventing invalid contracts in the cache)),
             # then we don't look it up again.
+            cached_contract = self.conIdCache.find(contract)
             if cached_contract and cached_contract.conId:
-                # logger.info("Found in cache: {} for {}", cached_contract, contract)
-                cached_contracts[cached_contract.conId] = cached_contract
-                totalResult[id(contract)] = cached_contract
+                results.append(cached_contract)
             else:
-                # else, we need to look up this contract before returning.
-                # logger.info("Not found in cache: {}", contract)
-                # Also, save the ORIGINAL LOOK UP KEY along with the uncached contract so we can
-                # _correctly_ map the lookup key to the resolved contract (the resolved contract
-                # can (and _will_ have more details than the lookup contract, but we only want to
-                # generate the lookup key using the INPUT DETAILS and not the FULL DETAILS because
-                # we are going from VAGUE DETAILS -> SPECIFIC DETAILS, and if we use the specific
-                # details as the cache key, we can't look it up again because we only have more
-                # vague details to start (like: lookup future with YM expiration, but qualify
-                # converts YM into YMD, but we didn't look up YMD at first, so we must not cache
-                # by using YMD details in the key, etc).
-                uncached_contracts.append((key, contract))
-
-                # also populate unresolved contract for safety in case it can't be resolved
-                # we just return it directly as originally provided
-                totalResult[id(contract)] = contract
-
-        # logger.info("CACHED: {} :: UNCACHED: {}", cached_contracts, uncached_contracts)
+                results.append(self.qualifier.submit(contract))
 
         # if we have NO UNCACHED CONTRACTS, then we found all input requests in the cache,
         # so we can just return the cached contracts found directly (and they are already
         # in the correct input-return order).
-        if not uncached_contracts:
-            return list(cached_contracts.values())
+        cached = [r for r in results if not isinstance(r, asyncio.Future)]
+        if len(cached) == len(results):
+            return cached
+
+        result = []
+        for contract, r in zip(contracts, results):
+            if isinstance(r, asyncio.Future):
+                # the future result is either the qualified contract or the unresolved input contract
+                # (we return _all_ contracts back to the user in the order of their inputs, so
+                #  unresolved contracts are still returned for the caller to check)
+                got = await asyncio.shield(r)
+
+                # Only cache actually qualified contracts with a full IBKR contract ID.
+                # Also, save the ORIGINAL LOOK UP KEY along with the resolved contract because
+                # the resolved contract can (and _will_) have more details than the lookup contract,
+                # but we only want to generate the lookup key using the INPUT DETAILS and not the FULL
+                # DETAILS because we are going from VAGUE DETAILS -> SPECIFIC DETAILS (like: lookup future
+                # with YM expiration, but qualify converts YM into YMD, so we must not cache by YMD details).
+                if got.conId:
+                    self.conIdCache.store(
+                        got,
+                        None
+                        if contract.conId
+                        else contractToSymbolDescriptor(contract),
+                    )
+                else:
+                    # return the caller's own contract object, not another caller's coalesced request
+                    got = contract
 
-        # For uncached, fetch them from the IBKR lookup system
-        got = []
-        try:
-            # logger.info("Looking up uncached contracts: {}", uncached_contracts)
-            got = await asyncio.wait_for(
-                self.ib.qualifyContractsAsync(*[c for (k, c) in uncached_contracts]),
-                timeout=5,
-            )
-        except Exception as e:
-            logger.error(
-                "Timeout while trying to qualify {} contracts (sometimes IBKR is slow or the API is offline during nightly restarts) :: {}",
-                len(uncached_contracts),
-                str(e),
-            )
+                r = got
 
-        # iterate resolved contracts and cache them by multiple lookup keys
-        for (originalContractKey, _), contract in zip(uncached_contracts, got):
-            # the `qualifyContractsAsync` modifies the contracts in-place, so we map their
-            # id to itself since we replaced it directly.
-            # (yes, we _always_ set this even if we didn't resolve a 'conId' because we need
-            #  to return _all_ contracts back to the user in the order of their inputs, so
-            #  we need every input contract to be in the 'totalResult' map regardless of its final
-            #  success/fail resolution value)
-            totalResult[id(contract)] = contract
-
-            # Only cache actually qualified contracts with a full IBKR contract ID
-            if not contract.conId:
-                continue
+            result.append(r)
 
-            cached_contracts[contract.conId] = contract
+        # NOTE: we DO NOT MODIFY THE CACHED CONTRACT RESULTS IN-PLACE so you must assign the
+        #       return value of this async call to be your new list of contracts.
+        # logger.info("Returning contracts: {}", result)
+        return result
 
-            # we want Futures contracts to refresh more often because they have
-            # embedded expiration dates which may change over time if we are using
-            # generic symbol names like "ES" for the next main contract.
-            EXPIRATION_DAYS = 2 if isinstance(contract, Future) else 30
+    async def prefetchContracts(self) -> None:
+        """Warm the contract index for every saved quote group and current position.
 
-            # logger.info("Saving {} -> {}", contract.conId, contract)
-            # logger.info("Saving {} -> {}", originalContractKey, contract)
+        Runs in the background after connecting so later quote restores and position
+        lookups are index hits instead of gateway round-trips."""
+        contracts: list[Contract] = [
+            Contract(conId=p.contract.conId) for p in self.ib.positions()
+        ]
 
-            # cache by id
-            self.conIdCache.set(
-                contract.conId, contract, expire=86400 * EXPIRATION_DAYS
-            )  # type: ignore
+        for key in self.cache:
+            if isinstance(key, tuple) and key and key[0] == "quotes":
+                found = self.cache.get(key)
+                if isinstance(found, dict):
+                    # client snapshots are saved as full contracts already
+                    contracts.extend(
+                        Contract(conId=c.conId)
+                        for c in found.get("contracts", [])
+                        if c.conId
+                    )
+                elif found:
+                    for sym in found:
+                        # spread descriptions and positional lookups can't be qualified directly
+                        if isinstance(sym, str) and len(sym) <= 30 and sym[0] != ":":
+                            try:
+                                contracts.append(contractForName(sym))
+                            except:
+                                pass
 
-            # also set by Class-Symbol designation as key (e.g. "Index-SPX" or "Future-ES")
-            self.conIdCache.set(
-                originalContractKey,
-                contract,
-                expire=86400 * EXPIRATION_DAYS,
-            )  # type: ignore
+        todo = [c for c in contracts if not self.conIdCache.find(c)]
+        if not todo:
+            return
 
-            # also cache the same thing by the most well defined symbol we have
-            self.conIdCache.set(
-                (contract.localSymbol, contract.symbol),
-                contract,
-                expire=86400 * EXPIRATION_DAYS,
-            )  # type: ignore
+        with Timer(f"[contracts] Prefetched {len(todo):,} contracts"):
+            await self.qualify(*todo)
 
-        # Return in the same order as the input by combining cached and uncached results.
-        # NOTE: we DO NOT MODIFY THE CACHED CONTRACT RESULTS IN-PLACE so you must assign the
-        #       return value of this async call to be your new list of contracts.
-        result = [totalResult[id(c)] for c in contracts]
+    async def prefetchChains(self) -> None:
+        """Keep option chains loaded for every quoted or held underlying.
 
-        # logger.info("Returning contracts: {}", result)
-        return result
+        Loads once after connecting, then again every morning before the market opens,
+        so the first chain lookup of the day is a local read instead of an API request."""
+        # give the quote restore a moment to populate quoteState first
+        await asyncio.sleep(5)
+
+        while True:
+            contracts = [t.contract for t in self.quoteState.values()]
+            contracts.extend(p.contract for p in self.positions.values())
+            symbols = underlyingsFor(c for c in contracts if c)
+
+            with Timer(f"[chains] Prefetched {len(symbols):,} underlyings"):
+                await self.chains.prefetch(symbols)
+
+            now = pendulum.now("US/Eastern")
+            refresh = now.set(hour=9, minute=0, second=0, microsecond=0)
+            if refresh <= now:
+                refresh = refresh.add(days=1)
+
+            await asyncio.sleep((refresh - now).total_seconds())
 
     def updateGlobalStateVariable(self, key: str, val: str | None) -> None:
         # 'val' of None means just print the output, while 'val' of empty string means delete the key.
@@ -780,39 +838,33 @@ class IBKRCmdlineApp:
         If no input quantity, return total position size.
         If input quantity larger than position size, returned size is capped to max position size.
         """
-        portitems = self.ib.portfolio()
-        # logger.debug("Current Portfolio is: {}", portitems)
-
         results = []
-        for pi in portitems:
-            # Note: using 'localSymbol' because for options, it includes
-            # the full OCC-like format, while contract.symbol will just
-            # be the underlying equity symbol.
-            # Note note: using fnmatch.fnmatch() because we allow 'sym' to
-            #            have glob characters for multiple lookups at once!
-            # Note 3: options .localSymbols have the space padding, so remove for input compare.
-            # TODO: fix temporary hack of OUR symbols being like /NQ but position values dont' have the slash...
-            if fnmatch.fnmatch(
-                pi.contract.localSymbol.replace(" ", ""), sym.replace("/", "")
-            ):
-                contract = None
-                contract = pi.contract
-                position = pi.position
-
-                if qty is None:
-                    # if no quantity requested, use entire position
-                    foundqty = position
-                elif abs(qty) >= abs(position):
-                    # else, if qty is larger than position, truncate to position.
-                    foundqty = position
-                else:
-                    # else, use requested quantity but with sign of position
-                    foundqty = math.copysign(qty, position)
 
-                # note: '.marketPrice' here is IBKR's "best effort" market price because it only
-                #       updates maybe every 30-90 seconds? So (qty * .marketPrice * multiplier) may not represent the
-                #       actual live value of the position.
-                results.append((contract, foundqty, pi.marketPrice))
+        # Note: matching on 'localSymbol' because for options, it includes
+        # the full OCC-like format, while contract.symbol will just
+        # be the underlying equity symbol.
+        # Note note: 'sym' may have glob characters for multiple lookups at once
+        #            (exact names are direct index lookups)
+        # Note 3: options .localSymbols have the space padding, so the book indexes them without spaces.
+        # TODO: fix temporary hack of OUR symbols being like /NQ but position values dont' have the slash...
+        for pi in self.positions.find(sym.replace("/", "")):
+            contract = pi.contract
+            position = pi.position
+
+            if qty is None:
+                # if no quantity requested, use entire position
+                foundqty = position
+            elif abs(qty) >= abs(position):
+                # else, if qty is larger than position, truncate to position.
+                foundqty = position
+            else:
+                # else, use requested quantity but with sign of position
+                foundqty = math.copysign(qty, position)
+
+            # note: '.marketPrice' here is IBKR's "best effort" market price because it only
+            #       updates maybe every 30-90 seconds? So (qty * .marketPrice * multiplier) may not represent the
+            #       actual live value of the position.
+            results.append((contract, foundqty, pi.marketPrice))
 
         return results
 
@@ -928,6 +980,7 @@ class IBKRCmdlineApp:
         # now we passed the integer extraction and the quote lookup, so return the found symbol for the lookup id
         assert ticker.contract
         name = (ticker.contract.localSymbol or ticker.contract.symbol).replace(" ", "")
+        self.lines.touch(lookupKey(ticker.contract))
 
         return name, ticker.contract
 
@@ -1265,6 +1318,7 @@ class IBKRCmdlineApp:
                 pp.pformat(order),
             )
             try:
+                await self.pacer.wait("orders")
                 trade = await asyncio.wait_for(
                     self.ib.whatIfOrderAsync(contract, order), timeout=2
                 )
@@ -1416,7 +1470,8 @@ class IBKRCmdlineApp:
 
             # TODO: make this delta range configurable? config file? env? global setting?
             if isinstance(contract, (Option, FuturesOption)):
-                delta = self.quoteState[name].modelGreeks.delta
+                greeks = self.greeks.model(name) or self.quoteState[name].modelGreeks
+                delta = greeks.delta if greeks else None
                 if not delta:
                     logger.warning("[{}] WARNING: OPTION DELTA NOT POPULATED YET", desc)
                 elif abs(delta) <= 0.15:
@@ -1477,6 +1532,9 @@ class IBKRCmdlineApp:
 
         profitTrade = None
         lossTrade = None
+
+        # parent and any bracket legs go out together
+        await self.pacer.wait("orders", 1 + bool(profitOrder) + bool(lossOrder))
         trade = self.ib.placeOrder(contract, order)
 
         if profitOrder:
@@ -1600,19 +1658,13 @@ class IBKRCmdlineApp:
 
     def orderPriceForSpread(self, contracts: Sequence[Contract], positionSize: int):
         """Given a set of contracts, attempt to find the closing order."""
-        ot = self.ib.openTrades()
+        contractIds = frozenset(c.conId for c in contracts)
 
-        contractIds = set([c.conId for c in contracts])
         # Use a list so we can collect multiple exit points for the same position.
-        ts = []
-        for t in ot:
-            if not isinstance(t.contract, Bag):
-                continue
-
-            legIds = set([c.conId for c in t.contract.comboLegs])
-            if legIds == contractIds:
-                qty, price = t.orderStatus.remaining, t.order.lmtPrice
-                ts.append((qty, price))
+        ts = [
+            (t.orderStatus.remaining, t.order.lmtPrice)
+            for t in self.openOrders.find(contractIds)
+        ]
 
         # if only one and it's the full position, return without formatting
         if len(ts) == 1:
@@ -1626,26 +1678,17 @@ class IBKRCmdlineApp:
         """Attempt to match an active closing order to an open position.
 
         Works for both total quantity closing and partial scale-out closing."""
-        ot = self.ib.openTrades()
-
         # Use a list so we can collect multiple exit points for the same position.
-        ts = []
-        for t in ot:
-            # t.order.action is "BUY" or "SELL"
-            opposite = "SELL" if positionSize > 0 else "BUY"
-            if (
-                t.order.action == opposite
-                and t.contract.localSymbol == contract.localSymbol
-            ):
-                # Closing price is opposite sign of the holding quantity.
-                # (i.e. LONG positions are closed for a CREDIT (-) and
-                #       SHORT positions are closed for a DEBIT (+))
-                ts.append(
-                    (
-                        int(t.orderStatus.remaining),
-                        float(np.sign(positionSize) * -1 * t.order.lmtPrice),
-                    )
-                )
+        # Closing price is opposite sign of the holding quantity.
+        # (i.e. LONG positions are closed for a CREDIT (-) and
+        #       SHORT positions are closed for a DEBIT (+))
+        ts = [
+            (
+                int(t.orderStatus.remaining),
+                float(np.sign(positionSize) * -1 * t.order.lmtPrice),
+            )
+            for t in self.openOrders.find(contract, opposite(positionSize))
+        ]
 
         # if only one and it's the full position, return without formatting
         if len(ts) == 1:
@@ -1659,6 +1702,7 @@ class IBKRCmdlineApp:
         # TODO: maybe we should refactor this to only accept qualified contracts as input (instead of string symbol names) to avoid naming confusion?
         q = self.quoteState.get(sym)
         assert q and q.contract, f"Why doesn't {sym} exist in the quote state?"
+        self.lines.touch(sym)
 
         # only optionally print the quote because printing technically requires extra time
         # for all the formatting and display output
@@ -1680,6 +1724,9 @@ class IBKRCmdlineApp:
         # else else, return nothing because there's no actual price we can read anywhere.
 
         # if no quote yet (or no prices available), return last seen price...
+        if sym in self.quoteStore:
+            return self.quoteStore.quote(sym)
+
         if q.bid == q.bid and q.ask == q.ask and q.bid > 0 and q.ask > 0:
             return q.bid, q.ask
 
@@ -1691,26 +1738,66 @@ class IBKRCmdlineApp:
         return None
 
     async def loadExecutions(self) -> None:
-        """Manually fetch all executions from the gateway.
+        """Fetch executions from the gateway since the journal was last synced.
 
         The IBKR API only sends live push updates for executions on the _current_ client,
         so to see executions from either _all_ clients or executions before this client started,
-        we need to ask for them all again.
+        we need to ask for them again. Everything before the previous sync is already in
+        the journal, so only newer executions are requested.
         """
 
-        logger.info("Fetching full execution history...")
+        started = pendulum.now().timestamp()
+        execFilter = ExecutionFilter()
+        if since := self.journal.since():
+            execFilter.time = filterTime(since)
+            logger.info("Fetching execution history since {}...", execFilter.time)
+        else:
+            logger.info("Fetching full execution history...")
+
         try:
             # manually flag "we are loading historical commissions, so don't run the event handler"
             self.loadingCommissions = True
 
             with Timer("Fetched execution history"):
-                await asyncio.wait_for(self.ib.reqExecutionsAsync(), 3)
+                await self.pacer.wait("api")
+                fills = await asyncio.wait_for(
+                    self.ib.reqExecutionsAsync(execFilter), 3
+                )
         finally:
             # allow the commission report event handler to run again
             self.loadingCommissions = False
 
+        # (executions from other clients may not have matching trades, so they don't all
+        #  arrive through the event handlers)
+        added = self.recordFills(fills)
+        self.journal.markSynced(started)
+        logger.info("Journaled {} new executions", added)
+
+    def sessionStats(self) -> ExecutionStats:
+        """Return execution stats for the current session (rebuilt from the journal when the session changes)."""
+        start = sessionStart()
+        if self.execStats.start != start:
+            self.execStats = ExecutionStats(start=start)
+            for row in self.journal.fills(start):
+                self.execStats.add(row)
+
+        return self.execStats
+
+    def recordFills(self, fills: Sequence[Fill]) -> int:
+        """Journal executions and count them in the session stats; returns how many were new."""
+        added = self.journal.record(fills)
+
+        stats = self.sessionStats()
+        start = stats.start or 0.0
+        for fill in fills:
+            if fill.time.timestamp() >= start:
+                stats.add(fillDict(fill))
+
+        return added
+
     def updatePosition(self, pos):
         self.position[pos.contract.symbol] = pos
+        self.positions.update(pos)
 
     def updateOrder(self, trade):
         # Only print update if this is regular runtime and not
@@ -1748,6 +1835,8 @@ class IBKRCmdlineApp:
         logger.warning("Order canceled: {}", err)
 
     def commissionHandler(self, trade, fill, report):
+        self.recordFills([fill])
+
         # Only report commissions if not bulk loading them as a refresh
         # (the bulk load API causes the event handler to fire for each historical fill)
         if self.loadingCommissions:
@@ -1832,17 +1921,16 @@ class IBKRCmdlineApp:
             fill.contract.localSymbol,
         )
 
-        symbol = trade.contract.localSymbol.replace(" ", "")
-        side = fill.execution.side  # "BOT" or "SLD"
-        qty = fill.execution.shares
-
-        # Do not assume you're always going long/flat → adjust against current state
-        prev_qty = self.internalPositions.get(symbol, 0)
-        signed_qty = qty if side == "BOT" else -qty
-        new_qty = prev_qty + signed_qty
+        self.recordFills([fill])
 
-        self.internalPositions[symbol] = new_qty
-        logger.info(f"[exec] {symbol}: {side} {qty} → {new_qty} total")
+        # apply our fills right away (position events replace them, see PositionBook),
+        # but executions replayed while loading history are already included in positions.
+        if not self.loadingCommissions:
+            symbol = fill.contract.localSymbol.replace(" ", "")
+            side = fill.execution.side  # "BOT" or "SLD"
+            qty = fill.execution.shares
+            new_qty = self.positions.execution(fill)
+            logger.info(f"[exec] {symbol}: {side} {qty} → {new_qty} total")
 
         if fill.execution.cumQty > 0:
             if trade.contract.conId not in self.pnlSingle:
@@ -1869,81 +1957,116 @@ class IBKRCmdlineApp:
                    isn't working correctly because then you can see the errors/exceptions (if any).
         """
         # logger.info("Ticker update: {}", tickr)
+        recording = [] if self.recorder else None
+        indicatorUpdates = []
+
         for ticker in tickr:
             c = ticker.contract
             name = (c.localSymbol or c.symbol).replace(" ", "")
-            price = (ticker.bid + ticker.ask) / 2
-
-            # "Bag" spreads have no unique ID themselves and Contract objects can't be hashed because
-            # they are mutable, so we generate a fast synthetic bag quote key here (which is mostly like
-            # the global quote key except we aren't bothering to sort it here... the sort probably isn't necessary
-            # in the global one either)
-            if isinstance(c, Bag):
-                quotekey = tuple(x.tuple() for x in c.comboLegs)
+
+            # only quotes added to quoteState have a store slot (depth or one-off subscriptions don't)
+            slot = self.quoteStore.slotForContract(c)
+            if slot is not None:
+                price = self.quoteStore.update(slot, ticker)
+
+                # EMAs and ATR track the live midpoint, or the last trade if there's no bid/ask.
+                # (spreads are allowed to be negative because they can be credit quotes; spreads
+                #  without IBKR quotes get synthetic prices from their legs after this loop instead)
+                key = self.quoteStore.names[slot]
+                when = self.quoteStore.time[slot]
+
+                if key in self.chaser.byKey:
+                    self.chaser.quoteUpdated(key)
+                if isinstance(c, Bag):
+                    native = bool(ticker.bid and ticker.ask and price == price)
+                    self.spreads.native(key, native)
+                    if native:
+                        indicatorUpdates.append((key, when, price, False))
+                        self.bars.update(key, when, price)
+                else:
+                    if c.conId in self.spreads.byLeg:
+                        self.spreads.legUpdated(c.conId)
+
+                    mark = (
+                        price
+                        if ticker.bid > 0 and ticker.ask > 0
+                        else self.quoteStore.mark(key)
+                    )
+                    indicatorUpdates.append(
+                        (
+                            key,
+                            when,
+                            mark,
+                            # also allow TICK to trend negative since it's a metric and not a price.
+                            key != "TICK-NYSE",
+                        )
+                    )
+                    self.bars.update(key, when, mark, ticker.volume)
+
+                    if ticker.modelGreeks:
+                        self.greeks.setFallback(slot, ticker.modelGreeks.undPrice)
             else:
-                quotekey = c.conId
+                price = (ticker.bid + ticker.ask) / 2
 
-            self.quotehistory[quotekey].append(price)
+            if recording is not None:
+                recording.append(
+                    (
+                        name,
+                        ticker.time,
+                        ticker.bid,
+                        ticker.bidSize,
+                        ticker.ask,
+                        ticker.askSize,
+                        ticker.last,
+                        ticker.volume,
+                    )
+                )
 
             # CHAD tickersUpdate
-            if self.strategy.get(name):
-                alg = self.strategy.get(name)
-                algo = alg.get("algo")
-                start = alg.get("start")
-                if name not in self.barState.keys():
-                    barData = OHLC5MinTracker()
-                    self.barState[name] = barData
-
-                barData = self.barState.get(name)
-                if c.secType == 'OPT':
-                    barData.update(datetime.datetime.now(), self.quoteState.get(name).modelGreeks.undPrice)
-
-                if not self.running[name]:
-                    self.running[name] = True
-
-                    async def safe_runop(symbol=name, algo=algo, start=start):
-                        try:
-                            await self.dispatch.runop("runstrat", f'"{symbol}" "{algo}" "{start}"', self.opstate)
-                        finally:
-                            self.running[symbol] = False
-
-                    asyncio.create_task(safe_runop())
+            if name in self.strategy:
+                # strategies check underlying bars; if the underlying isn't quoted itself,
+                # build its bars from the option's model underlying price instead.
+                if (
+                    c.secType == "OPT"
+                    and c.symbol not in self.quoteStore
+                    and ticker.modelGreeks
+                    and ticker.time
+                ):
+                    self.bars.update(
+                        c.symbol, ticker.time.timestamp(), ticker.modelGreeks.undPrice
+                    )
 
+                # coalesced: at most one evaluation queued per symbol no matter the tick rate
+                self.strategies.notify(name)
 
-            # this is a synthetic memory-having ATR where we just feed it price data and
-            # it calculates a dynamic H/L/C for the actual ATR based on recent price history.
             if ticker.bid > 0 and ticker.ask > 0:
-                self.atrs[name].update(price)
-
                 if False and ICLI_AWWDIO_URL:
                     asyncio.create_task(
                         self.speak.say(say=f"PRICE UP: {name} TO {price:,.2f}")
                     )
 
 
+        # each spread with any leg updated above is recomputed once
+        for spread in self.spreads.flush():
+            indicatorUpdates.append((spread.key, spread.time, spread.mid, False))
+            self.bars.update(spread.key, spread.time, spread.mid)
+            if spread.key in self.chaser.byKey:
+                self.chaser.quoteUpdated(spread.key)
+
+        # this includes a synthetic memory-having ATR where we just feed it price data and
+        # it calculates a dynamic H/L/C for the actual ATR based on recent price history.
+        self.indicators.updateBatch(indicatorUpdates)
+
+        # one vectorized pass over every option whose quote or underlying changed
+        self.greeks.refresh()
+
         # TODO: we could also run volume crossover calculations too...
 
         # TODO: we should also do some algo checks here based on the live quote price updates...
 
-        if ICLI_DUMP_QUOTES:
-            with open(
-                f"tickers-{datetime.datetime.now().date()}-{ICLI_CLIENT_ID}.json", "a"
-            ) as tj:
-                for ticker in tickr:
-                    tj.write(
-                        orjson.dumps(
-                            dict(
-                                symbol=name,
-                                time=str(ticker.time),
-                                bid=ticker.bid,
-                                bidSize=ticker.bidSize,
-                                ask=ticker.ask,
-                                askSize=ticker.askSize,
-                                volume=ticker.volume,
-                            )
-                        )
-                    )
-                    tj.write("\n")
+        # rows are only queued here; the recorder thread does all formatting and file writing
+        if recording:
+            self.recorder.record(recording)
 
     def updateSummary(self, v):
         """Each row is populated after connection then continually
@@ -2077,53 +2200,18 @@ class IBKRCmdlineApp:
 
             return f"{n:>5}"
 
-        def updateEMA(sym, price, longOnly=True):
-            # if no price, don't update (but allow negative prices if this is a credit quote)
-            if (not price) or (longOnly and (price < 0)) or (price != price):
-                # logger.info("Skipping EMA update for: {} because {}", sym, price)
-
-                # We had some invalid price data here, so reset everything to zero (if not already zero)
-                if sym in self.ema:
-                    del self.ema[sym]
-
-                return
-
-            # Normalize the EMAs s so they are in TIME and not "updates per ICLI_REFRESH interval"
-            # 1 minute and 3 minute EMAs
-
-            # these are in units of fractional seconds we need to normalize to our "bar update duration intervals"
-            # TODO: we could move this to the ticker updater instead? then it updates on every quote change and we have timestamps to use.
-            refresh = self.toolbarUpdateInterval
-
-            MIN_1 = 60 // refresh
-            MIN_3 = (60 * 3) // refresh
-            MIN_5 = (60 * 5) // refresh
-
-            for name, back in (("1m", MIN_1), ("3m", MIN_3), ("5m", MIN_5)):
-                prev = self.ema[sym][name]
-
-                # use previous price or initialize with current price
-                if (not prev) or (prev != prev):
-                    prev = price
-
-                # fmt: off
-                # if prev != prev:
-                #    logger.info("NaN in EMA? [{} :: {}] {} {} -> {}", prev, price, sym, back, self.ema[sym][back])
-                # fmt: on
-
-                k = 2 / (back + 1)
-                self.ema[sym][name] = (k * (price - prev)) + prev
-
-        def getEMA(sym, name, roundto=2):
-            # Round our results here so we don't need to excessively format all the prints.
-            return round(self.ema[sym][name], roundto)
+        getEMA = self.indicators.ema
 
         # Fields described at:
         # https://ib-insync.readthedocs.io/api.html#module-ib_insync.ticker
 
         useLast = self.localvars.get("last")
 
-        def formatTicker(c):
+        def priceTicker(c):
+            """Resolve current display price for a quote.
+
+            Runs for every quote on every refresh, so only do price math here; all string
+            formatting happens in formatTicker() which only runs when a row changed."""
             ls = lookupKey(c.contract)
 
             # ibkr API keeps '.close' as the previous full market day close until the next
@@ -2151,36 +2239,7 @@ class IBKRCmdlineApp:
             bidSize = c.bidSize
             askSize = c.askSize
 
-            match c.minTick:
-                case 0.01:
-                    # common case, just regular dollars 'n cents
-                    decimals = 2
-                case 0.0001:
-                    # currency quotes
-                    decimals = 4
-                case 0.001:
-                    # yield quotes
-                    decimals = 3
-                case 0.00025:
-                    # other more specific futures quotes.
-                    # e.g. /LE is quoted with a 40,000 multiplier because the unit is "cents per pound" but
-                    #      prices are shown pre-adjusted to dollars-per-pound, so even though the
-                    #      minTick is 0.00025, that's in "cents/pound" but our quotes are "$/pound" which is 100x higher...
-                    #      Long story short, a 0.00025 minTick is actually 3 decimal places.
-                    #      If there are other exceptions to the "tick vs cents vs dollars vs multiplier" problem, we haven't found them yet.
-                    decimals = 3
-                case 0.03125:
-                    # futures bonds are quoted in "1/32 of one point (0.03125)"
-                    decimals = 5
-                case 0.00390625:
-                    # other futures bonds are quoted in "1/8 of 1/32 of one point (0.00390625)"
-                    decimals = 8
-                case 0.0025:
-                    # CORN "1/4 of one cent (0.0025) per bushel"
-                    decimals = 4
-                case _:
-                    # default, just two too
-                    decimals = 2
+            decimals = toolbar.decimalsForTick(c.minTick)
 
             if bid > 0 and bid == bid and ask > 0 and ask == ask:
                 if useLast:
@@ -2197,63 +2256,28 @@ class IBKRCmdlineApp:
                     # bags are allowed to have negative prices because they can be credit quotes
                     usePrice = round((bid + ask) / 2, 2)
                 else:
-                    # else, IBKR isn't giving us quotes for this spread (IBKR datafeeds suck), so actually let's
-                    # see if we have a live quote running for all legs so we can generate the spread quote
-                    # anyway with our own math... sigh.
-                    # logger.info("Generating synthetic quote using: {}", c.contract)
-                    contractIds = [x.conId for x in c.contract.comboLegs]
-                    quotes = [
-                        # .get() because MAYBE THIS QUOTE DOESN'T EXIST EITHER, so we can't even generate a synthetic bag quote. sad.
-                        self.quoteState.get(quotekey)
-                        for quotekey in [
-                            self.contractIdsToQuoteKeysMappings.get(x)
-                            for x in contractIds
-                        ]
-                    ]
-                    # logger.info("Found underlying quotes: {}", quotes)
-                    bid = 0
-                    ask = 0
-                    bidSize = float("inf")
-                    askSize = float("inf")
-                    for leg, quote in zip(c.contract.comboLegs, quotes):
-                        # if a quote doesn't exist, we need to abandon trying to generate any part of this synthetic quote
-                        # because we don't have all the data we need so just combining partial values would be wrong.
-                        if not quote or (quote.ask == -1 or quote.bid == -1):
-                            bid = 0
-                            ask = 0
-                            bidSize = 0
-                            askSize = 0
-                            usePrice = np.nan
-                            break
-
-                        if leg.action == "SELL":
-                            # SELL legs have opposite signs and positions because they are credits
-                            bid -= quote.ask * leg.ratio
-                            ask -= quote.bid * leg.ratio
-                            # the "quantity" of a spread is the smallest number available for the combinations
-                            bidSize = min(bidSize, quote.askSize)
-                            askSize = min(askSize, quote.bidSize)
-                        else:
-                            # else, is BUY, so we do normal adding to the normal order
-                            bid += quote.bid * leg.ratio
-                            ask += quote.ask * leg.ratio
-                            bidSize = min(bidSize, quote.bidSize)
-                            askSize = min(askSize, quote.askSize)
+                    # else, IBKR isn't giving us quotes for this spread (IBKR datafeeds suck), so use the
+                    # synthetic quote the spread book maintains from the leg quotes (if all legs are quoted).
+                    spread = self.spreads.quote(ls)
+                    if spread and spread.complete:
+                        bid = spread.bid
+                        ask = spread.ask
+                        bidSize = spread.bidSize
+                        askSize = spread.askSize
+                        usePrice = round(spread.mid, 2)
                     else:
-                        usePrice = round((bid + ask) / 2, 2)
+                        bid = 0
+                        ask = 0
+                        bidSize = 0
+                        askSize = 0
+                        usePrice = np.nan
             else:
                 # else, bid/ask is currently offline or broken or just not on the symbol, so use the last traded price.
                 usePrice = c.last if c.last == c.last else c.close
 
-            # update EMA using current midpoint estimate (and allow Bag/spread quotes to have negative EMA due to credit spreads).
-            # Also allow TICK to trend negative since it's a metric and not a price.
-            updateEMA(
-                ls,
-                usePrice,
-                (not isinstance(c.contract, Bag) and not (ls == "TICK-NYSE")),
-            )
+            return ls, decimals, usePrice, bid, ask, bidSize, askSize
 
-            ago = (self.now - (c.time or self.now)).as_duration()
+        def formatTicker(c, ls, decimals, usePrice, bid, ask, bidSize, askSize):
             try:
                 percentUnderHigh = (
                     ((usePrice - c.high) / c.high) * 100 if c.high == c.high else 0
@@ -2412,16 +2436,18 @@ class IBKRCmdlineApp:
                 gamma = None
                 theta = None
                 try:
-                    iv = c.modelGreeks.impliedVol
-                    delta = c.modelGreeks.delta
-                    theta = c.modelGreeks.theta
-                    gamma = c.modelGreeks.gamma
+                    # local greeks are available as soon as the quote is, IBKR's only eventually
+                    greeks = self.greeks.model(ls) or c.modelGreeks
+                    iv = greeks.impliedVol
+                    delta = greeks.delta
+                    theta = greeks.theta
+                    gamma = greeks.gamma
 
                     # Note: keep underlyingStrikeDifference the LAST attempt here because if the user doesn't
                     #       have live market data for this option, then 'und' is 0 and this math breaks,
                     #       but if it breaks _last_ then the greeks above still work properly.
                     strike = c.contract.strike
-                    und = c.modelGreeks.undPrice
+                    und = greeks.undPrice
                     underlyingStrikeDifference = -(strike - und) / und * 100
                 except:
                     pass
@@ -2455,9 +2481,13 @@ class IBKRCmdlineApp:
                             for leg, quote in zip(c.contract.comboLegs, quotes):
                                 # round these because the IBKR values are very long and we end up with
                                 # bad artifacts like -0.00 due to math being different in far out decimal plaes.
-                                qiv = round(quote.modelGreeks.impliedVol, 2)
-                                qd = round(quote.modelGreeks.delta, 2)
-                                qt = round(quote.modelGreeks.theta, 2)
+                                greeks = (
+                                    self.greeks.model(lookupKey(quote.contract))
+                                    or quote.modelGreeks
+                                )
+                                qiv = round(greeks.impliedVol, 2)
+                                qd = round(greeks.delta, 2)
+                                qt = round(greeks.theta, 2)
                                 match leg.action:
                                     case "BUY":
                                         collectiveIV += qiv
@@ -2497,9 +2527,7 @@ class IBKRCmdlineApp:
 
                     # show a recent range of prices since spreads have twice (or more) the bid/ask volatility
                     # of a single leg option (due to all the legs being combined into one quote dynamically)
-                    src = self.quotehistory[
-                        tuple(x.tuple() for x in c.contract.comboLegs)
-                    ]
+                    src = self.quoteStore.recent(ls).tolist()
 
                     # typically, a low stddev indicates temporary low volatility which is
                     # the calm before the storm when a big move happens next (in either direction,
@@ -2557,7 +2585,7 @@ class IBKRCmdlineApp:
                             f" ({pctBigHigh} {amtBigHigh} {fmtPriceOpt(c.high):>6})",
                             f"({pctBigLow} {amtBigLow} {fmtPriceOpt(c.low):>6})",
                             f" {fmtPriceOpt(bid):>6} x {b_s}   {fmtPriceOpt(ask):>6} x {a_s} ",
-                            f"  ({str(ago):>13})  ",
+                            f"  ({toolbar.AGO_PAD})  ",
                             f"  :: {parts}  (r {minmax:.2f})  (s {std:.2f})",
                             "HALTED!" if c.halted > 0 else "",
                         ]
@@ -2648,7 +2676,7 @@ class IBKRCmdlineApp:
                             f"({pctBigLow} {amtBigLow} {fmtPriceOpt(c.low):>6})",
                             f"({pctBigClose} {amtBigClose} {fmtPriceOpt(c.close):>6})",
                             f" {fmtPriceOpt(c.bid):>6} x {b_s}   {fmtPriceOpt(c.ask):>6} x {a_s} ",
-                            f"  ({str(ago):>13})  ",
+                            f"  ({toolbar.AGO_PAD})  ",
                             f"(s {compensated:>8,.2f} @ {compdiff:>6,.2f})",
                             f"({when:>3} d)",
                             rowNice,
@@ -2690,9 +2718,9 @@ class IBKRCmdlineApp:
             )
 
             # somewhat circuitous logic to format NaNs and values properly at the same string padding offsets
-            atrval = np.nan
-            if atrr := self.atrs.get(ls):
-                atrval = atrr.atr.current
+            atrval = self.indicators.atr(ls)
+            if atrval is None:
+                atrval = np.nan
 
             # if ATR > 100, omit cents so it fits in the narrow column easier
             if atrval > 100:
@@ -2747,7 +2775,7 @@ class IBKRCmdlineApp:
                     f"({atr})",
                     f"{c.open:>10,.{decimals}f}",
                     f"{c.close:>10,.{decimals}f}",
-                    f"({str(ago)})",
+                    f"({toolbar.AGO})",
                     "     HALTED!" if c.halted > 0 else "",
                 ]
             )
@@ -2832,9 +2860,50 @@ class IBKRCmdlineApp:
                 # > to ensure that it is greater than or equal to zero.
                 onc = f" (OVERNIGHT REG-T MARGIN CALL: ${-overnightDeficit:,.2f})"
 
-            qs = sorted(self.quoteState.items(), key=sortQuotes)
+            # only re-sorts if quotes were added or removed since the previous refresh
+            qs = self.toolbarRows.quotes(self.quoteState, (self.now.date(), useLast))
             self.quotesPositional = qs
 
+            priced = [priceTicker(quote) for _, quote in qs]
+
+            def rowInputs(quote, ls, decimals, usePrice):
+                # everything displayed in a row which isn't a field of the ticker itself
+                atrval = self.indicators.atr(ls)
+                greeks = self.greeks.model(ls) or quote.modelGreeks
+                emaDecimals = (
+                    2 if quote.contract.secType in {"OPT", "FOP", "BAG"} else decimals
+                )
+                return (
+                    usePrice,
+                    getEMA(ls, "1m", emaDecimals),
+                    getEMA(ls, "3m", emaDecimals),
+                    round(atrval, 2) if atrval is not None else np.nan,
+                    *(
+                        (
+                            greeks.impliedVol,
+                            greeks.delta,
+                            greeks.gamma,
+                            greeks.theta,
+                            greeks.undPrice,
+                            greeks.optPrice,
+                        )
+                        if greeks
+                        else (np.nan,) * 6
+                    ),
+                )
+
+            for position in self.toolbarRows.changed(
+                [
+                    rowInputs(quote, ls, decimals, usePrice)
+                    for (_, quote), (ls, decimals, usePrice, *_) in zip(qs, priced)
+                ],
+                # synthetic spread rows depend on other quotes and price history, so never cache them
+                [isinstance(quote.contract, Bag) for _, quote in qs],
+            ):
+                self.toolbarRows.update(
+                    position, formatTicker(qs[position][1], *priced[position])
+                )
+
             spxbreakers = ""
             spx = self.quoteState.get("SPX")
             if spx:
@@ -2864,15 +2933,14 @@ class IBKRCmdlineApp:
                     ]
                 )
 
-            # TODO: we may want to iterate these to exclude "Inactive" orders like:
-            # [x.log[-1].status == "Inactive" for x in self.ib.openTrades()]
-            ordcount = len(self.ib.openTrades())
+            # Inactive orders aren't working, so they aren't counted
+            ordcount = self.openOrders.working
             openorders = f"open orders: {ordcount:,}"
 
-            positioncount = len(self.ib.portfolio())
+            positioncount = len(self.positions)
             openpositions = f"positions: {positioncount:,}"
 
-            executioncount = len(self.ib.fills())
+            executioncount = self.journal.today
             todayexecutions = f"executions: {executioncount:,}"
 
             # TODO: We couold also flip this between a "time until market open" vs "time until close" value depending
@@ -2887,8 +2955,19 @@ class IBKRCmdlineApp:
                 f"""[{ICLI_CLIENT_ID}] {self.now}{onc} [{self.updates:,}]                {spxbreakers}                     {openorders}    {openpositions}    {todayexecutions}      {todayclose}   ({daysInMonth} :: {daysInYear})\n"""
                 + "\n".join(
                     [
-                        f"{qp:>2}) " + formatTicker(quote)
-                        for qp, (sym, quote) in enumerate(qs)
+                        f"{qp:>2}) " + row
+                        for qp, row in enumerate(
+                            self.toolbarRows.paint(
+                                [
+                                    str(
+                                        (
+                                            self.now - (quote.time or self.now)
+                                        ).as_duration()
+                                    )
+                                    for _, quote in qs
+                                ]
+                            )
+                        )
                     ]
                 )
                 + "\n"
@@ -2930,7 +3009,7 @@ class IBKRCmdlineApp:
         return "live"
 
     def addQuoteFromContract(self, contract):
-        """Add live quote by providing a resolved contract"""
+        """Add live quote by providing a resolved contract (returns None if no line was available)"""
         # logger.info("Adding quotes for: {} :: {}", ordReq, contract)
 
         # just verify this contract is already qualified (will be a cache hit most likely)
@@ -2941,23 +3020,56 @@ class IBKRCmdlineApp:
         else:
             assert contract.conId, f"Sorry, we only accept qualified contracts for adding quotes, but we got: {contract}"
 
-        tickFields = tickFieldsForContract(contract)
-
         # remove spaces from OCC-like symbols for consistent key reference
         symkey = lookupKey(contract)
 
         # don't double-subscribe to symbols! If something is already in our quote state, we have an active subscription!
         if symkey not in self.quoteState:
             # logger.info("[{}] Adding new live quote...", symkey)
-            self.quoteState[symkey] = self.ib.reqMktData(contract, tickFields)
-            #self.ib.reqHistoricalData()
-            self.contractIdsToQuoteKeysMappings[contract.conId] = symkey
+            ticker = self.lines.subscribe(contract, QUOTE)
+            if ticker is None:
+                # line budget is full of quotes we can't evict (already logged)
+                return None
+
+            self.trackQuote(symkey, contract, ticker)
 
             # This is a nice debug helper just showing the quote key name to the attached contract subscription:
             # logger.info("[{}]: {}", symkey, contract)
+        else:
+            self.lines.touch(symkey)
 
         return symkey
 
+    def trackQuote(self, symkey, contract, ticker) -> None:
+        """Register a subscribed ticker with everything reading quotes (store, greeks, spreads)."""
+        self.quoteState[symkey] = ticker
+        self.quoteStore.addContract(contract)
+        self.greeks.add(contract)
+        if isinstance(contract, Bag):
+            self.spreads.add(contract)
+
+        self.contractIdsToQuoteKeysMappings[contract.conId] = symkey
+
+    async def addQuoteFromContractPaced(self, contract):
+        """Add live quote like addQuoteFromContract(), but wait for market data pacing first (for bulk adds)"""
+        if lookupKey(contract) not in self.quoteState:
+            await self.pacer.ready("marketdata")
+
+        return self.addQuoteFromContract(contract)
+
+    def dropQuote(self, symkey) -> bool:
+        """Remove live quote and everything derived from it (returns False if it wasn't a live quote)."""
+        self.lines.unsubscribe(symkey, QUOTE)
+
+        found = self.quoteState.pop(symkey, None)
+        self.greeks.remove(symkey)
+        self.spreads.remove(symkey)
+        self.quoteStore.remove(symkey)
+        self.indicators.remove(symkey)
+        self.bars.remove(symkey)
+
+        return found is not None
+
     def quoteExists(self, contract):
         return lookupKey(contract) in self.quoteState
 
@@ -3015,8 +3127,9 @@ class IBKRCmdlineApp:
                 )
                 continue
 
-            symkey = self.addQuoteFromContract(contract)
-            qs.add(symkey)
+            # quotes refused a line aren't in quoteState, so callers can't use their keys
+            if symkey := await self.addQuoteFromContractPaced(contract):
+                qs.add(symkey)
 
         # return array of quote lookup keys
         # (because things like spreads have weird keys, we construct parts the caller
@@ -3198,18 +3311,27 @@ class IBKRCmdlineApp:
 
             ib_async.util.logToConsole(logging.INFO)
 
+        # measure event loop lag and slow callbacks for the whole session
+        self.loopMonitor.start()
+
+        # time every IB event handler by name (so slow loop callbacks can name the
+        # handler running inside them)
+        timed = self.loopMonitor.timed
+
         # Attach IB events *outside* of the reconnect loop because we don't want to
         # add duplicate event handlers on every reconnect!
         # Note: these are equivalent to the pattern:
         #           lambda row: self.updateSummary(row)
-        self.ib.accountSummaryEvent += self.updateSummary
-        self.ib.pnlEvent += self.updatePNL
-        self.ib.orderStatusEvent += self.updateOrder
-        self.ib.errorEvent += self.errorHandler
-        self.ib.cancelOrderEvent += self.cancelHandler
-        self.ib.commissionReportEvent += self.commissionHandler
-        self.ib.newsBulletinEvent += self.newsBHandler
-        self.ib.tickNewsEvent += self.newsTHandler
+        self.ib.accountSummaryEvent += timed("accountSummaryEvent", self.updateSummary)
+        self.ib.pnlEvent += timed("pnlEvent", self.updatePNL)
+        self.ib.orderStatusEvent += timed("orderStatusEvent", self.updateOrder)
+        self.ib.errorEvent += timed("errorEvent", self.errorHandler)
+        self.ib.cancelOrderEvent += timed("cancelOrderEvent", self.cancelHandler)
+        self.ib.commissionReportEvent += timed(
+            "commissionReportEvent", self.commissionHandler
+        )
+        self.ib.newsBulletinEvent += timed("newsBulletinEvent", self.newsBHandler)
+        self.ib.tickNewsEvent += timed("tickNewsEvent", self.newsTHandler)
 
         # We don't use these event types because ib_insync keeps
         # the objects "live updated" in the background, so everytime
@@ -3220,18 +3342,47 @@ class IBKRCmdlineApp:
         # 5 Hz to 10 Hz because quotes are updated every 250 ms.
         # This event handler also includes a utility for writing the quotes to disk
         # for later backtest handling.
-        self.ib.pendingTickersEvent += self.tickersUpdate
+        self.ib.pendingTickersEvent += timed("pendingTickersEvent", self.tickersUpdate)
 
         # openOrderEvent is noisy and randomly just re-submits
         # already static order details as new events.
         # self.ib.openOrderEvent += self.orderOpenHandler
-        self.ib.execDetailsEvent += self.orderExecuteHandler
+        self.ib.execDetailsEvent += timed("execDetailsEvent", self.orderExecuteHandler)
+
+        # strategy order intents resolve from order status and executions
+        # (after orderExecuteHandler so internal positions are current when strategies resume)
+        self.ib.orderStatusEvent += timed(
+            "orderStatusEvent", self.strategies.orderStatus
+        )
+
+        # chased orders step (or finish) on order status changes
+        self.ib.orderStatusEvent += timed("orderStatusEvent", self.chaser.orderStatus)
+
+        # open order index follows every order from placement until it's done
+        self.ib.newOrderEvent += timed("newOrderEvent", self.openOrders.update)
+        self.ib.openOrderEvent += timed("openOrderEvent", self.openOrders.update)
+        self.ib.orderStatusEvent += timed("orderStatusEvent", self.openOrders.update)
+        self.ib.execDetailsEvent += timed("execDetailsEvent", self.strategies.execution)
+
+        # order lifecycle latencies: sends (new, modify, cancel) and every gateway
+        # response after them
+        self.ib.newOrderEvent += timed("newOrderEvent", self.latency.newOrder)
+        self.ib.orderModifyEvent += timed("orderModifyEvent", self.latency.modified)
+        self.ib.cancelOrderEvent += timed(
+            "cancelOrderEvent", self.latency.cancelRequested
+        )
+        self.ib.openOrderEvent += timed("openOrderEvent", self.latency.status)
+        self.ib.orderStatusEvent += timed("orderStatusEvent", self.latency.status)
+        self.ib.execDetailsEvent += timed("execDetailsEvent", self.latency.execution)
 
         # Note: "PortfolioEvent" is fine here since we are using a single account.
         # If you have multiple accounts, you want positionEvent (the IBKR API
         # doesn't allow "Portfolio" to span accounts, but Positions can be reported
         # from multiple accounts with one API connection apparently)
-        self.ib.updatePortfolioEvent += lambda row: self.updatePosition(row)
+        self.ib.updatePortfolioEvent += timed(
+            "updatePortfolioEvent", self.updatePosition
+        )
+        self.ib.positionEvent += timed("positionEvent", self.positions.position)
 
         async def requestMarketData():
             logger.info("Requesting market data...")
@@ -3246,13 +3397,10 @@ class IBKRCmdlineApp:
             # remove all quotes and re-subscribe to the current quote state
             logger.info("[quotes] Restoring quote state...")
             self.quoteState.clear()
+            self.lines.clear()
 
-            # Note: always restore snapshot state FIRST so the commands further down don't overwrite
-            #       our state with only startup entries.
-            with Timer("[quotes :: snapshot] Restored quote state"):
-                # restore CLIENT ONLY symbols
-                # run the snapshot restore by itself because it hits IBKR rate limits if run with the other restores
-                await self.dispatch.runop("qloadsnapshot", "", self.opstate)
+            # intraday bar series lost their realtime bar lines too
+            asyncio.create_task(self.intraday.reseed())
 
             contracts: list[Stock | Future | Index] = [
                 Stock(sym, "SMART", "USD") for sym in stocks
@@ -3260,22 +3408,29 @@ class IBKRCmdlineApp:
             contracts += futures
             contracts += idxs
 
-            with Timer("[quotes :: global] Restored quote state"):
-                # run restore and local contracts qualification concurrently
+            # Note: always restore snapshot state FIRST so the commands further down don't overwrite
+            #       our state with only startup entries.
+            with Timer("[quotes :: snapshot] Restored quote state"):
+                # run snapshot restore and local contracts qualification concurrently
+                # (every subscription waits on the pacer, so restores run at the fastest allowed rate)
                 # logger.info("pre=qualified: {}", contracts)
                 _, contracts = await asyncio.gather(
-                    # restore SHARED global symbols
-                    self.dispatch.runop("qrestore", "global", self.opstate),
+                    # restore CLIENT ONLY symbols
+                    self.dispatch.runop("qloadsnapshot", "", self.opstate),
                     # prepare to restore COMMON symbols
                     self.qualify(*contracts),
                 )
                 # logger.info("post=qualified: {}", contracts)
 
+            with Timer("[quotes :: global] Restored quote state"):
+                # restore SHARED global symbols
+                await self.dispatch.runop("qrestore", "global", self.opstate)
+
             with Timer("[quotes :: common] Restored quote state"):
                 for contract in contracts:
                     try:
                         # logger.info("Adding quote for: {} via {}", contract, contracts)
-                        self.addQuoteFromContract(contract)
+                        await self.addQuoteFromContractPaced(contract)
                     except:
                         logger.error("Failed to add on startup: {}", contract)
 
@@ -3303,6 +3458,7 @@ class IBKRCmdlineApp:
                     # reset cached states on reconnect so we don't show stale data
                     self.summary.clear()
                     self.position.clear()
+                    self.positions.clear()
                     self.pnlSingle.clear()
 
                     await self.ib.connectAsync(
@@ -3332,6 +3488,15 @@ class IBKRCmdlineApp:
                     # also load market data async for quicker non-blocking startup
                     asyncio.create_task(requestMarketData())
 
+                    # and warm the contract index for saved quotes and positions in the background
+                    asyncio.create_task(self.prefetchContracts())
+
+                    # and load option chains for everything we quote or hold before anyone asks for them
+                    if self.chainsPrefetcher:
+                        self.chainsPrefetcher.cancel()
+
+                    self.chainsPrefetcher = asyncio.create_task(self.prefetchChains())
+
                     # request live updates (well, once per second) of account and position values
                     self.ib.reqPnL(self.accountId)
 
@@ -3342,12 +3507,15 @@ class IBKRCmdlineApp:
                         self.pnlSingle[p.contract.conId] = self.ib.reqPnLSingle(
                             self.accountId, "", p.contract.conId
                         )
+                        self.updatePosition(p)
+
+                    self.openOrders.reset(self.ib.openTrades())
 
-                    positions = self.ib.positions()
-                    for account, contract, position, avgCost in positions:
-                        symbol = contract.localSymbol.replace(" ", "")
-                        self.internalPositions[symbol] = position
-                        logger.info(f"[init] seeded {symbol} = {position} from portfolio")
+                    for p in self.ib.positions():
+                        self.positions.position(p)
+                        logger.info(
+                            f"[init] seeded {p.contract.localSymbol.replace(' ', '')} = {p.position} from portfolio"
+                        )
 
                     # run some startup accounting subscriptions concurrently
                     await asyncio.gather(
@@ -3421,7 +3589,9 @@ class IBKRCmdlineApp:
                 text1 = await session.prompt_async(
                     f"{self.levelName()}> ",
                     enable_history_search=True,
-                    bottom_toolbar=self.bottomToolbar,
+                    bottom_toolbar=self.loopMonitor.timed(
+                        "toolbar", self.bottomToolbar
+                    ),
                     # refresh_interval=3,
                     # mouse_support=True,
                     # completer=completer, # <-- causes not to be full screen due to additional dropdown space
@@ -3480,8 +3650,15 @@ class IBKRCmdlineApp:
                         pass
 
     def stop(self):
+        self.profiler.stop()
         self.ib.disconnect()
 
+        if self.recorder:
+            self.recorder.close()
+
+        self.journal.close()
+        self.latency.save()
+
     async def setup(self):
         pass
 
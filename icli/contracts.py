@@ -0,0 +1,244 @@
+"""Contract index and batched contract qualification.
+
+ContractIndex is an in-memory dict in front of the on-disk diskcache contract cache.
+Each qualified contract is stored once by contract id, and every other lookup key
+(the unqualified Class-Symbol descriptor, the (localSymbol, symbol) pair) only stores
+the contract id pointing to the single contract record.
+
+QualifyQueue collects qualification requests arriving at the same time into batched
+qualifyContractsAsync() calls and coalesces concurrent requests for the same contract,
+so large restores or fan-out commands don't run one gateway round-trip per contract.
+Coalesced callers each get their own copy of the qualified contract.
+"""
+
+import asyncio
+import copy
+
+from dataclasses import dataclass, field
+from typing import Any, Hashable
+
+import diskcache
+
+from ib_async import Contract, Future, IB
+from loguru import logger
+
+from icli.helpers import contractToSymbolDescriptor
+from icli.pacer import RequestPacer
+
+
+def expirationFor(contract: Contract) -> int:
+    """Return cache lifetime in seconds for a qualified contract."""
+    # we want Futures contracts to refresh more often because they have
+    # embedded expiration dates which may change over time if we are using
+    # generic symbol names like "ES" for the next main contract.
+    return 86400 * (2 if isinstance(contract, Future) else 30)
+
+
+def requestKey(contract: Contract) -> Hashable:
+    """Lookup key for an unqualified contract request."""
+    return contract.conId or contractToSymbolDescriptor(contract)
+
+
+@dataclass
+class ContractIndex:
+    """Contracts by id (plus alias keys to ids) with an in-memory tier over disk storage.
+
+    Supports the mapping-style access used across icli (`index[conId]`, `conId in index`,
+    `index.get(conId)`) for contract ids."""
+
+    disk: diskcache.Cache = field(
+        default_factory=lambda: diskcache.Cache("./cache-contracts")
+    )
+
+    byId: dict[int, Contract] = field(default_factory=dict)
+    aliases: dict[Hashable, int] = field(default_factory=dict)
+
+    def _load(self, key: Hashable) -> Any:
+        try:
+            return self.disk.get(key)  # type: ignore
+        except ModuleNotFoundError:
+            # the pickled contract is from another library we don't have loaded in this environment anymore,
+            # so we need to drop the existing bad pickle and re-save it
+            try:
+                del self.disk[key]
+            except:
+                pass
+
+        return None
+
+    def get(self, conId: int, default: Any = None) -> Contract | Any:
+        if (found := self.byId.get(conId)) is not None:
+            return found
+
+        found = self._load(conId)
+        if isinstance(found, Contract) and found.conId:
+            self.byId[conId] = found
+            return found
+
+        return default
+
+    def __getitem__(self, conId: int) -> Contract:
+        if (found := self.get(conId)) is None:
+            raise KeyError(conId)
+
+        return found
+
+    def __contains__(self, conId: int) -> bool:
+        return self.get(conId) is not None
+
+    def lookup(self, key: Hashable) -> Contract | None:
+        """Return contract by contract id or by any alias key it was stored under."""
+        if isinstance(key, int):
+            return self.get(key)
+
+        if (conId := self.aliases.get(key)) is not None:
+            return self.get(conId)
+
+        found = self._load(key)
+
+        # previous cache versions stored full contracts under alias keys too
+        if isinstance(found, Contract):
+            if found.conId:
+                self.store(found, key)
+                return found
+
+            return None
+
+        if isinstance(found, int):
+            self.aliases[key] = found
+            return self.get(found)
+
+        return None
+
+    def find(self, contract: Contract) -> Contract | None:
+        """Return cached qualified contract for a (possibly unqualified) contract."""
+        return self.lookup(requestKey(contract))
+
+    def store(self, contract: Contract, *aliases: Hashable) -> None:
+        """Save qualified contract by id plus any extra alias keys."""
+        conId = contract.conId
+        assert conId, f"Only qualified contracts can be indexed: {contract}"
+
+        expire = expirationFor(contract)
+
+        self.byId[conId] = contract
+        self.disk.set(conId, contract, expire=expire)  # type: ignore
+
+        # also cache the same thing by the most well defined symbol we have
+        for alias in (*aliases, (contract.localSymbol, contract.symbol)):
+            if alias is None or alias == conId:
+                continue
+
+            self.aliases[alias] = conId
+            self.disk.set(alias, conId, expire=expire)  # type: ignore
+
+
+@dataclass
+class QualifyQueue:
+    """Batch and coalesce qualifyContractsAsync() requests."""
+
+    ib: IB
+    pacer: RequestPacer
+
+    # max contracts per qualifyContractsAsync() call
+    batchSize: int = 50
+
+    # how long to wait collecting requests before sending a batch
+    window: float = 0.005
+
+    # per-batch timeout; timed out contracts are retried once with 'retryTimeout'
+    timeout: float = 5
+    retryTimeout: float = 15
+
+    # request key -> futures of every caller waiting on it (the first one submitted the contract)
+    pending: dict[Hashable, list[asyncio.Future]] = field(default_factory=dict)
+    queue: list[tuple[Hashable, Contract]] = field(default_factory=list)
+    task: asyncio.Task | None = None
+
+    def submit(self, contract: Contract) -> asyncio.Future:
+        """Return future resolving to the qualified contract (or the input contract if qualification failed)."""
+        key = requestKey(contract)
+        fut = asyncio.get_running_loop().create_future()
+
+        # coalesce: if the same contract is already waiting, wait for its result
+        if (waiting := self.pending.get(key)) is not None:
+            waiting.append(fut)
+            return fut
+
+        self.pending[key] = [fut]
+        self.queue.append((key, contract))
+
+        if not self.task or self.task.done():
+            self.task = asyncio.create_task(self.drain())
+
+        return fut
+
+    async def qualifyBatch(self, contracts: list[Contract], timeout: float) -> bool:
+        # every contract in the batch is its own contract details request
+        await self.pacer.wait("details", len(contracts))
+
+        try:
+            # contracts are qualified in-place, so we read results from the inputs directly
+            await asyncio.wait_for(
+                self.ib.qualifyContractsAsync(*contracts), timeout=timeout
+            )
+            return True
+        except Exception as e:
+            logger.error(
+                "Timeout while trying to qualify {} contracts (sometimes IBKR is slow or the API is offline during nightly restarts) :: {}",
+                len(contracts),
+                str(e),
+            )
+
+        return False
+
+    def resolve(self, key: Hashable, contract: Contract) -> None:
+        # callers may modify their contract, so coalesced callers get copies
+        for i, fut in enumerate(self.pending.pop(key, [])):
+            if not fut.done():
+                fut.set_result(contract if i == 0 else copy.deepcopy(contract))
+
+    def fail(self, keys: list[Hashable], error: BaseException) -> None:
+        for key in keys:
+            for fut in self.pending.pop(key, []):
+                if fut.done():
+                    continue
+
+                if isinstance(error, asyncio.CancelledError):
+                    fut.cancel()
+                else:
+                    fut.set_exception(error)
+
+    async def drain(self) -> None:
+        batch: list[tuple[Hashable, Contract]] = []
+        try:
+            await asyncio.sleep(self.window)
+
+            while self.queue:
+                batch = self.queue[: self.batchSize]
+                del self.queue[: self.batchSize]
+
+                contracts = [c for _, c in batch]
+                if not await self.qualifyBatch(contracts, self.timeout):
+                    retry = [c for c in contracts if not c.conId]
+                    if retry and not await self.qualifyBatch(retry, self.retryTimeout):
+                        logger.error(
+                            "Failed to qualify: {}",
+                            ", ".join(
+                                sorted(contractToSymbolDescriptor(c) for c in retry)
+                            ),
+                        )
+
+                for key, contract in batch:
+                    self.resolve(key, contract)
+
+                batch = []
+        except (Exception, asyncio.CancelledError) as e:
+            # nothing else would ever resolve these, so every waiting caller gets the error
+            self.fail([key for key, _ in [*batch, *self.queue]], e)
+            self.queue.clear()
+
+            if isinstance(e, asyncio.CancelledError):
+                raise
+
+            logger.exception("Contract qualification failed")
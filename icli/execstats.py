@@ -0,0 +1,326 @@
+"""Running execution analytics.
+
+The executions report used to rebuild every aggregate from all fills of the day with a
+pandas pipeline on each call. ExecutionStats instead updates its aggregates as each
+execution (and later, its commission report) arrives: per-order VWAP, duration, and
+commission, P&L buckets per half hour (or per day for multi-day reports), per-side totals,
+and the cumulative profit, so the report only formats what it displays.
+
+Executions and commission reports are separate events, so each execution is counted once
+when first seen and its commission and realized P&L are counted once when the report
+arrives. Rows are the journal's flattened execution dicts (see icli.journal).
+"""
+
+import datetime
+import itertools
+import os
+
+from dataclasses import dataclass, field, fields
+from typing import Any, Final, Hashable
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+
+from mutil.numeric import fmtPrice
+
+# executions shown in the execution table (all aggregates still include every execution)
+ICLI_EXECUTIONS_ROWS: Final = int(os.getenv("ICLI_EXECUTIONS_ROWS", 200))
+
+EASTERN: Final = ZoneInfo("US/Eastern")
+
+EXECUTION_COLUMNS: Final = """clientId secType conId symbol conDate right strike date exchange tradingClass localSymbol time orderId
+     side shares cumQty price total realizedPNL RPNL_each commission c_each c_pct c_pct_RPNL dayProfit""".split()
+
+
+def ratio(a: float, b: float) -> float:
+    return a / b if b else float("nan")
+
+
+@dataclass(slots=True)
+class ExecutionRow:
+    row: dict[str, Any]
+    when: datetime.datetime
+    total: float
+
+    commissioned: bool = False
+
+    # cumulative realized P&L once this execution's commission report was counted
+    dayProfit: float = float("nan")
+
+
+@dataclass(slots=True)
+class OrderStats:
+    orderId: int
+    side: str
+    localSymbol: str
+    start: datetime.datetime
+    finish: datetime.datetime
+    shares: float = 0
+    notional: float = 0
+    total: float = 0
+    commission: float = 0
+
+    @property
+    def vwap(self) -> float:
+        return ratio(self.notional, self.shares)
+
+
+@dataclass(slots=True)
+class BucketStats:
+    realizedPNL: float = 0
+    executions: int = 0
+    orders: set[Hashable] = field(default_factory=set)
+    profit: int = 0
+    loss: int = 0
+    opening: set[Hashable] = field(default_factory=set)
+    closing: set[Hashable] = field(default_factory=set)
+
+
+@dataclass(slots=True)
+class SideTotals:
+    executions: int = 0
+    shares: float = 0
+    price: float = 0
+    total: float = 0
+    commission: float = 0
+
+    # executions with commission reports (for the mean commission per share)
+    commissioned: int = 0
+    cEach: float = 0
+
+    def add(self, other: "SideTotals") -> "SideTotals":
+        return SideTotals(
+            *(getattr(self, f.name) + getattr(other, f.name) for f in fields(self))
+        )
+
+
+@dataclass
+class ExecutionStats:
+    # bucket P&L by day instead of by half hour
+    daily: bool = False
+
+    # session start (epoch) these stats cover, if they are the live session stats
+    start: float | None = None
+
+    executions: dict[str, ExecutionRow] = field(default_factory=dict)
+    orders: dict[Hashable, OrderStats] = field(default_factory=dict)
+    buckets: dict[Any, BucketStats] = field(default_factory=dict)
+    sides: dict[str, SideTotals] = field(
+        default_factory=lambda: dict(BOT=SideTotals(), SLD=SideTotals())
+    )
+
+    dayProfit: float = 0
+
+    def __len__(self) -> int:
+        return len(self.executions)
+
+    def bucket(self, when: datetime.datetime) -> BucketStats:
+        key = (
+            when.date()
+            if self.daily
+            else when.replace(minute=when.minute // 30 * 30, second=0, microsecond=0)
+        )
+
+        if (found := self.buckets.get(key)) is None:
+            found = self.buckets[key] = BucketStats()
+
+        return found
+
+    def add(self, row: dict[str, Any]) -> None:
+        """Count a journal row (an execution, or an execution updated with its commission)."""
+        execId = row["execId"]
+        if (found := self.executions.get(execId)) is None:
+            found = self.execution(row)
+
+        if not found.commissioned and row["commission"] is not None:
+            self.commission(found, row)
+
+    def execution(self, row: dict[str, Any]) -> ExecutionRow:
+        when = row["time"].astimezone(EASTERN)
+        multiplier = float(row["multiplier"] or 1)
+        shares = row["shares"]
+        total = round(shares * row["avgPrice"], 2) * multiplier
+
+        found = self.executions[row["execId"]] = ExecutionRow(dict(row), when, total)
+
+        key = (row["permId"] or row["orderId"], row["side"], row["localSymbol"])
+        if (order := self.orders.get(key)) is None:
+            order = self.orders[key] = OrderStats(
+                row["orderId"], row["side"], row["localSymbol"], when, when
+            )
+
+        order.start = min(order.start, when)
+        order.finish = max(order.finish, when)
+        order.shares += shares
+        order.notional += shares * row["price"]
+        order.total += total
+
+        bucket = self.bucket(when)
+        bucket.executions += 1
+        bucket.orders.add(key)
+
+        side = self.sides.setdefault(row["side"], SideTotals())
+        side.executions += 1
+        side.shares += shares
+        side.price += row["price"]
+        side.total += total
+
+        return found
+
+    def commission(self, found: ExecutionRow, row: dict[str, Any]) -> None:
+        found.commissioned = True
+        for column in ("commission", "currency", "realizedPNL"):
+            found.row[column] = row[column]
+
+        commission = row["commission"]
+        pnl = row["realizedPNL"]
+        r = found.row
+
+        key = (r["permId"] or r["orderId"], r["side"], r["localSymbol"])
+        self.orders[key].commission += commission
+
+        side = self.sides[r["side"]]
+        side.commission += commission
+        side.commissioned += 1
+        side.cEach += ratio(commission, r["shares"])
+
+        # Note: 'realizedPNL' for the closing transactions *already* includes commissions for both the buy and sell executions,
+        #       so *don't* subtract commissions again anywhere.
+        self.dayProfit += pnl
+        found.dayProfit = self.dayProfit
+
+        # using "PNL == 0" to determine an opening execution should work _most_ of the time, but if you
+        # somehow get exactly a $0.00 PNL on a close, it will be counted incorrectly here.
+        bucket = self.bucket(found.when)
+        bucket.realizedPNL += pnl
+        if pnl > 0:
+            bucket.profit += 1
+        elif pnl < 0:
+            bucket.loss += 1
+
+        (bucket.opening if pnl == 0 else bucket.closing).add(key)
+
+    def executionFrame(self, limit: int = ICLI_EXECUTIONS_ROWS) -> pd.DataFrame:
+        """Newest 'limit' executions (oldest first) plus summary rows, formatted for display."""
+        # executions are added in time order (journal rows are sorted, live fills arrive in order)
+        rows = list(itertools.islice(reversed(self.executions.values()), limit))
+        rows.reverse()
+
+        def fmt(n: float | None) -> str:
+            return "" if n is None or n != n else fmtPrice(n)
+
+        shown = {}
+        for e in rows:
+            r = e.row
+            commission = r["commission"] if e.commissioned else None
+            pnl = r["realizedPNL"] if e.commissioned else None
+
+            # provide a weak calculation of commission as percentage of PNL and of traded value.
+            # Note: we estimate the entry commission by just doubling the exit commission (which isn't 100% accurate, but
+            #       if the opening trade is outside the requested date range (or before the journal started), we don't have
+            #       the opening matching executions to read the commission from)
+            shown[r["execId"]] = dict(
+                clientId=f"{r['clientId']}" if r["clientId"] else "",
+                secType=r["secType"],
+                conId=r["conId"],
+                symbol=r["symbol"],
+                conDate=r["lastTradeDateOrContractMonth"],
+                right=r["right"],
+                strike=r["strike"] or "",
+                date=e.when.strftime("%Y-%m-%d"),
+                exchange=r["exchange"],
+                tradingClass=r["tradingClass"],
+                localSymbol=r["localSymbol"],
+                time=e.when.strftime("%H:%M:%S"),
+                orderId=f"{r['orderId']}" if r["orderId"] else "",
+                side=r["side"],
+                shares=fmt(r["shares"]),
+                cumQty=r["cumQty"],
+                price=fmt(r["price"]),
+                total=fmt(e.total),
+                realizedPNL=fmt(pnl),
+                RPNL_each=fmt(None if pnl is None else ratio(pnl, r["shares"])),
+                commission=fmt(commission),
+                c_each=fmt(
+                    None if commission is None else ratio(commission, r["shares"])
+                ),
+                c_pct=fmt(
+                    None
+                    if commission is None
+                    else ratio(commission, e.total + commission)
+                ),
+                c_pct_RPNL=fmt(
+                    None
+                    if commission is None
+                    else ratio(commission * 2, pnl + commission * 2)
+                ),
+                dayProfit=fmt(e.dayProfit),
+            )
+
+        buy = self.sides.get("BOT", SideTotals())
+        sell = self.sides.get("SLD", SideTotals())
+        both = buy.add(sell)
+
+        for name, totals in (("sum", both), ("sum-buy", buy), ("sum-sell", sell)):
+            shown[name] = dict(
+                shares=fmt(totals.shares),
+                price=fmt(totals.price),
+                commission=fmt(totals.commission),
+                total=fmt(totals.total),
+            )
+
+        shown["profit"] = dict(
+            price=fmt(sell.price - buy.price), total=fmt(sell.total - buy.total)
+        )
+
+        shown["mean"] = dict(
+            c_each=fmt(ratio(both.cEach, both.commissioned)),
+            shares=fmt(ratio(both.shares, both.executions)),
+            price=fmt(ratio(both.price, both.executions)),
+        )
+
+        return pd.DataFrame.from_dict(
+            shown, orient="index", columns=EXECUTION_COLUMNS
+        ).fillna("")
+
+    def bucketFrame(self) -> pd.DataFrame:
+        rows = {}
+        profit = 0.0
+        for key in sorted(self.buckets):
+            b = self.buckets[key]
+            profit += b.realizedPNL
+            rows[key] = dict(
+                realizedPNL=fmtPrice(b.realizedPNL),
+                orders=len(b.orders),
+                executions=b.executions,
+                profit=b.profit,
+                loss=b.loss,
+                opening=len(b.opening),
+                closing=len(b.closing),
+                dayProfit=fmtPrice(profit),
+            )
+
+        return pd.DataFrame.from_dict(rows, orient="index")
+
+    def orderFrame(self) -> pd.DataFrame:
+        rows = []
+        for o in sorted(self.orders.values(), key=lambda o: o.start):
+            rows.append(
+                dict(
+                    date=o.start.strftime("%Y-%m-%d"),
+                    start=o.start.strftime("%H:%M:%S"),
+                    finish=o.finish.strftime("%H:%M:%S"),
+                    orderId=o.orderId,
+                    side=o.side,
+                    localSymbol=o.localSymbol,
+                    vwap=fmtPrice(o.vwap),
+                    shares=fmtPrice(o.shares),
+                    total=fmtPrice(o.total),
+                    commission=fmtPrice(o.commission),
+                    c_each=fmtPrice(ratio(o.commission, o.shares)),
+                    duration=(o.finish - o.start).seconds,
+                    c_pct=fmtPrice(ratio(o.commission, o.total + o.commission)),
+                )
+            )
+
+        return pd.DataFrame(rows)
@@ -0,0 +1,408 @@
+"""Local option greeks and implied volatility.
+
+IBKR model greeks arrive seconds after an option quote starts (and are often missing
+after hours), so every subscribed option is also priced locally from its own quote and
+its underlying's quote in the QuoteStore.
+
+Stock and index options use Black-Scholes, futures options use Black-76 (both as the
+generalized Black-Scholes model with cost of carry 'b' of the risk free rate or zero).
+Implied volatility is solved for every option at once with a bracketed Newton iteration,
+and only options whose price or underlying price changed (or whose values are older than
+ICLI_GREEKS_REFRESH so theta keeps moving) are recomputed on each refresh.
+
+Results are per quote slot and use IBKR's units: theta per day, vega per volatility point.
+"""
+
+import datetime
+import math
+import os
+import time
+
+from dataclasses import dataclass, field
+from typing import Final, Hashable
+
+import numpy as np
+import pendulum
+
+from ib_async import Contract, Future, FuturesOption, Option, OptionComputation
+
+from icli.quotestore import QuoteStore
+
+# annual risk free rate used for discounting and stock/index option carry
+ICLI_RISK_FREE_RATE: Final = float(os.getenv("ICLI_RISK_FREE_RATE", 0.045))
+
+# recompute unchanged options after this many seconds so time decay stays current
+ICLI_GREEKS_REFRESH: Final = float(os.getenv("ICLI_GREEKS_REFRESH", 30))
+
+SECONDS_PER_YEAR: Final = 365 * 86400
+
+# implied volatility search bounds
+IV_LOW: Final = 0.001
+IV_HIGH: Final = 10.0
+
+# options this close to expiration are priced as if they had this much time left
+MIN_EXPIRY_SECONDS: Final = 60
+
+GREEK_COLUMNS: Final = ("iv", "delta", "gamma", "theta", "vega", "und", "price")
+
+# per-option inputs which don't change while the option is subscribed
+PARAM_COLUMNS: Final = ("strike", "expires", "right", "carry", "fallback")
+
+SQRT_2PI: Final = math.sqrt(2 * math.pi)
+
+
+def npdf(x: np.ndarray) -> np.ndarray:
+    return np.exp(-0.5 * x * x) / SQRT_2PI
+
+
+def ncdf(x: np.ndarray) -> np.ndarray:
+    """Standard normal CDF (Abramowitz and Stegun 26.2.17, absolute error < 7.5e-8)."""
+    ax = np.abs(x)
+    t = 1 / (1 + 0.2316419 * ax)
+    poly = t * (
+        0.319381530
+        + t * (-0.356563782 + t * (1.781477937 + t * (-1.821255978 + t * 1.330274429)))
+    )
+    upper = 1 - npdf(ax) * poly
+    return np.where(x >= 0, upper, 1 - upper)
+
+
+def blackScholes(
+    und: np.ndarray,
+    strike: np.ndarray,
+    years: np.ndarray,
+    sigma: np.ndarray,
+    rate: float,
+    carry: np.ndarray,
+    right: np.ndarray,
+) -> tuple[np.ndarray, ...]:
+    """Return (price, delta, gamma, theta, vega) for generalized Black-Scholes.
+
+    'carry' is the cost of carry (the rate for stocks/indexes, zero for futures) and
+    'right' is 1 for calls and -1 for puts. Theta is per year and vega per 1.00 volatility."""
+    sqrtT = np.sqrt(years)
+    vsqrt = sigma * sqrtT
+    d1 = (np.log(und / strike) + (carry + 0.5 * sigma * sigma) * years) / vsqrt
+    d2 = d1 - vsqrt
+
+    growth = np.exp((carry - rate) * years)
+    discount = np.exp(-rate * years)
+
+    nd1 = ncdf(right * d1)
+    nd2 = ncdf(right * d2)
+    pd1 = npdf(d1)
+
+    price = right * (und * growth * nd1 - strike * discount * nd2)
+    delta = right * growth * nd1
+    gamma = growth * pd1 / (und * vsqrt)
+    vega = und * growth * pd1 * sqrtT
+    theta = (
+        -und * growth * pd1 * sigma / (2 * sqrtT)
+        - right * (carry - rate) * und * growth * nd1
+        - right * rate * strike * discount * nd2
+    )
+
+    return price, delta, gamma, theta, vega
+
+
+def impliedVol(
+    target: np.ndarray,
+    und: np.ndarray,
+    strike: np.ndarray,
+    years: np.ndarray,
+    rate: float,
+    carry: np.ndarray,
+    right: np.ndarray,
+    iterations: int = 40,
+    tolerance: float = 1e-6,
+) -> np.ndarray:
+    """Solve implied volatility for every row at once (NaN where the price has no solution
+    between IV_LOW and IV_HIGH, or didn't converge within 'iterations')."""
+    growth = np.exp((carry - rate) * years)
+    discount = np.exp(-rate * years)
+
+    # prices outside the no-arbitrage bounds have no volatility
+    lower = np.maximum(right * (und * growth - strike * discount), 0)
+    upper = np.where(right > 0, und * growth, strike * discount)
+    valid = (target > lower) & (target < upper)
+
+    # prices needing a volatility outside [IV_LOW, IV_HIGH] would never converge
+    for bound, side in ((IV_LOW, 1), (IV_HIGH, -1)):
+        price, *_ = blackScholes(
+            und, strike, years, np.full_like(target, bound), rate, carry, right
+        )
+        valid &= side * (target - price) >= -tolerance
+
+    lo = np.full_like(target, IV_LOW)
+    hi = np.full_like(target, IV_HIGH)
+
+    # Brenner-Subrahmanyam at-the-money estimate as the starting point
+    sigma = np.clip(np.sqrt(2 * np.pi / years) * target / und, IV_LOW, IV_HIGH)
+
+    for _ in range(iterations):
+        price, _delta, _gamma, _theta, vega = blackScholes(
+            und, strike, years, sigma, rate, carry, right
+        )
+        diff = price - target
+        solved = np.abs(diff) <= tolerance
+
+        if not np.any(valid & ~solved):
+            break
+
+        hi = np.where(diff > 0, sigma, hi)
+        lo = np.where(diff < 0, sigma, lo)
+
+        # newton step if it stays inside the bracket, else bisect
+        step = sigma - diff / np.where(vega > 1e-12, vega, np.nan)
+        sigma = np.where((step > lo) & (step < hi), step, (lo + hi) / 2)
+    else:
+        price, *_ = blackScholes(und, strike, years, sigma, rate, carry, right)
+        solved = np.abs(price - target) <= tolerance
+
+    return np.where(valid & solved, sigma, np.nan)
+
+
+def expirationTimestamp(contract: Contract) -> float:
+    """Epoch seconds of option expiration (the 16:00 ET close of its last trading day)."""
+    date = datetime.datetime.strptime(
+        contract.lastTradeDateOrContractMonth[:8], "%Y%m%d"
+    )
+    return pendulum.datetime(
+        date.year, date.month, date.day, 16, tz="US/Eastern"
+    ).timestamp()
+
+
+@dataclass
+class GreeksEngine:
+    store: QuoteStore
+
+    rate: float = ICLI_RISK_FREE_RATE
+    refreshAfter: float = ICLI_GREEKS_REFRESH
+
+    # slot -> option contract being priced
+    options: dict[int, Contract] = field(default_factory=dict)
+
+    # option slot -> underlying quote slot (only for underlyings we are quoting)
+    underlyings: dict[int, int] = field(default_factory=dict)
+
+    # futures symbol -> {last trade date: quote key} (futures option underlyings)
+    futures: dict[str, dict[str, Hashable]] = field(default_factory=dict)
+
+    # sorted option slots (rebuilt when options are added or removed)
+    optionSlots: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+
+    strike: np.ndarray = field(init=False)
+
+    # epoch seconds of expiration
+    expires: np.ndarray = field(init=False)
+
+    # 1 for calls, -1 for puts
+    right: np.ndarray = field(init=False)
+
+    # 1 if the cost of carry is the risk free rate (Black-Scholes), 0 for futures (Black-76)
+    carry: np.ndarray = field(init=False)
+
+    # IBKR's model underlying price, used when the underlying itself isn't quoted
+    fallback: np.ndarray = field(init=False)
+
+    iv: np.ndarray = field(init=False)
+    delta: np.ndarray = field(init=False)
+    gamma: np.ndarray = field(init=False)
+    theta: np.ndarray = field(init=False)
+    vega: np.ndarray = field(init=False)
+
+    # underlying price and option price used for the current values
+    und: np.ndarray = field(init=False)
+    price: np.ndarray = field(init=False)
+
+    # monotonic time the current values were computed
+    computed: np.ndarray = field(init=False)
+
+    # quotes were added or removed, so options without an underlying should look again
+    resolve: bool = False
+
+    recomputed: int = 0
+
+    def __post_init__(self) -> None:
+        for col in GREEK_COLUMNS + PARAM_COLUMNS:
+            setattr(self, col, np.full(self.store.capacity, np.nan))
+
+        self.computed = np.zeros(self.store.capacity)
+
+    def fit(self) -> None:
+        """Grow arrays to match the quote store after it grows."""
+        size = len(self.computed)
+        if size >= self.store.capacity:
+            return
+
+        more = self.store.capacity - size
+        for col in GREEK_COLUMNS + PARAM_COLUMNS:
+            setattr(
+                self, col, np.concatenate((getattr(self, col), np.full(more, np.nan)))
+            )
+
+        self.computed = np.concatenate((self.computed, np.zeros(more)))
+
+    def add(self, contract: Contract) -> None:
+        """Start pricing 'contract' if it's an option (futures are remembered as option underlyings)."""
+        self.resolve = True
+
+        if isinstance(contract, Future):
+            if (slot := self.store.slotForContract(contract)) is None:
+                return
+
+            key = self.store.names[slot]
+            self.futures.setdefault(contract.symbol, {})[
+                contract.lastTradeDateOrContractMonth
+            ] = key
+            return
+
+        if not isinstance(contract, (Option, FuturesOption)):
+            return
+
+        if (slot := self.store.slotForContract(contract)) is None:
+            return
+
+        self.fit()
+        self.options[slot] = contract
+        self.strike[slot] = contract.strike
+        self.expires[slot] = expirationTimestamp(contract)
+        self.right[slot] = 1 if contract.right.startswith("C") else -1
+        self.carry[slot] = 0 if isinstance(contract, FuturesOption) else 1
+        self.computed[slot] = 0
+
+        self.optionSlots = np.array(sorted(self.options), dtype=np.int64)
+
+    def remove(self, key: Hashable) -> None:
+        """Stop pricing quote 'key' (must run before the quote store releases the slot)."""
+        if (slot := self.store.slot(key)) is None:
+            return
+
+        self.resolve = True
+
+        for dates in self.futures.values():
+            for date, found in list(dates.items()):
+                if found == key:
+                    del dates[date]
+
+        # anything priced from this quote has to find its underlying again
+        for option, underlying in list(self.underlyings.items()):
+            if underlying == slot:
+                del self.underlyings[option]
+
+        if self.options.pop(slot, None) is None:
+            return
+
+        self.underlyings.pop(slot, None)
+        for col in GREEK_COLUMNS + PARAM_COLUMNS:
+            getattr(self, col)[slot] = np.nan
+
+        self.optionSlots = np.array(sorted(self.options), dtype=np.int64)
+
+    def underlyingSlot(self, contract: Contract) -> int | None:
+        if isinstance(contract, FuturesOption):
+            # futures options settle into the nearest future expiring on or after the option
+            expiration = contract.lastTradeDateOrContractMonth
+            for date, key in sorted(self.futures.get(contract.symbol, {}).items()):
+                if date >= expiration:
+                    return self.store.slot(key)
+
+            return None
+
+        # stock and index option underlyings are quoted by symbol (SPXW options have symbol SPX)
+        return self.store.slot(contract.symbol)
+
+    def setFallback(self, slot: int, undPrice: float | None) -> None:
+        if undPrice and slot in self.options:
+            self.fallback[slot] = undPrice
+
+    def refresh(self, now: float | None = None) -> int:
+        """Recompute greeks for options with changed inputs; returns how many were recomputed."""
+        slots = self.optionSlots
+        if not len(slots):
+            return 0
+
+        mono = time.monotonic()
+        now = now or time.time()
+        store = self.store
+
+        if self.resolve:
+            self.resolve = False
+            for slot, contract in self.options.items():
+                if slot not in self.underlyings:
+                    if (found := self.underlyingSlot(contract)) is not None:
+                        self.underlyings[slot] = found
+
+        def marks(idx: np.ndarray) -> np.ndarray:
+            bid = store.bid[idx]
+            ask = store.ask[idx]
+            return np.where((bid > 0) & (ask > 0), store.mid[idx], store.last[idx])
+
+        price = marks(slots)
+
+        und = self.fallback[slots].copy()
+        if self.underlyings:
+            quoted = np.array([self.underlyings.get(s, -1) for s in slots])
+            has = quoted >= 0
+            if np.any(has):
+                fromQuote = marks(quoted[has])
+                und[has] = np.where(fromQuote > 0, fromQuote, und[has])
+
+        changed = (
+            (price > 0)
+            & (und > 0)
+            & (
+                (price != self.price[slots])
+                | (und != self.und[slots])
+                | (mono - self.computed[slots] >= self.refreshAfter)
+            )
+        )
+
+        if not np.any(changed):
+            return 0
+
+        todo = slots[changed]
+        price = price[changed]
+        und = und[changed]
+        strike = self.strike[todo]
+        right = self.right[todo]
+        carry = self.carry[todo] * self.rate
+        years = (
+            np.maximum(self.expires[todo] - now, MIN_EXPIRY_SECONDS) / SECONDS_PER_YEAR
+        )
+
+        with np.errstate(all="ignore"):
+            iv = impliedVol(price, und, strike, years, self.rate, carry, right)
+            _, delta, gamma, theta, vega = blackScholes(
+                und, strike, years, iv, self.rate, carry, right
+            )
+
+        self.iv[todo] = iv
+        self.delta[todo] = delta
+        self.gamma[todo] = gamma
+        self.theta[todo] = theta / 365
+        self.vega[todo] = vega / 100
+        self.und[todo] = und
+        self.price[todo] = price
+        self.computed[todo] = mono
+
+        self.recomputed += len(todo)
+        return len(todo)
+
+    def model(self, key: Hashable) -> OptionComputation | None:
+        """Return local greeks for quote 'key' shaped like IBKR's modelGreeks (None if not computed)."""
+        slot = self.store.slot(key)
+        if slot is None or slot not in self.options or not self.iv[slot] > 0:
+            return None
+
+        return OptionComputation(
+            tickAttrib=0,
+            impliedVol=float(self.iv[slot]),
+            delta=float(self.delta[slot]),
+            optPrice=float(self.price[slot]),
+            pvDividend=0,
+            gamma=float(self.gamma[slot]),
+            vega=float(self.vega[slot]),
+            theta=float(self.theta[slot]),
+            undPrice=float(self.und[slot]),
+        )
@@ -0,0 +1,80 @@
+"""Tick-driven indicators (EMAs and ATR) for every live quote.
+
+Indicators are updated from tickersUpdate using quote timestamps, so values depend only
+on the quotes received (not on how often the toolbar redraws) and keep advancing while
+the prompt is busy. The toolbar, calculator, and strategies all read from here.
+"""
+
+import math
+
+from dataclasses import dataclass, field
+from typing import Final, Hashable, Iterable
+
+from icli.tinyalgo import ATRTime, EMATime
+
+# EMA names and their spans in seconds
+EMA_SPANS: Final = {"1m": 60, "3m": 60 * 3, "5m": 60 * 5}
+
+# ATR smoothing length and high/low window in seconds
+ATR_LENGTH: Final = 90
+ATR_WINDOW: Final = 45
+
+
+@dataclass(slots=True)
+class SymbolIndicators:
+    emas: dict[str, EMATime] = field(
+        default_factory=lambda: {name: EMATime(span) for name, span in EMA_SPANS.items()}
+    )
+    atr: ATRTime = field(default_factory=lambda: ATRTime(ATR_LENGTH, ATR_WINDOW))
+
+    def update(self, when: float, price: float) -> None:
+        for ema in self.emas.values():
+            ema.update(when, price)
+
+        self.atr.update(when, price)
+
+
+@dataclass
+class IndicatorEngine:
+    symbols: dict[Hashable, SymbolIndicators] = field(default_factory=dict)
+
+    def update(
+        self, key: Hashable, when: float, price: float, longOnly: bool = True
+    ) -> None:
+        # if no price, don't update (but allow negative prices if this is a credit quote)
+        if (not price) or (price != price) or (longOnly and price < 0):
+            # We had some invalid price data here, so reset everything (if not already reset)
+            self.symbols.pop(key, None)
+            return
+
+        # a missing quote timestamp would poison the time-weighted state (EMATime and
+        # ATRTime never recover from a NaN 'when'), so skip the tick but keep the history
+        if not math.isfinite(when):
+            return
+
+        if (found := self.symbols.get(key)) is None:
+            found = self.symbols[key] = SymbolIndicators()
+
+        found.update(when, price)
+
+    def updateBatch(self, rows: Iterable[tuple[Hashable, float, float, bool]]) -> None:
+        """Update from (key, when, price, longOnly) rows collected during one ticker event."""
+        update = self.update
+        for key, when, price, longOnly in rows:
+            update(key, when, price, longOnly)
+
+    def remove(self, key: Hashable) -> None:
+        self.symbols.pop(key, None)
+
+    def ema(self, key: Hashable, name: str, roundto: int = 2) -> float:
+        # Round our results here so we don't need to excessively format all the prints.
+        if found := self.symbols.get(key):
+            return round(found.emas[name].current, roundto)
+
+        return 0
+
+    def atr(self, key: Hashable) -> float | None:
+        if found := self.symbols.get(key):
+            return found.atr.current
+
+        return None
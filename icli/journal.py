@@ -0,0 +1,243 @@
+"""Persistent execution journal.
+
+The gateway only reports executions for the current day (and only live executions for
+the current client), so every execution and commission report we see is written to a
+local SQLite journal as it arrives. Rows are keyed by execId, so replays from history
+refreshes and repeated commission reports never duplicate anything, and multi-day
+reports read straight from the journal instead of asking the gateway again.
+
+The journal also remembers when history was last fully synced from the gateway, so a
+refresh only requests executions since then (minus a small overlap) instead of the
+entire day for every client.
+
+The database (ICLI_JOURNAL) is only opened on first use, so creating an app (replays,
+benchmarks, tests) never creates a journal file as a side effect.
+"""
+
+import datetime
+import os
+import pathlib
+import sqlite3
+import time
+
+from dataclasses import dataclass, field
+from typing import Any, Final, Iterable
+
+import pendulum
+
+from ib_async import Fill
+
+from loguru import logger
+
+ICLI_JOURNAL: Final = str(os.getenv("ICLI_JOURNAL", "./executions.sqlite"))
+
+# re-request this many seconds before the last sync in case executions arrived out of order
+SYNC_OVERLAP: Final = 120.0
+
+# column name -> (source object on Fill, attribute) in table order
+JOURNAL_COLUMNS: Final = dict(
+    execId=("execution", "execId"),
+    time=("", "time"),
+    clientId=("execution", "clientId"),
+    orderId=("execution", "orderId"),
+    permId=("execution", "permId"),
+    acctNumber=("execution", "acctNumber"),
+    orderRef=("execution", "orderRef"),
+    conId=("contract", "conId"),
+    secType=("contract", "secType"),
+    symbol=("contract", "symbol"),
+    localSymbol=("contract", "localSymbol"),
+    tradingClass=("contract", "tradingClass"),
+    lastTradeDateOrContractMonth=("contract", "lastTradeDateOrContractMonth"),
+    right=("contract", "right"),
+    strike=("contract", "strike"),
+    multiplier=("contract", "multiplier"),
+    exchange=("execution", "exchange"),
+    side=("execution", "side"),
+    shares=("execution", "shares"),
+    cumQty=("execution", "cumQty"),
+    price=("execution", "price"),
+    avgPrice=("execution", "avgPrice"),
+    lastLiquidity=("execution", "lastLiquidity"),
+    commission=("commissionReport", "commission"),
+    currency=("commissionReport", "currency"),
+    realizedPNL=("commissionReport", "realizedPNL"),
+)
+
+# values only known once the commission report arrives (IBKR sends them after the execution)
+COMMISSION_COLUMNS: Final = ("commission", "currency", "realizedPNL")
+
+COLUMN_NAMES: Final = ", ".join(f'"{c}"' for c in JOURNAL_COLUMNS)
+
+SCHEMA: Final = f"""
+CREATE TABLE IF NOT EXISTS executions ({COLUMN_NAMES}, PRIMARY KEY ("execId"));
+CREATE INDEX IF NOT EXISTS executions_time ON executions (time);
+CREATE INDEX IF NOT EXISTS executions_symbol ON executions (symbol, time);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value);
+"""
+
+
+def fillRow(fill: Fill) -> tuple:
+    row: list[Any] = []
+    for column, (source, attr) in JOURNAL_COLUMNS.items():
+        value = getattr(getattr(fill, source) if source else fill, attr)
+        if column == "time":
+            value = value.timestamp()
+        elif column in COMMISSION_COLUMNS and not fill.commissionReport.execId:
+            # no commission report yet (empty reports have a zero commission, not a missing one)
+            value = None
+
+        row.append(value)
+
+    return tuple(row)
+
+
+def fillDict(fill: Fill) -> dict[str, Any]:
+    """Return a fill as a journal row (like rows from ExecutionJournal.fills())."""
+    row = dict(zip(JOURNAL_COLUMNS, fillRow(fill)))
+    row["time"] = fill.time
+    return row
+
+
+def sessionStart() -> float:
+    """Epoch time the current trading session date started (exchange time)."""
+    return pendulum.now("US/Eastern").start_of("day").timestamp()
+
+
+def filterTime(since: float) -> str:
+    """Format an epoch time for ExecutionFilter(time=...) (UTC, like execution times)."""
+    return time.strftime("%Y%m%d-%H:%M:%S", time.gmtime(since))
+
+
+@dataclass
+class ExecutionJournal:
+    path: pathlib.Path = field(default_factory=lambda: pathlib.Path(ICLI_JOURNAL))
+
+    # opened on first use
+    connection: sqlite3.Connection | None = field(default=None, init=False)
+
+    # executions in the current session (for the toolbar, updated only when recording)
+    today: int = 0
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self.connection is None:
+            logger.info("[journal] Opening {}", self.path)
+            self.connection = sqlite3.connect(self.path)
+            self.connection.row_factory = sqlite3.Row
+            self.connection.executescript(SCHEMA)
+            self.counted()
+
+        return self.connection
+
+    def counted(self) -> None:
+        self.today = self.db.execute(
+            "SELECT count(*) FROM executions WHERE time >= ?", (sessionStart(),)
+        ).fetchone()[0]
+
+    def close(self) -> None:
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def record(self, fills: Iterable[Fill]) -> int:
+        """Write executions (with commissions if present); returns how many were new."""
+        rows = [fillRow(f) for f in fills]
+        if not rows:
+            return 0
+
+        params = ", ".join("?" * len(JOURNAL_COLUMNS))
+
+        # existing rows only gain commission values (a replayed execution has no report yet)
+        updates = ", ".join(
+            f'"{c}" = coalesce(excluded."{c}", "{c}")' for c in COMMISSION_COLUMNS
+        )
+
+        count = "SELECT count(*) FROM executions"
+        with self.db:
+            before = self.db.execute(count).fetchone()[0]
+            self.db.executemany(
+                f"INSERT INTO executions ({COLUMN_NAMES}) VALUES ({params}) "
+                f"ON CONFLICT (execId) DO UPDATE SET {updates}",
+                rows,
+            )
+            inserted = self.db.execute(count).fetchone()[0] - before
+
+        if inserted:
+            self.counted()
+
+        logger.debug("[journal] Recorded {} executions ({} new)", len(rows), inserted)
+        return inserted
+
+    def lastTime(self) -> float | None:
+        """Return epoch time of the newest journaled execution."""
+        return self.db.execute("SELECT max(time) FROM executions").fetchone()[0]
+
+    def synced(self) -> float | None:
+        """Return epoch time the last full history refresh started."""
+        found = self.db.execute(
+            "SELECT value FROM meta WHERE key = 'synced'"
+        ).fetchone()
+        return found[0] if found else None
+
+    def markSynced(self, when: float) -> None:
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('synced', ?)",
+                (when,),
+            )
+
+    def since(self) -> float | None:
+        """Return epoch time a history refresh must request executions from (None for everything)."""
+        if (synced := self.synced()) is None:
+            return None
+
+        return synced - SYNC_OVERLAP
+
+    def fills(
+        self,
+        start: datetime.datetime | float | None = None,
+        end: datetime.datetime | float | None = None,
+        symbols: Iterable[str] | None = None,
+        clientId: int | None = None,
+        orderId: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """Return journaled executions oldest first, filtered by any of the arguments.
+
+        Times are returned as timezone-aware UTC datetimes like Fill.time.
+        """
+        where = []
+        params: list[Any] = []
+
+        for op, value in ((">=", start), ("<", end)):
+            if value is not None:
+                where.append(f"time {op} ?")
+                params.append(
+                    value.timestamp() if isinstance(value, datetime.datetime) else value
+                )
+
+        if symbols:
+            symbols = list(symbols)
+            where.append(f"symbol IN ({', '.join('?' * len(symbols))})")
+            params.extend(symbols)
+
+        for column, value in (("clientId", clientId), ("orderId", orderId)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(value)
+
+        query = "SELECT * FROM executions"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+
+        query += " ORDER BY time, clientId"
+
+        found = []
+        for row in self.db.execute(query, params):
+            got = dict(row)
+            got["time"] = datetime.datetime.fromtimestamp(
+                got["time"], datetime.timezone.utc
+            )
+            found.append(got)
+
+        return found
@@ -11,8 +11,10 @@ import fnmatch
 import itertools
 import math
 import pathlib
+import re
 
 import sys
+import time
 from collections import Counter, defaultdict
 from zoneinfo import ZoneInfo
 
@@ -34,7 +36,12 @@ from mutil.timer import Timer
 import icli.cli
 from icli import awwdio
 from icli.helpers import *
-from icli.bar import OHLC5MinTracker
+from icli.bar import ORBTracker
+from icli.chains import sessionDate, strikesBetween
+from icli.strikescan import StrikeScanner
+from icli.execstats import ICLI_EXECUTIONS_ROWS, ExecutionStats
+from icli.journal import sessionStart
+from icli.latency import STAGES, sessions
 import asyncio
 
 import aiohttp
@@ -141,6 +148,7 @@ STRATSTATEMAP = dict(
     S="ORB Starting",
     O="Openrange found",
     B="Breakout and order placed, sub is running",
+    X="Exit order pending",
     A="ABORT",
 
 )
@@ -287,12 +295,10 @@ class IOpQQuote(IOp):
                 # Request quotes with metadata fields populated
                 # (note: metadata is only populated using "live" endpoints,
                 #  so we can't use the self-canceling "11 second snapshot" parameter)
-                tickers.append(
-                    self.ib.reqMktData(
-                        contract,
-                        tickFieldsForContract(contract),
-                    )
-                )
+                if (ticker := self.state.lines.subscribe(contract, "qquote")) is None:
+                    return
+
+                tickers.append(ticker)
 
             # Loop over quote results until they have all been reported
             success = False
@@ -354,14 +360,14 @@ class IOpQQuote(IOp):
                 break
 
             for contract in contracts:
-                self.ib.cancelMktData(contract)
+                self.state.lines.unsubscribeContract(contract, "qquote")
 
             # try again...
             await asyncio.sleep(0.333)
 
         # all done!
         for contract in contracts:
-            self.ib.cancelMktData(contract)
+            self.state.lines.unsubscribeContract(contract, "qquote")
 
 
 @dataclass
@@ -448,6 +454,14 @@ class IOpPositionEvict(IOp):
 
         runners = []
         for contract, qty, delayedEstimatedMarketPrice in contracts:
+            # evict always places its exit, but say so if it may double up a working exit
+            if exiting := self.state.openOrders.exiting(contract, qty):
+                logger.warning(
+                    "[{}] Evicting while working exit orders already cover {}",
+                    contract.localSymbol,
+                    exiting,
+                )
+
             # use a live midpoint market price as our initial offer
             quoteKey = lookupKey(contract)
             bid, ask = self.state.currentQuote(quoteKey)
@@ -465,12 +479,13 @@ class IOpPositionEvict(IOp):
                 # if asking for a delta eviction, check current quote...
                 quotesym = lookupKey(contract)
 
-                # check delta...
+                # check delta (local greeks exist as soon as the quote has a price, but a quote
+                # we just added needs a moment for its first prices to arrive)...
                 while not (
-                    thebigd := self.state.quoteState[quotesym].modelGreeks.delta
-                ):
-                    # takes a couple moments for the greeks feed to populate on initial quote...
-                    await asyncio.sleep(0.003)
+                    greeks := self.state.greeks.model(quotesym)
+                    or self.state.quoteState[quotesym].modelGreeks
+                ) or not (thebigd := greeks.delta):
+                    await asyncio.sleep(0.05)
 
                 # skip placing this contract order if the delta is below the user requested threshold.
                 # (i.e. equivalent to "only evict if self.delta >= abs(contract delta)")
@@ -666,6 +681,7 @@ class IOpDetails(IOp):
 
         for contract in contracts:
             try:
+                await self.state.pacer.wait("details")
                 (detail,) = await self.ib.reqContractDetailsAsync(contract)
 
                 # IBKR "rules" map one marketRuleId to one exchange by position in each list.
@@ -689,6 +705,7 @@ class IOpDetails(IOp):
                 # TODO: we should cache these lookup results forever. The underlying marketRuleId results will never change,
                 #       so running a network call for each detail attempt it wasteful.
                 rids = tuple(set(ridsAll))
+                await self.state.pacer.wait("api", len(rids))
                 rules = await asyncio.gather(
                     *[self.ib.reqMarketRuleAsync(rid) for rid in rids]
                 )
@@ -884,6 +901,7 @@ class IOpInfo(IOp):
                         "ask": ticker.askGreeks,
                         "last": ticker.lastGreeks,
                         "model": ticker.modelGreeks,
+                        "local": self.state.greeks.model(lookupKey(ticker.contract)),
                     }.items()
                     if v
                 }
@@ -1166,11 +1184,13 @@ class IOpDepth(IOp):
             logger.error("Market depth does not support spreads!")
             return
 
-        self.depthState[contract] = self.ib.reqMktDepth(
-            contract, numRows=55, isSmartDepth=useSmart
+        t = self.state.lines.subscribe(
+            contract, "depth", "depth", numRows=55, isSmartDepth=useSmart
         )
+        if t is None:
+            return
 
-        t = self.depthState[contract]
+        self.depthState[contract] = t
         i = 0
 
         # loop for up to a second until bids or asks are populated
@@ -1307,7 +1327,7 @@ class IOpDepth(IOp):
                     break
 
         # logger.info("Actual depth: {} :: {}", pp.pformat(t.domBidsDict), pp.pformat(t.domAsksDict))
-        self.ib.cancelMktDepth(contract, isSmartDepth=useSmart)
+        self.state.lines.unsubscribeContract(contract, "depth", "depth")
         del self.depthState[contract]
 
 
@@ -1414,6 +1434,7 @@ class IOpOrderModify(IOp):
                 ordr.orderType = "LMT"
 
             logger.info("Submitting order update: {} :: {}", contract, ordr)
+            await self.state.pacer.wait("orders")
             trade = self.ib.placeOrder(contract, ordr)
             logger.info("Updated: {}", pp.pformat(trade))
         except KeyboardInterrupt:
@@ -1627,114 +1648,23 @@ class IOpOrder(IOp):
 
         quoteKey = lookupKey(contract)
 
-        checkedTimes = 0
-        # while (unfilled quantity) AND (order NOT canceled or rejected or broken)
-        while (rem := trade.orderStatus.remaining) > 0 or (
-            "Pending" in trade.orderStatus.status
-        ):
-            if ("Cancel" in trade.orderStatus.status) or (
-                trade.orderStatus.status in {"Filled", "Inactive"}
-            ):
-                logger.error(
-                    "[{} :: {}] Order was canceled or rejected! Status: {}",
-                    trade.orderStatus.status,
-                    trade.contract.localSymbol,
-                    pp.pformat(trade.orderStatus),
-                )
-                return False
-
-            if rem == 0:
-                logger.warning(
-                    "Quantity Remaining is zero, but status is Pending. Waiting for final order status update..."
-                )
-                # sleep 75 ms and check again
-                await asyncio.sleep(0.075)
-                # TODO: infinite looped here? WHAT?
-                continue
-
-            logger.info("Quantity remaining: {:,.2f}", rem)
-            checkedTimes += 1
-
-            # if this is the first check after the order was placed, don't
-            # run the algo (i.e. give the original limit price a chance to work)
-            if checkedTimes == 1:
-                logger.info("Skipping adjust so original limit has a chance to fill...")
-                await asyncio.sleep(0.075)
-                continue
-
-            # get current qty/value of trade both remaining and already executed
-            # TODO: fix these names. these names are bad. "currentQty" is actually "order remaining quantity"
-            (
-                remainingAmount,  # PRICE * Q
-                totalAmount,  # PRICE * Q
-                currentPrice,  # SYMBOL PRICE
-                currentQty,  # REMAINING QUANTITY
-            ) = self.state.amountForTrade(trade)
+        # the chaser steps our price toward the far side on quote and order status updates
+        # (shared with every other chased order, so modifications stay under IBKR's rate limits)
+        chased = self.state.chaser.chase(trade, contract, quoteKey, isLong)
 
-            # re-read current quote for symbol before each update in case the price is moving rapidly against us
-            bid, ask = self.state.currentQuote(quoteKey)
-
-            if bid > 0 and ask > 0:
-                logger.info("Adjusting price for more aggressive fills...")
-
-                # TODO: restore ability for OPENING ORDERS to reduce quantity when ordering and chasing quotes, but
-                #       remember to DO NOT reduce quantity when chasing closing orders because we want to close a whole position.
-                if isLong:
-                    # if this is a BUY LONG order, we want to close the gap between our initial price guess and the actual ask.
-                    newPrice = (currentPrice + ask) / 2
-                else:
-                    # else, this is a SELL SHORT (or close long) order, so we want to start at our price and chase the bid closer.
-                    newPrice = (currentPrice + bid) / 2
-
-                if isinstance(trade.contract, (Option, FuturesOption, Future)):
-                    newPrice = comply(contract, newPrice)
-
-                # crypto and forex can round to 8 places, everything else is 2 places.
-                if isinstance(trade.contract, (Forex, Crypto)):
-                    newPrice = round(newPrice, 8)
-                else:
-                    newPrice = round(newPrice, 2)
-                    # if price DID NOT CHANGE, we still need to modify the price increment for an order update in our intended direction.
-                    # (there's no sense in updating an order price to the same value, plus IBKR outright rejects updates if the price or quantity doesn't change)
-                    if newPrice == currentPrice:
-                        currentPrice += 0.01 if isLong else -0.01
-
-                logger.info(
-                    "Price changing from {} to {} (difference {}) for spending ${:,.2f}",
-                    currentPrice,
-                    newPrice,
-                    round((newPrice - currentPrice), 4),
-                    totalAmount,
-                )
-
-                if currentPrice == newPrice:
-                    logger.error(
-                        "Not submitting order update because no price change? Order still active!"
-                    )
-                    return False
-
-                logger.info("Submitting order update to: ${:,.2f}", newPrice)
-                order.lmtPrice = newPrice
-
-                self.ib.placeOrder(contract, order)
-
-            waitDuration = 3
-            logger.info(
-                "[{} :: {}] Waiting for {} seconds to check for new executions...",
+        try:
+            filled = await asyncio.shield(chased)
+        except:
+            # catches CTRL-C while waiting
+            self.state.chaser.release(trade.order.orderId)
+            logger.warning(
+                "[{}] User canceled automated limit updates! Order still live.",
                 trade.orderStatus.orderId,
-                checkedTimes,
-                waitDuration,
             )
+            filled = True
 
-            try:
-                await asyncio.sleep(waitDuration)
-            except:
-                # catches CTRL-C during sleep
-                logger.warning(
-                    "[{}] User canceled automated limit updates! Order still live.",
-                    trade.orderStatus.orderId,
-                )
-                break
+        if not filled:
+            return False
 
         # now just print current holdings so we have a clean view of what we just transacted
         # (but schedule it for a next run so so the event loop has a chance to update holdings first)
@@ -1846,7 +1776,12 @@ class IOpOrderStraddle(IOp):
         useExp = sstrikes[useExpIdx : useExpIdx + 1 + self.expirationAway][-1]
 
         assert useExp in strikes
-        useChain = strikes[useExp]
+
+        # strikes are picked by position, so only use strikes listed for this expiration
+        useChain = await self.state.chains.strikesFor(quotesym, useExp)
+        if not useChain:
+            logger.error("[{} :: {}] No strikes listed for {}", self.symbol, quotesym, useExp)
+            return None
 
         # nearest ATM strike to the current quote
         currentStrikeIdx = find_nearest(useChain, currentPrice)
@@ -1918,11 +1853,22 @@ class IOpOrderStraddle(IOp):
         #  buy and (maybe) ANOTHER for the combined spread quote to sell, so we want to ONLY extract the BUY SPREAD quote
         #  for this straddle purchase. the spread quote is a tuple key while the leg quotes are just string keys)
         # The Bag BUY quote keys look like: ((640377328, 1, 'BUY', 'SMART', 0, 0, '', -1), (649711537, 1, 'BUY', 'SMART', 0, 0, '', -1))
-        quoteKey = next(filter(lambda x: isinstance(x, tuple) and x[0][2] == "BUY", qk))
+        quoteKey = next(
+            filter(lambda x: isinstance(x, tuple) and x[0][2] == "BUY", qk or []), None
+        )
+        legsKeys = list(filter(lambda x: not isinstance(x, tuple), qk or []))
+
+        # quotes refused a market data line aren't returned, and we can't price without every leg
+        if quoteKey is None or len(legsKeys) != len(orderReq.orders):
+            logger.error(
+                "[{} :: {}] Failed to add quotes for the spread and all its legs (market data lines full?)",
+                self.symbol,
+                spread,
+            )
+            return None
 
         # ACTUALLY, the IBKR spread quotes are VERY UNRELIABLE and often just NEVER POPULATE, so build our own spread quotes... sigh.
         spreadBuyQuote = self.state.quoteState[quoteKey]
-        legsKeys = list(filter(lambda x: not isinstance(x, tuple), qk))
 
         legsquotes = [self.state.quoteState[legKey] for legKey in legsKeys]
         for i in range(0, 15):
@@ -2042,6 +1988,7 @@ class IOpOrderStraddle(IOp):
 
         # If we were previewing and ordering locally...
         if self.preview:
+            await self.state.pacer.wait("orders")
             trade = await self.ib.whatIfOrderAsync(bag, order)
             logger.info("PREVIEW: {}", pp.pformat(trade))
             logger.warning("ONLY PREVIEW. NO TRADE PLACED.")
@@ -2051,6 +1998,7 @@ class IOpOrderStraddle(IOp):
             if not contract.exchange:
                 contract.exchange = "SMART"
 
+            await self.state.pacer.wait("orders")
             trade = self.ib.placeOrder(contract, order)
 
 
@@ -3008,6 +2956,7 @@ class IOpOrderCancel(IOp):
 
         for n, o in enumerate(oooo, start=1):
             logger.info("[{} of {}] Cancel for order: {}", n, len(oooo), o)
+            await self.state.pacer.wait("orders")
             self.ib.cancelOrder(o)
 
 
@@ -3035,6 +2984,31 @@ class IOpBalance(IOp):
             logger.info("{}", pp.pformat(ords))
 
 
+@dataclass
+class IOpExposure(IOp):
+    """Show market value and unrealized PnL aggregated per underlying (optionally only for given symbols)"""
+
+    def argmap(self):
+        return [DArg("*symbols", convert=lambda x: [s.upper() for s in x])]
+
+    async def run(self):
+        exposure = self.state.positions.exposure()
+        for symbol, row in sorted(
+            exposure.items(), key=lambda x: abs(x[1]["marketValue"]), reverse=True
+        ):
+            if self.symbols and symbol not in self.symbols:
+                continue
+
+            logger.info(
+                "[{}] value ${:,.2f} :: unrealized ${:,.2f} :: {} position{}",
+                symbol,
+                row["marketValue"],
+                row["unrealizedPNL"],
+                row["positions"],
+                "" if row["positions"] == 1 else "s",
+            )
+
+
 @dataclass
 class IOpStrat1(IOp):
     def argmap(self):
@@ -3048,7 +3022,6 @@ class IOpStrat1(IOp):
             parentStrat["subState"] = subState
 
     async def run(self, symbol):
-        self.state = self.state.state
         levels = {
             "L0":
                 {"stopLoss": -0.30, "stopLossQty": 1, "takeProfit": 0.30, "takeProfQty": 0.5, "isTrail": False, },
@@ -3060,22 +3033,14 @@ class IOpStrat1(IOp):
                 {"stopLoss": 0, "stopLossQty": 0, "takeProfit": 0, "takeProfQty": 0, "isTrail": True, },
         }
 
-        position = self.state.internalPositions.get(symbol, None)
+        position = self.state.positions.quantity(symbol)
         if position is None:
             logger.error(f"no position found for {symbol}, aborting strategy")
             self.state.strategy.pop(symbol, None)
             return
 
-        ords = self.ib.portfolio()
-
-        f = False
-        myPos = None
-        for o in ords:
-            portcont = o.contract.localSymbol.replace(" ", "")
-            if portcont == symbol:
-                f = True
-                myPos = o
-                break
+        myPos = self.state.positions.get(symbol)
+        f = myPos is not None
 
         if not f:
             self.state.strategy.pop(symbol, None)
@@ -3092,22 +3057,30 @@ class IOpStrat1(IOp):
             t = myPos.contract.secType
 
             quote: Ticker = self.state.quoteState.get(symbol)
-            bar: OHLC5MinTracker = self.state.barState.get(symbol)
-            underlyingPrice = quote.modelGreeks.undPrice
-            #logger.info(f"{bar.previous_bar} {bar.get_current_bar()} {myPos.contract.right}")
+            slot = self.state.quoteStore.slot(symbol)
+            if quote is None or slot is None:
+                # position without a live quote (unsubscribed or not added yet): nothing to evaluate
+                logger.warning(f"[{symbol}] strategy has no live quote, skipping evaluation")
+                return
+
+            previousBar = self.state.bars.previous(
+                myPos.contract.symbol, "5m", partial=False
+            )
+            greeks = self.state.greeks.model(symbol) or quote.modelGreeks
+            underlyingPrice = greeks.undPrice if greeks else None
+            #logger.info(f"{previousBar} {myPos.contract.right}")
 
             avgCost = None
 
             if t == "OPT":
                 avgCost = myPos.averageCost / 100
 
-            ticker = self.state.quoteState[symbol]
-            mktPrice = (ticker.bid + ticker.ask) / 2
+            mktPrice = self.state.quoteStore.mid[slot]
             algo = strategyState.get("algo")
             stratState = strategyState.get("start")
 
             contDate = myPos.contract.lastTradeDateOrContractMonth
-            myCurrentDate = datetime.date.today()
+            myCurrentDate = pendulum.now().date()
             tradeDate = "%4d%02d%02d" % (myCurrentDate.year, myCurrentDate.month, myCurrentDate.day)
             isFuture = int(contDate) > int(tradeDate)
             now = pendulum.now("US/Eastern")
@@ -3134,47 +3107,55 @@ class IOpStrat1(IOp):
                 else :
                     strategyState["highPrice"] = mktPrice
 
+                # exit order still working: keep tracking the high, but don't place another exit
+                # (the order's fill or failure moves the strategy out of "X")
+                if stratState == "X":
+                    return
+
                 if stratState == "L0" :
                     #logger.debug(f"strategy S1 is in state {stratState} and {myPos} {pnlPercentage} {avgCost} {mktPrice}")
                     if "SL" not in  strategyState and pnlPercentage <= (level.get("stopLoss")*100) :
                         self.updateParent(myPos.contract.tradingClass,"SL0")
                         amount = math.ceil(position * level.get("stopLossQty"))
                         logger.info(f"Hit stop loss for {symbol} {pnlPercentage} selling {amount}")
-                        await self.runoplive("buy", f"{symbol} -{amount} AMF")
-                        if ICLI_AWWDIO_URL:
-                            await self.runoplive("say", f"first stop loss reached on  {myPos.contract.tradingClass} {myPos.contract.right} selling {amount} contracts")
-                        await asyncio.sleep(5)
-                        strategyState["start"] = "Z"
+                        self.state.strategies.submit(
+                            symbol,
+                            -amount,
+                            "Z",
+                            announce=f"first stop loss reached on  {myPos.contract.tradingClass} {myPos.contract.right} selling {amount} contracts" if ICLI_AWWDIO_URL else None,
+                        )
                         return
 
-                    # logger.error(f"prev: {bar.previous_bar} this: {bar.current_bar}")
+                    # logger.error(f"prev: {previousBar}")
 
-                    if "SL" in strategyState and bar.previous_bar != None and (
-                            (strategyState["SL"] < bar.previous_bar["close"] and strategyState["SL"] < bar.previous_bar["open"] and myPos.contract.right == 'P') or
-                            (strategyState["SL"] > bar.previous_bar["close"] and strategyState["SL"] > bar.previous_bar["open"] and myPos.contract.right == 'C')
+                    if "SL" in strategyState and previousBar != None and (
+                            (strategyState["SL"] < previousBar["close"] and strategyState["SL"] < previousBar["open"] and myPos.contract.right == 'P') or
+                            (strategyState["SL"] > previousBar["close"] and strategyState["SL"] > previousBar["open"] and myPos.contract.right == 'C')
                     ):
-                        prevOpen = bar.previous_bar["open"]
-                        prevClose = bar.previous_bar["close"]
-                        prevTimestamp = bar.previous_bar["timestamp"]
+                        prevOpen = previousBar["open"]
+                        prevClose = previousBar["close"]
+                        prevTimestamp = previousBar["timestamp"]
                         self.updateParent(myPos.contract.tradingClass, "SL0")
                         amount = math.ceil(position * level.get("stopLossQty"))
                         logger.info(f"Hit PRICE stop loss on underlying stock {symbol} {pnlPercentage} selling {amount} open/close:{prevOpen}/{prevClose} @ {prevTimestamp}")
-                        await self.runoplive("buy", f"{symbol} -{amount} AMF")
-                        if ICLI_AWWDIO_URL:
-                            await self.runoplive("say", f"first stop loss reached on {myPos.contract.tradingClass} {myPos.contract.right} selling {amount} contracts")
-                        await asyncio.sleep(5)
-                        strategyState["start"] = "Z"
+                        self.state.strategies.submit(
+                            symbol,
+                            -amount,
+                            "Z",
+                            announce=f"first stop loss reached on {myPos.contract.tradingClass} {myPos.contract.right} selling {amount} contracts" if ICLI_AWWDIO_URL else None,
+                        )
                         return
 
                     if pnlPercentage > (level.get("takeProfit") *100):
                         self.updateParent(myPos.contract.tradingClass, "TP1")
                         amount =  math.ceil(position * level.get("takeProfQty"))
                         logger.info(f"Hit first take profit for {symbol} {pnlPercentage}, selling {amount} ")
-                        await self.runoplive("buy", f"{symbol} -{amount} AMF")
-                        if ICLI_AWWDIO_URL:
-                            await self.runoplive("say", f"took first profit on {myPos.contract.tradingClass} {myPos.contract.right} selling {amount} contracts")
-                        await asyncio.sleep(5)
-                        strategyState["start"] = "L1"
+                        self.state.strategies.submit(
+                            symbol,
+                            -amount,
+                            "L1",
+                            announce=f"took first profit on {myPos.contract.tradingClass} {myPos.contract.right} selling {amount} contracts" if ICLI_AWWDIO_URL else None,
+                        )
                         return
 
                 if stratState == "L1" :
@@ -3184,22 +3165,24 @@ class IOpStrat1(IOp):
                         self.updateParent(myPos.contract.tradingClass, "SL1")
                         amount =  math.ceil(position * level.get("stopLossQty"))
                         logger.info(f"Hit stop loss for {symbol} {pnlPercentage} selling {amount}")
-                        await self.runoplive("buy", f"{symbol} -{amount} AMF")
-                        if ICLI_AWWDIO_URL:
-                            await self.runoplive("say", f"second stop loss reached on  {myPos.contract.tradingClass} {myPos.contract.right} selling {amount} contracts")
-                        await asyncio.sleep(5)
-                        strategyState["start"] = "Z"
+                        self.state.strategies.submit(
+                            symbol,
+                            -amount,
+                            "Z",
+                            announce=f"second stop loss reached on  {myPos.contract.tradingClass} {myPos.contract.right} selling {amount} contracts" if ICLI_AWWDIO_URL else None,
+                        )
                         return
 
                     if pnlPercentage > (level.get("takeProfit") *100):
                         self.updateParent(myPos.contract.tradingClass, "TP2")
                         amount =  math.ceil(position * level.get("takeProfQty"))
                         logger.info(f"Hit second take profit for {symbol} {pnlPercentage}, selling {amount} ")
-                        await self.runoplive("buy", f"{symbol} -{amount} AMF")
-                        if ICLI_AWWDIO_URL:
-                            await self.runoplive("say", f"took additional profit {myPos.contract.tradingClass} {myPos.contract.right} selling {amount} contracts")
-                        await asyncio.sleep(5)
-                        strategyState["start"] = "L2"
+                        self.state.strategies.submit(
+                            symbol,
+                            -amount,
+                            "L2",
+                            announce=f"took additional profit {myPos.contract.tradingClass} {myPos.contract.right} selling {amount} contracts" if ICLI_AWWDIO_URL else None,
+                        )
                         return
 
                 if stratState == "L2":
@@ -3210,22 +3193,24 @@ class IOpStrat1(IOp):
                         self.updateParent(myPos.contract.tradingClass, "SLR")
                         amount = position
                         logger.info(f"Hit stop loss for {symbol} {pnlPercentage} selling {amount}")
-                        await self.runoplive("buy", f"{symbol} -{amount} AMF")
-                        if ICLI_AWWDIO_URL:
-                            await self.runoplive("say", f"runner stop loss reached {myPos.contract.tradingClass} {myPos.contract.right} selling {amount} contracts")
-                        await asyncio.sleep(5)
-                        strategyState["start"] = "Z"
+                        self.state.strategies.submit(
+                            symbol,
+                            -amount,
+                            "Z",
+                            announce=f"runner stop loss reached {myPos.contract.tradingClass} {myPos.contract.right} selling {amount} contracts" if ICLI_AWWDIO_URL else None,
+                        )
                         return
 
                 if not isFuture and untilClose.seconds <= 300 :
                     self.updateParent(myPos.contract.tradingClass, "TPR")
                     amount = position
                     logger.info(f"Contract is going to expire, we are in state {stratState}, selling before the close, as not hit either SL or PT {symbol} {pnlPercentage} selling {amount}")
-                    await self.runoplive("buy", f"{symbol} -{amount} AMF")
-                    if ICLI_AWWDIO_URL:
-                        await self.runoplive("say", f"runners took profit {myPos.contract.tradingClass} {myPos.contract.right} selling {amount} contracts")
-                    await asyncio.sleep(5)
-                    strategyState["start"] = "Z"
+                    self.state.strategies.submit(
+                        symbol,
+                        -amount,
+                        "Z",
+                        announce=f"runners took profit {myPos.contract.tradingClass} {myPos.contract.right} selling {amount} contracts" if ICLI_AWWDIO_URL else None,
+                    )
                     return
 
                 return
@@ -3249,16 +3234,8 @@ class IOpSetStrategy(IOp):
         ]
 
     async def run(self):
-        ords = self.ib.portfolio()
-        f = False
-        myPos = None
-        for o in ords:
-            portcont = o.contract.localSymbol.replace(" ","")
-
-            if portcont == self.symbol :
-                f = True
-                myPos = o
-                break
+        myPos = self.state.positions.get(self.symbol)
+        f = myPos is not None
 
         if f :
             strat = None
@@ -3303,24 +3280,12 @@ class IOpRunStrategy(IOp):
         ]
 
     async def run(self):
-        ords = self.ib.portfolio()
-        # logger.info(f"State is: {self.state}")
-        f = False
-        for o in ords:
-            portcont = o.contract.localSymbol.replace(" ","")
-
-            if portcont == self.symbol :
-                f = True
-                break
-
-        strat = globals().get(STRATMAP.get(self.algo))
+        # evaluates through the same long-lived strategy object tick notifications use
+        if not self.state.strategies.strategyFor(self.symbol, self.algo):
+            logger.error(f"FAILED to RUN strategy for {self.symbol} to {self.algo} starting at {self.start}")
+            return
 
-        if strat :
-            #logger.debug(f"running strategy for {self.symbol} to {strat} starting at {self.start}")
-            sinstance = strat(self)
-            await sinstance.run(self.symbol)
-        else:
-            logger.error(f"FAILED to RUN strategy for {self.symbol} to {strat} starting at {self.start}")
+        await self.state.strategies.evaluate(self.symbol, self.algo)
 
 
 @dataclass
@@ -3365,7 +3330,10 @@ class IOpBuyORBStrategy1(IOp):
         )
 
         # TODO: what about ranges where we do'nt have an underlying like NDXP doesn't mean we are subscribed to ^NDX
-        quote = self.state.quoteState[symbol]
+        quote = self.state.quoteState.get(symbol)
+        if quote is None:
+            logger.error("[{}] No live quote for the current price (market data lines full?)", symbol)
+            return None,0.0,0
 
         # prices are NaN until they get populated...
         # (and sometimes this doesn't work right after hours or weekend times... thanks ibkr)
@@ -3408,52 +3376,38 @@ class IOpBuyORBStrategy1(IOp):
 
             if count == dte:
                 logger.info("[{}] Using date as basis for strike generation...", date)
-                firstLast = None
-                for strike in strikes:
-                    if low < strike < high:
-                        for pc in (direction,):
-                            optionSymbol = "{}{}{}{:0>8}".format(
-                                symbol,
-                                date[2:],
-                                pc,
-                                int(strike * 1000),
-                            )
-                            logger.info(f"{optionSymbol}")
-                            contracts = [contractForName(optionSymbol)]
-                            contracts = await self.state.qualify(*contracts)
-
-                            for contract in contracts:
-                                conDate =  datetime.datetime.strptime(contract.lastTradeDateOrContractMonth, "%Y%m%d").date()
-                                zdte = (conDate - datetime.date.today()).days
-                                data = self.ib.reqMktData(
-                                    contract,
-                                    tickFieldsForContract(contract),
-                                )
-                                #logger.info(data)
-                                await self.runoplive("add", f'"{optionSymbol}"')
-                                await asyncio.sleep(1.0)
-
-                                result = self.state.currentQuote(optionSymbol)
-                                if isinstance(result, (list, tuple)) and len(result) == 2:
-                                    bid, ask = result
-
-                                    if (bid+ask)/2 > 0.29 and (bid+ask)/2 < 0.80:
-                                        return (optionSymbol,contract.strike, zdte)
-
-                                await self.runoplive("rm", f'"{optionSymbol}"')
-                                await asyncio.sleep(0.25)
-                                if direction == "P" and firstLast == None:
-                                    logger.info(f"setting the last first put contract as the last resort contract {optionSymbol}")
-                                    firstLast = (optionSymbol, contract.strike, zdte)
-                                elif direction == "C":
-                                    logger.info(
-                                        f"setting the last last call contract as the last resort contract {optionSymbol}")
-                                    firstLast = (optionSymbol, contract.strike, zdte)
-                            generated.append(optionSymbol)
-                if firstLast is not None:
-                    logger.info(
-                        f"using the last resort contract {firstLast}")
-                    return firstLast
+                candidates = [
+                    "{}{}{}{:0>8}".format(
+                        symbol,
+                        date[2:],
+                        direction,
+                        int(strike * 1000),
+                    )
+                    for strike in strikesBetween(strikes, low, high)
+                ]
+                generated.extend(candidates)
+
+                # all candidate strikes are qualified and quoted concurrently, and the lowest
+                # strike with a premium inside the scanner's band is picked.
+                scanner = StrikeScanner(self.state)
+                with Timer(f"[{symbol}] Scanned {len(candidates)} strikes"):
+                    picked = await scanner.scan(candidates)
+
+                if picked is None and scanner.candidates:
+                    # last resort: the first put or the last call scanned
+                    picked = (
+                        scanner.candidates[0]
+                        if direction == "P"
+                        else scanner.candidates[-1]
+                    )
+                    logger.info(f"using the last resort contract {picked.symbol}")
+
+                if picked is not None:
+                    conDate = datetime.datetime.strptime(
+                        picked.contract.lastTradeDateOrContractMonth, "%Y%m%d"
+                    ).date()
+                    zdte = (conDate - datetime.date.today()).days
+                    return (picked.symbol, picked.contract.strike, zdte)
             count+=1
 
         for row in generated:
@@ -3466,9 +3420,7 @@ class IOpBuyORBStrategy1(IOp):
         return None,0.0,0
 
     async def run(self, symbol):
-        self.state = self.state.state
         buffer=0.28
-        contract = None
         debug = False
         opendate = None
         opentime = None
@@ -3477,17 +3429,17 @@ class IOpBuyORBStrategy1(IOp):
         if symbol in self.state.strategy:
             curState = self.state.strategy.get(symbol)
         else:
-            self.state.strategy[symbol] = {"start":"S", "desc" : "waiting for opening range", "algo" : "S2", "entries":0, "lastCheckTime": datetime.datetime(2025,6,26,9,29,tzinfo=ZoneInfo("America/New_York")) if debug else datetime.datetime.now()} #TODO: this needs to be set to now
+            self.state.strategy[symbol] = {"start":"S", "desc" : "waiting for opening range", "algo" : "S2", "entries":0, "lastCheckTime": datetime.datetime(2025,6,26,9,29,tzinfo=ZoneInfo("America/New_York")) if debug else pendulum.now("America/New_York")} #TODO: this needs to be set to now
             logger.info(f"set ORB strategy for symbol : {self.state.strategy}")
             return True
 
         if debug :
             opendate = datetime.date(2025,7,16) #TODO: this needs to be fixed to the current date.
         else:
-            opendate = datetime.datetime.now().date()
+            opendate = pendulum.now("America/New_York").date()
 
         opentime = datetime.time(9,30,0,0,tzinfo=ZoneInfo("America/New_York"))
-        curtime = datetime.datetime.now(tz=ZoneInfo("America/New_York"))
+        curtime = pendulum.now("America/New_York")
 
         if 'lastCheckTime' not in self.state.strategy[symbol]:
             if debug:
@@ -3502,22 +3454,13 @@ class IOpBuyORBStrategy1(IOp):
 
         self.state.strategy[symbol]['lastCheckTime'] = curtime
 
-        if " " in symbol:
-            # is multi-leg spread/bag request, so do bag
-            orderReq = self.state.ol.parse(symbol)
-            contract = await self.state.bagForSpread(orderReq)
-        else:
-            # else, is a regular single symbol
-            # if ordering current positional quote, do the lookup.
-            # TODO: make centralized lookup helper function
-            if symbol.startswith(":"):
-                orig = symbol
-                fullSymbol, contract = self.state.quoteResolve(symbol)
-                if not fullSymbol:
-                    logger.error("[{}] Failed to find symbol by position index!", orig)
-                    return None
-            else:
-                contract = contractForName(symbol)
+        # bars and quotes are looked up by symbol, so only check positional quotes resolve
+        # TODO: make centralized lookup helper function
+        if symbol.startswith(":"):
+            fullSymbol, _ = self.state.quoteResolve(symbol)
+            if not fullSymbol:
+                logger.error("[{}] Failed to find symbol by position index!", symbol)
+                return None
 
         quote: Ticker = self.state.quoteState.get(symbol)
 
@@ -3529,119 +3472,52 @@ class IOpBuyORBStrategy1(IOp):
             if self.alignedtime(curtime) <= self.alignedtime(lasttime) and not debug:
                 return
 
-            contract = Stock(symbol, 'SMART', 'USD')
-            # logger.debug(f"Just before requesting the bars {curState}")
+            # bars are seeded once per symbol then extended live, so this doesn't re-request history
+            series = await self.state.intraday.get(symbol)
 
-            bars = await self.ib.reqHistoricalDataAsync(
-                contract,
-                endDateTime=curtime,
-                durationStr='23400 S',  # Go back 2 days from now
-                barSizeSetting='5 mins',  # 5-minute candles
-                whatToShow='TRADES',
-                useRTH=True,
-                formatDate=1
-            )
-            openBarFound = False
-            for bar in bars:
-                if bar.date == datetime.datetime.combine(opendate, opentime):
-                    curState["orbHigh"] = bar.high + buffer
-                    curState["orbLow"] = bar.low - buffer
-                    curState["orbTime"] = bar.date
-                    curState["start"] = "O"
-                    curState["desc"] = "opening range set, waiting for breakout"
-                    openBarFound = True
-                    # logger.debug(curState)
-                    break
-
-            if not openBarFound:
-                if bar.date < datetime.datetime.combine(opendate, opentime):
-                    # logger.debug("not yet received an opening candle")
-                    return
-
-            # curState["orbHigh"] = bar.high
-            # curState["orbLow"] = bar.low
-            # curState["state"] = "O"
-            # curState["desc"] = "opening range set, waiting for breakout"
-
-        if curState["start"] == "O":
-            if self.alignedtime(curtime) <= self.alignedtime(lasttime):
+            openTime = datetime.datetime.combine(opendate, opentime)
+            bar = series.byDate.get(openTime)
+            if bar is None:
+                # logger.debug("not yet received an opening candle")
                 return
 
-            bars = await self.ib.reqHistoricalDataAsync(
-                contract,
-                endDateTime=curtime,
-                durationStr='23400 S',  # Go back 2 days from now
-                barSizeSetting='5 mins',  # 5-minute candles
-                whatToShow='TRADES',
-                useRTH=True,
-                formatDate=1
-            )
+            curState["orbHigh"] = bar.high + buffer
+            curState["orbLow"] = bar.low - buffer
+            curState["orbTime"] = bar.date
+            self.state.strategies.transition(symbol, "O")
+            curState["desc"] = "opening range set, waiting for breakout"
 
-            bar = None
-            breakoutFound = False
-            stale = False
-            inside = True
-            outside = False
-            direction = None
-            breakoutCount = 0
-            retestCount = 0
-            outsideCount = 0
-            prevVolume = 0
-
-            for bar in bars:
-                # logger.info(
-                #     f"PRE LOOP breakout for {symbol} -> direction={direction} @ {bar.date} count={breakoutCount} retest={retestCount} outcount={outsideCount} {stale} {inside} {outside}")
-
-                if bar.date < datetime.datetime.combine(opendate, opentime):
-                    continue
-                orbHigh = curState["orbHigh"]
-                orbLow = curState["orbLow"]
-                # logger.info(f"{bar.date} == {self.alignedtime(curtime-datetime.timedelta(seconds=300))}")
-                if bar.open >= curState["orbHigh"] and bar.close >= curState["orbHigh"]:
-                    outside = True
-                    inside = False
-                    if not stale:
-                        outsideCount += 1
-                        if bar.date == self.alignedtime(curtime-datetime.timedelta(seconds=300)):
-
-                            logger.info(f"{symbol}: valid breakout found C")
-                            breakoutCount += 1
-                            direction = "C"
-                            breakoutFound = True
-                            inside = False
-                            break
+            # carry breakout state forward incrementally: catch up on bars completed since the open,
+            # then every newly completed bar is processed exactly once as it completes.
+            orb = ORBTracker(curState["orbHigh"], curState["orbLow"])
+            latestDate = self.alignedtime(curtime - datetime.timedelta(seconds=300))
+            for b in series.bars:
+                if b.date >= openTime:
+                    orb.update(b, latest=(b.date == latestDate))
 
-                        else:
-                            stale = True
-                            # logger.info("stale breakout found")
-
-                elif bar.open <= curState["orbLow"] and bar.close <= curState["orbLow"]:
-                    outside = True
-                    inside = False
-                    if not stale:
-                        outsideCount += 1
-                        if bar.date == self.alignedtime(curtime-datetime.timedelta(seconds=300)):
-                            logger.info(f"{symbol}: valid breakout found P")
-                            breakoutCount += 1
-                            direction = "P"
-                            breakoutFound = True
-                            inside = False
-                            break
-                        else:
-                            stale = True
-                            # logger.info("stale breakout found")
-
-                elif not inside:
-                    inside = True
-                    stale = False
-                    retestCount += 1
-                    outside = False
-
-                prevVolume = bar.volume
-                #
-                # logger.info(
-                #     f"POS LOOP breakout for {symbol} -> direction={direction} @ {bar.date} count={breakoutCount} retest={retestCount} outcount={outsideCount} {stale} {inside} {outside}")
-                # logger.debug(f"found breakout at bar {bar}, {breakoutFound} {direction}")
+            series.listeners.append(orb.update)
+            curState["orb"] = orb
+            # logger.debug(curState)
+
+        if curState["start"] == "O":
+            # no boundary gating here: the bar completes when the first realtime bar of the next
+            # interval arrives (a few seconds after the boundary), and checking is just a dict read.
+            orb: ORBTracker = curState["orb"]
+            orbHigh = curState["orbHigh"]
+            orbLow = curState["orbLow"]
+
+            # only the bar which just completed can be a valid breakout
+            barDate = self.alignedtime(curtime - datetime.timedelta(seconds=300))
+            direction = orb.breakoutAt(barDate)
+
+            # the breakout stays readable for the whole next bar, so after re-arming for
+            # reentry don't trade the same breakout again
+            if direction and curState.get("consumedBreakout") == barDate:
+                direction = None
+
+            breakoutFound = direction is not None
+            if breakoutFound:
+                logger.info(f"{symbol}: valid breakout found {direction}")
 
             #TODO: remove this extra True and the direction is fixed to P
             if breakoutFound:
@@ -3652,25 +3528,26 @@ class IOpBuyORBStrategy1(IOp):
                 if not debug:
                     optionToTrade, strike, dte = await self.getChains(symbol,0,10, direction)
                 else:
-                    logger.info(f"breakoutfound {direction} {bar.date}")
-                    curState["start"] = "B"
+                    logger.info(f"breakoutfound {direction} {barDate}")
+                    self.state.strategies.transition(symbol, "B")
                     return
 
                 if strike > 0 and not debug:
+                    curState["consumedBreakout"] = barDate
                     await self.runoplive("bo1", f'{symbol} {strike} {direction} ${amount} {dte} SL:{sl}')
 
                     curState["option"] = optionToTrade
                     curState["breakoutFound"] = True
                     curState["breakoutDirection"] = direction
-                    curState["breakoutTime"] = bar.date
-                    curState["start"] = "B"
+                    curState["breakoutTime"] = barDate
+                    self.state.strategies.transition(symbol, "B")
                     curState["desc"] = "trade placed, waiting for results"
                     if "entries" in curState:
                         curState["entries"] += 1
                     else:
                         curState["entries"] = 1
                 else:
-                    curState["start"] = "A"
+                    self.state.strategies.transition(symbol, "A")
                     curState["desc"] = "abort could not find a strike / option that made sense"
 
         if curState["start"] == "B" and not debug:
@@ -3693,12 +3570,13 @@ class IOpBuyORBStrategy1(IOp):
                 curState.pop("breakoutTime", None)
                 curState.pop("breakoutFound", None)
                 curState["desc"] = "Rearmed for reentry"
-                curState["start"] = "O"
+                self.state.strategies.transition(symbol, "O")
             elif fromSub== "SLR" or fromSub== "TPR":
-                curState["start"] = "Z"
+                self.state.strategies.transition(symbol, "Z")
 
         if curState["start"] == "Z":
             self.state.strategy.pop(symbol)
+            self.state.intraday.release(symbol)
 
         #await self.runoplive("buy", f'{fullSymbol} {self.total} AMF ')
         #await asyncio.sleep(4)
@@ -3771,24 +3649,14 @@ class IOpBuyOptionStrategy1(IOp):
         await self.runoplive("add", f'{fullSymbol}')
         await asyncio.sleep(0.5)
 
-        contract = None
-
-        if " " in fullSymbol:
-            # is multi-leg spread/bag request, so do bag
-            orderReq = self.state.ol.parse(fullSymbol)
-            contract = await self.state.bagForSpread(orderReq)
-        else:
-            # else, is a regular single symbol
-            # if ordering current positional quote, do the lookup.
-            # TODO: make centralized lookup helper function
-            if fullSymbol.startswith(":"):
-                orig = fullSymbol
-                fullSymbol, contract = self.state.quoteResolve(fullSymbol)
-                if not fullSymbol:
-                    logger.error("[{}] Failed to find symbol by position index!", orig)
-                    return None
-            else:
-                contract = contractForName(fullSymbol)
+        # the order and strategy below only need the symbol ('buy' resolves the contract)
+        # TODO: make centralized lookup helper function
+        if fullSymbol.startswith(":"):
+            orig = fullSymbol
+            fullSymbol, _ = self.state.quoteResolve(fullSymbol)
+            if not fullSymbol:
+                logger.error("[{}] Failed to find symbol by position index!", orig)
+                return None
 
         slSet = False
         previewSet = False
@@ -4388,29 +4256,27 @@ class IOpOrders(IOp):
 
 @dataclass
 class IOpExecutions(IOp):
-    """Display all executions including commissions and PnL."""
+    """Display executions including commissions and PnL from the execution journal.
+
+    Shows the current session by default; :7D or :2W show the last 7 days or 2 weeks,
+    :ALL shows the entire journal, :C<id> and :O<id> filter by client id and order id."""
 
     def argmap(self):
         return [
             DArg(
                 "*symbols",
-                desc="Optional symbols to filter for in result listings",
+                desc="Optional symbols and :keywords to filter for in result listings",
                 convert=lambda x: set([s.upper() for s in x]),
             )
         ]
 
     async def run(self):
-        # "Fills" has:
-        # - contract
-        # - execution (price at exchange)
-        # - commissionReport (commission and PNL)
-        # - time (UTC)
-        # .executions() is the same as just the 'execution' value in .fills()
+        # Journal rows have contract, execution, and commission report fields flattened
+        # into one row per execution (time is UTC).
 
         # the live updating only works for the current client activity, so to fetch _all_
         # executions for the entire user over all clients, run "exec refresh" or "exec update"
-        # ALSO NOTE: we stopped fetching executions on startup too, so this will restore previous
-        #            executions if you restart your client in the middle of a trading session.
+        # (which only requests executions newer than the previous refresh)
         REFRESH_CHECK = {":REFRESH", ":UPDATE", ":U", ":R", ":UPD", ":REF"}
         SELF_CHECK = {":SELF", ":MINE", ":S", ":M"}
 
@@ -4422,234 +4288,64 @@ class IOpExecutions(IOp):
             self.symbols -= REFRESH_CHECK
             await self.state.loadExecutions()
 
-        fills = self.ib.fills()
-        # logger.info("Fills: {}", pp.pformat(fills))
-        contracts = []
-        executions = []
-        commissions = []
-        for f in fills:
-            contracts.append(f.contract)
-            executions.append(f.execution)
-            commissions.append(f.commissionReport)
-
-        if False:
-            logger.info(
-                "C: {}\nE: {}: CM: {}",
-                pp.pformat(contracts),
-                pp.pformat(executions),
-                pp.pformat(commissions),
-            )
-
-        use = []
-        for name, l in [
-            ("Contracts", contracts),
-            ("Executions", executions),
-            ("Commissions", commissions),
-        ]:
-            df = pd.DataFrame(l)
-            if df.empty:
-                logger.info("No {}", name)
-            else:
-                use.append((name, df))
-
-        if not use:
-            return None
-
-        df = pd.concat({name: frame for name, frame in use}, axis=1)
-
-        # Goodbye multiindex...
-        df.columns = df.columns.droplevel(0)
-
-        # enforce the dataframe is ordered from oldest executions to newest executions as defined by full original timestamp order.
-        df.sort_values(by=["time", "clientId"], inplace=True)
-
         # show only executions for the current client id
-        # TODO: allow showing only from a specific client id provided as a paramter too?
+        clientId = None
         if SELF_CHECK & self.symbols:
             self.symbols -= SELF_CHECK
-            df = df[df.clientId == self.state.clientId]
-
-        # if symbol filter requested, remove non-matching contracts.
-        # NOTE: we filter on SYMBOL and not "localSymbol" so we don't currently match on extended details like OCC symbols.
-        if self.symbols:
-            df = df[df.symbol.isin(self.symbols)]
-
-        # clean up any non-matching values due to symbols filtering
-        if self.symbols:
-            df = df[df.conId.notna()]
-
-        # Remove duplicate columns...
-        df = df.loc[:, ~df.columns.duplicated()]
-
-        # convert to Eastern time and drop date (since these reports only show up for one day, it's all duplicate details)
-        df["time"] = df["time"].apply(pd.Timestamp).dt.tz_convert("US/Eastern")
-        df["timestamp"] = df["time"]
-
-        df["date"] = df["time"].dt.strftime("%Y-%m-%d")
-        df["time"] = df["time"].dt.strftime("%H:%M:%S")
-
-        df["c_each"] = df.commission / df.shares
-
-        tointActual = ["clientId", "orderId"]
-        df[tointActual] = df[tointActual].map(lambda x: f"{int(x)}" if x else "")
-
-        # really have to stuff this multiplier change in there due to pandas typing requirements
-        df.multiplier = df.multiplier.replace("", 1).fillna(1).astype(float)
-
-        df["total"] = round(df.shares * df.avgPrice, 2) * df.multiplier
-
-        # Note: 'realizedPNL' for the closing transactions *already* includes commissions for both the buy and sell executions,
-        #       so *don't* subtract commissions again anywhere.
-        df["dayProfit"] = df.realizedPNL.cumsum()
-
-        df["RPNL_each"] = df.realizedPNL / df.shares
-
-        # provide a weak calculation of commission as percentage of PNL and of traded value.
-        # Note: we estimate the entry commission by just doubling the exit commission (which isn't 100% accurate, but
-        #       if the opening trade was more than 1 day ago, we don't have the opening matching executions to read
-        #       the execution from (and we aren't keeping a local fullly logged execution history, but maybe we should
-        #       add logged execution history as a feature in the future?)
-        df["c_pct"] = df.commission / (df.total + df.commission)
-        df["c_pct_RPNL"] = (df.commission * 2) / (df.realizedPNL + (df.commission * 2))
-
-        dfByTrade = df.groupby("orderId side localSymbol".split()).agg(
-            dict(
-                date=["min"],
-                time=[("start", "min"), ("finish", "max")],
-                price=["mean"],
-                shares=["sum"],
-                total=["sum"],
-                commission=["sum"],
-                # TODO: we need to calculate a manlal c_each by (total commision / shares) instead of mean of the c_each directly
-                c_each=["mean"],
-            )
-        )
-
-        # also show if the order occurred via multiple executions over time
-        # (single executions will have zero duration, etc)
-        dfByTrade["duration"] = pd.to_datetime(
-            dfByTrade["time"]["finish"], format="%H:%M:%S"
-        ) - pd.to_datetime(dfByTrade["time"]["start"], format="%H:%M:%S")
-
-        # convert the default pandas datetime difference just into a number of seconds per row
-        # (the returned "Series" from the subtraction above doesn't allow .seconds to be applied
-        #  as a column operation, so we apply it row-element-wise here instead)
-        dfByTrade["duration"] = dfByTrade.duration.apply(lambda x: x.seconds)
-
-        # also show commission percent for traded value per row
-        dfByTrade["c_pct"] = dfByTrade.commission / (
-            dfByTrade.total + dfByTrade.commission
-        )
-
-        dfByTimeProfit = df.copy().sort_values(
-            by=["time", "orderId", "secType", "side", "localSymbol"]
-        )
-
-        needsPrices = "price shares total commission c_each".split()
-        dfByTrade[needsPrices] = dfByTrade[needsPrices].map(fmtPrice)
-
-        # this currently has a false pandas warning about "concatenation with empty or all-NA entries is deprecated"
-        # but nothing is empty or NA in these columns. Their logic for checking their warning condition is just broken.
-        # (or their "FutureWarning" error message is so bad we can't actually see what the problem is)
-        df = addRowSafe(df, "sum", df[["shares", "price", "commission", "total"]].sum())
-
-        df = addRowSafe(
-            df,
-            "sum-buy",
-            df[["shares", "price", "commission", "total"]][df.side == "BOT"].sum(),
-        )
-
-        df = addRowSafe(
-            df,
-            "sum-sell",
-            df[["shares", "price", "commission", "total"]][df.side == "SLD"].sum(),
-        )
-
-        df.loc["profit", "total"] = (
-            df.loc["sum-sell"]["total"] - df.loc["sum-buy"]["total"]
-        )
-        df.loc["profit", "price"] = (
-            df.loc["sum-sell"]["price"] - df.loc["sum-buy"]["price"]
-        )
-
-        eachSharePrice = ["c_each", "shares", "price"]
-        df = addRowSafe(df, "med", df[eachSharePrice].median())
-        df = addRowSafe(df, "mean", df[eachSharePrice].mean())
-
-        needsPrices = "c_each shares price avgPrice commission realizedPNL RPNL_each total dayProfit c_pct c_pct_RPNL".split()
-        df[needsPrices] = df[needsPrices].map(fmtPrice)
-
-        # convert contract IDs to integers (and fill in any missing
-        # contract ids with placeholders so they don't get turned to
-        # strings with the global .fillna("") below).
-        df.conId = df.conId.fillna(-1).astype(int)
-
-        # new pandas strict typing doesn't allow numeric columns to become "" strings, so now just
-        # convert ALL columns to a generic object type
-        df = df.astype(object)
-
-        # display anything NaN as empty strings so it doesn't clutter the interface
-        df.fillna("", inplace=True)
-
-        df.rename(columns={"lastTradeDateOrContractMonth": "conDate"}, inplace=True)
-        # ignoring: "execId" (long string for execution recall) and "permId" (???)
-
-        # removed: lastLiquidity avgPrice
-        df = df[
-            (
-                """clientId secType conId symbol conDate right strike date exchange tradingClass localSymbol time orderId
-         side  shares  cumQty price    total realizedPNL RPNL_each
-         commission c_each c_pct c_pct_RPNL dayProfit""".split()
-            )
-        ]
-
-        dfByTimeProfit.set_index("timestamp", inplace=True)
-
-        dfByTimeProfit["profit"] = dfByTimeProfit.where(dfByTimeProfit.realizedPNL > 0)[
-            "realizedPNL"
-        ]
-
-        dfByTimeProfit["loss"] = dfByTimeProfit.where(dfByTimeProfit.realizedPNL < 0)[
-            "realizedPNL"
-        ]
-
-        # using "PNL == 0" to determine an open order should work _most_ of the time, but if you
-        # somehow get exactly a $0.00 PNL on a close, it will be counted incorrectly here.
-        dfByTimeProfit["opening"] = dfByTimeProfit.where(
-            dfByTimeProfit.realizedPNL == 0
-        )["orderId"]
-        dfByTimeProfit["closing"] = dfByTimeProfit.where(
-            dfByTimeProfit.realizedPNL != 0
-        )["orderId"]
-
-        profitByHour = dfByTimeProfit.resample("30Min").agg(
-            dict(
-                realizedPNL="sum",
-                orderId=[("orders", "nunique"), ("executions", "count")],
-                profit="count",
-                loss="count",
-                opening="nunique",
-                closing="nunique",
-            )
-        )
+            clientId = self.state.clientId
+
+        orderId = None
+        start: float | None = sessionStart()
+        for keyword in [s for s in self.symbols if s.startswith(":")]:
+            self.symbols.discard(keyword)
+            if keyword == ":ALL":
+                start = None
+            elif m := re.fullmatch(r":(\d+)([DW])", keyword):
+                days = int(m.group(1)) * (7 if m.group(2) == "W" else 1)
+                start = (
+                    pendulum.now("US/Eastern")
+                    .start_of("day")
+                    .subtract(days=days - 1)
+                    .timestamp()
+                )
+            elif m := re.fullmatch(r":([CO])(\d+)", keyword):
+                if m.group(1) == "C":
+                    clientId = int(m.group(2))
+                else:
+                    orderId = int(m.group(2))
+            else:
+                logger.warning("Unknown executions keyword: {}", keyword)
 
-        profitByHour["dayProfit"] = profitByHour.realizedPNL.cumsum()
+        if start == sessionStart() and not (self.symbols or clientId or orderId):
+            # current session without filters is maintained as executions arrive
+            stats = self.state.sessionStats()
+        else:
+            # NOTE: we filter on SYMBOL and not "localSymbol" so we don't currently match on extended details like OCC symbols.
+            # multi-day reports summarize by day instead of by half hour
+            stats = ExecutionStats(daily=start is None or start < sessionStart())
+            for row in self.state.journal.fills(
+                start, symbols=self.symbols, clientId=clientId, orderId=orderId
+            ):
+                stats.add(row)
 
-        needsPrices = "realizedPNL dayProfit".split()
-        profitByHour[needsPrices] = profitByHour[needsPrices].map(fmtPrice)
+        if not stats:
+            logger.info("No executions")
+            return None
 
         desc = ""
         if self.symbols:
             desc = f" Filtered for: {', '.join(self.symbols)}"
 
-        printFrame(df, f"Execution Summary{desc}")
-        printFrame(profitByHour, f"Profit by Half Hour{desc}")
+        shown = min(len(stats), ICLI_EXECUTIONS_ROWS)
         printFrame(
-            dfByTrade.sort_values(
-                by=[("date", "min"), ("time", "start"), "orderId", "localSymbol"]
-            ),
-            f"Execution Summary by Complete Order{desc}",
+            stats.executionFrame(),
+            f"Execution Summary{desc} ({shown:,} of {len(stats):,} executions)",
         )
+        printFrame(
+            stats.bucketFrame(),
+            f"Profit by {'Day' if stats.daily else 'Half Hour'}{desc}",
+        )
+        printFrame(stats.orderFrame(), f"Execution Summary by Complete Order{desc}")
 
 
 @dataclass
@@ -4769,14 +4465,8 @@ class IOpQuotesRemove(IOp):
 
             if contract:
                 try:
-                    self.ib.cancelMktData(contract)
-
                     symkey = lookupKey(contract)
-                    try:
-                        del self.state.quoteState[symkey]
-                        del self.state.ema[symkey]
-                    except:
-                        pass
+                    self.state.dropQuote(symkey)
                     logger.info(
                         "[{}] Removed: {} ({})",
                         sym,
@@ -4870,6 +4560,7 @@ class IOpOrderSpread(IOp):
                 pp.pformat(order),
             )
 
+            await self.state.pacer.wait("orders")
             trade = await asyncio.wait_for(
                 self.ib.whatIfOrderAsync(bag, order), timeout=2
             )
@@ -4880,6 +4571,7 @@ class IOpOrderSpread(IOp):
             # TOTO: also maybe move this entire execution logic into cli.py next to the regular single-contract order processing?
             return
 
+        await self.state.pacer.wait("orders")
         trade = self.ib.placeOrder(bag, order)
         logger.info("TRADE EXECUTED: {}", pp.pformat(trade))
 
@@ -4928,7 +4620,10 @@ class IOpOptionChainRangeDTE(IOp):
         )
 
         # TODO: what about ranges where we do'nt have an underlying like NDXP doesn't mean we are subscribed to ^NDX
-        quote = self.state.quoteState[self.symbol]
+        quote = self.state.quoteState.get(self.symbol)
+        if quote is None:
+            logger.error("[{}] No live quote for the current price (market data lines full?)", self.symbol)
+            return None
 
         # prices are NaN until they get populated...
         # (and sometimes this doesn't work right after hours or weekend times... thanks ibkr)
@@ -4969,26 +4664,26 @@ class IOpOptionChainRangeDTE(IOp):
                 continue
 
             logger.info("[{}] Using date as basis for strike generation...", date)
-            for strike in strikes:
-                if low < strike < high:
-                    for pc in ("P", "C"):
-                        optionSymbol = "{}{}{}{:0>8}".format(
-                                self.symbol,
-                                date[2:],
-                                pc,
-                                int(strike * 1000),
-                            )
-                        contracts = [contractForName(optionSymbol)]
-                        contracts = await self.state.qualify(*contracts)
-
-                        for contract in contracts:
-                            data = self.ib.reqMktData(
-                                    contract,
-                                    tickFieldsForContract(contract),
-                                    )
-                            logger.info(data)
-                        #logger.info(self.state.currentQuote(optionSymbol))
-                        generated.append(optionSymbol)
+
+            # only generate strikes listed for this expiration
+            strikes = await self.state.chains.strikesFor(self.symbol, date)
+            for strike in strikesBetween(strikes, low, high):
+                for pc in ("P", "C"):
+                    optionSymbol = "{}{}{}{:0>8}".format(
+                            self.symbol,
+                            date[2:],
+                            pc,
+                            int(strike * 1000),
+                        )
+                    contracts = [contractForName(optionSymbol)]
+                    contracts = await self.state.qualify(*contracts)
+
+                    # added as regular live quotes so the lines are tracked (and removable)
+                    for contract in contracts:
+                        symkey = self.state.addQuoteFromContract(contract)
+                        logger.info(self.state.quoteState.get(symkey))
+                    #logger.info(self.state.currentQuote(optionSymbol))
+                    generated.append(optionSymbol)
 
             # only print for THE FIRST DATE FOUND
             # (so we don't end up writing these out for every daily expiration or
@@ -5030,7 +4725,10 @@ class IOpOptionChainRange(IOp):
         )
 
         # TODO: what about ranges where we do'nt have an underlying like NDXP doesn't mean we are subscribed to ^NDX
-        quote = self.state.quoteState[self.symbol]
+        quote = self.state.quoteState.get(self.symbol)
+        if quote is None:
+            logger.error("[{}] No live quote for the current price (market data lines full?)", self.symbol)
+            return None
 
         # prices are NaN until they get populated...
         # (and sometimes this doesn't work right after hours or weekend times... thanks ibkr)
@@ -5071,17 +4769,19 @@ class IOpOptionChainRange(IOp):
                 continue
 
             logger.info("[{}] Using date as basis for strike generation...", date)
-            for strike in strikes:
-                if low < strike < high:
-                    for pc in ("P", "C"):
-                        generated.append(
-                            "{}{}{}{:0>8}".format(
-                                self.rename or self.symbol,
-                                date[2:],
-                                pc,
-                                int(strike * 1000),
-                            )
+
+            # only generate strikes listed for this expiration
+            strikes = await self.state.chains.strikesFor(self.symbol, date)
+            for strike in strikesBetween(strikes, low, high):
+                for pc in ("P", "C"):
+                    generated.append(
+                        "{}{}{}{:0>8}".format(
+                            self.rename or self.symbol,
+                            date[2:],
+                            pc,
+                            int(strike * 1000),
                         )
+                    )
 
             # only print for THE FIRST DATE FOUND
             # (so we don't end up writing these out for every daily expiration or
@@ -5111,11 +4811,9 @@ class IOpOptionChain(IOp):
         ]
 
     async def run(self):
-        # TODO: have this fech from optional external API because IBKR chains API is
-        # excessively rate limited garbage.
-
-        # Index cache by symbol AND current date because strikes can change
-        # every day even for the same expiration if there's high volatility.
+        # Chains are read from the local chain store, which loads all expirations and strikes
+        # for an underlying with one reqSecDefOptParams() request per day (or already has them
+        # from the background prefetch), so this only waits on the API for new underlyings.
         now = pendulum.now("US/Eastern")
         got = {}
 
@@ -5133,148 +4831,54 @@ class IOpOptionChain(IOp):
                 symbol, _ = self.state.quoteResolve(symbol)
                 assert symbol
 
-            cacheKey = ("chains", symbol, now.date())
-            # logger.info("Looking up {}", cacheKey)
-
-            # if found in cache, don't lookup again!
-            if True:
-                if found := self.cache.get(cacheKey):
-                    # don't print cached chains by default because this pollutes `Fast` output,
-                    # but if the last symbol is "preview" then do show it...
-                    if IS_PREVIEW:
-                        logger.info(
-                            "[{}] Already cached: {}",
-                            symbol,
-                            pp.pformat(found.items()),
-                        )
-                    got[symbol] = found
-                    continue
-
-            # note "fetching" here so it doesn't fire if the cache hit passes.
-            # (We only want to log the fetching network requests; just cache reading is quiet)
-            logger.info("[chains] Fetching for {}", symbol)
-
-            # resolve for option chains lookup
             contractExact = contractForName(symbol)
 
-            # if we want to request ALL chains, only provide underlying
-            # symbol then mock it as "OPT" so the IBKR resolver sees we
-            # are requesting option underlying and not just single-stock
-            # contract details.
-            contractExact.secType = "OPT"
-
             # If full option symbol, get all strikes for the date of the symbol
+            exactDate = None
+            underlying = symbol
             if isinstance(contractExact, (Option, FuturesOption)):
-                contractExact.strike = 0.00
-                # if is option already, use exact date of option...
-                useDates = [pendulum.parse("20" + symbol[-15 : -15 + 6]).date()]
+                exactDate = "20" + symbol[-15 : -15 + 6]
+                underlying = symbol[:-15]
+                if underlying == "SPXW":
+                    underlying = "SPX"
+
+            # chains already loaded today print only in preview mode (like cached chains did)
+            known = self.state.chains.cached(underlying)
+            fetched = not (known and known.loaded == sessionDate())
+
+            chain = await self.state.chains.get(underlying)
+            if not chain:
+                logger.error("[{}] No option chain found!", symbol)
+                continue
+
+            if exactDate:
+                strikes = {exactDate: chain.strikes.get(exactDate, [])}
+            elif symbol.startswith("/"):
+                # futures options chains only cover the current future already
+                strikes = dict(chain.strikes)
             else:
-                # We try to collect 3 days for our chains fetching:
+                # We only report expirations in these months (the chain store has all of them):
                 #   - THIS month
                 #   - month of the Friday of this week
-                #   - If we are past the 15th of the month, also fetch NEXT month for next opex calculations.
+                #   - If we are past the 15th of the month, also NEXT month for next opex calculations.
                 #   - but, since this is a set, these will be reduced to either 1 or 2 total values
-                #     - the "check friday" technically isn't needed with the +20 day check, but it's logically
-                #       what is needed for the data we are trying to fetch too.
-                # Also this is a weird hack because IBKR has awful data feeds and these chain fetches take
-                # multiple minutes due to IBKR "pacing" rate limiting, while fetching chains from traider or
-                # polygon takes milliseconds for hundreds of chains.
-                # TODO: we should allow alternate chain lookup feeds or using a local cache populated from
-                #       external services.
-                useDates = set(
-                    [
-                        pendulum.date(d.year, d.month, 1)
-                        for d in [
-                            now,
-                            pendulum.parse("friday", strict=False),
-                            (now + datetime.timedelta(days=20)),
-                        ]
+                useDates = {
+                    f"{d.year}{d.month:02}"
+                    for d in [
+                        now,
+                        pendulum.parse("friday", strict=False),
+                        (now + datetime.timedelta(days=20)),
                     ]
-                )
-
-            # this request takes between 1 second and 60 seconds depending on ???
-            # does IBKR rate limit this endpoint? sometimes the same request
-            # takes 1-5 seconds, other times it takes 45-65 seconds.
-            # Maybe it's rate limited to one "big" call per minute?
-            # (UPDATE: yeah, the docs say:
-            #  "due to the potentially high amount of data resulting from such
-            #   queries this request is subject to pacing. Although a request such
-            #   as the above one will be answered immediately, a similar subsequent
-            #   one will be kept on hold for one minute.")
-            # So this endpoint is a jerk. You may need to rely on an external data
-            # provider if you want to gather full chains of multiple underlyings
-            # without waiting 1 minute per symbol.
-            # Depending on what you ask for with the contract, it can return between
-            # one row (one date+strike), dozens of rows (all strikes for a date),
-            # or thousands of rows (all strikes at all future dates).
-            strikes: dict[str, list[float]] = defaultdict(list)
-            got[symbol] = strikes
-
-            for d in sorted(useDates):
-                if symbol.startswith("/"):
-                    # Futures use future expiration
-                    contractExact.lastTradeDateOrContractMonth = FUT_EXP
-                else:
-                    contractExact.lastTradeDateOrContractMonth = f"{d.year}{d.month:02}"
-
-                logger.info(
-                    "[{}{}] Fetching strikes...",
-                    symbol,
-                    contractExact.lastTradeDateOrContractMonth,
-                )
-
-                # TODO: replace with reqSecDefOptParams()?
-                try:
-                    # long timeout here because these get delayed by "pacing backoff" API limits sometimes.
-                    chainsExact = await asyncio.wait_for(
-                        self.ib.reqContractDetailsAsync(contractExact), timeout=180
-                    )
-                except:
-                    logger.error(
-                        "[{}{}] Timeout while fetching contract details...",
-                        symbol,
-                        contractExact.lastTradeDateOrContractMonth,
-                    )
-                    continue
-
-                # logger.info("Full result: {}", chainsExact)
-
-                # group strike results by date
-                logger.info(
-                    "[{}{}] Populating strikes...",
-                    symbol,
-                    contractExact.lastTradeDateOrContractMonth,
-                )
-
-                for d in sorted(
-                    chainsExact, key=lambda k: k.contract.lastTradeDateOrContractMonth
-                ):
-                    strikes[d.contract.lastTradeDateOrContractMonth].append(
-                        d.contract.strike
-                    )
-
-            # cleanup the results because they were received in an
-            # arbitrary order, but we want them sorted for bisecting
-            # and just nice viewing.
-            for k, v in strikes.items():
-                assert k
-                assert v
-                # also reduce to a set first to drop all the duplicate
-                # call/put strikes.
-                strikes[k] = sorted(set(v))
-
-            # logger.info("Saving into {}", cacheKey)
+                }
 
-            # expire strike caches at the next 1615 available
-            # TODO: remove date() from cache key and only rely on .expire() instead?
-            # compare now.time() against pendulum.Time(16, 15, 0)
-            self.cache.set(cacheKey, strikes, expire=86400)
+                strikes = {d: v for d, v in chain.strikes.items() if d[:6] in useDates}
 
-            logger.info("Strikes: {}", pp.pformat(strikes))
+            got[symbol] = strikes
 
-            if False:
-                df = pd.DataFrame(chainsExact)
-                printFrame(df)
+            # don't print already loaded chains by default because this pollutes `Fast` output,
+            # but if the last symbol is "preview" then do show it...
+            if fetched or IS_PREVIEW:
+                logger.info("[{}] Strikes: {}", symbol, pp.pformat(strikes))
 
         return got
 
@@ -5429,7 +5033,7 @@ class IOpQuoteLoadSnapshot(IOp):
             # snapshots are always saved with exact Contract objects, so we can just restore them directly
             cs = cons.get("contracts", [])
             for c in cs:
-                self.state.addQuoteFromContract(c)
+                await self.state.addQuoteFromContractPaced(c)
 
             logger.info("Restored {} quotes from snapshot", len(cs))
         except:
@@ -5505,6 +5109,259 @@ class IOpQuoteList(IOp):
             logger.info("[{}] Members: {}", group, pp.pformat(found))
 
 
+@dataclass
+class IOpQuoteLines(IOp):
+    """Show market data line usage against the line budget (optionally setting a new budget)"""
+
+    def argmap(self):
+        return [
+            DArg(
+                "*budget",
+                convert=lambda x: int(x[0]) if x else None,
+                desc="optional new market data line budget",
+            )
+        ]
+
+    async def run(self):
+        lines = self.state.lines
+        if self.budget:
+            lines.budget = self.budget
+
+        logger.info("Lines: {}", pp.pformat(lines.report()))
+
+        # least recently viewed first, so these are the next quotes to go if we run out of lines
+        for line in lines.evictable()[:10]:
+            logger.info(
+                "[{}] Evictable (last viewed {:,.0f} seconds ago)",
+                line.key,
+                time.monotonic() - line.viewed,
+            )
+
+
+@dataclass
+class IOpPacing(IOp):
+    """Show outbound request budgets, queue depth, and wait times by request class"""
+
+    def argmap(self):
+        return []
+
+    async def run(self):
+        for kind, row in self.state.pacer.report().items():
+            logger.info(
+                "[{}] sent {:,.0f} :: queued {} :: waited {} (avg {:,.3f} s, max {:,.3f} s) :: tokens {}",
+                kind,
+                row["sent"],
+                row["queued"],
+                row["waited"],
+                row["waitAvg"],
+                row["waitMax"],
+                f"{row['tokens']:,.2f}" if "tokens" in row else "-",
+            )
+
+
+@dataclass
+class IOpProfile(IOp):
+    """Event loop lag report and sampling profiler.
+
+    prof [lag]            show loop lag histogram, handler timings, and recent slow callbacks
+    prof start [ms]       start sampling the event loop stack (every ICLI_PROF_INTERVAL by default)
+    prof stop [path]      stop sampling, write collapsed stacks (for flamegraphs), and show top frames
+    prof dump [path]      write collapsed stacks collected so far
+    prof top [count]      show frames with the most samples
+    prof reset            reset lag and handler statistics"""
+
+    def argmap(self):
+        return [
+            DArg(
+                "*args",
+                desc="lag, start [ms], stop [path], dump [path], top [count], or reset",
+            )
+        ]
+
+    async def run(self):
+        cmd, *rest = self.args or ["lag"]
+        arg = rest[0] if rest else None
+        profiler = self.state.profiler
+        monitor = self.state.loopMonitor
+
+        match cmd.lower():
+            case "lag":
+                self.lag()
+            case "start":
+                if profiler.running:
+                    logger.warning("[prof] Profiler already running")
+                    return
+
+                profiler.start(float(arg) / 1000 if arg else None)
+                logger.info(
+                    "[prof] Sampling every {:,.1f} ms", profiler.interval * 1000
+                )
+            case "stop":
+                profiler.stop()
+                self.dump(arg)
+                self.top(20)
+            case "dump":
+                self.dump(arg)
+            case "top":
+                self.top(int(arg) if arg else 20)
+            case "reset":
+                monitor.reset()
+                logger.info("[prof] Lag statistics reset")
+            case _:
+                logger.error("[prof] Unknown command: {}", cmd)
+
+    def dump(self, path: str | None) -> None:
+        profiler = self.state.profiler
+        if not profiler.samples:
+            logger.warning("[prof] No samples collected")
+            return
+
+        written = profiler.dump(path)
+        logger.info(
+            "[prof] Wrote {:,} samples ({:,} unique stacks) to {} (flamegraph.pl or speedscope input)",
+            profiler.samples,
+            len(profiler.stacks),
+            written,
+        )
+
+    def top(self, count: int) -> None:
+        profiler = self.state.profiler
+        samples = profiler.samples or 1
+        for name, own, total in profiler.top(count):
+            logger.info(
+                "[prof] {:>6.1%} own {:>6.1%} total :: {}",
+                own / samples,
+                total / samples,
+                name,
+            )
+
+    def lag(self) -> None:
+        report = self.state.loopMonitor.report()
+        lag = report["lag"]
+        logger.info(
+            "[lag] {:,} checks :: mean {:,.2f} ms :: p50 {:,.2f} ms :: p99 {:,.2f} ms :: max {:,.2f} ms",
+            lag.count,
+            lag.mean,
+            lag.quantile(0.5),
+            lag.quantile(0.99),
+            lag.max,
+        )
+
+        for label, count in lag.rows():
+            logger.info("[lag] {:>12}: {:,}", label, count)
+
+        for name, stats in report["handlers"]:
+            if stats.calls:
+                logger.info(
+                    "[handler] {} :: {:,} calls :: avg {:,.3f} ms :: max {:,.2f} ms :: slow {:,}",
+                    name,
+                    stats.calls,
+                    stats.total / stats.calls * 1000,
+                    stats.max * 1000,
+                    stats.slow,
+                )
+
+        for name, stats in report["callbacks"]:
+            logger.info(
+                "[slow] {} :: {:,} times :: total {:,.1f} ms :: max {:,.1f} ms",
+                name,
+                stats.calls,
+                stats.total * 1000,
+                stats.max * 1000,
+            )
+
+        for when, name, took, inner in report["recent"][-10:]:
+            logger.info(
+                "[slow] {} {} :: {:,.1f} ms{}",
+                pendulum.from_timestamp(when, tz="US/Eastern").format("HH:mm:ss"),
+                name,
+                took * 1000,
+                f" ({inner})" if inner else "",
+            )
+
+
+@dataclass
+class IOpLatency(IOp):
+    """Show order lifecycle latencies by stage, order type, secType, and exchange.
+
+    Shows the current session by default; :YYYY-MM-DD shows a saved session, :<N> merges
+    the last N saved sessions, and :ALL merges every saved session. Any other words filter
+    rows by stage, order type (substring), secType, or exchange (like: latency firstFill OPT AF)."""
+
+    def argmap(self):
+        return [
+            DArg(
+                "*filters",
+                desc="Optional :session keywords and stage/order type/secType/exchange filters",
+                convert=lambda x: [f.upper() for f in x],
+            )
+        ]
+
+    async def run(self):
+        latency = self.state.latency
+        filters = []
+        use: list[str] | None = None
+        for f in self.filters:
+            if f == ":ALL":
+                use = sessions(latency.directory)
+            elif m := re.fullmatch(r":(\d+)", f):
+                use = sessions(latency.directory)[-int(m.group(1)) :]
+            elif f.startswith(":"):
+                use = [f[1:]]
+            else:
+                filters.append(f)
+
+        # the current session may not be saved yet
+        latency.save()
+
+        try:
+            histograms = latency.merged(use)
+        except FileNotFoundError as e:
+            logger.error("No saved latency session: {}", e.filename)
+            return
+
+        rows = []
+        for (stage, orderType, secType, exchange), h in histograms.items():
+            if filters and not all(
+                f in {stage.upper(), secType, exchange}
+                or f in orderType
+                # order type shorthand like AF or MID
+                or ALGOMAP.get(f) == orderType
+                for f in filters
+            ):
+                continue
+
+            rows.append(
+                dict(
+                    orderType=orderType,
+                    secType=secType,
+                    exchange=exchange,
+                    stage=stage,
+                    count=h.count,
+                    mean=h.mean,
+                    p50=h.percentile(50),
+                    p90=h.percentile(90),
+                    p99=h.percentile(99),
+                    max=h.max / 1000,
+                )
+            )
+
+        if not rows:
+            logger.info("No order latencies recorded for: {}", filters or "session")
+            return
+
+        df = pd.DataFrame(rows)
+        df["stage"] = pd.Categorical(df["stage"], STAGES, ordered=True)
+        df = df.sort_values(["orderType", "secType", "exchange", "stage"])
+        for column in ("mean", "p50", "p90", "p99", "max"):
+            df[column] = df[column].map(lambda ms: f"{ms:,.1f}")
+
+        printFrame(
+            df.set_index(["orderType", "secType", "exchange", "stage"]),
+            f"Order Latency (ms) :: {', '.join(use) if use else latency.session}",
+        )
+
+
 @dataclass
 class IOpQuoteGroupDelete(IOp):
     """Delete an entire quote group"""
@@ -5556,9 +5413,15 @@ OP_MAP = {
         "ls": IOpPositions,
         "orders": IOpOrders,
         "executions": IOpExecutions,
+        "exposure": IOpExposure,
     },
     "Connection": {
         "rid": IOpRID,
+        "pacing": IOpPacing,
+    },
+    "Diagnostics": {
+        "prof": IOpProfile,
+        "latency": IOpLatency,
     },
     "Utilities": {
         "rcheck": None,
@@ -5597,6 +5460,7 @@ OP_MAP = {
         "qclean": IOpQuoteClean,
         "qlist": IOpQuoteList,
         "qsnapshot": IOpQuoteSaveClientSnapshot,
+        "qlines": IOpQuoteLines,
         "qloadsnapshot": IOpQuoteLoadSnapshot,
     },
 }
@@ -0,0 +1,340 @@
+"""Order lifecycle latency histograms.
+
+Every order placed by this client is timestamped from the moment it is sent (the local
+placeOrder, seen as newOrderEvent) through each transition the gateway reports back:
+
+    ack            first gateway response for the order (any status besides PendingSubmit)
+    PreSubmitted   first PreSubmitted status
+    Submitted      first Submitted status (working at the exchange)
+    fill           every execution
+    firstFill      first execution
+    Filled         order completely filled
+    modify         modification sent (chase steps, 'modify') until the gateway confirms it
+    cancel         cancel request until the Cancelled status
+
+Everything except modify and cancel is measured from the original submit. Latencies are
+aggregated per (stage, order type, secType, exchange) into HDR-style histograms: log-linear
+buckets with 32 linear sub-buckets per power of two of microseconds, so any percentile is
+within about 3% of the exact value while each histogram only stores bucket counts.
+
+Histograms are saved per trading session (one JSON file per session date, reloaded if the
+app restarts during the same session) so algo and chase choices can be compared across
+days with 'latency'.
+"""
+
+import datetime
+import math
+import os
+import pathlib
+import time
+
+from collections.abc import Hashable, Iterable
+from dataclasses import dataclass, field
+from typing import Any, Final
+
+import orjson
+import pendulum
+
+from ib_async import Bag, Fill, Order, Trade
+from loguru import logger
+
+from icli.openorders import orderKey
+
+ICLI_LATENCY_DIR: Final = str(os.getenv("ICLI_LATENCY_DIR", "./latency"))
+
+# linear sub-buckets per power of two (log2 of SUB_BUCKETS is SUB_BITS)
+SUB_BITS: Final = 5
+SUB_BUCKETS: Final = 1 << SUB_BITS
+
+STAGES: Final = (
+    "ack",
+    "PreSubmitted",
+    "Submitted",
+    "fill",
+    "firstFill",
+    "Filled",
+    "modify",
+    "cancel",
+)
+
+# order timelines kept for late executions after their order is done
+TIMELINES_MAX: Final = 5_000
+
+# seconds between saves triggered by finished orders (the app also saves when stopping)
+SAVE_INTERVAL: Final = 60.0
+
+PENDING: Final = {"PendingSubmit", "ApiPending"}
+
+ADAPTIVE_PRIORITY: Final = dict(Urgent="FAST", Normal="NORMAL", Patient="SLOW")
+
+# (stage, order type, secType, exchange)
+LatencyKey = tuple[str, str, str, str]
+
+
+def bucketIndex(us: int) -> int:
+    shift = max(0, us.bit_length() - 1 - SUB_BITS)
+    return (shift << SUB_BITS) + (us >> shift)
+
+
+def bucketValue(index: int) -> int:
+    """Highest value (microseconds) counted in bucket 'index'."""
+    shift = max(0, (index >> SUB_BITS) - 1)
+    sub = index - (shift << SUB_BITS)
+    return ((sub + 1) << shift) - 1
+
+
+def orderTypeName(order: Order) -> str:
+    """Order type as placed, with adaptive algos named like the order type menu ('LMT + ADAPTIVE + FAST')."""
+    if order.algoStrategy == "Adaptive":
+        priority = next(
+            (p.value for p in order.algoParams if p.tag == "adaptivePriority"), ""
+        )
+        priority = ADAPTIVE_PRIORITY.get(priority, priority)
+        return f"{order.orderType} + ADAPTIVE + {priority}"
+
+    if order.algoStrategy:
+        return f"{order.orderType} + {order.algoStrategy.upper()}"
+
+    return order.orderType
+
+
+@dataclass(slots=True)
+class LatencyHistogram:
+    # bucket index -> count
+    counts: dict[int, int] = field(default_factory=dict)
+    count: int = 0
+
+    # microseconds
+    total: int = 0
+    min: int = 0
+    max: int = 0
+
+    def record(self, seconds: float) -> None:
+        us = max(0, round(seconds * 1e6))
+        index = bucketIndex(us)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.min = us if not self.count else min(self.min, us)
+        self.max = max(self.max, us)
+        self.count += 1
+        self.total += us
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+
+        self.min = other.min if not self.count else min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.count += other.count
+        self.total += other.total
+
+    @property
+    def mean(self) -> float:
+        """Mean in milliseconds."""
+        return self.total / self.count / 1000 if self.count else math.nan
+
+    def percentile(self, q: float) -> float:
+        """Value at percentile 'q' (0 to 100) in milliseconds."""
+        if not self.count:
+            return math.nan
+
+        want = max(1, math.ceil(q / 100 * self.count))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= want:
+                return min(bucketValue(index), self.max) / 1000
+
+        return self.max / 1000
+
+    def asdict(self) -> dict[str, Any]:
+        return dict(
+            counts={str(k): v for k, v in self.counts.items()},
+            count=self.count,
+            total=self.total,
+            min=self.min,
+            max=self.max,
+        )
+
+    @classmethod
+    def fromdict(cls, found: dict[str, Any]) -> "LatencyHistogram":
+        return cls(
+            {int(k): v for k, v in found["counts"].items()},
+            found["count"],
+            found["total"],
+            found["min"],
+            found["max"],
+        )
+
+
+@dataclass(slots=True)
+class OrderTimeline:
+    # (order type, secType, exchange)
+    label: tuple[str, str, str]
+
+    # monotonic times
+    submitted: float
+    modified: float = math.nan
+    cancelled: float = math.nan
+
+    # stages already recorded (each stage besides 'fill' counts once per order)
+    seen: set[str] = field(default_factory=set)
+
+
+def sessionPath(
+    session: str, directory: str | pathlib.Path = ICLI_LATENCY_DIR
+) -> pathlib.Path:
+    return pathlib.Path(directory) / f"latency-{session}.json"
+
+
+def loadSession(path: pathlib.Path) -> dict[LatencyKey, LatencyHistogram]:
+    found = orjson.loads(path.read_bytes())
+    return {
+        tuple(key.split("|")): LatencyHistogram.fromdict(h)  # type: ignore
+        for key, h in found["histograms"].items()
+    }
+
+
+def sessions(directory: str | pathlib.Path = ICLI_LATENCY_DIR) -> list[str]:
+    """Return saved session dates, oldest first."""
+    return sorted(
+        p.stem.removeprefix("latency-")
+        for p in pathlib.Path(directory).glob("latency-*.json")
+    )
+
+
+@dataclass
+class OrderLatency:
+    directory: pathlib.Path = field(
+        default_factory=lambda: pathlib.Path(ICLI_LATENCY_DIR)
+    )
+
+    # session date these histograms are saved as
+    session: str = field(
+        default_factory=lambda: pendulum.now("US/Eastern").format("YYYY-MM-DD")
+    )
+
+    histograms: dict[LatencyKey, LatencyHistogram] = field(default_factory=dict)
+    timelines: dict[Hashable, OrderTimeline] = field(default_factory=dict)
+
+    saved: float = 0
+    dirty: bool = False
+
+    def __post_init__(self) -> None:
+        # continue the session if the app restarted during it
+        path = self.path
+        if path.exists():
+            try:
+                self.histograms = loadSession(path)
+            except Exception as e:
+                logger.warning("[latency] Ignoring unreadable {}: {}", path, e)
+
+    @property
+    def path(self) -> pathlib.Path:
+        return sessionPath(self.session, self.directory)
+
+    def record(self, timeline: OrderTimeline, stage: str, since: float) -> None:
+        key = (stage, *timeline.label)
+        if (found := self.histograms.get(key)) is None:
+            found = self.histograms[key] = LatencyHistogram()
+
+        found.record(time.monotonic() - since)
+        self.dirty = True
+
+    def once(self, timeline: OrderTimeline, stage: str) -> None:
+        if stage not in timeline.seen:
+            timeline.seen.add(stage)
+            self.record(timeline, stage, timeline.submitted)
+
+    def newOrder(self, trade: Trade) -> None:
+        """newOrderEvent handler (the order was just sent)."""
+        contract = trade.contract
+        exchange = contract.exchange or ("SMART" if isinstance(contract, Bag) else "")
+        self.timelines[orderKey(trade.order)] = OrderTimeline(
+            (orderTypeName(trade.order), contract.secType, exchange), time.monotonic()
+        )
+
+        # drop the oldest timelines (insertion ordered) once there are too many
+        while len(self.timelines) > TIMELINES_MAX:
+            del self.timelines[next(iter(self.timelines))]
+
+    def modified(self, trade: Trade) -> None:
+        """orderModifyEvent handler (a modification was just sent)."""
+        if timeline := self.timelines.get(orderKey(trade.order)):
+            timeline.modified = time.monotonic()
+
+    def cancelRequested(self, trade: Trade) -> None:
+        """cancelOrderEvent handler (a cancel was just sent)."""
+        if timeline := self.timelines.get(orderKey(trade.order)):
+            timeline.cancelled = time.monotonic()
+
+    def status(self, trade: Trade) -> None:
+        """orderStatusEvent and openOrderEvent handler."""
+        if not (timeline := self.timelines.get(orderKey(trade.order))):
+            return
+
+        status = trade.orderStatus.status
+        if status in PENDING or status == "PendingCancel":
+            return
+
+        self.once(timeline, "ack")
+
+        if timeline.modified == timeline.modified:
+            self.record(timeline, "modify", timeline.modified)
+            timeline.modified = math.nan
+
+        if status in {"PreSubmitted", "Submitted", "Filled"}:
+            self.once(timeline, status)
+        elif status == "Cancelled" and timeline.cancelled == timeline.cancelled:
+            self.record(timeline, "cancel", timeline.cancelled)
+            timeline.cancelled = math.nan
+
+        if trade.isDone() and time.monotonic() - self.saved >= SAVE_INTERVAL:
+            self.save()
+
+    def execution(self, trade: Trade, fill: Fill) -> None:
+        """execDetailsEvent handler."""
+        if not (timeline := self.timelines.get(orderKey(trade.order))):
+            return
+
+        self.record(timeline, "fill", timeline.submitted)
+        self.once(timeline, "firstFill")
+
+    def save(self) -> None:
+        self.saved = time.monotonic()
+        if not self.dirty:
+            return
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.path.write_bytes(
+            orjson.dumps(
+                dict(
+                    session=self.session,
+                    saved=datetime.datetime.now().isoformat(timespec="seconds"),
+                    histograms={
+                        "|".join(key): h.asdict() for key, h in self.histograms.items()
+                    },
+                ),
+                option=orjson.OPT_INDENT_2,
+            )
+        )
+        self.dirty = False
+
+    def merged(
+        self, sessionNames: Iterable[str] | None = None
+    ) -> dict[LatencyKey, LatencyHistogram]:
+        """Histograms for saved sessions merged together (the current session if None)."""
+        if sessionNames is None:
+            return self.histograms
+
+        merged: dict[LatencyKey, LatencyHistogram] = {}
+        for session in sessionNames:
+            found = (
+                self.histograms
+                if session == self.session
+                else loadSession(sessionPath(session, self.directory))
+            )
+
+            for key, h in found.items():
+                merged.setdefault(key, LatencyHistogram()).merge(h)
+
+        return merged
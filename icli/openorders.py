@@ -0,0 +1,138 @@
+"""Open order index.
+
+Working orders are indexed as order events arrive instead of scanning openTrades() for
+every position: single contracts by (conId, action) and spreads by (frozen set of leg
+conIds, action). Index entries are the live Trade objects, so remaining quantity and
+limit price are always current when read.
+
+Orders leave the index once they are done. Inactive orders (rejected or waiting for a
+session to open) stay indexed but are counted separately so the toolbar can show only
+orders actually working.
+"""
+
+from dataclasses import dataclass, field
+from typing import Hashable, Iterable
+
+from ib_async import Bag, Contract, Order, OrderStatus, Trade
+
+# (conId or frozenset of leg conIds, "BUY" or "SELL")
+OrderIndexKey = tuple[int | frozenset[int], str]
+
+
+def orderKey(order: Order) -> Hashable:
+    """Same identity ib_async uses for trades (orders from other clients have no order id)."""
+    return order.permId if order.orderId <= 0 else (order.clientId, order.orderId)
+
+
+def contractKey(contract: Contract) -> int | frozenset[int]:
+    if isinstance(contract, Bag):
+        return frozenset(leg.conId for leg in contract.comboLegs)
+
+    return contract.conId
+
+
+def opposite(positionSize: float) -> str:
+    """Order action closing a position of 'positionSize'."""
+    return "SELL" if positionSize > 0 else "BUY"
+
+
+@dataclass
+class OpenOrderIndex:
+    trades: dict[Hashable, Trade] = field(default_factory=dict)
+
+    # (contract key, action) -> order keys
+    byContract: dict[OrderIndexKey, set[Hashable]] = field(default_factory=dict)
+
+    # order key -> index key it was filed under
+    filed: dict[Hashable, OrderIndexKey] = field(default_factory=dict)
+
+    inactive: set[Hashable] = field(default_factory=set)
+
+    def __len__(self) -> int:
+        return len(self.trades)
+
+    @property
+    def working(self) -> int:
+        """Open orders excluding Inactive orders."""
+        return len(self.trades) - len(self.inactive)
+
+    def update(self, trade: Trade) -> None:
+        """orderStatusEvent / openOrderEvent handler."""
+        key = orderKey(trade.order)
+        status = trade.orderStatus.status
+
+        if status in OrderStatus.DoneStates:
+            self.remove(key)
+            return
+
+        indexKey = (contractKey(trade.contract), trade.order.action)
+        if (previous := self.filed.get(key)) != indexKey:
+            if previous:
+                self.unfile(key, previous)
+
+            self.byContract.setdefault(indexKey, set()).add(key)
+            self.filed[key] = indexKey
+
+        self.trades[key] = trade
+
+        if status == "Inactive":
+            self.inactive.add(key)
+        else:
+            self.inactive.discard(key)
+
+    def unfile(self, key: Hashable, indexKey: OrderIndexKey) -> None:
+        if (found := self.byContract.get(indexKey)) is not None:
+            found.discard(key)
+            if not found:
+                del self.byContract[indexKey]
+
+    def remove(self, key: Hashable) -> None:
+        self.trades.pop(key, None)
+        self.inactive.discard(key)
+        if (indexKey := self.filed.pop(key, None)) is not None:
+            self.unfile(key, indexKey)
+
+    def reset(self, trades: Iterable[Trade]) -> None:
+        """Rebuild from a full openTrades() snapshot (after connecting)."""
+        self.trades.clear()
+        self.byContract.clear()
+        self.filed.clear()
+        self.inactive.clear()
+
+        for trade in trades:
+            self.update(trade)
+
+    def find(
+        self, contract: Contract | frozenset[int], action: str | None = None
+    ) -> list[Trade]:
+        """Return open orders for a contract (or spread leg set), optionally only one action."""
+        key = contract if isinstance(contract, frozenset) else contractKey(contract)
+
+        found: list[Trade] = []
+        for act in (action,) if action else ("BUY", "SELL"):
+            found.extend(self.trades[k] for k in self.byContract.get((key, act), ()))
+
+        return found
+
+    def exits(self, contract: Contract, positionSize: float) -> list[Trade]:
+        """Return working orders closing a position of 'positionSize' in 'contract'."""
+        return [
+            t
+            for t in self.find(contract, opposite(positionSize))
+            if t.orderStatus.status != "Inactive"
+        ]
+
+    def exiting(self, contract: Contract, positionSize: float) -> float:
+        """Return total remaining quantity of working orders closing the position."""
+        return sum(t.orderStatus.remaining for t in self.exits(contract, positionSize))
+
+    def conIds(self) -> set[int]:
+        """Return contract ids (including spread legs) with open orders."""
+        found: set[int] = set()
+        for key, _action in self.byContract:
+            if isinstance(key, frozenset):
+                found |= key
+            else:
+                found.add(key)
+
+        return found
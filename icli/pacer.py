@@ -0,0 +1,296 @@
+"""Outbound request pacing.
+
+IBKR rejects (or silently delays) clients sending more than 50 messages per second, and
+historical data and contract detail requests have their own, much slower, pacing rules.
+Every request we send to the gateway is accounted for by RequestPacer so bulk operations
+can run at the fastest safe rate instead of sleeping for guessed amounts of time.
+
+Each request class has its own token bucket, and every class also spends from the shared
+"api" bucket for the global message limit. Async callers `await wait(kind)` before sending,
+and waiters are granted in priority order (orders before market data before bulk lookups),
+so a large quote restore never holds up an order. Sync callers which can't wait (placing
+orders from event handlers, subscribing from sync paths) `spend()` tokens after the fact,
+which makes any queued requests wait correspondingly longer.
+"""
+
+import asyncio
+import os
+import time
+
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Final, Hashable
+
+# messages per second across all requests (IBKR's limit is 50, minus headroom for cancels and
+# requests ib_async sends on its own)
+ICLI_PACE_API: Final = float(os.getenv("ICLI_PACE_API", 45))
+
+# order placements, modifications, and cancels per second
+ICLI_PACE_ORDERS: Final = float(os.getenv("ICLI_PACE_ORDERS", 20))
+
+# contract detail requests per second (each contract in a qualification batch is one request)
+ICLI_PACE_DETAILS: Final = float(os.getenv("ICLI_PACE_DETAILS", 10))
+
+# historical data requests per 10 minutes (IBKR allows 60)
+ICLI_PACE_HISTORICAL: Final = float(os.getenv("ICLI_PACE_HISTORICAL", 60))
+
+# IBKR rejects identical historical requests made within 15 seconds of each other
+HISTORICAL_IDENTICAL_GAP: Final = 15.0
+
+# request class -> (tokens per second, bucket capacity)
+PACE_LIMITS: Final = {
+    "api": (ICLI_PACE_API, ICLI_PACE_API),
+    "orders": (ICLI_PACE_ORDERS, ICLI_PACE_ORDERS),
+    "details": (ICLI_PACE_DETAILS, ICLI_PACE_DETAILS * 5),
+    "historical": (ICLI_PACE_HISTORICAL / 600, ICLI_PACE_HISTORICAL),
+}
+
+# request class -> default priority (lower runs first)
+PACE_PRIORITY: Final = {
+    "orders": 0,
+    "api": 1,
+    "marketdata": 1,
+    "details": 2,
+    "historical": 2,
+}
+
+
+@dataclass(slots=True)
+class TokenBucket:
+    rate: float
+    capacity: float
+    tokens: float = 0
+    updated: float = field(default_factory=time.monotonic)
+
+    def __post_init__(self) -> None:
+        self.tokens = self.capacity
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, cost: float, now: float) -> float:
+        """Seconds until 'cost' tokens are available (requests larger than the bucket only need a full bucket)."""
+        self.refill(now)
+        need = min(cost, self.capacity) - self.tokens
+        return need / self.rate if need > 0 else 0
+
+    def spend(self, cost: float, now: float) -> None:
+        # can go negative for sync sends and oversized requests, which delays everything after them
+        self.refill(now)
+        self.tokens -= cost
+
+
+@dataclass(slots=True)
+class PaceStats:
+    sent: float = 0
+
+    # requests which had to queue, and how long they waited
+    waited: int = 0
+    waitTotal: float = 0
+    waitMax: float = 0
+
+
+@dataclass(slots=True, order=True)
+class Waiter:
+    priority: int
+    seq: int
+    kind: str = field(compare=False)
+    cost: float = field(compare=False)
+    key: Hashable | None = field(compare=False)
+    prepay: bool = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    queued: float = field(compare=False, default_factory=time.monotonic)
+
+
+@dataclass
+class RequestPacer:
+    buckets: dict[str, TokenBucket] = field(
+        default_factory=lambda: {
+            kind: TokenBucket(rate, capacity)
+            for kind, (rate, capacity) in PACE_LIMITS.items()
+        }
+    )
+
+    stats: dict[str, PaceStats] = field(default_factory=dict)
+
+    waiting: list[Waiter] = field(default_factory=list)
+    seq: int = 0
+
+    # tokens already spent by ready() for sync sends which haven't happened yet
+    prepaid: defaultdict[str, float] = field(default_factory=lambda: defaultdict(float))
+
+    # historical request key -> when it was last sent
+    identical: dict[Hashable, float] = field(default_factory=dict)
+
+    wake: asyncio.Event = field(default_factory=asyncio.Event)
+    task: asyncio.Task | None = None
+
+    def delay(
+        self, kind: str, cost: float = 1, key: Hashable | None = None
+    ) -> tuple[float, float]:
+        """Return (class delay, global api delay) in seconds before 'cost' tokens of 'kind' can be sent."""
+        now = time.monotonic()
+        classDelay = 0.0
+        if kind != "api" and (bucket := self.buckets.get(kind)):
+            classDelay = bucket.delay(cost, now)
+
+        if key is not None and (last := self.identical.get(key)):
+            classDelay = max(classDelay, last + HISTORICAL_IDENTICAL_GAP - now)
+
+        return classDelay, self.buckets["api"].delay(cost, now)
+
+    def spend(self, kind: str, cost: float = 1, key: Hashable | None = None) -> None:
+        """Account for 'cost' messages of 'kind' being sent right now."""
+        if self.prepaid[kind] >= cost:
+            self.prepaid[kind] -= cost
+            return
+
+        now = time.monotonic()
+        if kind != "api" and (bucket := self.buckets.get(kind)):
+            bucket.spend(cost, now)
+
+        self.buckets["api"].spend(cost, now)
+
+        if key is not None:
+            self.identical[key] = now
+
+        self.stats.setdefault(kind, PaceStats()).sent += cost
+
+    def take(self, kind: str, cost: float = 1) -> bool:
+        """Spend tokens if they are available right now (and nothing more important is queued)."""
+        priority = PACE_PRIORITY.get(kind, 1)
+        if any(w.priority <= priority for w in self.waiting):
+            return False
+
+        if max(self.delay(kind, cost)) > 0:
+            return False
+
+        self.spend(kind, cost)
+        return True
+
+    async def wait(
+        self,
+        kind: str,
+        cost: float = 1,
+        priority: int | None = None,
+        key: Hashable | None = None,
+    ) -> None:
+        """Wait until 'cost' messages of 'kind' can be sent, then spend them."""
+        await self.queue(kind, cost, priority, key, prepay=False)
+
+    async def ready(
+        self, kind: str, cost: float = 1, priority: int | None = None
+    ) -> None:
+        """Wait like wait(), but for a sync send which calls spend() itself immediately after."""
+        await self.queue(kind, cost, priority, None, prepay=True)
+
+    async def queue(
+        self,
+        kind: str,
+        cost: float,
+        priority: int | None,
+        key: Hashable | None,
+        prepay: bool,
+    ) -> None:
+        if priority is None:
+            priority = PACE_PRIORITY.get(kind, 1)
+
+        # fast path: nothing queued and tokens available
+        if not self.waiting and max(self.delay(kind, cost, key)) <= 0:
+            self.grant(kind, cost, key, prepay)
+            return
+
+        self.seq += 1
+        waiter = Waiter(
+            priority,
+            self.seq,
+            kind,
+            cost,
+            key,
+            prepay,
+            asyncio.get_running_loop().create_future(),
+        )
+        self.waiting.append(waiter)
+        self.wake.set()
+
+        if not self.task or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+        try:
+            await waiter.future
+        finally:
+            if waiter in self.waiting:
+                self.waiting.remove(waiter)
+
+        waited = time.monotonic() - waiter.queued
+        stats = self.stats.setdefault(kind, PaceStats())
+        stats.waited += 1
+        stats.waitTotal += waited
+        stats.waitMax = max(stats.waitMax, waited)
+
+    def grant(self, kind: str, cost: float, key: Hashable | None, prepay: bool) -> None:
+        self.spend(kind, cost, key)
+        if prepay:
+            self.prepaid[kind] += cost
+
+    async def run(self) -> None:
+        while self.waiting:
+            self.wake.clear()
+            sleep: float | None = None
+
+            for waiter in sorted(self.waiting):
+                if waiter.future.done():
+                    self.waiting.remove(waiter)
+                    continue
+
+                classDelay, apiDelay = self.delay(waiter.kind, waiter.cost, waiter.key)
+                if classDelay <= 0 and apiDelay <= 0:
+                    self.waiting.remove(waiter)
+                    self.grant(waiter.kind, waiter.cost, waiter.key, waiter.prepay)
+                    waiter.future.set_result(None)
+                    sleep = 0
+                    break
+
+                # waiting only on the shared api budget, so nothing behind us may use it first
+                if classDelay <= 0:
+                    sleep = apiDelay
+                    break
+
+                # blocked by its own class budget; lower priority classes can still go
+                sleep = classDelay if sleep is None else min(sleep, classDelay)
+
+            if sleep is None:
+                continue
+
+            if sleep > 0:
+                try:
+                    await asyncio.wait_for(self.wake.wait(), timeout=sleep)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                # let granted waiters send before granting more
+                await asyncio.sleep(0)
+
+    def report(self) -> dict[str, dict[str, float]]:
+        now = time.monotonic()
+        queued = Counter(w.kind for w in self.waiting)
+
+        found = {}
+        for kind in sorted(set(self.buckets) | set(self.stats) | set(queued)):
+            stats = self.stats.get(kind, PaceStats())
+            row = dict(
+                sent=stats.sent,
+                queued=queued[kind],
+                waited=stats.waited,
+                waitAvg=stats.waitTotal / stats.waited if stats.waited else 0,
+                waitMax=stats.waitMax,
+            )
+
+            if bucket := self.buckets.get(kind):
+                bucket.refill(now)
+                row["tokens"] = bucket.tokens
+
+            found[kind] = row
+
+        return found
@@ -0,0 +1,238 @@
+"""Indexed position book.
+
+Positions are kept current from updatePortfolioEvent (portfolio rows with market values),
+positionEvent (quantities, sent immediately when positions change), and our own fills
+(applied right away so strategies see a new quantity before IBKR reports it).
+
+Fills are only provisional: each is kept as a delta by execId on top of the quantity
+IBKR last reported, and the next position or portfolio event replaces them. IBKR may
+also report the new position before the execution, so a position change not yet
+explained by fills is remembered for POSITION_FILL_WINDOW seconds and absorbs the fills
+arriving after it instead of counting them twice.
+
+Every position is indexed by contract id, by quote name (localSymbol without spaces, the
+same as quote keys), by underlying symbol, and by trading class, so strategy and order
+paths look positions up directly instead of scanning the whole portfolio.
+"""
+
+import fnmatch
+import time
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Final, Iterable
+
+from ib_async import Contract, Fill, PortfolioItem, Position
+
+# seconds a reported position change waits for the fills which caused it
+POSITION_FILL_WINDOW: Final = 5.0
+
+
+def positionName(contract: Contract) -> str:
+    return contract.localSymbol.replace(" ", "")
+
+
+@dataclass
+class PositionBook:
+    # contract id -> latest portfolio row
+    rows: dict[int, PortfolioItem] = field(default_factory=dict)
+
+    # contract id -> current quantity (last reported quantity plus provisional fills)
+    quantities: dict[int, float] = field(default_factory=dict)
+
+    # contract id -> quantity from the last position event or portfolio row
+    reported: dict[int, float] = field(default_factory=dict)
+
+    # contract id -> execId -> signed fill quantity not reported by IBKR yet
+    provisional: dict[int, dict[str, float]] = field(default_factory=dict)
+
+    # contract id -> (reported change not explained by fills yet, when it was reported)
+    unexplained: dict[int, tuple[float, float]] = field(default_factory=dict)
+
+    # contract id -> contract for everything with a row or a quantity
+    contracts: dict[int, Contract] = field(default_factory=dict)
+
+    byName: dict[str, int] = field(default_factory=dict)
+    byUnderlying: defaultdict[str, set[int]] = field(
+        default_factory=lambda: defaultdict(set)
+    )
+    byTradingClass: defaultdict[str, set[int]] = field(
+        default_factory=lambda: defaultdict(set)
+    )
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.byName
+
+    def values(self) -> Iterable[PortfolioItem]:
+        return self.rows.values()
+
+    def index(self, contract: Contract) -> None:
+        conId = contract.conId
+        if conId in self.contracts:
+            return
+
+        self.contracts[conId] = contract
+        self.byName[positionName(contract)] = conId
+        self.byUnderlying[contract.symbol].add(conId)
+        if contract.tradingClass:
+            self.byTradingClass[contract.tradingClass].add(conId)
+
+    def unindex(self, conId: int) -> None:
+        """Forget contract once it has neither a portfolio row nor a quantity."""
+        if conId in self.rows or self.quantities.get(conId):
+            return
+
+        self.quantities.pop(conId, None)
+        if not (contract := self.contracts.pop(conId, None)):
+            return
+
+        self.byName.pop(positionName(contract), None)
+
+        for index, key in (
+            (self.byUnderlying, contract.symbol),
+            (self.byTradingClass, contract.tradingClass),
+        ):
+            if (found := index.get(key)) is not None:
+                found.discard(conId)
+                if not found:
+                    del index[key]
+
+    def settle(self, conId: int) -> float:
+        quantity = self.reported.get(conId, 0) + sum(
+            self.provisional.get(conId, {}).values()
+        )
+
+        if quantity:
+            self.quantities[conId] = quantity
+        else:
+            self.quantities.pop(conId, None)
+            self.unindex(conId)
+
+        return quantity
+
+    def report(self, contract: Contract, quantity: float) -> None:
+        """Replace provisional fills with a quantity reported by IBKR."""
+        conId = contract.conId
+        change = quantity - self.reported.get(conId, 0)
+
+        # fills seen before this report are included in it, so whatever they don't
+        # explain is from fills we haven't seen yet (or trades by other clients)
+        change -= sum(self.provisional.pop(conId, {}).values())
+        if change:
+            previous, _ = self.unexplained.get(conId, (0, 0))
+            self.unexplained[conId] = (previous + change, time.monotonic())
+
+        if quantity:
+            self.index(contract)
+            self.reported[conId] = quantity
+        else:
+            self.reported.pop(conId, None)
+
+        self.settle(conId)
+
+    def update(self, row: PortfolioItem) -> None:
+        """updatePortfolioEvent handler."""
+        conId = row.contract.conId
+        if row.position:
+            self.index(row.contract)
+            self.rows[conId] = row
+        else:
+            self.rows.pop(conId, None)
+
+        self.report(row.contract, row.position)
+
+    def position(self, pos: Position) -> None:
+        """positionEvent handler (arrives before the matching portfolio row)."""
+        self.report(pos.contract, pos.position)
+
+    def execution(self, fill: Fill) -> float:
+        """Apply one of our fills to the quantity right away; returns the new quantity."""
+        contract = fill.contract
+        conId = contract.conId
+        shares = fill.execution.shares
+        signed = shares if fill.execution.side == "BOT" else -shares
+
+        # the position may already be reported with this fill included
+        if found := self.unexplained.pop(conId, None):
+            change, when = found
+            if time.monotonic() - when <= POSITION_FILL_WINDOW and change * signed > 0:
+                absorbed = min(abs(change), abs(signed))
+                absorbed = absorbed if signed > 0 else -absorbed
+                signed -= absorbed
+                if change - absorbed:
+                    self.unexplained[conId] = (change - absorbed, when)
+
+        self.index(contract)
+        if signed:
+            self.provisional.setdefault(conId, {})[fill.execution.execId] = signed
+
+        return self.settle(conId)
+
+    def clear(self) -> None:
+        self.rows.clear()
+        self.quantities.clear()
+        self.reported.clear()
+        self.provisional.clear()
+        self.unexplained.clear()
+        self.contracts.clear()
+        self.byName.clear()
+        self.byUnderlying.clear()
+        self.byTradingClass.clear()
+
+    def get(self, name: str) -> PortfolioItem | None:
+        """Return portfolio row by quote name (localSymbol without spaces)."""
+        if (conId := self.byName.get(name)) is None:
+            return None
+
+        return self.rows.get(conId)
+
+    def quantity(self, name: str) -> float | None:
+        """Return current quantity by quote name (None if we have no position)."""
+        if (conId := self.byName.get(name)) is None:
+            return None
+
+        return self.quantities.get(conId)
+
+    def find(self, pattern: str) -> list[PortfolioItem]:
+        """Return portfolio rows with quote names matching 'pattern' (which may be a glob)."""
+        if not any(c in pattern for c in "*?["):
+            return [found] if (found := self.get(pattern)) else []
+
+        return [
+            self.rows[conId]
+            for name, conId in self.byName.items()
+            if conId in self.rows and fnmatch.fnmatch(name, pattern)
+        ]
+
+    def forUnderlying(self, symbol: str) -> list[PortfolioItem]:
+        return [
+            self.rows[conId]
+            for conId in self.byUnderlying.get(symbol, ())
+            if conId in self.rows
+        ]
+
+    def forTradingClass(self, tradingClass: str) -> list[PortfolioItem]:
+        return [
+            self.rows[conId]
+            for conId in self.byTradingClass.get(tradingClass, ())
+            if conId in self.rows
+        ]
+
+    def exposure(self) -> dict[str, dict[str, float]]:
+        """Return market value, unrealized PnL, and position count aggregated per underlying."""
+        found = {}
+        for symbol, conIds in self.byUnderlying.items():
+            rows = [self.rows[c] for c in conIds if c in self.rows]
+            if not rows:
+                continue
+
+            found[symbol] = dict(
+                marketValue=sum(r.marketValue for r in rows),
+                unrealizedPNL=sum(r.unrealizedPNL for r in rows),
+                positions=len(rows),
+            )
+
+        return found
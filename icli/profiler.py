@@ -0,0 +1,343 @@
+"""Event loop lag monitor and on-demand sampling profiler.
+
+Everything in icli runs on one event loop, so any slow callback (a toolbar render, a
+ticker batch, a pandas report, a logging sink) delays everything else. LoopMonitor runs
+all the time and measures that directly:
+
+  - scheduling lag: a timer re-arms itself every ICLI_LAG_INTERVAL seconds and records how
+    late it actually ran into a histogram (lag is exactly the time the loop was busy with
+    something else when the timer was due).
+  - slow callbacks: every loop callback is timed (one perf_counter pair per callback), and
+    callbacks slower than ICLI_LAG_SLOW are logged by name (task coroutine or function).
+  - handler timing: IB event handlers and the toolbar are attached through timed(), which
+    keeps per-handler call counts and durations and names the slowest handler inside a
+    slow callback (ib_async emits every event from the one socket callback), like
+    "pendingTickersEvent -> IBKRCmdlineApp.tickersUpdate".
+
+SamplingProfiler is started and stopped on demand ('prof start', 'prof stop'): a thread
+samples the event loop thread's Python stack every ICLI_PROF_INTERVAL seconds and counts
+identical stacks, which are written in collapsed-stack format ("frame;frame;frame count"
+per line) for flamegraph.pl, speedscope, or inferno.
+"""
+
+import asyncio
+import bisect
+import datetime
+import math
+import os
+import pathlib
+import sys
+import threading
+import time
+
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Final
+
+from loguru import logger
+
+# seconds between loop lag measurements
+ICLI_LAG_INTERVAL: Final = float(os.getenv("ICLI_LAG_INTERVAL", 0.1))
+
+# loop callbacks running at least this many seconds are logged as slow
+ICLI_LAG_SLOW: Final = float(os.getenv("ICLI_LAG_SLOW", 0.05))
+
+# seconds between stack samples while profiling
+ICLI_PROF_INTERVAL: Final = float(os.getenv("ICLI_PROF_INTERVAL", 0.005))
+
+# where profiles are written when no path is given
+ICLI_PROF_DIR: Final = str(os.getenv("ICLI_PROF_DIR", "./profiles"))
+
+# histogram bucket upper bounds in milliseconds (plus an overflow bucket)
+LAG_BUCKETS: Final = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000)
+
+# only log the same slow callback once per this many seconds (all are still counted)
+SLOW_LOG_INTERVAL: Final = 10.0
+
+
+def callbackName(callback: Any) -> str:
+    """Describe a loop callback (tasks by their coroutine, everything else by function name)."""
+    owner = getattr(callback, "__self__", None)
+    if isinstance(owner, asyncio.Task):
+        coro = owner.get_coro()
+        return f"task {getattr(coro, '__qualname__', coro)}"
+
+    # functools.partial and friends
+    callback = getattr(callback, "func", callback)
+    return getattr(callback, "__qualname__", None) or repr(callback)
+
+
+@dataclass(slots=True)
+class Histogram:
+    """Counts of millisecond durations in LAG_BUCKETS buckets."""
+
+    counts: list[int] = field(default_factory=lambda: [0] * (len(LAG_BUCKETS) + 1))
+    count: int = 0
+    total: float = 0
+    max: float = 0
+
+    def add(self, ms: float) -> None:
+        self.counts[bisect.bisect_left(LAG_BUCKETS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding quantile 'q' (the max for the overflow bucket)."""
+        want = q * self.count
+        seen = 0
+        for bound, count in zip(LAG_BUCKETS, self.counts):
+            seen += count
+            if seen >= want and count:
+                return min(bound, self.max)
+
+        return self.max
+
+    def rows(self) -> list[tuple[str, int]]:
+        """(bucket label, count) for non-empty buckets."""
+        labels = [f"<= {b:,} ms" for b in LAG_BUCKETS] + [f"> {LAG_BUCKETS[-1]:,} ms"]
+        return [(label, c) for label, c in zip(labels, self.counts) if c]
+
+
+@dataclass(slots=True)
+class HandlerStats:
+    calls: int = 0
+    total: float = 0
+    max: float = 0
+    slow: int = 0
+
+
+@dataclass
+class LoopMonitor:
+    interval: float = ICLI_LAG_INTERVAL
+    slow: float = ICLI_LAG_SLOW
+
+    lag: Histogram = field(default_factory=Histogram)
+
+    # "event -> handler" -> durations (seconds)
+    handlers: dict[str, HandlerStats] = field(default_factory=dict)
+
+    # slow loop callbacks by name
+    callbacks: dict[str, HandlerStats] = field(default_factory=dict)
+
+    # (wall time, callback, seconds, slowest handler inside it) for recent slow callbacks
+    recent: deque[tuple[float, str, float, str]] = field(
+        default_factory=lambda: deque(maxlen=100)
+    )
+
+    # slowest timed handler (name, seconds) inside the callback currently running
+    inner: tuple[str, float] | None = None
+
+    logged: dict[str, float] = field(default_factory=dict)
+    due: float = math.nan
+    loop: asyncio.AbstractEventLoop | None = None
+
+    def start(self) -> None:
+        """Start measuring lag and slow callbacks on the running loop."""
+        self.loop = asyncio.get_running_loop()
+        self.install()
+
+        self.due = self.loop.time() + self.interval
+        self.loop.call_at(self.due, self.tick)
+
+    def tick(self) -> None:
+        assert self.loop, "tick() only runs after start()"
+        now = self.loop.time()
+        self.lag.add(max(0, now - self.due) * 1000)
+
+        self.due = now + self.interval
+        self.loop.call_at(self.due, self.tick)
+
+    def install(self) -> None:
+        """Time every asyncio Handle (also TimerHandle) callback.
+
+        Only pure Python handles can be timed (uvloop handles aren't), which leaves the
+        lag histogram and handler timings working without callback names."""
+        handle = asyncio.events.Handle
+        if getattr(handle._run, "monitor", None) is self:
+            return
+
+        run = getattr(handle._run, "original", handle._run)
+        perf = time.perf_counter
+        monitor = self
+
+        def _run(h) -> None:
+            monitor.inner = None
+            started = perf()
+            run(h)
+            took = perf() - started
+            if took >= monitor.slow:
+                monitor.slowCallback(h._callback, took)
+
+        _run.original = run  # type: ignore
+        _run.monitor = self  # type: ignore
+        handle._run = _run  # type: ignore
+
+    def slowCallback(self, callback: Any, took: float) -> None:
+        name = callbackName(callback)
+        stats = self.callbacks.setdefault(name, HandlerStats())
+        stats.calls += 1
+        stats.slow += 1
+        stats.total += took
+        stats.max = max(stats.max, took)
+
+        inner = f"{self.inner[0]} {self.inner[1] * 1000:,.1f} ms" if self.inner else ""
+        now = time.time()
+        self.recent.append((now, name, took, inner))
+
+        if now - self.logged.get(name, 0) >= SLOW_LOG_INTERVAL:
+            self.logged[name] = now
+            logger.warning(
+                "[lag] {} blocked the event loop for {:,.1f} ms{}",
+                name,
+                took * 1000,
+                f" ({inner})" if inner else "",
+            )
+
+    def timed(self, event: str, handler: Callable) -> Callable:
+        """Wrap an event handler to record its duration under "event -> handler"."""
+        name = f"{event} -> {getattr(handler, '__qualname__', handler)}"
+        stats = self.handlers.setdefault(name, HandlerStats())
+        perf = time.perf_counter
+        slow = self.slow
+
+        def run(*args, **kwargs):
+            started = perf()
+            try:
+                return handler(*args, **kwargs)
+            finally:
+                took = perf() - started
+                stats.calls += 1
+                stats.total += took
+                if took > stats.max:
+                    stats.max = took
+
+                if took >= slow:
+                    stats.slow += 1
+
+                if not self.inner or took > self.inner[1]:
+                    self.inner = (name, took)
+
+        return run
+
+    def reset(self) -> None:
+        self.lag = Histogram()
+        self.handlers = {name: HandlerStats() for name in self.handlers}
+        self.callbacks.clear()
+        self.recent.clear()
+
+    def report(self) -> dict[str, Any]:
+        return dict(
+            lag=self.lag,
+            handlers=sorted(
+                self.handlers.items(), key=lambda kv: kv[1].total, reverse=True
+            ),
+            callbacks=sorted(
+                self.callbacks.items(), key=lambda kv: kv[1].total, reverse=True
+            ),
+            recent=list(self.recent),
+        )
+
+
+def frameName(code, names: dict[Any, str]) -> str:
+    if (found := names.get(code)) is None:
+        found = names[code] = (
+            f"{getattr(code, 'co_qualname', code.co_name)} "
+            f"({pathlib.Path(code.co_filename).name}:{code.co_firstlineno})"
+        )
+
+    return found
+
+
+@dataclass
+class SamplingProfiler:
+    interval: float = ICLI_PROF_INTERVAL
+
+    # stack (outermost frame first) -> samples
+    stacks: Counter[tuple[str, ...]] = field(default_factory=Counter)
+    samples: int = 0
+    started: float = math.nan
+    stopped: float = math.nan
+
+    thread: threading.Thread | None = None
+    stopping: threading.Event = field(default_factory=threading.Event)
+
+    @property
+    def running(self) -> bool:
+        return self.thread is not None
+
+    def start(self, interval: float | None = None) -> None:
+        """Start sampling the calling thread (the event loop thread); clears previous samples."""
+        if self.running:
+            return
+
+        self.interval = interval or self.interval
+        self.stacks.clear()
+        self.samples = 0
+        self.started = time.time()
+        self.stopped = math.nan
+        self.stopping.clear()
+        self.thread = threading.Thread(
+            target=self.sample,
+            args=(threading.get_ident(),),
+            name="icli-profiler",
+            daemon=True,
+        )
+        self.thread.start()
+
+    def stop(self) -> None:
+        if not self.thread:
+            return
+
+        self.stopping.set()
+        self.thread.join()
+        self.thread = None
+        self.stopped = time.time()
+
+    def sample(self, target: int) -> None:
+        names: dict[Any, str] = {}
+        stacks = self.stacks
+        while not self.stopping.wait(self.interval):
+            frame = sys._current_frames().get(target)
+            if frame is None:
+                break
+
+            stack = []
+            while frame is not None:
+                stack.append(frameName(frame.f_code, names))
+                frame = frame.f_back
+
+            stack.reverse()
+            stacks[tuple(stack)] += 1
+            self.samples += 1
+
+    def collapsed(self) -> list[str]:
+        """Samples in collapsed-stack format (flamegraph.pl / speedscope / inferno input)."""
+        return [f"{';'.join(stack)} {count}" for stack, count in self.stacks.items()]
+
+    def dump(self, path: str | pathlib.Path | None = None) -> pathlib.Path:
+        if path is None:
+            when = datetime.datetime.fromtimestamp(self.started).strftime(
+                "%Y%m%d-%H%M%S"
+            )
+            path = pathlib.Path(ICLI_PROF_DIR) / f"icli-{when}.folded"
+
+        path = pathlib.Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("\n".join(self.collapsed()) + "\n")
+        return path
+
+    def top(self, count: int = 20) -> list[tuple[str, int, int]]:
+        """Return (frame, own samples, total samples) for the frames with the most own samples."""
+        own: Counter[str] = Counter()
+        total: Counter[str] = Counter()
+        for stack, n in self.stacks.items():
+            own[stack[-1]] += n
+            for name in set(stack):
+                total[name] += n
+
+        return [(name, n, total[name]) for name, n in own.most_common(count)]
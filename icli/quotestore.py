@@ -0,0 +1,234 @@
+"""Columnar storage for live quote values.
+
+Every subscribed quote gets a stable integer slot into preallocated numpy arrays, so
+per-tick updates are array writes instead of allocating new python objects, and
+readers (toolbar, calculator, strategies) can fetch values by quote key, contract id,
+or slot directly.
+
+Slots are recycled when quotes are removed, and arrays double in size when full.
+"""
+
+from dataclasses import dataclass, field
+from typing import Final, Hashable
+
+import numpy as np
+
+from ib_async import Bag, Contract, Ticker
+
+from icli.helpers import lookupKey
+
+# price/size columns maintained for every slot
+COLUMNS: Final = ("bid", "ask", "bidSize", "askSize", "last", "close", "mid", "time")
+
+
+@dataclass
+class QuoteStore:
+    capacity: int = 128
+
+    # number of previous midpoints retained per quote
+    historyLength: int = 120
+
+    # quote key -> slot
+    slots: dict[Hashable, int] = field(default_factory=dict)
+
+    # contract id -> slot (spreads have no contract id so they are only found by key)
+    conIds: dict[int, int] = field(default_factory=dict)
+
+    # slot -> quote key (None if slot is unused)
+    names: list[Hashable | None] = field(default_factory=list)
+
+    # slots released by remove() ready for re-use
+    free: list[int] = field(default_factory=list)
+
+    bid: np.ndarray = field(init=False)
+    ask: np.ndarray = field(init=False)
+    bidSize: np.ndarray = field(init=False)
+    askSize: np.ndarray = field(init=False)
+    last: np.ndarray = field(init=False)
+    close: np.ndarray = field(init=False)
+    mid: np.ndarray = field(init=False)
+
+    # epoch seconds of the most recent update
+    time: np.ndarray = field(init=False)
+
+    # ring buffer of midpoints per slot; head is the next write position
+    history: np.ndarray = field(init=False)
+    historyHead: np.ndarray = field(init=False)
+    historyCount: np.ndarray = field(init=False)
+
+    def __post_init__(self) -> None:
+        for col in COLUMNS:
+            setattr(self, col, np.full(self.capacity, np.nan))
+
+        self.history = np.full((self.capacity, self.historyLength), np.nan)
+        self.historyHead = np.zeros(self.capacity, dtype=np.int64)
+        self.historyCount = np.zeros(self.capacity, dtype=np.int64)
+        self.names = [None] * self.capacity
+        self.free = list(reversed(range(self.capacity)))
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.slots
+
+    def grow(self) -> None:
+        """Double capacity, keeping all existing slot numbers stable."""
+        prev = self.capacity
+        self.capacity *= 2
+
+        def extend(arr, fill):
+            more = np.full((prev,) + arr.shape[1:], fill, dtype=arr.dtype)
+            return np.concatenate((arr, more))
+
+        for col in COLUMNS:
+            setattr(self, col, extend(getattr(self, col), np.nan))
+
+        self.history = extend(self.history, np.nan)
+        self.historyHead = extend(self.historyHead, 0)
+        self.historyCount = extend(self.historyCount, 0)
+        self.names.extend([None] * prev)
+
+        # new slots go to the end of the stack so lower slots get used first
+        self.free = list(reversed(range(prev, self.capacity))) + self.free
+
+    def add(self, key: Hashable, conId: int | None = None) -> int:
+        """Return slot for quote key, allocating a new slot if the key is new."""
+        if (slot := self.slots.get(key)) is not None:
+            return slot
+
+        if not self.free:
+            self.grow()
+
+        slot = self.free.pop()
+        self.slots[key] = slot
+        self.names[slot] = key
+
+        if conId:
+            self.conIds[conId] = slot
+
+        return slot
+
+    def addContract(self, contract: Contract) -> int:
+        return self.add(
+            lookupKey(contract), None if isinstance(contract, Bag) else contract.conId
+        )
+
+    def remove(self, key: Hashable) -> None:
+        """Release slot for quote key (no error if key doesn't exist)."""
+        slot = self.slots.pop(key, None)
+        if slot is None:
+            return
+
+        for col in COLUMNS:
+            getattr(self, col)[slot] = np.nan
+
+        self.history[slot] = np.nan
+        self.historyHead[slot] = 0
+        self.historyCount[slot] = 0
+        self.names[slot] = None
+
+        for conId, s in list(self.conIds.items()):
+            if s == slot:
+                del self.conIds[conId]
+
+        self.free.append(slot)
+
+    def slot(self, key: Hashable) -> int | None:
+        return self.slots.get(key)
+
+    def slotForConId(self, conId: int) -> int | None:
+        return self.conIds.get(conId)
+
+    def slotForContract(self, contract: Contract) -> int | None:
+        if contract.conId and (slot := self.conIds.get(contract.conId)) is not None:
+            return slot
+
+        return self.slots.get(lookupKey(contract))
+
+    def update(self, slot: int, ticker: Ticker) -> float:
+        """Copy current ticker values into slot and append midpoint to history.
+
+        Returns the midpoint (NaN if no bid/ask is available)."""
+        self.last[slot] = ticker.last
+        self.close[slot] = ticker.close
+
+        return self.set(
+            slot,
+            ticker.bid,
+            ticker.ask,
+            ticker.bidSize,
+            ticker.askSize,
+            ticker.time.timestamp() if ticker.time else np.nan,
+        )
+
+    def set(
+        self,
+        slot: int,
+        bid: float,
+        ask: float,
+        bidSize: float,
+        askSize: float,
+        when: float,
+    ) -> float:
+        """Write bid/ask values into slot (also used for synthetic spread quotes) and append midpoint to history."""
+        mid = (bid + ask) / 2
+
+        self.bid[slot] = bid
+        self.ask[slot] = ask
+        self.bidSize[slot] = bidSize
+        self.askSize[slot] = askSize
+        self.mid[slot] = mid
+        self.time[slot] = when
+
+        head = self.historyHead[slot]
+        self.history[slot, head] = mid
+        self.historyHead[slot] = (head + 1) % self.historyLength
+        if self.historyCount[slot] < self.historyLength:
+            self.historyCount[slot] += 1
+
+        return mid
+
+    def recent(self, key: Hashable) -> np.ndarray:
+        """Return midpoint history for quote key in oldest-to-newest order."""
+        slot = self.slots.get(key)
+        if slot is None:
+            return np.empty(0)
+
+        count = self.historyCount[slot]
+        head = self.historyHead[slot]
+        row = self.history[slot]
+
+        if count < self.historyLength:
+            return row[:count].copy()
+
+        return np.concatenate((row[head:], row[:head]))
+
+    def quote(self, key: Hashable) -> tuple[float, float] | None:
+        """Return (bid, ask) if both exist, else (last, last) if last exists, else None."""
+        slot = self.slots.get(key)
+        if slot is None:
+            return None
+
+        bid = self.bid[slot]
+        ask = self.ask[slot]
+        if bid > 0 and ask > 0:
+            return float(bid), float(ask)
+
+        last = self.last[slot]
+        if last == last:
+            return float(last), float(last)
+
+        return None
+
+    def mark(self, key: Hashable) -> float | None:
+        """Return midpoint if a live bid/ask exists, else last price, else close (None if key is not stored)."""
+        slot = self.slots.get(key)
+        if slot is None:
+            return None
+
+        if self.bid[slot] > 0 and self.ask[slot] > 0:
+            return float(self.mid[slot])
+
+        last = self.last[slot]
+        return float(last if last == last else self.close[slot])
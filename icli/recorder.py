@@ -0,0 +1,212 @@
+"""Tick recorder for persisting every quote update without blocking the event loop.
+
+The event loop only appends lightweight tuples to a queue (one queue put per
+pendingTickersEvent); a background writer thread owns the file handle, formats
+rows, batches writes, and rotates output files when the trading session changes.
+
+Two output formats are available:
+    - "json": one orjson row per tick (same fields as the original ICLI_DUMP_QUOTES output)
+    - "bin": fixed-width little-endian records matching TICK_DTYPE so a full day
+             can be loaded back as a columnar numpy array via `readTicks()`.
+"""
+
+import datetime
+import pathlib
+import queue
+import threading
+import time
+
+from dataclasses import dataclass, field
+from typing import Any, Final
+
+import numpy as np
+import orjson
+import pendulum
+
+from loguru import logger
+
+# Fixed-width binary record layout for "bin" format recordings.
+# Symbols longer than 24 bytes (only spread descriptions) are truncated.
+TICK_DTYPE: Final = np.dtype(
+    [
+        ("symbol", "S24"),
+        ("time", "<f8"),
+        ("bid", "<f8"),
+        ("bidSize", "<f8"),
+        ("ask", "<f8"),
+        ("askSize", "<f8"),
+        ("last", "<f8"),
+        ("volume", "<f8"),
+    ]
+)
+
+# ordered field names for tuples handed to TickRecorder.record()
+TICK_FIELDS: Final[tuple[str, ...]] = TICK_DTYPE.names or ()
+
+FORMAT_EXTENSIONS: Final = dict(json="json", bin="bin")
+
+# sentinel telling the writer thread to flush everything and exit
+_STOP: Final = object()
+
+
+def readTicks(path: str | pathlib.Path) -> np.ndarray:
+    """Load a "bin" format recording as a structured numpy array (columns are TICK_FIELDS)."""
+    return np.fromfile(path, dtype=TICK_DTYPE)
+
+
+def sessionDate() -> datetime.date:
+    """Trading session date used for file rotation (sessions are in exchange time, not local time)."""
+    return pendulum.now("US/Eastern").date()
+
+
+@dataclass
+class TickRecorder:
+    """Record tick tuples to a per-session file using a background writer thread."""
+
+    clientId: int = 0
+    fmt: str = "json"
+    prefix: str = "tickers"
+    directory: pathlib.Path = field(default_factory=pathlib.Path)
+
+    # flush when either this many rows are buffered or this many seconds elapsed since the last flush
+    flushRows: int = 8192
+    flushInterval: float = 1.0
+
+    rowsWritten: int = 0
+    path: pathlib.Path | None = None
+
+    q: queue.SimpleQueue = field(default_factory=queue.SimpleQueue)
+    thread: threading.Thread | None = None
+
+    def __post_init__(self) -> None:
+        assert (
+            self.fmt in FORMAT_EXTENSIONS
+        ), f"Recorder format must be one of: {list(FORMAT_EXTENSIONS)}"
+
+        self.directory = pathlib.Path(self.directory)
+
+    def start(self) -> None:
+        if self.thread:
+            return
+
+        self.thread = threading.Thread(
+            target=self._writer, name="icli-tick-recorder", daemon=True
+        )
+        self.thread.start()
+
+        logger.info(
+            "[recorder] Recording ticks as {} to {}",
+            self.fmt,
+            self.pathFor(sessionDate()),
+        )
+
+    def record(self, rows: list[tuple[Any, ...]]) -> None:
+        """Submit rows from the event loop.
+
+        Each row is a tuple ordered like TICK_FIELDS except 'time' may be the raw
+        ticker datetime (conversion happens in the writer thread, not here)."""
+        if rows:
+            self.q.put(rows)
+
+    def close(self) -> None:
+        """Flush all pending rows and stop the writer thread."""
+        if not self.thread:
+            return
+
+        self.q.put(_STOP)
+        self.thread.join()
+        self.thread = None
+
+        logger.info("[recorder] Closed after writing {:,} rows", self.rowsWritten)
+
+    def pathFor(self, date: datetime.date) -> pathlib.Path:
+        return (
+            self.directory
+            / f"{self.prefix}-{date}-{self.clientId}.{FORMAT_EXTENSIONS[self.fmt]}"
+        )
+
+    def _encode(self, rows: list[tuple[Any, ...]]) -> bytes:
+        if self.fmt == "json":
+            return b"".join(
+                [
+                    orjson.dumps(
+                        dict(
+                            symbol=symbol,
+                            time=str(when),
+                            bid=bid,
+                            bidSize=bidSize,
+                            ask=ask,
+                            askSize=askSize,
+                            last=last,
+                            volume=volume,
+                        ),
+                        option=orjson.OPT_APPEND_NEWLINE,
+                    )
+                    for symbol, when, bid, bidSize, ask, askSize, last, volume in rows
+                ]
+            )
+
+        return np.array(
+            [
+                (
+                    symbol.encode(),
+                    when.timestamp() if when else np.nan,
+                    *rest,
+                )
+                for symbol, when, *rest in rows
+            ],
+            dtype=TICK_DTYPE,
+        ).tobytes()
+
+    def _writer(self) -> None:
+        buffered: list[tuple[Any, ...]] = []
+        lastFlush = time.monotonic()
+        currentDate = None
+        fh = None
+
+        def flush():
+            nonlocal fh, currentDate, lastFlush
+
+            lastFlush = time.monotonic()
+            if not buffered:
+                return
+
+            # rotate on session change (checked per flush, not per row, because flushes are frequent enough)
+            date = sessionDate()
+            if date != currentDate:
+                if fh:
+                    fh.close()
+
+                currentDate = date
+                self.path = self.pathFor(date)
+                fh = open(self.path, "ab")
+
+            try:
+                fh.write(self._encode(buffered))
+                fh.flush()
+                self.rowsWritten += len(buffered)
+            except:
+                logger.exception("[recorder] Failed writing {} rows", len(buffered))
+
+            buffered.clear()
+
+        running = True
+        while running:
+            try:
+                got = self.q.get(timeout=self.flushInterval)
+                if got is _STOP:
+                    running = False
+                else:
+                    buffered.extend(got)
+            except queue.Empty:
+                pass
+
+            if (
+                not running
+                or len(buffered) >= self.flushRows
+                or (time.monotonic() - lastFlush) >= self.flushInterval
+            ):
+                flush()
+
+        if fh:
+            fh.close()
@@ -0,0 +1,424 @@
+"""Replay recorded tick sessions through the live handlers.
+
+Recordings written by the tick recorder (ICLI_DUMP_QUOTES, either format) are streamed
+through a real IBKRCmdlineApp without a gateway connection: each recorded symbol gets a
+ticker registered like a live quote, rows are applied to those tickers, and every batch
+of rows sharing a timestamp is delivered to tickersUpdate() exactly like one
+pendingTickersEvent. The toolbar is rendered on the app's refresh interval of replay
+time, and 5 second bars built from the ticks extend intraday bars the same way
+realtime bars do, so armed strategies evaluate against the replayed session.
+
+The clock is replay time: pendulum.now() is frozen at each batch's timestamp, so the
+toolbar and strategies see the recorded session's time instead of wall time. Replays run
+as fast as possible (speed 0) or at a multiple of the recorded pace.
+
+Recordings only contain quote names, so contracts are rebuilt from names: OCC-style
+option names become options and everything else becomes a stock, with stable synthetic
+contract ids. Orders placed by strategies go to the app's IB object, which isn't
+connected unless the replay is simulated: then the app runs against a SimIB whose
+tickers are the replayed tickers, so strategy orders are acknowledged and filled against
+the recorded quotes after each batch. Every strategy decision is reported.
+
+    python -m icli.replay tickers-2026-10-16-0.bin --strategy SPY=S2:S --speed 10 --simulate
+"""
+
+import argparse
+import asyncio
+import datetime
+import math
+import pathlib
+import re
+import tempfile
+import time
+
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from typing import Any, Final
+
+import orjson
+import pendulum
+
+from ib_async import Contract, RealTimeBar, Stock, Ticker
+from loguru import logger
+
+import icli.cli as cli
+import icli.recorder as recorder
+from icli.bar import BarSeries
+from icli.helpers import contractForName
+from icli.journal import ExecutionJournal
+from icli.latency import OrderLatency
+from icli.simbroker import SimIB, syntheticConId
+
+# OCC option names without spaces (SPY241220C00500000)
+OCC_NAME: Final = re.compile(r"^[A-Z]{1,6}\d{6}[CP]\d{8}$")
+
+# seconds per bar fed into intraday bars (IBKR realtime bars are always 5 seconds)
+REPLAY_BAR_SECONDS: Final = 5
+
+# replay rows are TICK_FIELDS ordered tuples with epoch times
+SYMBOL, TIME, BID, BIDSIZE, ASK, ASKSIZE, LAST, VOLUME = range(
+    len(recorder.TICK_FIELDS)
+)
+
+
+def readRecording(path: str | pathlib.Path) -> Iterator[tuple[Any, ...]]:
+    """Yield recorded rows (ordered like TICK_FIELDS, times as epoch seconds) from either format."""
+    path = pathlib.Path(path)
+    if path.suffix == f".{recorder.FORMAT_EXTENSIONS['bin']}":
+        for row in recorder.readTicks(path).tolist():
+            yield (row[0].decode(), *row[1:])
+
+        return
+
+    with open(path, "rb") as fh:
+        for line in fh:
+            row = orjson.loads(line)
+            when = row["time"]
+            yield (
+                row["symbol"],
+                (
+                    datetime.datetime.fromisoformat(when).timestamp()
+                    if when and when != "None"
+                    else math.nan
+                ),
+                *(row[f] for f in recorder.TICK_FIELDS[2:]),
+            )
+
+
+def replayContract(name: str) -> Contract:
+    """Build a contract for a recorded quote name with a stable synthetic contract id."""
+    if OCC_NAME.match(name):
+        contract = contractForName(name)
+    else:
+        contract = Stock(name, "SMART", "USD")
+
+    contract.localSymbol = name
+    contract.conId = syntheticConId(name)
+    return contract
+
+
+def num(value: Any) -> float:
+    return math.nan if value is None else value
+
+
+@dataclass(slots=True)
+class BarBuilder:
+    """Builds 5 second bars from ticks like IBKR realtime bars."""
+
+    start: float = math.nan
+    open: float = math.nan
+    high: float = math.nan
+    low: float = math.nan
+    close: float = math.nan
+    volume: float = 0
+    lastVolume: float = math.nan
+
+    def update(self, when: float, price: float, volume: float) -> RealTimeBar | None:
+        """Add a tick; returns the completed bar when the tick starts a new bar."""
+        completed = None
+        start = when - when % REPLAY_BAR_SECONDS
+        if start != self.start:
+            if self.open == self.open:
+                completed = RealTimeBar(
+                    time=datetime.datetime.fromtimestamp(
+                        self.start, datetime.timezone.utc
+                    ),
+                    open_=self.open,
+                    high=self.high,
+                    low=self.low,
+                    close=self.close,
+                    volume=self.volume,
+                )
+
+            self.start = start
+            self.open = self.high = self.low = self.close = price
+            self.volume = 0
+        else:
+            self.high = max(self.high, price)
+            self.low = min(self.low, price)
+            self.close = price
+
+        # recorded volume is the session total, so bars get the difference
+        if volume == volume:
+            if self.lastVolume == self.lastVolume and volume > self.lastVolume:
+                self.volume += volume - self.lastVolume
+
+            self.lastVolume = volume
+
+        return completed
+
+
+@dataclass(slots=True)
+class ReplayStats:
+    rows: int = 0
+    batches: int = 0
+    symbols: int = 0
+
+    # recorded time covered and wall time taken
+    first: float = math.nan
+    last: float = math.nan
+    wall: float = 0
+
+    handlerTotal: float = 0
+    handlerMax: float = 0
+
+    toolbars: int = 0
+    toolbarTotal: float = 0
+    toolbarMax: float = 0
+
+    def report(self) -> dict[str, float]:
+        return dict(
+            rows=self.rows,
+            batches=self.batches,
+            symbols=self.symbols,
+            recordedSeconds=self.last - self.first,
+            wallSeconds=self.wall,
+            rowsPerSecond=self.rows / self.wall if self.wall else 0,
+            handlerAvgUs=self.handlerTotal / self.batches * 1e6 if self.batches else 0,
+            handlerMaxUs=self.handlerMax * 1e6,
+            toolbars=self.toolbars,
+            toolbarAvgUs=(
+                self.toolbarTotal / self.toolbars * 1e6 if self.toolbars else 0
+            ),
+            toolbarMaxUs=self.toolbarMax * 1e6,
+        )
+
+
+@dataclass
+class TickReplay:
+    app: Any
+
+    # 0 replays as fast as possible, otherwise a multiple of recorded time (2 is twice as fast)
+    speed: float = 0
+
+    # render the toolbar every this many seconds of replay time (0 disables)
+    toolbarInterval: float | None = None
+
+    # simulated broker matching orders against replayed quotes (its tickers are the replayed tickers)
+    broker: SimIB | None = None
+
+    tickers: dict[str, Ticker] = field(default_factory=dict)
+    builders: dict[str, BarBuilder] = field(default_factory=dict)
+    stats: ReplayStats = field(default_factory=ReplayStats)
+
+    def __post_init__(self) -> None:
+        if self.toolbarInterval is None:
+            self.toolbarInterval = self.app.toolbarUpdateInterval
+
+    def track(self, name: str) -> Ticker:
+        """Register a recorded symbol as a live quote (including intraday bars, so nothing requests history)."""
+        contract = replayContract(name)
+        ticker = self.tickers[name] = (
+            self.broker.ticker(contract) if self.broker else Ticker(contract=contract)
+        )
+        self.app.trackQuote(name, contract, ticker)
+        self.app.intraday.series[name] = BarSeries(name, contract)
+        self.builders[name] = BarBuilder()
+        self.stats.symbols += 1
+        return ticker
+
+    def apply(self, row: tuple[Any, ...]) -> Ticker:
+        name = row[SYMBOL]
+        ticker = self.tickers.get(name) or self.track(name)
+
+        when = row[TIME]
+        ticker.time = (
+            datetime.datetime.fromtimestamp(when, datetime.timezone.utc)
+            if when == when
+            else None
+        )
+        ticker.bid = num(row[BID])
+        ticker.bidSize = num(row[BIDSIZE])
+        ticker.ask = num(row[ASK])
+        ticker.askSize = num(row[ASKSIZE])
+        ticker.last = num(row[LAST])
+        ticker.volume = num(row[VOLUME])
+
+        price = ticker.last
+        if not price == price:
+            price = (ticker.bid + ticker.ask) / 2
+
+        if when == when and price == price:
+            if bar := self.builders[name].update(when, price, ticker.volume):
+                series = self.app.intraday.series[name]
+                self.app.intraday.extend(series, [bar], True)
+
+        return ticker
+
+    def toolbar(self) -> None:
+        started = time.perf_counter()
+        try:
+            self.app.bottomToolbar()
+        except:
+            logger.exception("[replay] Toolbar failed")
+            self.toolbarInterval = 0
+
+        took = time.perf_counter() - started
+        self.stats.toolbars += 1
+        self.stats.toolbarTotal += took
+        self.stats.toolbarMax = max(self.stats.toolbarMax, took)
+
+    def deliver(self, batch: set[Ticker], when: float) -> None:
+        if when == when:
+            pendulum.travel_to(pendulum.from_timestamp(when), freeze=True)
+
+        started = time.perf_counter()
+        try:
+            self.app.tickersUpdate(batch)
+        except:
+            logger.exception("[replay] tickersUpdate failed")
+
+        if self.broker:
+            self.broker.match(batch)
+
+        took = time.perf_counter() - started
+        self.stats.batches += 1
+        self.stats.handlerTotal += took
+        self.stats.handlerMax = max(self.stats.handlerMax, took)
+
+    async def run(self, rows: Iterable[tuple[Any, ...]]) -> ReplayStats:
+        stats = self.stats
+        batch: set[Ticker] = set()
+        batchTime = math.nan
+        nextToolbar = math.nan
+        wallStart = time.perf_counter()
+
+        try:
+            for row in rows:
+                when = row[TIME]
+
+                # rows recorded from one ticker event share a timestamp
+                if batch and when != batchTime:
+                    self.deliver(batch, batchTime)
+                    batch = set()
+
+                    # (the first batch always renders because comparisons with NaN are False)
+                    if self.toolbarInterval and not batchTime < nextToolbar:
+                        self.toolbar()
+                        nextToolbar = batchTime + self.toolbarInterval
+
+                    if self.speed:
+                        ahead = (batchTime - stats.first) / self.speed - (
+                            time.perf_counter() - wallStart
+                        )
+                        await asyncio.sleep(max(0, ahead))
+                    else:
+                        # let strategy evaluations (and anything else scheduled) run between batches
+                        await asyncio.sleep(0)
+
+                batchTime = when
+                batch.add(self.apply(row))
+
+                stats.rows += 1
+                if when == when:
+                    if not stats.first == stats.first:
+                        stats.first = when
+
+                    stats.last = when
+
+            if batch:
+                self.deliver(batch, batchTime)
+
+            # allow final strategy evaluations to finish
+            await asyncio.sleep(0)
+        finally:
+            pendulum.travel_back()
+            stats.wall = time.perf_counter() - wallStart
+
+        return stats
+
+
+def replayApp(**kwargs) -> cli.IBKRCmdlineApp:
+    """Create an unconnected app for replays and simulated sessions (executions journal in memory, no tick recording)."""
+    kwargs.setdefault("accountId", "REPLAY")
+    app = cli.IBKRCmdlineApp(
+        journal=ExecutionJournal(pathlib.Path(":memory:")),
+        # replayed and simulated orders never mix into live session latencies
+        latency=OrderLatency(pathlib.Path(tempfile.mkdtemp("-icli-latency"))),
+        **kwargs,
+    )
+
+    # strategies run commands through the dispatcher like the prompt does
+    app.dispatch = cli.lang.Dispatch()
+
+    # never re-record replayed ticks into today's recording
+    if app.recorder:
+        app.recorder.close()
+        app.recorder = None
+
+    return app
+
+
+def armStrategy(app: cli.IBKRCmdlineApp, spec: str) -> None:
+    """Arm a strategy from SYMBOL=ALGO[:STATE] (like 'setstrat' without adding quotes)."""
+    symbol, _, algoState = spec.partition("=")
+    algo, _, start = algoState.partition(":")
+    app.strategy[symbol.upper()] = dict(algo=algo.upper(), start=start.upper() or "S")
+
+
+async def replay(
+    path: str | pathlib.Path,
+    speed: float = 0,
+    strategies: Iterable[str] = (),
+    toolbar: bool = True,
+    simulate: bool = False,
+) -> tuple[ReplayStats, list[tuple[float, str, str, Any]]]:
+    """Replay a recording; returns replay stats and the strategy decisions made."""
+    broker = SimIB() if simulate else None
+    app = replayApp(ib=broker) if broker else replayApp()
+    if broker:
+        # connect the app to the simulated broker (and attach its IB event handlers)
+        await app.prepare()
+
+    for spec in strategies:
+        armStrategy(app, spec)
+
+    harness = TickReplay(app, speed, None if toolbar else 0, broker)
+    stats = await harness.run(readRecording(path))
+
+    app.exiting = True
+    app.stop()
+    return stats, list(app.strategies.decisions)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay a recorded tick session")
+    parser.add_argument("recording", help="tickers-*.json or tickers-*.bin recording")
+    parser.add_argument(
+        "--speed", type=float, default=0, help="multiple of recorded pace (0: max)"
+    )
+    parser.add_argument(
+        "--strategy",
+        action="append",
+        default=[],
+        help="arm a strategy as SYMBOL=ALGO[:STATE] (repeatable)",
+    )
+    parser.add_argument("--no-toolbar", action="store_true")
+    parser.add_argument(
+        "--simulate",
+        action="store_true",
+        help="fill strategy orders against replayed quotes with a simulated broker",
+    )
+    args = parser.parse_args()
+
+    stats, decisions = asyncio.run(
+        replay(
+            args.recording,
+            args.speed,
+            args.strategy,
+            not args.no_toolbar,
+            args.simulate,
+        )
+    )
+
+    for when, symbol, decision, detail in decisions:
+        logger.info(
+            "[{}] {} {}: {}", pendulum.from_timestamp(when), symbol, decision, detail
+        )
+
+    for k, v in stats.report().items():
+        logger.info("{:>16}: {:,.2f}", k, v)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,935 @@
+"""Simulated broker standing in for the IBKR gateway connection.
+
+SimIB is an ib_async IB whose requests never leave the process: orders are acknowledged
+and matched locally against the simulator's own tickers (fed synthetic quotes through
+quote(), or recorded quotes through a tick replay), and every order, execution,
+commission, position, and portfolio change is reported through the same IB events the
+app already listens to. IBKRCmdlineApp runs against it unchanged (ICLI_SIMULATE=1), so
+order paths can be load tested without a paper account.
+
+Matching is deliberately simple and deterministic for a given seed: marketable orders fill
+at the touch, limit orders fill once the far side reaches the limit, stop orders trigger
+from the last price (or midpoint), brackets activate children when the parent fills and
+cancel siblings when one child fills. Latency, partial fills, and rejections are
+configurable. Order lifecycle latencies are kept per order for report().
+"""
+
+import argparse
+import asyncio
+import datetime
+import math
+import os
+import random
+import statistics
+import time
+import zlib
+
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Final, Iterable
+
+from ib_async import (
+    Bag,
+    BarDataList,
+    Client,
+    CommissionReport,
+    Contract,
+    ContractDetails,
+    Execution,
+    Fill,
+    IB,
+    Option,
+    Order,
+    OrderState,
+    OrderStatus,
+    PnL,
+    PnLSingle,
+    PortfolioItem,
+    Position,
+    RealTimeBarList,
+    StartupFetch,
+    StartupFetchALL,
+    Stock,
+    TagValue,
+    Ticker,
+    Trade,
+    TradeLogEntry,
+)
+from loguru import logger
+
+from icli.helpers import PriceOrQuantity
+
+# seconds from placeOrder() / cancelOrder() until the simulated gateway acknowledges it
+ICLI_SIM_ACK_LATENCY: Final = float(os.getenv("ICLI_SIM_ACK_LATENCY", 0.005))
+
+# seconds after acknowledgement before a working order may fill
+ICLI_SIM_FILL_LATENCY: Final = float(os.getenv("ICLI_SIM_FILL_LATENCY", 0.01))
+
+# probability an acknowledged order is rejected instead of working
+ICLI_SIM_REJECT_RATE: Final = float(os.getenv("ICLI_SIM_REJECT_RATE", 0))
+
+# probability a fill only takes part of the available quantity
+ICLI_SIM_PARTIAL_RATE: Final = float(os.getenv("ICLI_SIM_PARTIAL_RATE", 0))
+
+ICLI_SIM_SEED: Final = int(os.getenv("ICLI_SIM_SEED", 0))
+
+# order types filling at the touch immediately
+MARKET_TYPES: Final = {"MKT", "MOC", "MOO", "MTL"}
+
+# commission per share (minimum per order) and per contract
+COMMISSION_SHARE: Final = 0.005
+COMMISSION_MINIMUM: Final = 1.0
+COMMISSION_CONTRACT: Final = 0.65
+
+
+def syntheticConId(name: str) -> int:
+    """Stable contract id for simulated contracts (also used by tick replays)."""
+    return zlib.crc32(name.encode()) | 1
+
+
+def contractName(contract: Contract) -> str:
+    """Quote name for a contract (OCC-style without spaces for options)."""
+    if contract.localSymbol:
+        return contract.localSymbol.replace(" ", "")
+
+    if isinstance(contract, Option) and contract.strike:
+        date = contract.lastTradeDateOrContractMonth
+        return f"{contract.symbol}{date[2:]}{contract.right[:1]}{int(contract.strike * 1000):08d}"
+
+    return contract.symbol
+
+
+class SimClient(Client):
+    """Client which is always ready and never sends anything."""
+
+    def __init__(self, wrapper, sim: "SimIB"):
+        super().__init__(wrapper)
+        self.sim = sim
+
+    def isReady(self) -> bool:
+        return self.sim.simConnected
+
+    def isConnected(self) -> bool:
+        return self.sim.simConnected
+
+    def send(self, *fields, **kwargs) -> None:
+        # requests without a simulated implementation are dropped
+        logger.trace("[sim] Dropped request: {}", fields[:2])
+
+
+@dataclass(slots=True)
+class SimOrder:
+    trade: Trade
+
+    # monotonic lifecycle times for latency reporting
+    placed: float
+    acked: float = math.nan
+    firstFill: float = math.nan
+    done: float = math.nan
+
+    # may fill at or after this monotonic time
+    fillableAt: float = math.inf
+
+    # stop orders become their limit/market order once triggered
+    triggered: bool = False
+
+    # held by the simulated gateway until a transmitting order arrives (brackets)
+    held: bool = False
+
+
+@dataclass(slots=True)
+class SimPosition:
+    quantity: float = 0
+
+    # average cost per unit including multiplier (like IBKR's avgCost)
+    avgCost: float = 0
+    realized: float = 0
+
+
+class SimIB(IB):
+    """IB with a local matching engine instead of a gateway connection."""
+
+    def __init__(
+        self,
+        ackLatency: float = ICLI_SIM_ACK_LATENCY,
+        fillLatency: float = ICLI_SIM_FILL_LATENCY,
+        rejectRate: float = ICLI_SIM_REJECT_RATE,
+        partialRate: float = ICLI_SIM_PARTIAL_RATE,
+        seed: int = ICLI_SIM_SEED,
+    ):
+        super().__init__()
+        self.client = SimClient(self.wrapper, self)
+
+        self.ackLatency = ackLatency
+        self.fillLatency = fillLatency
+        self.rejectRate = rejectRate
+        self.partialRate = partialRate
+        self.random = random.Random(seed)
+
+        self.simConnected = False
+        self.account = "SIM"
+        self.simClientId = 0
+        self.permIds = 1_000_000
+        self.execIds = 0
+
+        # execution ids are unique across sessions (like IBKR's), so journals never
+        # mistake a new session's fills for ones they already have
+        self.execSession = f"{time.time_ns():x}"
+
+        # conId -> contract and ticker for everything quoted or qualified
+        self.contracts: dict[int, Contract] = {}
+        self.simTickers: dict[int, Ticker] = {}
+
+        # orderId -> order (every order ever placed), working orders by contract key
+        self.simOrders: dict[int, SimOrder] = {}
+        self.working: defaultdict[Any, set[int]] = defaultdict(set)
+
+        # parent orderId -> child orderIds (bracket legs)
+        self.children: defaultdict[int, set[int]] = defaultdict(set)
+
+        self.simPositions: dict[int, SimPosition] = {}
+        self.simPortfolio: dict[int, PortfolioItem] = {}
+        self.simFills: dict[str, Fill] = {}
+
+    async def connectAsync(
+        self,
+        host: str = "",
+        port: int = 0,
+        clientId: int = 0,
+        timeout: float | None = None,
+        readonly: bool = False,
+        account: str = "",
+        raiseSyncErrors: bool = False,
+        fetchFields: StartupFetch = StartupFetchALL,
+    ) -> "SimIB":
+        self.simConnected = True
+        self.simClientId = clientId
+        self.account = account or self.account
+        self.client._reqIdSeq = max(self.client._reqIdSeq, 1)
+        self.wrapper.accounts = [self.account]
+        self.connectedEvent.emit()
+        return self
+
+    def disconnect(self) -> None:
+        if self.simConnected:
+            self.simConnected = False
+            self.disconnectedEvent.emit()
+
+    def isConnected(self) -> bool:
+        return self.simConnected
+
+    def qualify(self, contract: Contract) -> Contract:
+        if isinstance(contract, Bag):
+            return contract
+
+        if not contract.conId:
+            name = contractName(contract)
+            contract.localSymbol = contract.localSymbol or name
+            contract.conId = syntheticConId(name)
+
+        contract.currency = contract.currency or "USD"
+        self.contracts.setdefault(contract.conId, contract)
+        return contract
+
+    async def qualifyContractsAsync(self, *contracts: Contract, **kwargs) -> list:
+        return [self.qualify(c) for c in contracts]
+
+    def qualifyContracts(self, *contracts: Contract, **kwargs) -> list:
+        return [self.qualify(c) for c in contracts]
+
+    async def reqContractDetailsAsync(self, contract: Contract) -> list:
+        return [ContractDetails(contract=self.qualify(contract), minTick=0.01)]
+
+    async def reqMarketRuleAsync(self, marketRuleId: int) -> list:
+        return []
+
+    async def reqSecDefOptParamsAsync(self, *args, **kwargs) -> list:
+        return []
+
+    async def reqHistoricalDataAsync(
+        self,
+        contract: Contract,
+        endDateTime: datetime.datetime | datetime.date | str | None,
+        durationStr: str,
+        barSizeSetting: str,
+        whatToShow: str,
+        useRTH: bool,
+        formatDate: int = 1,
+        keepUpToDate: bool = False,
+        chartOptions: list[TagValue] = [],
+        timeout: float = 60,
+    ) -> BarDataList:
+        return BarDataList()
+
+    async def reqMktDepthExchangesAsync(self) -> list:
+        return []
+
+    def ticker(self, contract: Contract) -> Ticker:
+        """Return the simulator's ticker for a contract (tick replays quote through these)."""
+        key = contract.conId if not isinstance(contract, Bag) else id(contract)
+        if (found := self.simTickers.get(key)) is None:
+            found = self.simTickers[key] = Ticker(contract=contract)
+            if not isinstance(contract, Bag):
+                self.contracts.setdefault(contract.conId, contract)
+
+        return found
+
+    def reqMktData(self, contract: Contract, *args, **kwargs) -> Ticker:
+        return self.ticker(self.qualify(contract))
+
+    def cancelMktData(self, contract: Contract) -> bool:
+        return True
+
+    def reqMktDepth(self, contract: Contract, *args, **kwargs) -> Ticker:
+        return self.ticker(self.qualify(contract))
+
+    def cancelMktDepth(self, contract: Contract, *args, **kwargs) -> None:
+        pass
+
+    def reqRealTimeBars(self, contract: Contract, *args, **kwargs) -> RealTimeBarList:
+        bars = RealTimeBarList()
+        bars.contract = contract
+        return bars
+
+    def cancelRealTimeBars(self, bars: RealTimeBarList) -> None:
+        pass
+
+    def reqMarketDataType(self, marketDataType: int) -> None:
+        pass
+
+    def reqNewsBulletins(self, allMessages: bool) -> None:
+        pass
+
+    def reqPnL(self, account: str, modelCode: str = "") -> PnL:
+        return PnL(account, modelCode)
+
+    def reqPnLSingle(self, account: str, modelCode: str, conId: int) -> PnLSingle:
+        return PnLSingle(account, modelCode, conId)
+
+    def cancelPnLSingle(self, account: str, modelCode: str, conId: int) -> None:
+        pass
+
+    async def reqAccountSummaryAsync(self) -> None:
+        pass
+
+    async def reqExecutionsAsync(self, execFilter=None) -> list[Fill]:
+        return list(self.simFills.values())
+
+    async def reqCompletedOrdersAsync(self, apiOnly: bool) -> list[Trade]:
+        return [o.trade for o in self.simOrders.values() if o.trade.isDone()]
+
+    async def reqAllOpenOrdersAsync(self) -> list[Trade]:
+        return self.openTrades()
+
+    def positions(self, account: str = "") -> list[Position]:
+        return [
+            Position(self.account, self.contracts[conId], p.quantity, p.avgCost)
+            for conId, p in self.simPositions.items()
+            if p.quantity
+        ]
+
+    def portfolio(self, account: str = "") -> list[PortfolioItem]:
+        return list(self.simPortfolio.values())
+
+    def trades(self) -> list[Trade]:
+        return [o.trade for o in self.simOrders.values()]
+
+    def openTrades(self) -> list[Trade]:
+        return [o.trade for o in self.simOrders.values() if not o.trade.isDone()]
+
+    def fills(self) -> list[Fill]:
+        return list(self.simFills.values())
+
+    def executions(self) -> list[Execution]:
+        return [f.execution for f in self.simFills.values()]
+
+    async def whatIfOrderAsync(self, contract: Contract, order: Order) -> OrderState:
+        bid, ask, *_ = self.quoteFor(contract)
+        price = float(order.lmtPrice or (ask if order.action == "BUY" else bid) or 0)
+        multiplier = float(getattr(contract, "multiplier", "") or 1)
+        notional = float(order.totalQuantity) * price * multiplier
+
+        # equities at regulation T margin, everything else fully paid
+        margin = notional * (0.25 if contract.secType == "STK" else 1)
+        return OrderState(
+            status="PreSubmitted",
+            initMarginChange=str(margin),
+            maintMarginChange=str(margin),
+            equityWithLoanChange=str(-notional),
+            commission=self.commission(contract, order.totalQuantity),
+        )
+
+    def later(self, delay: float, callback, *args) -> None:
+        loop = asyncio.get_running_loop()
+        if delay > 0:
+            loop.call_later(delay, callback, *args)
+        else:
+            loop.call_soon(callback, *args)
+
+    def log(self, trade: Trade, status: str, message: str = "", code: int = 0) -> None:
+        trade.log.append(
+            TradeLogEntry(
+                datetime.datetime.now(datetime.timezone.utc), status, message, code
+            )
+        )
+
+    def status(self, trade: Trade, status: str, message: str = "") -> None:
+        trade.orderStatus.status = status
+        self.log(trade, status, message)
+        trade.statusEvent.emit(trade)
+        self.orderStatusEvent.emit(trade)
+
+    def key(self, contract: Contract) -> Any:
+        if isinstance(contract, Bag):
+            return frozenset(
+                (leg.conId, leg.action, leg.ratio) for leg in contract.comboLegs
+            )
+
+        return contract.conId
+
+    def placeOrder(self, contract: Contract, order: Order) -> Trade:
+        now = time.monotonic()
+        if not order.orderId:
+            order.orderId = self.client.getReqId()
+
+        order.clientId = self.simClientId
+
+        if (found := self.simOrders.get(order.orderId)) and not found.trade.isDone():
+            # modification: IBKR acknowledges with another order status
+            trade = found.trade
+            if trade.order is not order:
+                for f in ("lmtPrice", "auxPrice", "totalQuantity", "orderType", "tif"):
+                    setattr(trade.order, f, getattr(order, f))
+
+            self.log(trade, trade.orderStatus.status, "Modify")
+            trade.modifyEvent.emit(trade)
+            self.orderModifyEvent.emit(trade)
+            self.later(self.ackLatency, self.acknowledge, found, True)
+            return trade
+
+        self.permIds += 1
+        order.permId = self.permIds
+        if not isinstance(contract, Bag):
+            self.qualify(contract)
+
+        trade = Trade(
+            contract,
+            order,
+            OrderStatus(
+                orderId=order.orderId,
+                status="PendingSubmit",
+                remaining=order.totalQuantity,
+                permId=order.permId,
+                parentId=order.parentId,
+                clientId=order.clientId,
+            ),
+            [],
+            [],
+        )
+        self.log(trade, "PendingSubmit")
+
+        sim = self.simOrders[order.orderId] = SimOrder(trade, now)
+        if order.parentId:
+            self.children[order.parentId].add(order.orderId)
+
+        self.newOrderEvent.emit(trade)
+
+        if not order.transmit:
+            # brackets transmit all together with their final leg
+            sim.held = True
+        else:
+            group = [sim]
+            if order.parentId and (parent := self.simOrders.get(order.parentId)):
+                group.append(parent)
+                group += [
+                    self.simOrders[c]
+                    for c in self.children[order.parentId]
+                    if c != order.orderId
+                ]
+
+            for member in group:
+                if member.held or member is sim:
+                    member.held = False
+                    self.later(self.ackLatency, self.acknowledge, member, False)
+
+        return trade
+
+    def acknowledge(self, sim: SimOrder, modified: bool) -> None:
+        trade = sim.trade
+        if trade.isDone():
+            return
+
+        if not modified and self.rejectRate and self.random.random() < self.rejectRate:
+            self.errorEvent.emit(
+                trade.order.orderId,
+                201,
+                "Order rejected - simulated rejection",
+                trade.contract,
+            )
+            sim.done = time.monotonic()
+            self.status(trade, "Cancelled", "Rejected")
+            trade.cancelledEvent.emit(trade)
+            return
+
+        now = time.monotonic()
+        if sim.acked != sim.acked:
+            sim.acked = now
+
+        # the gateway confirms new and modified orders with their order details first
+        self.openOrderEvent.emit(trade)
+
+        # bracket children wait for their parent to fill
+        parent = self.simOrders.get(trade.order.parentId)
+        if parent and parent.trade.orderStatus.status != "Filled":
+            self.status(trade, "PreSubmitted")
+            return
+
+        sim.fillableAt = now + self.fillLatency
+        self.working[self.key(trade.contract)].add(trade.order.orderId)
+        self.status(trade, "Submitted")
+
+        if self.fillLatency > 0:
+            self.later(self.fillLatency, self.fillable, sim)
+        else:
+            self.matchOrder(sim)
+
+    def fillable(self, sim: SimOrder) -> None:
+        # (loop timers may run marginally before their deadline)
+        sim.fillableAt = -math.inf
+        self.matchOrder(sim)
+
+    def cancelOrder(self, order: Order, *args) -> Trade | None:
+        if not (sim := self.simOrders.get(order.orderId)):
+            return None
+
+        trade = sim.trade
+        if not trade.isDone():
+            self.status(trade, "PendingCancel")
+            trade.cancelEvent.emit(trade)
+            self.cancelOrderEvent.emit(trade)
+            self.later(self.ackLatency, self.cancelled, sim, "Cancelled")
+
+        return trade
+
+    def cancelled(self, sim: SimOrder, status: str = "Cancelled") -> None:
+        trade = sim.trade
+        if trade.isDone():
+            return
+
+        self.working[self.key(trade.contract)].discard(trade.order.orderId)
+        sim.done = time.monotonic()
+        self.status(trade, status)
+        trade.cancelledEvent.emit(trade)
+
+        # cancelling a parent cancels its children too
+        for child in self.children.pop(trade.order.orderId, ()):
+            self.cancelled(self.simOrders[child])
+
+    def quoteFor(self, contract: Contract) -> tuple[float, float, float, float, float]:
+        """Return (bid, ask, bidSize, askSize, last) for a contract (spreads from their legs)."""
+        if not isinstance(contract, Bag):
+            t = self.simTickers.get(contract.conId)
+            if not t:
+                return (math.nan,) * 5
+
+            return (t.bid, t.ask, t.bidSize, t.askSize, t.last)
+
+        bid = ask = 0.0
+        bidSize = askSize = math.inf
+        for leg in contract.comboLegs:
+            t = self.simTickers.get(leg.conId)
+            if not t or not (t.bid >= 0 and t.ask > 0):
+                return (math.nan,) * 5
+
+            if leg.action == "SELL":
+                bid -= t.ask * leg.ratio
+                ask -= t.bid * leg.ratio
+                bidSize = min(bidSize, t.askSize)
+                askSize = min(askSize, t.bidSize)
+            else:
+                bid += t.bid * leg.ratio
+                ask += t.ask * leg.ratio
+                bidSize = min(bidSize, t.bidSize)
+                askSize = min(askSize, t.askSize)
+
+        return (bid, ask, bidSize, askSize, math.nan)
+
+    def quote(
+        self,
+        contract: Contract,
+        bid: float,
+        ask: float,
+        bidSize: float = 100,
+        askSize: float = 100,
+        last: float = math.nan,
+    ) -> Ticker:
+        """Set a synthetic quote, deliver it like a gateway tick, and match orders against it."""
+        ticker = self.ticker(self.qualify(contract))
+        ticker.time = datetime.datetime.now(datetime.timezone.utc)
+        ticker.bid = bid
+        ticker.ask = ask
+        ticker.bidSize = bidSize
+        ticker.askSize = askSize
+        ticker.last = last
+
+        self.pendingTickersEvent.emit({ticker})
+        self.match([ticker])
+        return ticker
+
+    def match(self, tickers: Iterable[Ticker]) -> None:
+        """Match working orders for contracts whose quotes changed (tick replays call this per batch)."""
+        if not any(self.working.values()):
+            return
+
+        conIds = {t.contract.conId for t in tickers if t.contract}
+        for key, orderIds in list(self.working.items()):
+            if not orderIds:
+                continue
+
+            if isinstance(key, frozenset):
+                if not any(conId in conIds for conId, *_ in key):
+                    continue
+            elif key not in conIds:
+                continue
+
+            for orderId in list(orderIds):
+                self.matchOrder(self.simOrders[orderId])
+
+    def fillPrice(self, sim: SimOrder) -> tuple[float, float] | None:
+        """Return (price, available quantity) if the order can fill now."""
+        order = sim.trade.order
+        bid, ask, bidSize, askSize, last = self.quoteFor(sim.trade.contract)
+        if not (bid == bid and ask == ask):
+            return None
+
+        buying = order.action == "BUY"
+        orderType = order.orderType
+
+        if orderType.startswith("STP") and not sim.triggered:
+            # stops without a trigger price never trigger
+            if order.auxPrice is None:
+                return None
+
+            stop = float(order.auxPrice)
+            mark = last if last == last else (bid + ask) / 2
+            if (mark >= stop) if buying else (mark <= stop):
+                sim.triggered = True
+            else:
+                return None
+
+        touch, size = (ask, askSize) if buying else (bid, bidSize)
+        size = size if size and size == size and size > 0 else math.inf
+
+        if orderType in MARKET_TYPES or orderType == "STP":
+            return touch, size
+
+        if orderType == "MIDPRICE":
+            mid = (bid + ask) / 2
+            limit = order.lmtPrice
+            if (
+                limit
+                and limit == limit
+                and ((mid > limit) if buying else (mid < limit))
+            ):
+                return None
+
+            return mid, size
+
+        limit = order.lmtPrice
+        if not (limit and limit == limit):
+            return touch, size
+
+        if (touch <= limit) if buying else (touch >= limit):
+            return touch, size
+
+        return None
+
+    def matchOrder(self, sim: SimOrder) -> None:
+        trade = sim.trade
+        if trade.isDone() or time.monotonic() < sim.fillableAt:
+            return
+
+        if not (found := self.fillPrice(sim)):
+            return
+
+        price, available = found
+        remaining = trade.orderStatus.remaining
+        quantity = min(remaining, available)
+        if (
+            self.partialRate
+            and quantity > 1
+            and self.random.random() < self.partialRate
+        ):
+            quantity = max(1, math.floor(quantity * self.random.random()))
+
+        self.execute(sim, price, quantity)
+
+    def commission(self, contract: Contract, quantity: float) -> float:
+        if contract.secType == "STK":
+            return max(COMMISSION_MINIMUM, quantity * COMMISSION_SHARE)
+
+        return quantity * COMMISSION_CONTRACT
+
+    def execute(self, sim: SimOrder, price: float, quantity: float) -> None:
+        trade = sim.trade
+        order = trade.order
+        status = trade.orderStatus
+        now = datetime.datetime.now(datetime.timezone.utc)
+
+        if sim.firstFill != sim.firstFill:
+            sim.firstFill = time.monotonic()
+
+        previous = status.filled
+        status.filled = previous + quantity
+        status.remaining = order.totalQuantity - status.filled
+        status.avgFillPrice = (
+            status.avgFillPrice * previous + price * quantity
+        ) / status.filled
+        status.lastFillPrice = price
+
+        contract = trade.contract
+        if isinstance(contract, Bag):
+            # spreads execute as their legs at the leg touch prices
+            legs = []
+            for leg in contract.comboLegs:
+                t = self.simTickers[leg.conId]
+                buying = (leg.action == "BUY") == (order.action == "BUY")
+                legs.append(
+                    (
+                        self.contracts.get(leg.conId) or Contract(conId=leg.conId),
+                        "BOT" if buying else "SLD",
+                        quantity * leg.ratio,
+                        t.ask if buying else t.bid,
+                    )
+                )
+        else:
+            legs = [
+                (contract, "BOT" if order.action == "BUY" else "SLD", quantity, price)
+            ]
+
+        for legContract, side, shares, legPrice in legs:
+            self.fill(trade, legContract, side, shares, legPrice, now)
+
+        done = status.remaining <= 0
+        if done:
+            self.working[self.key(contract)].discard(order.orderId)
+            sim.done = time.monotonic()
+
+        self.status(trade, "Filled" if done else "Submitted")
+
+        if done:
+            trade.filledEvent.emit(trade)
+            self.bracketFilled(sim)
+
+    def fill(
+        self,
+        trade: Trade,
+        contract: Contract,
+        side: str,
+        shares: float,
+        price: float,
+        when: datetime.datetime,
+    ) -> None:
+        order = trade.order
+        self.execIds += 1
+        execId = f"sim.{self.execSession}.{self.execIds:08d}"
+
+        cumQty = (
+            sum(
+                f.execution.shares
+                for f in trade.fills
+                if f.contract.conId == contract.conId
+            )
+            + shares
+        )
+        execution = Execution(
+            execId=execId,
+            time=when,
+            acctNumber=self.account,
+            exchange="SIM",
+            side=side,
+            shares=shares,
+            price=price,
+            permId=order.permId,
+            clientId=order.clientId,
+            orderId=order.orderId,
+            cumQty=cumQty,
+            avgPrice=price,
+            orderRef=order.orderRef,
+        )
+
+        commission = self.commission(contract, shares)
+        realized = self.applyPosition(contract, side, shares, price, commission)
+        report = CommissionReport(execId, commission, "USD", realized)
+
+        fill = Fill(contract, execution, report, when)
+        self.simFills[execId] = fill
+        trade.fills.append(fill)
+
+        trade.fillEvent.emit(trade, fill)
+        self.execDetailsEvent.emit(trade, fill)
+        trade.commissionReportEvent.emit(trade, fill, report)
+        self.commissionReportEvent.emit(trade, fill, report)
+
+    def applyPosition(
+        self,
+        contract: Contract,
+        side: str,
+        shares: float,
+        price: float,
+        commission: float,
+    ) -> float:
+        """Update position and portfolio for an execution; returns realized PnL (after commission)."""
+        multiplier = float(getattr(contract, "multiplier", "") or 1)
+        signed = shares if side == "BOT" else -shares
+        pos = self.simPositions.setdefault(contract.conId, SimPosition())
+        self.contracts.setdefault(contract.conId, contract)
+
+        realized = 0.0
+        cost = price * multiplier
+        if pos.quantity and (pos.quantity > 0) != (signed > 0):
+            # reducing (or flipping) the position realizes PnL on the closed quantity
+            closed = min(abs(signed), abs(pos.quantity))
+            direction = 1 if pos.quantity > 0 else -1
+            realized = (cost - pos.avgCost) * closed * direction - commission
+            pos.realized += realized
+            pos.quantity += math.copysign(closed, signed)
+            remainder = abs(signed) - closed
+            if remainder:
+                pos.quantity = math.copysign(remainder, signed)
+                pos.avgCost = cost
+            elif not pos.quantity:
+                pos.avgCost = 0
+        else:
+            total = abs(pos.quantity) + abs(signed)
+            pos.avgCost = (pos.avgCost * abs(pos.quantity) + cost * abs(signed)) / total
+            pos.quantity += signed
+
+        position = Position(self.account, contract, pos.quantity, pos.avgCost)
+        self.positionEvent.emit(position)
+
+        bid, ask, *_ = self.quoteFor(contract)
+        mark = (bid + ask) / 2 if bid == bid and ask == ask else price
+        item = PortfolioItem(
+            contract,
+            pos.quantity,
+            mark,
+            mark * multiplier * pos.quantity,
+            pos.avgCost,
+            (mark * multiplier - pos.avgCost) * pos.quantity,
+            pos.realized,
+            self.account,
+        )
+
+        if pos.quantity:
+            self.simPortfolio[contract.conId] = item
+        else:
+            self.simPortfolio.pop(contract.conId, None)
+
+        self.updatePortfolioEvent.emit(item)
+
+        # opening executions report no realized PnL (like IBKR)
+        return realized
+
+    def bracketFilled(self, sim: SimOrder) -> None:
+        order = sim.trade.order
+
+        # a filled parent activates its children
+        for child in self.children.get(order.orderId, ()):
+            member = self.simOrders[child]
+            if not member.held and not member.trade.isDone():
+                self.acknowledge(member, True)
+
+        # a filled child cancels its siblings (one-cancels-all)
+        if order.parentId:
+            for sibling in self.children.get(order.parentId, ()):
+                if sibling != order.orderId:
+                    self.cancelled(self.simOrders[sibling])
+
+    def report(self) -> dict[str, dict[str, float]]:
+        """Order lifecycle latency summary in milliseconds (placement to ack, first fill, done)."""
+        spans: dict[str, list[float]] = dict(ack=[], firstFill=[], done=[])
+        for sim in self.simOrders.values():
+            for name, at in (
+                ("ack", sim.acked),
+                ("firstFill", sim.firstFill),
+                ("done", sim.done),
+            ):
+                if at == at:
+                    spans[name].append((at - sim.placed) * 1000)
+
+        found = {}
+        for name, values in spans.items():
+            if not values:
+                continue
+
+            values.sort()
+            found[name] = dict(
+                count=len(values),
+                mean=statistics.fmean(values),
+                p50=values[len(values) // 2],
+                p99=values[min(len(values) - 1, int(len(values) * 0.99))],
+                max=values[-1],
+            )
+
+        return found
+
+
+async def loadTest(
+    symbol: str = "SPY", orders: int = 100, rate: float = 50, price: float = 500
+) -> dict[str, dict[str, float]]:
+    """Place 'orders' marketable limit orders at 'rate' per second through the app against a simulated broker."""
+    # (replays use this module for their broker)
+    from icli.replay import replayApp
+
+    sim = SimIB()
+    app = replayApp(ib=sim)
+    await app.prepare()
+
+    contract = sim.qualify(Stock(symbol, "SMART", "USD"))
+    sim.quote(contract, price - 0.01, price + 0.01, 1_000, 1_000, price)
+
+    for i in range(orders):
+        isLong = i % 2 == 0
+        await app.placeOrderForContract(
+            symbol,
+            isLong,
+            contract,
+            PriceOrQuantity(1, is_quantity=True),
+            limit=price + (0.01 if isLong else -0.01),
+            orderType="LMT",
+        )
+
+        await asyncio.sleep(1 / rate if rate else 0)
+
+    # wait for outstanding acknowledgements and fills
+    await asyncio.sleep(sim.ackLatency + sim.fillLatency + 0.1)
+
+    app.exiting = True
+    app.stop()
+    return sim.report()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Load test order paths against a simulated broker"
+    )
+    parser.add_argument("--symbol", default="SPY")
+    parser.add_argument("--orders", type=int, default=100)
+    parser.add_argument(
+        "--rate", type=float, default=50, help="orders per second (0: max)"
+    )
+    args = parser.parse_args()
+
+    for stage, found in asyncio.run(
+        loadTest(args.symbol, args.orders, args.rate)
+    ).items():
+        logger.info(
+            "{:>10}: {count} orders, mean {mean:,.2f} ms, p50 {p50:,.2f} ms, p99 {p99:,.2f} ms, max {max:,.2f} ms",
+            stage,
+            **found,
+        )
+
+
+if __name__ == "__main__":
+    main()
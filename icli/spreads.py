@@ -0,0 +1,173 @@
+"""Synthetic spread quotes.
+
+IBKR often doesn't quote spreads (Bag contracts) at all, but if every leg is quoted we can
+build the spread quote ourselves: BUY legs add their bid/ask, SELL legs subtract their
+ask/bid (so credit spreads go negative), and the spread size is the smallest leg size.
+
+SpreadBook indexes every leg contract id to the spreads containing it, so a leg tick only
+marks its own spreads dirty and each dirty spread is recomputed once per ticker event.
+While IBKR isn't quoting a spread, the synthetic values are written into the spread's
+QuoteStore slot, so everything reading quotes from the store (toolbar, calculator,
+strategies, order chaser) sees the same spread quote without walking legs again.
+"""
+
+from dataclasses import dataclass, field
+from typing import Hashable
+
+import numpy as np
+
+from ib_async import Bag
+
+from icli.helpers import lookupKey
+from icli.quotestore import QuoteStore
+
+
+@dataclass(slots=True)
+class SpreadQuote:
+    key: Hashable
+
+    # (leg contract id, signed ratio) where SELL legs have negative ratios
+    legs: list[tuple[int, float]]
+
+    bid: float = np.nan
+    ask: float = np.nan
+    bidSize: float = 0
+    askSize: float = 0
+    time: float = np.nan
+
+    # IBKR is quoting this spread itself, so synthetic values aren't written to the store
+    native: bool = False
+
+    @property
+    def mid(self) -> float:
+        return (self.bid + self.ask) / 2
+
+    @property
+    def complete(self) -> bool:
+        return self.bid == self.bid and self.ask == self.ask
+
+
+@dataclass
+class SpreadBook:
+    store: QuoteStore
+
+    # spread quote key -> spread
+    spreads: dict[Hashable, SpreadQuote] = field(default_factory=dict)
+
+    # leg contract id -> spread keys using the leg
+    byLeg: dict[int, set[Hashable]] = field(default_factory=dict)
+
+    # spreads with a leg updated since the last flush()
+    dirty: set[Hashable] = field(default_factory=set)
+
+    def add(self, contract: Bag) -> SpreadQuote:
+        key = lookupKey(contract)
+        if found := self.spreads.get(key):
+            return found
+
+        spread = self.spreads[key] = SpreadQuote(
+            key,
+            [
+                (leg.conId, -leg.ratio if leg.action == "SELL" else leg.ratio)
+                for leg in contract.comboLegs
+            ],
+        )
+
+        for conId, _ in spread.legs:
+            self.byLeg.setdefault(conId, set()).add(key)
+
+        self.dirty.add(key)
+        return spread
+
+    def remove(self, key: Hashable) -> None:
+        if not (spread := self.spreads.pop(key, None)):
+            return
+
+        self.dirty.discard(key)
+        for conId, _ in spread.legs:
+            if found := self.byLeg.get(conId):
+                found.discard(key)
+                if not found:
+                    del self.byLeg[conId]
+
+    def legUpdated(self, conId: int) -> None:
+        """tickersUpdate hook: a leg quote changed (only call for conIds in byLeg)."""
+        self.dirty |= self.byLeg[conId]
+
+    def native(self, key: Hashable, native: bool) -> None:
+        """Record whether IBKR is currently quoting the spread itself."""
+        if spread := self.spreads.get(key):
+            spread.native = native
+
+            # the spread's own (empty) ticker values were just written over our synthetic values
+            if not native:
+                self.dirty.add(key)
+
+    def compute(self, spread: SpreadQuote) -> None:
+        store = self.store
+        bid = 0.0
+        ask = 0.0
+        bidSize = float("inf")
+        askSize = float("inf")
+        when = 0.0
+
+        for conId, ratio in spread.legs:
+            slot = store.conIds.get(conId)
+
+            # a missing leg quote means no spread quote (partial sums would be wrong)
+            if slot is None or not (store.bid[slot] >= 0 and store.ask[slot] > 0):
+                spread.bid = spread.ask = np.nan
+                spread.bidSize = spread.askSize = 0
+                return
+
+            if ratio < 0:
+                # SELL legs have opposite signs and sides because they are credits
+                bid += store.ask[slot] * ratio
+                ask += store.bid[slot] * ratio
+                bidSize = min(bidSize, store.askSize[slot])
+                askSize = min(askSize, store.bidSize[slot])
+            else:
+                bid += store.bid[slot] * ratio
+                ask += store.ask[slot] * ratio
+                bidSize = min(bidSize, store.bidSize[slot])
+                askSize = min(askSize, store.askSize[slot])
+
+            when = max(when, store.time[slot])
+
+        spread.bid = float(bid)
+        spread.ask = float(ask)
+        spread.bidSize = float(bidSize)
+        spread.askSize = float(askSize)
+        spread.time = float(when)
+
+    def flush(self) -> list[SpreadQuote]:
+        """Recompute spreads with updated legs; returns the recomputed complete synthetic spreads."""
+        if not self.dirty:
+            return []
+
+        updated = []
+        for key in self.dirty:
+            if not (spread := self.spreads.get(key)) or spread.native:
+                continue
+
+            self.compute(spread)
+            if not spread.complete:
+                continue
+
+            if (slot := self.store.slot(key)) is not None:
+                self.store.set(
+                    slot,
+                    spread.bid,
+                    spread.ask,
+                    spread.bidSize,
+                    spread.askSize,
+                    spread.time,
+                )
+
+            updated.append(spread)
+
+        self.dirty.clear()
+        return updated
+
+    def quote(self, key: Hashable) -> SpreadQuote | None:
+        return self.spreads.get(key)
@@ -0,0 +1,386 @@
+"""Strategy runtime.
+
+Armed strategies (entries in the app's `strategy` dict) are evaluated by long-lived
+strategy objects, one per symbol, instead of dispatching a new `runstrat` command per tick.
+
+tickersUpdate only calls `notify(symbol)`: notifications are coalesced per symbol through
+a queue, so a symbol ticking many times while its strategy is still evaluating results
+in exactly one more evaluation afterwards instead of a pile of stacked tasks.
+
+Strategy orders are OrderIntents: submitting returns immediately and moves the strategy
+into the pending exit state "X", then order status and execution events move it on to
+its next state (or back to where it was if the order fails). An order which dies after a
+partial fill is placed again for the remaining quantity; if that keeps failing, the
+strategy still moves on to its next state because the position already changed. An order
+which fails without any fill backs its strategy off before it evaluates (and retries)
+again, doubling the wait for each consecutive failure.
+"""
+
+import asyncio
+import time
+
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Final
+
+import pendulum
+
+from ib_async import Fill, Trade
+from loguru import logger
+
+from icli.helpers import contractForName, PriceOrQuantity
+
+# allowed strategy state changes made by strategies themselves
+# (manual 'setstrat' commands can still move a strategy to any state)
+STRAT_TRANSITIONS: Final = {
+    # S1: position management
+    "L0": {"L1", "X", "Z"},
+    "L1": {"L2", "X", "Z"},
+    "L2": {"X", "Z"},
+    # pending exit order resolves to its next state (or back to its previous state on failure)
+    "X": {"L0", "L1", "L2", "Z"},
+    # S2: opening range breakout
+    "S": {"O", "A", "Z"},
+    "O": {"B", "A", "Z"},
+    "B": {"O", "Z"},
+    "A": {"Z"},
+    "Z": set(),
+}
+
+# strategy exits are adaptive market orders
+INTENT_ORDER_TYPE: Final = "MKT + ADAPTIVE + FAST"
+
+# recent strategy decisions kept for inspection (replays compare these across runs)
+STRAT_DECISIONS: Final = 1000
+
+# order statuses which end an intent without a complete fill
+INTENT_FAILED_STATUSES: Final = {"Cancelled", "ApiCancelled", "Inactive"}
+
+# orders placed per intent (the first plus re-placements of partially filled remainders)
+INTENT_ATTEMPTS: Final = 3
+
+# seconds before re-evaluating a strategy whose order failed without filling
+# (doubled for each consecutive failure up to INTENT_RETRY_MAX)
+INTENT_RETRY_DELAY: Final = 5.0
+INTENT_RETRY_MAX: Final = 300.0
+
+
+@dataclass(slots=True)
+class OrderIntent:
+    """A strategy order running in the background."""
+
+    symbol: str
+
+    # signed order quantity (negative sells)
+    quantity: float
+
+    # strategy state after the order fills, and state to restore if it fails
+    nextState: str
+    previousState: str
+
+    orderType: str = INTENT_ORDER_TYPE
+
+    trade: Trade | None = None
+    status: str = "Submitting"
+
+    # unsigned quantity filled across every order of this intent, and by orders before 'trade'
+    filled: float = 0
+    filledBefore: float = 0
+
+    attempts: int = 0
+
+    @property
+    def done(self) -> bool:
+        return self.status in {"Filled", "Failed"}
+
+    @property
+    def remaining(self) -> float:
+        """Signed quantity still to fill."""
+        left = max(0, abs(self.quantity) - self.filled)
+        return left if self.quantity > 0 else -left
+
+
+@dataclass
+class StrategyRuntime:
+    """Registry of strategy objects by symbol plus the coalescing evaluation queue."""
+
+    state: Any
+
+    # algo name -> strategy class (constructed with the app state)
+    factories: dict[str, Callable] = field(default_factory=dict)
+
+    # symbol -> (algo, strategy object)
+    instances: dict[str, tuple[str, Any]] = field(default_factory=dict)
+
+    queue: asyncio.Queue = field(default_factory=asyncio.Queue)
+
+    # symbols waiting in 'queue' (so each symbol is queued at most once)
+    queued: set[str] = field(default_factory=set)
+
+    # symbols currently evaluating, and symbols notified again during their evaluation
+    active: dict[str, asyncio.Task] = field(default_factory=dict)
+    stale: set[str] = field(default_factory=set)
+
+    worker: asyncio.Task | None = None
+
+    # order id -> in-flight strategy order
+    intents: dict[int, OrderIntent] = field(default_factory=dict)
+
+    # symbol -> (state whose orders failed, consecutive failures, monotonic retry time)
+    backoff: dict[str, tuple[str, int, float]] = field(default_factory=dict)
+
+    # (time, symbol, decision, detail) for state transitions and submitted orders
+    decisions: deque[tuple[float, str, str, Any]] = field(
+        default_factory=lambda: deque(maxlen=STRAT_DECISIONS)
+    )
+
+    def notify(self, symbol: str) -> None:
+        """Request an evaluation of the strategy for 'symbol' (called per tick, so must stay cheap)."""
+        if symbol in self.queued:
+            return
+
+        self.queued.add(symbol)
+        self.queue.put_nowait(symbol)
+
+        if not self.worker or self.worker.done():
+            self.worker = asyncio.create_task(self.run())
+
+    async def run(self) -> None:
+        while True:
+            symbol = await self.queue.get()
+            self.queued.discard(symbol)
+
+            # still evaluating the previous notification, so evaluate once more when it finishes
+            if symbol in self.active:
+                self.stale.add(symbol)
+                continue
+
+            self.active[symbol] = asyncio.create_task(self.evaluateAndRequeue(symbol))
+
+    async def evaluateAndRequeue(self, symbol: str) -> None:
+        try:
+            await self.evaluate(symbol)
+        except:
+            logger.exception("[{}] Strategy evaluation failed", symbol)
+        finally:
+            del self.active[symbol]
+            if symbol in self.stale:
+                self.stale.discard(symbol)
+                self.notify(symbol)
+
+    def strategyFor(self, symbol: str, algo: str) -> Any | None:
+        """Return the strategy object for 'symbol', creating it if needed (or if the algo changed)."""
+        found = self.instances.get(symbol)
+        if found and found[0] == algo:
+            return found[1]
+
+        factory = self.factories.get(algo)
+        if not factory:
+            logger.error("[{}] No strategy implementation for algo: {}", symbol, algo)
+            return None
+
+        strat = factory(self.state)
+        self.instances[symbol] = (algo, strat)
+        return strat
+
+    async def evaluate(self, symbol: str, algo: str | None = None) -> Any:
+        """Run one evaluation of the strategy for 'symbol'.
+
+        'algo' is only needed when the symbol has no strategy state yet."""
+        if algo is None:
+            if not (strategyState := self.state.strategy.get(symbol)):
+                self.release(symbol)
+                return None
+
+            algo = strategyState.get("algo")
+
+            # the last order failed, so wait before trying again
+            if (found := self.backoff.get(symbol)) and time.monotonic() < found[2]:
+                return None
+
+        if not (strat := self.strategyFor(symbol, algo)):
+            return None
+
+        result = await strat.run(symbol)
+
+        # strategies remove their own state when finished, so drop the finished object too
+        if symbol not in self.state.strategy:
+            self.release(symbol)
+
+        return result
+
+    def transition(self, symbol: str, to: str) -> None:
+        """Move strategy for 'symbol' to state 'to'."""
+        strategyState = self.state.strategy[symbol]
+        current = strategyState.get("start")
+
+        if to not in STRAT_TRANSITIONS.get(current, set()):
+            logger.warning(
+                "[{}] Unexpected strategy state transition: {} -> {}", symbol, current, to
+            )
+
+        logger.info("[{}] Strategy state: {} -> {}", symbol, current, to)
+        strategyState["start"] = to
+        self.decisions.append((pendulum.now().timestamp(), symbol, "state", to))
+
+    def release(self, symbol: str) -> None:
+        self.instances.pop(symbol, None)
+        self.backoff.pop(symbol, None)
+
+    def submit(
+        self, symbol: str, quantity: float, nextState: str, announce: str | None = None
+    ) -> OrderIntent:
+        """Place a strategy order for 'symbol' without waiting for it.
+
+        The strategy moves to "X" until the order resolves to 'nextState'."""
+        strategyState = self.state.strategy[symbol]
+        intent = OrderIntent(symbol, quantity, nextState, strategyState.get("start"))
+
+        strategyState["intent"] = intent
+        self.decisions.append((pendulum.now().timestamp(), symbol, "order", quantity))
+        self.transition(symbol, "X")
+
+        asyncio.create_task(self.place(intent))
+
+        if announce:
+            asyncio.create_task(self.state.speak.say(say=announce))
+
+        return intent
+
+    async def place(self, intent: OrderIntent) -> None:
+        contract = None
+        if found := self.state.positions.get(intent.symbol):
+            contract = found.contract
+        else:
+            (contract,) = await self.state.qualify(contractForName(intent.symbol))
+
+        quantity = intent.remaining
+        intent.attempts += 1
+
+        # a manual exit may already be working for this position
+        if exiting := self.state.openOrders.exiting(contract, -quantity):
+            logger.warning(
+                "[{}] Strategy exit placed while other exit orders for {} are working",
+                intent.symbol,
+                exiting,
+            )
+
+        placed = None
+        try:
+            placed = await self.state.placeOrderForContract(
+                intent.symbol,
+                quantity > 0,
+                contract,
+                PriceOrQuantity(quantity, is_quantity=True),
+                limit=0,
+                orderType=intent.orderType,
+            )
+        except:
+            logger.exception("[{}] Strategy order failed", intent.symbol)
+
+        if not placed:
+            self.resolve(intent, "Failed")
+            return
+
+        _order, trade = placed
+        intent.trade = trade
+        intent.status = "Submitted"
+        self.intents[trade.order.orderId] = intent
+
+        # market orders can complete before we get here
+        self.orderStatus(trade)
+
+    def orderStatus(self, trade: Trade) -> None:
+        """orderStatusEvent handler: resolve intents whose orders completed or died."""
+        if not (intent := self.intents.get(trade.order.orderId)):
+            return
+
+        status = trade.orderStatus.status
+        intent.filled = intent.filledBefore + trade.orderStatus.filled
+
+        if status == "Filled" and trade.orderStatus.remaining == 0:
+            self.resolve(intent, "Filled")
+        elif status in INTENT_FAILED_STATUSES:
+            if intent.filled and intent.remaining and intent.attempts < INTENT_ATTEMPTS:
+                self.replace(intent, trade)
+            else:
+                self.resolve(intent, "Failed")
+
+    def replace(self, intent: OrderIntent, trade: Trade) -> None:
+        """Place the unfilled remainder of a partially filled intent whose order ('trade') died."""
+        self.intents.pop(trade.order.orderId, None)
+        logger.warning(
+            "[{}] Strategy order {} after filling {} of {}, placing remaining {}",
+            intent.symbol,
+            trade.orderStatus.status,
+            intent.filled,
+            intent.quantity,
+            intent.remaining,
+        )
+
+        intent.filledBefore = intent.filled
+        intent.trade = None
+        intent.status = "Submitting"
+        self.decisions.append(
+            (pendulum.now().timestamp(), intent.symbol, "order", intent.remaining)
+        )
+
+        asyncio.create_task(self.place(intent))
+
+    def execution(self, trade: Trade, fill: Fill) -> None:
+        """execDetailsEvent handler (executions can arrive before the matching order status)."""
+        self.orderStatus(trade)
+
+    def resolve(self, intent: OrderIntent, status: str) -> None:
+        if intent.done:
+            return
+
+        intent.status = status
+        if intent.trade:
+            self.intents.pop(intent.trade.order.orderId, None)
+
+        logger.info(
+            "[{}] Strategy order {}: {} (filled {})",
+            intent.symbol,
+            status,
+            intent.quantity,
+            intent.filled,
+        )
+
+        strategyState = self.state.strategy.get(intent.symbol)
+        if not strategyState or strategyState.get("intent") is not intent:
+            return
+
+        # any fill already changed the position, so the previous state no longer matches it
+        del strategyState["intent"]
+        if intent.filled:
+            self.backoff.pop(intent.symbol, None)
+            self.transition(intent.symbol, intent.nextState)
+
+            # evaluate the new state right away instead of waiting for the next tick
+            self.notify(intent.symbol)
+            return
+
+        # nothing filled: the previous state would submit the same order again right away
+        failures = 1
+        if found := self.backoff.get(intent.symbol):
+            state, count, _retryAt = found
+            if state == intent.previousState:
+                failures = count + 1
+
+        delay = min(INTENT_RETRY_DELAY * 2 ** (failures - 1), INTENT_RETRY_MAX)
+        self.backoff[intent.symbol] = (
+            intent.previousState,
+            failures,
+            time.monotonic() + delay,
+        )
+
+        logger.warning(
+            "[{}] Strategy order failed {} time(s), retrying in {:,.0f} seconds",
+            intent.symbol,
+            failures,
+            delay,
+        )
+
+        self.transition(intent.symbol, intent.previousState)
+        asyncio.get_running_loop().call_later(delay, self.notify, intent.symbol)
@@ -0,0 +1,146 @@
+"""Concurrent option strike scanning.
+
+Given an ordered list of candidate option symbols, qualify them all at once, subscribe
+to quotes concurrently (capped at a maximum number of market data lines and by the lines
+left in the account's line budget), and wake on
+ticker updates instead of sleeping so a matching strike is picked as soon as its quote
+(and the quotes of any more preferred candidates) arrive.
+"""
+
+import asyncio
+import os
+
+from dataclasses import dataclass, field
+from typing import Any, Final
+
+from ib_async import Contract, Ticker
+from loguru import logger
+
+from icli.helpers import contractForName
+
+# maximum concurrent market data lines opened by one strike scan
+ICLI_SCAN_MAX_LINES: Final = int(os.getenv("ICLI_SCAN_MAX_LINES", 20))
+
+
+@dataclass(slots=True)
+class StrikeCandidate:
+    symbol: str
+    contract: Contract
+    mid: float | None = None
+
+
+@dataclass
+class StrikeScanner:
+    """Pick the first candidate (in caller preference order) with a midpoint inside the premium band."""
+
+    state: Any
+
+    premiumLow: float = 0.29
+    premiumHigh: float = 0.80
+
+    # max concurrent market data lines for the scan
+    maxLines: int = ICLI_SCAN_MAX_LINES
+
+    # seconds to wait for a candidate's first valid quote before giving up on it
+    timeout: float = 3.0
+
+    candidates: list[StrikeCandidate] = field(default_factory=list)
+
+    async def qualify(self, symbols: list[str]) -> list[StrikeCandidate]:
+        contracts = await self.state.qualify(*[contractForName(s) for s in symbols])
+
+        self.candidates = [
+            StrikeCandidate(symbol, contract)
+            for symbol, contract in zip(symbols, contracts)
+            if contract.conId
+        ]
+
+        return self.candidates
+
+    async def firstQuote(self, ticker: Ticker) -> float | None:
+        """Wait for a ticker's first valid bid/ask midpoint (falling back to last price on timeout)."""
+
+        def valid():
+            return ticker.bid > 0 and ticker.ask > 0
+
+        if not valid():
+            ready = asyncio.Event()
+
+            def onUpdate(t):
+                if valid():
+                    ready.set()
+
+            ticker.updateEvent += onUpdate
+            try:
+                await asyncio.wait_for(ready.wait(), timeout=self.timeout)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                ticker.updateEvent -= onUpdate
+
+        if valid():
+            return (ticker.bid + ticker.ask) / 2
+
+        return ticker.last if ticker.last == ticker.last else None
+
+    async def scan(self, symbols: list[str]) -> StrikeCandidate | None:
+        """Return the first candidate in 'symbols' order with a midpoint inside the premium band.
+
+        Only the picked candidate remains subscribed (as a regular live quote)."""
+        await self.qualify(symbols)
+
+        lines = self.state.lines
+
+        # shrink the scan to the line budget instead of failing when the account is near its limit
+        # (existing live quotes are shared, so they don't need a new line)
+        chunkSize = max(1, min(self.maxLines, lines.available()))
+
+        pending = list(self.candidates)
+        while pending:
+            # lines are shared with existing live quotes and only canceled if we were their only user
+            tickers: list[Ticker] = []
+            for c in pending[:chunkSize]:
+                if (ticker := lines.subscribe(c.contract, "scan")) is None:
+                    break
+
+                tickers.append(ticker)
+
+            # candidates refused a line stay pending for the next chunk (after this chunk's
+            # lines are released), keeping preference order
+            chunk = pending[: len(tickers)]
+            pending = pending[len(tickers) :]
+
+            if not chunk:
+                logger.warning(
+                    "Market data line budget full, {} strike candidates not scanned: {}",
+                    len(pending),
+                    ", ".join(c.symbol for c in pending),
+                )
+                break
+
+            waiting = [asyncio.create_task(self.firstQuote(t)) for t in tickers]
+
+            picked = None
+            try:
+                # evaluate in preference order, but every quote is already arriving concurrently
+                for c, task in zip(chunk, waiting):
+                    c.mid = await task
+                    logger.info("[{}] Scanned midpoint: {}", c.symbol, c.mid)
+                    if c.mid and self.premiumLow < c.mid < self.premiumHigh:
+                        picked = c
+                        break
+            finally:
+                for task in waiting:
+                    task.cancel()
+
+                # the pick becomes a live quote before we release the scan lines so it keeps its line
+                if picked:
+                    self.state.addQuoteFromContract(picked.contract)
+
+                for c in chunk:
+                    lines.unsubscribeContract(c.contract, "scan")
+
+            if picked:
+                return picked
+
+        return None
@@ -0,0 +1,219 @@
+"""Market data line accounting.
+
+IBKR limits how many market data lines (and market depth lines) an account can have
+open at once, and requests past the limit just fail with max-tickers errors. Every
+market data, depth, and realtime bar request goes through MarketDataLines so we always
+know how many lines are open and who is using them.
+
+Each line is reference counted by consumer name ("quote" for live quotes, "scan" for
+strike scans, etc), so a contract requested by multiple consumers only uses one line
+and is only canceled after its last consumer releases it.
+
+When a new line would exceed the budget, live quotes are evicted least recently viewed
+first. Quotes for open positions or working orders, and lines used by anything other
+than live quotes, are never evicted. If nothing can be evicted, the request is refused.
+"""
+
+import os
+import time
+
+from dataclasses import dataclass, field
+from typing import Any, Final, Hashable, Literal
+
+from ib_async import Bag, Contract
+from loguru import logger
+
+from icli.helpers import lookupKey, tickFieldsForContract
+
+# market data lines allowed by the account (IBKR default allowance is 100)
+ICLI_MARKET_DATA_LINES: Final = int(os.getenv("ICLI_MARKET_DATA_LINES", 100))
+
+# market depth lines allowed by the account (IBKR default allowance is 3)
+ICLI_DEPTH_LINES: Final = int(os.getenv("ICLI_DEPTH_LINES", 3))
+
+LineKind = Literal["mkt", "depth", "bars"]
+
+# consumer name for live quotes (the only lines we can evict)
+QUOTE: Final = "quote"
+
+
+@dataclass(slots=True)
+class Line:
+    kind: LineKind
+    key: Hashable
+    contract: Contract
+
+    # Ticker (mkt, depth) or RealTimeBarList (bars)
+    handle: Any
+
+    # extra request arguments (depth cancels need the same isSmartDepth as the request)
+    options: dict[str, Any] = field(default_factory=dict)
+
+    consumers: set[str] = field(default_factory=set)
+    viewed: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class MarketDataLines:
+    state: Any
+
+    budget: int = ICLI_MARKET_DATA_LINES
+    depthBudget: int = ICLI_DEPTH_LINES
+
+    lines: dict[tuple[LineKind, Hashable], Line] = field(default_factory=dict)
+
+    # requests refused because the budget was full and nothing could be evicted
+    refused: int = 0
+    evicted: int = 0
+
+    def used(self, kind: LineKind = "mkt") -> int:
+        """Return open lines counted against the budget for 'kind' (realtime bars count as market data)."""
+        if kind == "depth":
+            return sum(1 for line in self.lines.values() if line.kind == "depth")
+
+        return sum(1 for line in self.lines.values() if line.kind != "depth")
+
+    def available(self, kind: LineKind = "mkt") -> int:
+        limit = self.depthBudget if kind == "depth" else self.budget
+        return limit - self.used(kind)
+
+    def pinned(self) -> set[int]:
+        """Return contract ids which must stay subscribed (open positions and working orders)."""
+        return set(self.state.positions.quantities) | self.state.openOrders.conIds()
+
+    def evictable(self) -> list[Line]:
+        """Live-quote-only lines not protected by positions or orders, least recently viewed first."""
+        pinned = self.pinned()
+
+        def protected(line: Line) -> bool:
+            if isinstance(line.contract, Bag):
+                return any(leg.conId in pinned for leg in line.contract.comboLegs)
+
+            return line.contract.conId in pinned
+
+        return sorted(
+            (
+                line
+                for line in self.lines.values()
+                if line.kind == "mkt"
+                and line.consumers == {QUOTE}
+                and not protected(line)
+            ),
+            key=lambda line: line.viewed,
+        )
+
+    def reserve(self, kind: LineKind) -> bool:
+        """Make room for one more line of 'kind', evicting live quotes if needed."""
+        if self.available(kind) > 0:
+            return True
+
+        # depth lines have their own allowance and we never evict anything for them
+        if kind == "depth":
+            return False
+
+        for line in self.evictable():
+            logger.warning(
+                "[{}] Market data line budget full ({}), removing least recently viewed quote",
+                line.key,
+                self.budget,
+            )
+
+            self.evicted += 1
+            self.state.dropQuote(line.key)
+
+            if self.available(kind) > 0:
+                return True
+
+        return False
+
+    def subscribe(
+        self, contract: Contract, consumer: str, kind: LineKind = "mkt", **kwargs
+    ) -> Any | None:
+        """Return Ticker (or bar list) for 'contract', opening a new line only if not already open.
+
+        Returns None if the line budget is full and nothing can be evicted."""
+        key = lookupKey(contract)
+        if line := self.lines.get((kind, key)):
+            line.consumers.add(consumer)
+            line.viewed = time.monotonic()
+            return line.handle
+
+        if not self.reserve(kind):
+            self.refused += 1
+            logger.error(
+                "[{}] Not subscribing because all {} {} lines are in use: {}",
+                key,
+                self.depthBudget if kind == "depth" else self.budget,
+                kind,
+                self.report(),
+            )
+            return None
+
+        # bulk callers wait on the pacer before subscribing, everything else is just accounted for
+        self.state.pacer.spend("marketdata")
+
+        ib = self.state.ib
+        match kind:
+            case "mkt":
+                handle = ib.reqMktData(contract, tickFieldsForContract(contract))
+            case "depth":
+                handle = ib.reqMktDepth(contract, **kwargs)
+            case "bars":
+                handle = ib.reqRealTimeBars(contract, **kwargs)
+
+        self.lines[(kind, key)] = Line(kind, key, contract, handle, kwargs, {consumer})
+        return handle
+
+    def unsubscribe(self, key: Hashable, consumer: str, kind: LineKind = "mkt") -> None:
+        """Release 'consumer' from a line, canceling the line if it was the last consumer."""
+        if not (line := self.lines.get((kind, key))):
+            return
+
+        line.consumers.discard(consumer)
+        if line.consumers:
+            return
+
+        del self.lines[(kind, key)]
+
+        self.state.pacer.spend("marketdata")
+
+        ib = self.state.ib
+        match kind:
+            case "mkt":
+                ib.cancelMktData(line.contract)
+            case "depth":
+                ib.cancelMktDepth(
+                    line.contract, isSmartDepth=line.options.get("isSmartDepth", False)
+                )
+            case "bars":
+                ib.cancelRealTimeBars(line.handle)
+
+    def unsubscribeContract(
+        self, contract: Contract, consumer: str, kind: LineKind = "mkt"
+    ) -> None:
+        self.unsubscribe(lookupKey(contract), consumer, kind)
+
+    def touch(self, key: Hashable) -> None:
+        """Mark a quote as just viewed (so it's the last to be evicted)."""
+        if line := self.lines.get(("mkt", key)):
+            line.viewed = time.monotonic()
+
+    def clear(self) -> None:
+        """Forget all lines (after a reconnect, the gateway has already dropped them)."""
+        self.lines.clear()
+
+    def report(self) -> dict[str, Any]:
+        consumers: dict[str, int] = {}
+        for line in self.lines.values():
+            for consumer in line.consumers:
+                consumers[consumer] = consumers.get(consumer, 0) + 1
+
+        return dict(
+            used=self.used(),
+            budget=self.budget,
+            depth=self.used("depth"),
+            depthBudget=self.depthBudget,
+            consumers=consumers,
+            evicted=self.evicted,
+            refused=self.refused,
+        )
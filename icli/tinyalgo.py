@@ -1,5 +1,7 @@
 """tinalgo is just helpers copy/pasted from mmt because I don't want to add mmt as a dependency"""
 
+import math
+
 from dataclasses import dataclass, field
 from collections import deque
 
@@ -57,16 +59,118 @@ class ATRLive:
 
     length: int = 20
     bufferLength: int = 55
-    buffer: deque[float] = field(init=False)
+    window: "MonotonicWindow" = field(init=False)
     atr: ATR = field(init=False)
+    count: int = 0
 
     def __post_init__(self) -> None:
-        self.buffer = deque(maxlen=self.bufferLength)
+        # window is in units of updates (not seconds), so each update advances "time" by 1
+        self.window = MonotonicWindow(self.bufferLength - 1)
         self.atr = ATR(self.length)
 
     def update(self, price) -> float:
-        self.buffer.append(price)
-        high = max(self.buffer)
-        low = min(self.buffer)
+        self.count += 1
+        high, low = self.window.update(self.count, price)
 
         return self.atr.update(high, low, price)
+
+
+@dataclass(slots=True)
+class MonotonicWindow:
+    """Sliding window high/low over the most recent 'duration' time units in amortized O(1).
+
+    Each deque holds (time, price) pairs where prices are monotonic, so the current
+    high (or low) is always the leftmost entry."""
+
+    duration: float
+    highs: deque[tuple[float, float]] = field(default_factory=deque)
+    lows: deque[tuple[float, float]] = field(default_factory=deque)
+
+    def update(self, when: float, price: float) -> tuple[float, float]:
+        highs = self.highs
+        lows = self.lows
+
+        while highs and highs[-1][1] <= price:
+            highs.pop()
+
+        while lows and lows[-1][1] >= price:
+            lows.pop()
+
+        highs.append((when, price))
+        lows.append((when, price))
+
+        # expire old values (the value we just added is never expired, so these never empty)
+        cutoff = when - self.duration
+        while highs[0][0] < cutoff:
+            highs.popleft()
+
+        while lows[0][0] < cutoff:
+            lows.popleft()
+
+        return highs[0][1], lows[0][1]
+
+
+@dataclass(slots=True)
+class EMATime:
+    """An EMA decayed by elapsed time between updates instead of by update count.
+
+    'span' is in seconds and behaves like a bar-count EMA span (so a 60 second span
+    tracks the same as a 60-period EMA updated once per second regardless of how often
+    (or how irregularly) updates actually arrive)."""
+
+    span: float
+    current: float = 0.0
+    updated: float = 0.0
+
+    def update(self, when: float, price: float) -> float:
+        if not self.updated:
+            self.current = price
+        else:
+            elapsed = when - self.updated
+            if elapsed > 0:
+                # continuous-time equivalent of k = 2 / (span + 1)
+                alpha = 1 - math.exp(-2 * elapsed / self.span)
+                self.current += alpha * (price - self.current)
+
+        self.updated = when
+        return self.current
+
+
+@dataclass(slots=True)
+class ATRTime:
+    """Live-trade ATR using timestamps: high/low come from a 'window' second sliding window
+    and the true range is smoothed as an RMA over 'length' seconds."""
+
+    length: float = 90
+    window: float = 45
+    hilo: MonotonicWindow = field(init=False)
+    current: float = 0.0
+    prevClose: float = 0.0
+    started: float = 0.0
+    updated: float = 0.0
+
+    def __post_init__(self) -> None:
+        self.hilo = MonotonicWindow(self.window)
+
+    def update(self, when: float, price: float) -> float:
+        high, low = self.hilo.update(when, price)
+
+        if not self.updated:
+            self.started = when
+            self.current = high - low
+        else:
+            currentTR = max(
+                max(high - low, abs(high - self.prevClose)),
+                abs(low - self.prevClose),
+            )
+
+            # same bootstrap idea as ATR: use a shorter effective length until
+            # we've seen a full 'length' of history so we converge faster.
+            useLength = max(min(when - self.started, self.length), 1)
+            alpha = 1 - math.exp(-(when - self.updated) / useLength)
+            self.current += alpha * (currentTR - self.current)
+
+        self.prevClose = price
+        self.updated = when
+
+        return self.current
@@ -0,0 +1,160 @@
+"""Row caching for the bottom toolbar quote table.
+
+The toolbar redraws every `toolbarUpdateInterval` seconds, but most quotes don't change
+between redraws, so we keep the formatted row for each quote and only re-format rows
+where the underlying ticker values (or the derived values shown in the row) changed.
+
+Change detection runs as one vectorized comparison over an array snapshot of all rows
+instead of comparing fields row-by-row in python.
+"""
+
+import operator
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Final, Hashable, Iterable
+
+import numpy as np
+
+from ib_async import Ticker
+
+# Ticker fields which, if changed, require re-formatting the row
+SNAPSHOT_FIELDS: Final = (
+    "bid",
+    "ask",
+    "last",
+    "bidSize",
+    "askSize",
+    "high",
+    "low",
+    "close",
+    "open",
+    "halted",
+)
+
+snapshotFields: Final = operator.attrgetter(*SNAPSHOT_FIELDS)
+
+# Time-since-last-update changes on every redraw even when the quote itself didn't change,
+# so cached rows hold these markers and we substitute the live value when painting.
+AGO: Final = "\x00ago\x00"
+AGO_PAD: Final = "\x00agopad\x00"
+
+# number of decimals to show for quotes based on the contract's minimum tick
+MIN_TICK_DECIMALS: Final = {
+    # common case, just regular dollars 'n cents
+    0.01: 2,
+    # currency quotes
+    0.0001: 4,
+    # yield quotes
+    0.001: 3,
+    # other more specific futures quotes.
+    # e.g. /LE is quoted with a 40,000 multiplier because the unit is "cents per pound" but
+    #      prices are shown pre-adjusted to dollars-per-pound, so even though the
+    #      minTick is 0.00025, that's in "cents/pound" but our quotes are "$/pound" which is 100x higher...
+    #      Long story short, a 0.00025 minTick is actually 3 decimal places.
+    #      If there are other exceptions to the "tick vs cents vs dollars vs multiplier" problem, we haven't found them yet.
+    0.00025: 3,
+    # futures bonds are quoted in "1/32 of one point (0.03125)"
+    0.03125: 5,
+    # other futures bonds are quoted in "1/8 of 1/32 of one point (0.00390625)"
+    0.00390625: 8,
+    # CORN "1/4 of one cent (0.0025) per bushel"
+    0.0025: 4,
+}
+
+
+def decimalsForTick(minTick: float) -> int:
+    # default, just two too
+    return MIN_TICK_DECIMALS.get(minTick, 2)
+
+
+@dataclass
+class ToolbarRows:
+    """Sorted quote rows with cached formatting for the toolbar."""
+
+    sortkey: Callable[[tuple[Hashable, Ticker]], Any]
+
+    # quote keys present when we last sorted
+    keys: set[Hashable] = field(default_factory=set)
+
+    # sorted (key, ticker) pairs (also used for :N quote positional lookups)
+    ordered: list[tuple[Hashable, Ticker]] = field(default_factory=list)
+
+    # formatted row per position in 'ordered' (None if never rendered)
+    rows: list[str | None] = field(default_factory=list)
+
+    # array of last rendered inputs for each row for change detection
+    snapshot: np.ndarray = field(default_factory=lambda: np.empty((0, 0)))
+
+    # anything else forcing a full re-render when it changes (date, display settings, ...)
+    epoch: Any = None
+
+    # counters for seeing how effective the cache is
+    rendered: int = 0
+    reused: int = 0
+
+    def quotes(
+        self, quoteState: dict[Hashable, Ticker], epoch: Any = None
+    ) -> list[tuple[Hashable, Ticker]]:
+        """Return sorted quotes, only re-sorting when the set of quotes changed."""
+        if epoch != self.epoch:
+            self.epoch = epoch
+            self.keys = set()
+
+        # dict key views compare as sets, so this is one hash check per key instead of a full sort
+        if quoteState.keys() != self.keys:
+            self.ordered = sorted(quoteState.items(), key=self.sortkey)
+            self.keys = set(quoteState.keys())
+            self.rows = [None] * len(self.ordered)
+            self.snapshot = np.empty((0, 0))
+
+        return self.ordered
+
+    def changed(
+        self, extras: Iterable[tuple[float, ...]], always: Iterable[bool]
+    ) -> np.ndarray:
+        """Return positions of rows needing a new render.
+
+        'extras' are per-row derived values shown in the row (EMAs, greeks, etc) which
+        aren't ticker fields but still need to invalidate the row when they change.
+        'always' marks rows which can't be cached (their inputs live outside their own ticker).
+        """
+        current = np.array(
+            [
+                snapshotFields(ticker) + extra
+                for (_, ticker), extra in zip(self.ordered, extras)
+            ],
+            dtype=np.float64,
+        )
+
+        if current.shape != self.snapshot.shape:
+            dirty = np.ones(len(self.ordered), dtype=bool)
+        else:
+            # NaN != NaN, so treat both-NaN cells as unchanged too
+            same = (current == self.snapshot) | (
+                np.isnan(current) & np.isnan(self.snapshot)
+            )
+            dirty = ~same.all(axis=1)
+
+        dirty |= np.fromiter(always, dtype=bool, count=len(self.ordered))
+
+        for idx, row in enumerate(self.rows):
+            if row is None:
+                dirty[idx] = True
+
+        self.snapshot = current
+
+        positions = np.flatnonzero(dirty)
+        self.rendered += len(positions)
+        self.reused += len(self.ordered) - len(positions)
+
+        return positions
+
+    def update(self, position: int, row: str) -> None:
+        self.rows[position] = row
+
+    def paint(self, agos: Iterable[str]) -> list[str]:
+        """Return final rows with live time-since-update values substituted in."""
+        return [
+            (row or "").replace(AGO_PAD, f"{ago:>13}").replace(AGO, ago)
+            for row, ago in zip(self.rows, agos)
+        ]
@@ -0,0 +1,71 @@
+import asyncio
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from zoneinfo import ZoneInfo
+
+from eventkit import Event
+from ib_async import BarData, Stock
+
+from icli.bar import BarSeries, IntradayBars, OHLCBar
+
+TZ = ZoneInfo("America/New_York")
+
+
+class Pacer:
+    async def wait(self, kind, key=None):
+        pass
+
+
+class Lines:
+    def __init__(self):
+        self.subscribed = []
+
+    def subscribe(self, contract, consumer, kind, **kwargs):
+        handle = SimpleNamespace(updateEvent=Event())
+        self.subscribed.append(handle)
+        return handle
+
+
+def history(start, count):
+    return [
+        BarData(start + timedelta(minutes=5 * i), 10, 11, 9, 10.5, 100)
+        for i in range(count)
+    ]
+
+
+def test_reseedBackfillsMissedBarsAndResubscribes():
+    # the last bar is still building
+    start = datetime.now(TZ).replace(second=0, microsecond=0) - timedelta(minutes=30)
+    bars = history(start, 7)
+
+    async def reqHistoricalDataAsync(*args, **kwargs):
+        return bars
+
+    state = SimpleNamespace(
+        pacer=Pacer(),
+        lines=Lines(),
+        ib=SimpleNamespace(reqHistoricalDataAsync=reqHistoricalDataAsync),
+    )
+
+    intraday = IntradayBars(state)
+    series = BarSeries("AAPL", Stock("AAPL", "SMART", "USD", conId=1))
+    intraday.series["AAPL"] = series
+
+    # completed before the disconnect, and the series' dead realtime bars
+    for b in bars[:2]:
+        series.complete(OHLCBar(b.date, b.open, b.high, b.low, b.close, b.volume))
+
+    series.live = "dead"
+    completed = []
+    series.listeners.append(completed.append)
+
+    asyncio.run(intraday.reseed())
+
+    # only bars missed while disconnected reach listeners
+    assert [b.date for b in completed] == [b.date for b in bars[2:6]]
+    assert [b.date for b in series.bars] == [b.date for b in bars[:6]]
+    assert series.current.date == bars[6].date
+
+    assert series.live is state.lines.subscribed[-1]
+    assert len(series.live.updateEvent) == 1
@@ -0,0 +1,83 @@
+import asyncio
+
+from types import SimpleNamespace
+
+import diskcache
+
+from ib_async import ContractDetails, Option
+
+from icli.chains import Chain, ChainStore, sessionDate, strikesBetween
+
+
+class Pacer:
+    async def wait(self, kind):
+        pass
+
+
+class IB:
+    def __init__(self, listed):
+        self.listed = listed
+        self.requests = []
+
+    async def reqContractDetailsAsync(self, contract):
+        self.requests.append(contract)
+        return [
+            ContractDetails(
+                Option("SPY", contract.lastTradeDateOrContractMonth, strike, right)
+            )
+            for strike in self.listed
+            for right in "PC"
+        ]
+
+
+def store(tmp_path, listed):
+    state = SimpleNamespace(pacer=Pacer(), ib=IB(listed))
+    chains = ChainStore(state, disk=diskcache.Cache(str(tmp_path)))
+
+    # trading class strikes, as reqSecDefOptParams() reports them for every expiration
+    chains.save(
+        Chain(
+            "SPY",
+            sessionDate(),
+            {"20261120": [495.0, 497.5, 500.0, 502.5, 505.0], "20261218": [500.0]},
+        )
+    )
+
+    return chains
+
+
+def test_strikesBetween():
+    assert strikesBetween([1.0, 2.0, 3.0, 4.0], 1, 4) == [2.0, 3.0]
+    assert strikesBetween([1.0, 2.0], 5, 6) == []
+
+
+def test_strikesForLoadsListedStrikesOnce(tmp_path):
+    chains = store(tmp_path, [495.0, 500.0, 505.0])
+
+    async def run():
+        first = await chains.strikesFor("SPY", "20261120")
+        second = await chains.strikesFor("SPY", "20261120")
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == second == [495.0, 500.0, 505.0]
+
+    (request,) = chains.state.ib.requests
+    assert (request.secType, request.symbol, request.exchange) == (
+        "OPT",
+        "SPY",
+        "SMART",
+    )
+    assert request.lastTradeDateOrContractMonth == "20261120"
+
+    # other expirations are untouched, and the listed strikes are stored for restarts
+    assert chains.chains["SPY"].strikes["20261218"] == [500.0]
+    assert chains.disk.get(("SPY", "20261120")) == [495.0, 500.0, 505.0]
+
+
+def test_strikesForNothingListed(tmp_path):
+    chains = store(tmp_path, [])
+    assert asyncio.run(chains.strikesFor("SPY", "20261120")) == []
+
+    # not marked as exact, so the next request asks again
+    assert "20261120" not in chains.chains["SPY"].exact
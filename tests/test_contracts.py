@@ -0,0 +1,62 @@
+import asyncio
+
+from ib_async import Stock
+
+from icli.contracts import QualifyQueue
+from icli.pacer import RequestPacer
+
+
+class IB:
+    def __init__(self):
+        self.calls = []
+
+    async def qualifyContractsAsync(self, *contracts):
+        self.calls.append(contracts)
+        for c in contracts:
+            c.conId = 265598
+            c.localSymbol = c.symbol
+
+        return list(contracts)
+
+
+def test_coalescedCallersGetTheirOwnContracts():
+    async def run():
+        ib = IB()
+        queue = QualifyQueue(ib, RequestPacer())
+        return ib, await asyncio.gather(
+            queue.submit(Stock("AAPL", "SMART", "USD")),
+            queue.submit(Stock("AAPL", "SMART", "USD")),
+        )
+
+    ib, (first, second) = asyncio.run(run())
+
+    # one request for both callers
+    assert [len(c) for c in ib.calls] == [1]
+    assert first == second
+    assert first is not second
+    assert first.conId == 265598
+
+
+class BrokenPacer:
+    async def wait(self, kind, count=1):
+        raise RuntimeError("pacer failed")
+
+
+def test_failedDrainResolvesEveryCaller():
+    async def run():
+        queue = QualifyQueue(IB(), BrokenPacer(), batchSize=1)
+        waiting = [
+            queue.submit(Stock("AAPL", "SMART", "USD")),
+            queue.submit(Stock("AAPL", "SMART", "USD")),
+            queue.submit(Stock("MSFT", "SMART", "USD")),
+        ]
+
+        results = await asyncio.wait_for(
+            asyncio.gather(*waiting, return_exceptions=True), timeout=5
+        )
+        return queue, results
+
+    queue, results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert not queue.pending
+    assert not queue.queue
@@ -0,0 +1,73 @@
+import datetime
+
+import pytest
+
+from icli.execstats import ExecutionStats
+
+
+def row(execId, side="BOT", shares=10, price=1.5, commission=None, pnl=None, **extra):
+    """Journal-style execution row (see icli.journal.fillDict)."""
+    return dict(
+        execId=execId,
+        time=datetime.datetime(2024, 12, 20, 15, 5, tzinfo=datetime.timezone.utc),
+        clientId=1,
+        orderId=7,
+        permId=1001,
+        side=side,
+        shares=shares,
+        price=price,
+        avgPrice=price,
+        multiplier="100",
+        localSymbol="SPY   241220C00500000",
+        commission=commission,
+        currency="USD" if commission is not None else None,
+        realizedPNL=pnl,
+        **extra,
+    )
+
+
+def test_executionCountedOnce():
+    stats = ExecutionStats()
+    stats.add(row("e1"))
+    stats.add(row("e1"))
+
+    assert len(stats) == 1
+    assert stats.sides["BOT"].executions == 1
+    assert stats.sides["BOT"].shares == 10
+
+    (order,) = stats.orders.values()
+    assert order.shares == 10
+    assert order.total == pytest.approx(1_500)
+    assert sum(b.executions for b in stats.buckets.values()) == 1
+
+
+def test_commissionCountedOnceWhenReportArrives():
+    stats = ExecutionStats()
+    stats.add(row("e1"))
+    assert stats.sides["BOT"].commission == 0
+    assert stats.dayProfit == 0
+
+    # the same execution again with its commission report, then replayed from history
+    for _ in range(3):
+        stats.add(row("e1", commission=1.25, pnl=-1.25))
+
+    assert len(stats) == 1
+    assert stats.sides["BOT"].commission == pytest.approx(1.25)
+    assert stats.sides["BOT"].commissioned == 1
+    assert stats.dayProfit == pytest.approx(-1.25)
+
+    (order,) = stats.orders.values()
+    assert order.commission == pytest.approx(1.25)
+
+
+def test_executionsOfOneOrderAggregate():
+    stats = ExecutionStats()
+    stats.add(row("e1", shares=4, price=1.0, commission=0.5, pnl=0))
+    stats.add(row("e2", shares=6, price=2.0, commission=0.5, pnl=0))
+    stats.add(row("e2", shares=6, price=2.0, commission=0.5, pnl=0))
+
+    assert len(stats) == 2
+    (order,) = stats.orders.values()
+    assert order.shares == 10
+    assert order.vwap == pytest.approx(1.6)
+    assert order.commission == pytest.approx(1.0)
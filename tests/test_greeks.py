@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from icli.greeks import IV_HIGH, blackScholes, impliedVol
+
+RATE = 0.045
+
+
+def grid():
+    """Calls and puts across strikes and expirations (stock/index carry)."""
+    strike = np.array([80.0, 95, 100, 105, 120] * 2)
+    right = np.array([1.0] * 5 + [-1.0] * 5)
+    years = np.array([7 / 365, 30 / 365, 0.25, 0.5, 1.0] * 2)
+    und = np.full_like(strike, 100)
+    carry = np.full_like(strike, RATE)
+    return und, strike, years, carry, right
+
+
+@pytest.mark.parametrize("sigma", [0.08, 0.2, 0.5, 1.5])
+def test_impliedVolRoundTrip(sigma):
+    und, strike, years, carry, right = grid()
+    sigmas = np.full_like(und, sigma)
+    price, *_, vega = blackScholes(und, strike, years, sigmas, RATE, carry, right)
+
+    # far from the money at low volatility the price barely depends on volatility, so
+    # only options with enough vega to pin volatility down from a price are compared
+    sensitive = vega > 0.5
+    assert sensitive.sum() >= 4
+
+    solved = impliedVol(price, und, strike, years, RATE, carry, right)
+    np.testing.assert_allclose(solved[sensitive], sigma, rtol=1e-4)
+
+
+def test_impliedVolRoundTripFutures():
+    und, strike, years, _carry, right = grid()
+    carry = np.zeros_like(und)
+    sigma = np.full_like(und, 0.3)
+    price, *_, vega = blackScholes(und, strike, years, sigma, RATE, carry, right)
+
+    sensitive = vega > 0.5
+    solved = impliedVol(price, und, strike, years, RATE, carry, right)
+    np.testing.assert_allclose(solved[sensitive], 0.3, rtol=1e-4)
+
+
+def test_putCallParity():
+    und, strike, years, carry, _right = grid()
+    sigma = np.full_like(und, 0.25)
+
+    call, *_ = blackScholes(und, strike, years, sigma, RATE, carry, np.ones_like(und))
+    put, *_ = blackScholes(und, strike, years, sigma, RATE, carry, -np.ones_like(und))
+
+    parity = und - strike * np.exp(-RATE * years)
+    np.testing.assert_allclose(call - put, parity, atol=1e-5)
+
+
+def test_impliedVolOutsideBoundsIsNaN():
+    und, strike, years, carry, right = grid()
+
+    # below discounted intrinsic value, and above the underlying (or discounted strike)
+    discounted = strike * np.exp(-RATE * years)
+    low = np.maximum(right * (und - discounted), 0) - 0.01
+    high = np.where(right > 0, und, discounted) + 0.01
+
+    assert np.isnan(impliedVol(low, und, strike, years, RATE, carry, right)).all()
+    assert np.isnan(impliedVol(high, und, strike, years, RATE, carry, right)).all()
+
+
+def test_impliedVolOutsideVolatilityRangeIsNaN():
+    und, strike, years, carry, right = grid()
+
+    # inside the no-arbitrage bounds, but only reachable with volatility above IV_HIGH
+    price, *_ = blackScholes(
+        und, strike, years, np.full_like(und, IV_HIGH * 1.5), RATE, carry, right
+    )
+    high, *_ = blackScholes(
+        und, strike, years, np.full_like(und, IV_HIGH), RATE, carry, right
+    )
+    beyond = price - high > 1e-3
+    assert beyond.sum() >= 4
+
+    solved = impliedVol(price, und, strike, years, RATE, carry, right)
+    assert np.isnan(solved[beyond]).all()
+
+    # rows which can be solved still are
+    target, *_, vega = blackScholes(
+        und, strike, years, np.full_like(und, 0.3), RATE, carry, right
+    )
+    mixed = np.where(beyond, price, target)
+    solved = impliedVol(mixed, und, strike, years, RATE, carry, right)
+    assert np.isnan(solved[beyond]).all()
+
+    sensitive = ~beyond & (vega > 0.5)
+    assert sensitive.any()
+    np.testing.assert_allclose(solved[sensitive], 0.3, rtol=1e-4)
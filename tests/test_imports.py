@@ -0,0 +1,25 @@
+import importlib
+
+import pytest
+
+# everything the app imports when running (the discord and polygon scripts are standalone)
+MODULES = """cli lang bench replay simbroker strikescan strategies chaser bar indicators
+    quotestore greeks chains contracts subscriptions pacer positions openorders orders
+    spreads journal execstats latency profiler recorder toolbar tinyalgo calc""".split()
+
+
+@pytest.mark.parametrize("name", MODULES)
+def test_import(name):
+    importlib.import_module(f"icli.{name}")
+
+
+def test_appDefaults(tmp_path, monkeypatch):
+    """Field defaults and factories are evaluated without a gateway connection."""
+    from icli.replay import replayApp
+
+    # default caches are created in the working directory
+    monkeypatch.chdir(tmp_path)
+
+    app = replayApp()
+    assert app.recorder is None
+    assert app.indicators.atr("SPY") is None
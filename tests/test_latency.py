@@ -0,0 +1,71 @@
+import math
+import random
+
+import pytest
+
+from icli.latency import SUB_BUCKETS, LatencyHistogram, bucketIndex, bucketValue
+
+
+def test_bucketsExactBelowTwoSubBucketRanges():
+    for us in range(2 * SUB_BUCKETS):
+        assert bucketValue(bucketIndex(us)) == us
+
+
+def test_bucketHoldsValue():
+    large = [2**k + d for k in range(17, 40) for d in (-1, 0, 1)]
+    for us in [*range(1, 100_000), *large]:
+        index = bucketIndex(us)
+
+        # buckets are contiguous: each value lands in the first bucket covering it
+        assert bucketValue(index - 1) < us <= bucketValue(index)
+
+        # log-linear buckets are never wider than 1/SUB_BUCKETS of their values
+        assert (bucketValue(index) - us) / us <= 1 / SUB_BUCKETS
+
+
+def test_bucketIndexMonotonic():
+    indexes = [bucketIndex(us) for us in range(100_000)]
+    assert indexes == sorted(indexes)
+
+
+def test_percentilesWithinBucketError():
+    rng = random.Random(7)
+    seconds = [rng.lognormvariate(-5, 1.5) for _ in range(10_000)]
+
+    h = LatencyHistogram()
+    for s in seconds:
+        h.record(s)
+
+    exact = sorted(round(s * 1e6) for s in seconds)
+    for q in (1, 25, 50, 90, 99, 99.9, 100):
+        want = exact[max(1, math.ceil(q / 100 * len(exact))) - 1] / 1000
+        assert want <= h.percentile(q) <= want * (1 + 1 / SUB_BUCKETS) + 1e-9
+
+    assert h.count == len(seconds)
+    assert h.min == exact[0]
+    assert h.max == exact[-1]
+    assert h.mean == pytest.approx(sum(exact) / len(exact) / 1000)
+
+
+def test_emptyHistogram():
+    h = LatencyHistogram()
+    assert math.isnan(h.mean)
+    assert math.isnan(h.percentile(50))
+
+
+def test_mergeAndRoundTrip():
+    a = LatencyHistogram()
+    b = LatencyHistogram()
+    for ms in (1, 2, 3):
+        a.record(ms / 1000)
+
+    for ms in (0.5, 40):
+        b.record(ms / 1000)
+
+    a.merge(b)
+    assert a.count == 5
+    assert a.min == 500
+    assert a.max == 40_000
+    assert a.total == 46_500
+
+    assert LatencyHistogram.fromdict(a.asdict()) == a
@@ -0,0 +1,100 @@
+import asyncio
+import time
+
+import pytest
+
+from icli.pacer import PACE_LIMITS, RequestPacer, TokenBucket
+
+
+def test_bucketStartsFull():
+    bucket = TokenBucket(10, 20, updated=0)
+    assert bucket.tokens == 20
+    assert bucket.delay(20, 0) == 0
+
+
+def test_bucketRefillsAtRateUpToCapacity():
+    bucket = TokenBucket(10, 20, updated=0)
+    bucket.spend(20, 0)
+    assert bucket.tokens == 0
+
+    # 0.5 seconds at 10 tokens per second
+    assert bucket.delay(5, 0.5) == 0
+    assert bucket.tokens == pytest.approx(5)
+
+    # never refills past capacity
+    bucket.refill(100)
+    assert bucket.tokens == 20
+
+
+def test_bucketDelayUntilTokensAvailable():
+    bucket = TokenBucket(10, 20, updated=0)
+    bucket.spend(20, 0)
+    assert bucket.delay(5, 0) == pytest.approx(0.5)
+
+    # requests larger than the bucket only wait for a full bucket
+    assert bucket.delay(100, 0) == pytest.approx(2)
+
+
+def test_bucketGoesNegativeForSyncSends():
+    bucket = TokenBucket(10, 20, updated=0)
+    bucket.spend(30, 0)
+    assert bucket.tokens == -10
+
+    # the overdraft delays the next request too
+    assert bucket.delay(1, 0) == pytest.approx(1.1)
+
+
+def test_spendChargesClassAndApiBuckets():
+    pacer = RequestPacer()
+    pacer.spend("orders", 3)
+
+    rate, capacity = PACE_LIMITS["orders"]
+    assert pacer.buckets["orders"].tokens == pytest.approx(capacity - 3, abs=rate * 0.1)
+    assert pacer.buckets["api"].tokens < PACE_LIMITS["api"][1]
+    assert pacer.stats["orders"].sent == 3
+
+
+def test_takeRefusesWhenEmpty():
+    pacer = RequestPacer()
+
+    # empty only the class bucket; other classes still have the shared api budget
+    _rate, capacity = PACE_LIMITS["details"]
+    pacer.buckets["details"].spend(capacity, time.monotonic())
+
+    assert not pacer.take("details")
+    assert pacer.take("orders")
+
+
+def test_identicalHistoricalRequestsAreSpaced():
+    pacer = RequestPacer()
+    pacer.spend("historical", key="SPY 1 D")
+
+    classDelay, _apiDelay = pacer.delay("historical", key="SPY 1 D")
+    assert classDelay > 14
+
+    assert pacer.delay("historical", key="QQQ 1 D")[0] == 0
+
+
+def test_waitersGrantedInPriorityOrder():
+    async def run():
+        pacer = RequestPacer()
+
+        # drain the shared budget so everything below has to queue
+        pacer.spend("api", PACE_LIMITS["api"][1])
+
+        granted = []
+
+        async def request(kind):
+            await pacer.wait(kind)
+            granted.append(kind)
+
+        # queued lowest priority first; equal priorities are granted in queue order
+        await asyncio.gather(
+            request("historical"),
+            request("details"),
+            request("marketdata"),
+            request("orders"),
+        )
+        return granted
+
+    assert asyncio.run(run()) == ["orders", "marketdata", "historical", "details"]
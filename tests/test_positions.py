@@ -0,0 +1,68 @@
+import datetime
+
+from ib_async import CommissionReport, Execution, Fill, Position, Stock
+
+from icli.positions import PositionBook
+
+AAPL = Stock("AAPL", "SMART", "USD", conId=265598, localSymbol="AAPL")
+
+
+def position(quantity):
+    return Position("DU1", AAPL, quantity, 100.0)
+
+
+def fill(execId, side, shares):
+    execution = Execution(execId=execId, side=side, shares=shares)
+    return Fill(AAPL, execution, CommissionReport(), datetime.datetime.now())
+
+
+def test_fillBeforePosition():
+    book = PositionBook()
+    assert book.execution(fill("e1", "BOT", 10)) == 10
+    assert book.quantity("AAPL") == 10
+
+    # the report includes the fill, which is no longer provisional
+    book.position(position(10))
+    assert book.quantity("AAPL") == 10
+    assert not book.provisional
+    assert not book.unexplained
+
+
+def test_positionBeforeFill():
+    book = PositionBook()
+    book.position(position(10))
+
+    # the fill was already reported, so it isn't added again
+    assert book.execution(fill("e1", "BOT", 10)) == 10
+    book.position(position(10))
+    assert book.quantity("AAPL") == 10
+
+
+def test_partialFillsAroundPositionEvents():
+    book = PositionBook()
+    book.position(position(100))
+
+    assert book.execution(fill("e1", "SLD", 30)) == 70
+    book.position(position(40))
+
+    # the position already includes e2, but not e3
+    assert book.execution(fill("e2", "SLD", 30)) == 40
+    assert book.execution(fill("e3", "SLD", 40)) == 0
+    assert book.quantity("AAPL") is None
+    assert "AAPL" not in book.byName
+
+    book.position(position(0))
+    assert book.quantity("AAPL") is None
+    assert not book.provisional
+    assert not book.contracts
+
+
+def test_unmatchedReportExpires(monkeypatch):
+    book = PositionBook()
+    now = [1000.0]
+    monkeypatch.setattr("icli.positions.time.monotonic", lambda: now[0])
+
+    # an old report (like the one loaded at connect) never absorbs later fills
+    book.position(position(10))
+    now[0] += 60
+    assert book.execution(fill("e1", "BOT", 5)) == 15
@@ -0,0 +1,104 @@
+import datetime
+import time
+
+import orjson
+import pytest
+
+import icli.recorder as recorder
+from icli.recorder import TickRecorder, readTicks
+
+WHEN = datetime.datetime(2024, 12, 20, 14, 30, tzinfo=datetime.timezone.utc)
+
+
+def rows(symbol, count=3):
+    return [
+        (
+            symbol,
+            WHEN + datetime.timedelta(seconds=i),
+            1.0 + i,
+            10,
+            1.1 + i,
+            20,
+            1.05,
+            i,
+        )
+        for i in range(count)
+    ]
+
+
+def waitFor(rec, written):
+    deadline = time.monotonic() + 5
+    while rec.rowsWritten < written:
+        assert time.monotonic() < deadline, "writer thread never flushed"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def session(monkeypatch):
+    """Control the session date the writer thread rotates on."""
+    current = [datetime.date(2024, 12, 19)]
+    monkeypatch.setattr(recorder, "sessionDate", lambda: current[0])
+    return current
+
+
+def test_jsonRows(tmp_path, session):
+    rec = TickRecorder(clientId=7, fmt="json", directory=tmp_path)
+    rec.start()
+    rec.record(rows("AAPL"))
+    rec.close()
+
+    path = tmp_path / "tickers-2024-12-19-7.json"
+    found = [orjson.loads(line) for line in path.read_bytes().splitlines()]
+    assert [r["symbol"] for r in found] == ["AAPL"] * 3
+    assert found[1]["bid"] == 2.0
+    assert found[1]["time"] == str(WHEN + datetime.timedelta(seconds=1))
+    assert rec.rowsWritten == 3
+
+
+def test_binRows(tmp_path, session):
+    rec = TickRecorder(clientId=7, fmt="bin", directory=tmp_path)
+    rec.start()
+    rec.record(rows("SPY241220C00500000"))
+    rec.close()
+
+    ticks = readTicks(tmp_path / "tickers-2024-12-19-7.bin")
+    assert ticks["symbol"].tolist() == [b"SPY241220C00500000"] * 3
+    assert ticks["time"][0] == WHEN.timestamp()
+    assert ticks["ask"].tolist() == pytest.approx([1.1, 2.1, 3.1])
+    assert ticks["volume"].tolist() == [0, 1, 2]
+
+
+def test_closeFlushesBufferedRows(tmp_path, session):
+    # nothing would flush on its own for a minute
+    rec = TickRecorder(
+        fmt="json", directory=tmp_path, flushRows=10_000, flushInterval=60
+    )
+    rec.start()
+    rec.record(rows("AAPL"))
+    rec.record(rows("MSFT"))
+    rec.close()
+
+    assert rec.rowsWritten == 6
+    assert len(rec.path.read_bytes().splitlines()) == 6
+
+
+def test_rotatesWhenSessionChanges(tmp_path, session):
+    rec = TickRecorder(fmt="bin", directory=tmp_path, flushRows=1)
+    rec.start()
+    rec.record(rows("AAPL", 2))
+    waitFor(rec, 2)
+
+    session[0] = datetime.date(2024, 12, 20)
+    rec.record(rows("MSFT", 1))
+    rec.close()
+
+    first = readTicks(tmp_path / "tickers-2024-12-19-0.bin")
+    second = readTicks(tmp_path / "tickers-2024-12-20-0.bin")
+    assert first["symbol"].tolist() == [b"AAPL"] * 2
+    assert second["symbol"].tolist() == [b"MSFT"]
+    assert rec.path == tmp_path / "tickers-2024-12-20-0.bin"
+
+
+def test_unknownFormat():
+    with pytest.raises(AssertionError):
+        TickRecorder(fmt="csv")
@@ -0,0 +1,71 @@
+import asyncio
+import time
+
+from types import SimpleNamespace
+
+from icli.strategies import INTENT_RETRY_DELAY, OrderIntent, StrategyRuntime
+
+
+def runtime():
+    calls = []
+
+    class Strategy:
+        def __init__(self, state):
+            pass
+
+        async def run(self, symbol):
+            calls.append(symbol)
+
+    state = SimpleNamespace(strategy={"AAPL": {"algo": "S1", "start": "X"}})
+    return StrategyRuntime(state, factories={"S1": Strategy}), calls
+
+
+def intent(rt, filled=0):
+    found = OrderIntent("AAPL", -10, "Z", "L1", filled=filled)
+    rt.state.strategy["AAPL"]["intent"] = found
+    return found
+
+
+def test_failedIntentBacksOff():
+    async def run():
+        rt, calls = runtime()
+
+        rt.resolve(intent(rt), "Failed")
+        assert rt.state.strategy["AAPL"]["start"] == "L1"
+
+        state, failures, retryAt = rt.backoff["AAPL"]
+        assert (state, failures) == ("L1", 1)
+        assert retryAt - time.monotonic() > INTENT_RETRY_DELAY - 1
+
+        # ticks don't evaluate the strategy until the backoff passes
+        rt.notify("AAPL")
+        await asyncio.sleep(0.01)
+        assert calls == []
+
+        # consecutive failures in the same state wait longer
+        rt.resolve(intent(rt), "Failed")
+        assert rt.backoff["AAPL"][1] == 2
+        assert rt.backoff["AAPL"][2] - time.monotonic() > 2 * INTENT_RETRY_DELAY - 1
+
+        # once expired, evaluations run again
+        rt.backoff["AAPL"] = ("L1", 2, time.monotonic())
+        rt.notify("AAPL")
+        await asyncio.sleep(0.01)
+        assert calls == ["AAPL"]
+
+    asyncio.run(run())
+
+
+def test_filledIntentClearsBackoff():
+    async def run():
+        rt, calls = runtime()
+        rt.backoff["AAPL"] = ("L1", 3, time.monotonic() + 60)
+
+        rt.resolve(intent(rt, filled=10), "Filled")
+        assert rt.state.strategy["AAPL"]["start"] == "Z"
+        assert "AAPL" not in rt.backoff
+
+        await asyncio.sleep(0.01)
+        assert calls == ["AAPL"]
+
+    asyncio.run(run())